@@ -3,11 +3,12 @@
 """
 import os
 import logging
+import secrets
 from typing import Dict, Any, Optional
 
 from fastapi import FastAPI, Depends, HTTPException, status, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, PlainTextResponse
 from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
 import jwt
 from datetime import datetime, timedelta
@@ -15,13 +16,12 @@ from datetime import datetime, timedelta
 from core.config import Config
 from core.database import Database
 from core.redis_manager import initialize_redis
-from core.database_cache import DatabaseCache
+from core.database_cache import DatabaseCache, row_key
+from core.logger import setup_logging, shutdown_logging
+from core.metrics import get_metrics, load_exported_snapshots, render_prometheus
 
 # تنظیم لاگر
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-)
+setup_logging(log_file="api.log")
 logger = logging.getLogger("api")
 
 # ایجاد نمونه FastAPI
@@ -82,6 +82,7 @@ async def startup_event():
 
         # ایجاد مدیریت کش دیتابیس
         db_cache = DatabaseCache(db, redis)
+        await db_cache.start()
 
         logger.info("سرور API با موفقیت راه‌اندازی شد.")
     except Exception as e:
@@ -94,9 +95,13 @@ async def shutdown_event():
     """
     ایونت خاموش کردن سرور
     """
-    global db, redis
+    global db, redis, db_cache
 
     try:
+        # لغو اشتراک نامعتبرسازی کش
+        if db_cache:
+            await db_cache.stop()
+
         # قطع اتصال از دیتابیس
         if db:
             logger.info("در حال قطع اتصال از دیتابیس...")
@@ -110,6 +115,8 @@ async def shutdown_event():
         logger.info("سرور API با موفقیت خاموش شد.")
     except Exception as e:
         logger.error(f"خطا در خاموش کردن سرور API: {str(e)}")
+    finally:
+        shutdown_logging()
 
 
 # ----- احراز هویت ----- #
@@ -122,6 +129,9 @@ SECRET_KEY = os.environ.get("JWT_SECRET_KEY", "supersecretkey")
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 60 * 24  # 24 ساعت
 
+# توکن ثابت جمع‌آوری کننده‌ی Prometheus برای /metrics (خالی یعنی فقط توکن دسترسی کاربر)
+METRICS_TOKEN = os.environ.get("METRICS_TOKEN", "")
+
 
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     """
@@ -175,7 +185,8 @@ async def get_current_user(token: str = Depends(oauth2_scheme)):
 
         # دریافت اطلاعات کاربر از دیتابیس
         query = "SELECT * FROM users WHERE id = $1"
-        user = await db_cache.fetch_one("users", query, (user_id,))
+        user = await db_cache.fetch_one("users", query, (user_id,),
+                                        depends_on=[row_key("users", id=user_id)])
 
         if user is None:
             raise credentials_exception
@@ -185,6 +196,24 @@ async def get_current_user(token: str = Depends(oauth2_scheme)):
         raise credentials_exception
 
 
+async def verify_metrics_access(token: str = Depends(oauth2_scheme)) -> Optional[dict]:
+    """
+    بررسی دسترسی به /metrics با توکن ثابت METRICS_TOKEN یا توکن دسترسی کاربر
+
+    Args:
+        token: توکن Bearer
+
+    Returns:
+        Optional[dict]: اطلاعات کاربر یا None برای توکن METRICS_TOKEN
+
+    Raises:
+        HTTPException: در صورت نامعتبر بودن توکن
+    """
+    if METRICS_TOKEN and secrets.compare_digest(token.encode(), METRICS_TOKEN.encode()):
+        return None
+    return await get_current_user(token)
+
+
 @app.post("/token", response_model=Dict[str, str])
 async def login_for_access_token(form_data: OAuth2PasswordRequestForm = Depends()):
     """
@@ -258,6 +287,27 @@ async def status():
 
 # ----- مسیرهای نیازمند احراز هویت ----- #
 
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics(_: Optional[dict] = Depends(verify_metrics_access)):
+    """
+    آمار اجرای هندلرها و پلاگین‌ها با فرمت متنی Prometheus
+
+    آمار پردازه‌ی ربات به صورت دوره‌ای در Redis ذخیره شده و اینجا با آمار خود سرور API ادغام می‌شود.
+
+    Returns:
+        PlainTextResponse: متن متریک‌ها
+    """
+    snapshots = {}
+    if redis:
+        try:
+            snapshots = await load_exported_snapshots(redis)
+        except Exception as e:
+            logger.error(f"خطا در خواندن متریک‌ها از Redis: {str(e)}")
+    snapshots["api"] = get_metrics().snapshot()
+
+    return PlainTextResponse(render_prometheus(snapshots), media_type="text/plain; version=0.0.4")
+
+
 @app.get("/me", response_model=Dict[str, Any])
 async def read_users_me(current_user: dict = Depends(get_current_user)):
     """
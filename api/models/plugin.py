@@ -87,8 +87,10 @@ class PluginListResponse(BaseResponse):
     """مدل پاسخ لیست پلاگین‌ها"""
     data: List[PluginResponse]
     total: int
-    page: int
+    total_exact: bool = True
+    page: Optional[int] = None
     limit: int
+    next_cursor: Optional[str] = None
 
 
 class PluginToggleRequest(BaseModel):
@@ -86,5 +86,7 @@ class UserListResponse(BaseResponse):
     """مدل پاسخ لیست کاربران"""
     data: List[UserResponse]
     total: int
-    page: int
+    total_exact: bool = True
+    page: Optional[int] = None
     limit: int
+    next_cursor: Optional[str] = None
@@ -0,0 +1,109 @@
+"""
+صفحه‌بندی مبتنی بر کلید (keyset) برای endpointهای لیست
+
+به‌جای OFFSET که با عمیق‌تر شدن صفحه‌ها کندتر می‌شود، هر صفحه از آخرین کلید مرتب‌سازی
+صفحه‌ی قبل ادامه می‌یابد ("WHERE (name, id) > ($1, $2)") و از ایندکس استفاده می‌کند.
+کلید آخرین ردیف در یک cursor مبهم (base64 از JSON) به کلاینت داده می‌شود.
+"""
+import base64
+import binascii
+import json
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from fastapi import HTTPException, status
+
+# نسخه‌ی قالب cursor
+CURSOR_VERSION = 1
+
+
+def encode_cursor(sort: str, values: Sequence[Any]) -> str:
+    """
+    ساخت cursor از مقادیر کلید مرتب‌سازی آخرین ردیف
+
+    Args:
+        sort: نام مرتب‌سازی (برای رد cursor مرتب‌سازی دیگر)
+        values: مقادیر ستون‌های کلید
+
+    Returns:
+        str: cursor مبهم
+    """
+    payload = json.dumps({'v': CURSOR_VERSION, 's': sort, 'k': list(values)},
+                         separators=(",", ":"), ensure_ascii=False, default=str)
+    return base64.urlsafe_b64encode(payload.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str, sort: str, size: int) -> List[Any]:
+    """
+    خواندن مقادیر کلید از cursor
+
+    Args:
+        cursor: cursor دریافتی از کلاینت
+        sort: نام مرتب‌سازی مورد انتظار
+        size: تعداد ستون‌های کلید
+
+    Returns:
+        List[Any]: مقادیر کلید
+
+    Raises:
+        HTTPException: در صورت نامعتبر بودن cursor
+    """
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        payload = json.loads(raw.decode("utf-8"))
+        if payload.get('v') == CURSOR_VERSION and payload.get('s') == sort \
+                and isinstance(payload.get('k'), list) and len(payload['k']) == size:
+            return payload['k']
+    except (binascii.Error, UnicodeDecodeError, ValueError, AttributeError):
+        pass
+    raise HTTPException(
+        status_code=status.HTTP_400_BAD_REQUEST,
+        detail="cursor نامعتبر است"
+    )
+
+
+def keyset_condition(columns: Sequence[str], first_param: int, descending: Sequence[bool] = ()) -> str:
+    """
+    شرط ادامه‌ی صفحه پس از آخرین کلید
+
+    Args:
+        columns: ستون‌ها یا عبارت‌های کلید به ترتیب مرتب‌سازی (آخرین ستون باید یکتا باشد)
+        first_param: شماره‌ی اولین پارامتر
+        descending: نزولی بودن هر ستون (پیش‌فرض همه صعودی)
+
+    Returns:
+        str: شرط SQL
+    """
+    placeholders = [f"${first_param + index}" for index in range(len(columns))]
+    if not any(descending):
+        if len(columns) == 1:
+            return f"{columns[0]} > {placeholders[0]}"
+        return f"({', '.join(columns)}) > ({', '.join(placeholders)})"
+
+    # ترتیب ترکیبی: (c1 < $1) OR (c1 = $1 AND c2 > $2) ...
+    descending = list(descending) + [False] * (len(columns) - len(descending))
+    branches = []
+    for index, column in enumerate(columns):
+        equal = [f"{columns[prev]} = {placeholders[prev]}" for prev in range(index)]
+        operator = "<" if descending[index] else ">"
+        branches.append(" AND ".join(equal + [f"{column} {operator} {placeholders[index]}"]))
+    return "(" + " OR ".join(f"({branch})" for branch in branches) + ")"
+
+
+def split_page(rows: List[Dict[str, Any]], limit: int, sort: str,
+               columns: Sequence[str]) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+    """
+    جدا کردن صفحه از نتیجه‌ی LIMIT limit + 1 و ساخت cursor صفحه‌ی بعد
+
+    Args:
+        rows: ردیف‌های دریافتی (حداکثر limit + 1)
+        limit: اندازه‌ی صفحه
+        sort: نام مرتب‌سازی
+        columns: ستون‌های کلید
+
+    Returns:
+        Tuple[List[Dict[str, Any]], Optional[str]]: ردیف‌های صفحه و cursor بعدی (None در صفحه‌ی آخر)
+    """
+    if len(rows) <= limit:
+        return rows, None
+    rows = rows[:limit]
+    return rows, encode_cursor(sort, [rows[-1][column] for column in columns])
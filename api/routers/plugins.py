@@ -11,23 +11,37 @@ from api.models.plugin import (
 )
 from api.models.base import BaseResponse
 from api.main import get_current_user, db_cache
+from api.pagination import decode_cursor, keyset_condition, split_page
+from api.search import RANK_COLUMN, RANK_SORT, like_pattern, match_condition, rank_expression
 
 router = APIRouter(prefix="/plugins", tags=["plugins"])
 logger = logging.getLogger("api.plugins")
 
+# کلید صفحه‌بندی لیست پلاگین‌ها (id برای یکتا بودن کلید)
+PLUGIN_SORT = "name"
+PLUGIN_KEYSET = ("name", "id")
+PLUGIN_SEARCH_COLUMNS = ("name", "display_name")
+PLUGIN_SEARCH_TEXT = ("description",)
+
 
 @router.get("/", response_model=PluginListResponse)
 async def list_plugins(
     current_user: dict = Depends(get_current_user),
-    page: int = Query(1, ge=1, description="شماره صفحه"),
+    page: int = Query(1, ge=1, description="شماره صفحه (در صورت نبود cursor)"),
     limit: int = Query(10, ge=1, le=100, description="تعداد آیتم در هر صفحه"),
     plugin_type: Optional[str] = Query(None, description="فیلتر براساس نوع پلاگین"),
     status: Optional[str] = Query(None, description="فیلتر براساس وضعیت پلاگین"),
-    search: Optional[str] = Query(None, description="جستجو براساس نام یا توضیحات")
+    search: Optional[str] = Query(None, description="جستجو براساس نام یا توضیحات"),
+    cursor: Optional[str] = Query(None, description="cursor صفحه‌ی بعد (next_cursor پاسخ قبلی)"),
+    exact_count: bool = Query(False, description="شمارش دقیق به‌جای تعداد تقریبی")
 ):
     """
     دریافت لیست پلاگین‌ها
 
+    با cursor صفحه‌ی بعد از آخرین (name, id) صفحه‌ی قبل ادامه می‌یابد و page نادیده
+    گرفته می‌شود. total برای جداول بزرگ تقریبی است مگر exact_count درخواست شود. نتایج
+    جستجو به ترتیب شباهت به متن جستجو (و سپس شناسه) مرتب می‌شوند.
+
     Args:
         current_user: کاربر جاری
         page: شماره صفحه
@@ -35,13 +49,12 @@ async def list_plugins(
         plugin_type: نوع پلاگین
         status: وضعیت پلاگین
         search: متن جستجو
+        cursor: cursor صفحه‌ی بعد
+        exact_count: شمارش دقیق
 
     Returns:
         PluginListResponse: لیست پلاگین‌ها
     """
-    # محاسبه آفست
-    offset = (page - 1) * limit
-
     # ساخت کوئری
     base_query = "FROM plugins"
     where_clauses = []
@@ -49,8 +62,9 @@ async def list_plugins(
     param_count = 1
 
     if search:
-        where_clauses.append(f"(name ILIKE ${param_count} OR display_name ILIKE ${param_count} OR description ILIKE ${param_count})")
-        params.append(f"%{search}%")
+        # ILIKE با ایندکس trigram (الگو escape شده تا % و _ کاربر wildcard نباشند)
+        where_clauses.append(match_condition(PLUGIN_SEARCH_COLUMNS + PLUGIN_SEARCH_TEXT, param_count))
+        params.append(like_pattern(search))
         param_count += 1
 
     if plugin_type:
@@ -63,31 +77,64 @@ async def list_plugins(
         params.append(status)
         param_count += 1
 
+    sort = RANK_SORT if search else PLUGIN_SORT
+    keyset = (RANK_COLUMN, "id") if search else PLUGIN_KEYSET
+    after = decode_cursor(cursor, sort, len(keyset)) if cursor else None
+
+    filter_query = base_query
     if where_clauses:
-        base_query += " WHERE " + " AND ".join(where_clauses)
+        filter_query += " WHERE " + " AND ".join(where_clauses)
+
+    # شمارش (تقریبی مگر شمارش دقیق درخواست شده باشد)
+    if exact_count:
+        total = await db_cache.count("plugins", f"SELECT COUNT(*) {filter_query}", tuple(params))
+        total_exact = True
+    else:
+        total, total_exact = await db_cache.estimate_count("plugins", f"SELECT 1 {filter_query}", tuple(params))
+
+    # رتبه‌بندی نتایج جستجو براساس شباهت و سپس شناسه
+    order_by, rank_select = "name ASC, id ASC", ""
+    key_columns, descending = PLUGIN_KEYSET, ()
+    if search:
+        rank = rank_expression(PLUGIN_SEARCH_COLUMNS, param_count, PLUGIN_SEARCH_TEXT)
+        params.append(search)
+        param_count += 1
+        order_by, rank_select = f"{RANK_COLUMN} DESC, id ASC", f", {rank} AS {RANK_COLUMN}"
+        key_columns, descending = (rank, "id"), (True, False)
+
+    # ادامه از آخرین کلید صفحه‌ی قبل به‌جای OFFSET
+    offset = 0
+    if after is not None:
+        where_clauses.append(keyset_condition(key_columns, param_count, descending))
+        params.extend(after)
+        page = None
+    else:
+        offset = (page - 1) * limit
 
-    # کوئری شمارش
-    count_query = f"SELECT COUNT(*) {base_query}"
-    count_result = await db_cache.count("plugins", count_query, tuple(params))
+    if where_clauses:
+        base_query += " WHERE " + " AND ".join(where_clauses)
 
-    # کوئری دریافت پلاگین‌ها
+    # کوئری دریافت پلاگین‌ها (یک ردیف اضافه برای تشخیص صفحه‌ی بعد)
     query = f"""
     SELECT id, name, display_name, description, version, author, type, status,
-           config, module_path, dependencies, requires_restart, created_at, updated_at
+           config, module_path, dependencies, requires_restart, created_at, updated_at{rank_select}
     {base_query}
-    ORDER BY name ASC
-    LIMIT {limit} OFFSET {offset}
+    ORDER BY {order_by}
+    LIMIT {limit + 1} OFFSET {offset}
     """
 
-    plugins = await db_cache.fetch_all("plugins", query, tuple(params))
+    rows = await db_cache.fetch_all("plugins", query, tuple(params))
+    plugins, next_cursor = split_page(rows, limit, sort, keyset)
 
     return {
         "success": True,
         "message": "لیست پلاگین‌ها با موفقیت دریافت شد",
         "data": plugins,
-        "total": count_result,
+        "total": total,
+        "total_exact": total_exact,
         "page": page,
-        "limit": limit
+        "limit": limit,
+        "next_cursor": next_cursor
     }
 
 
@@ -11,26 +11,42 @@ from api.models.user import (
 )
 from api.models.base import BaseResponse
 from api.main import get_current_user, db_cache
+from api.pagination import decode_cursor, keyset_condition, split_page
+from api.search import RANK_COLUMN, RANK_SORT, like_pattern, match_condition, rank_expression
+from core.database_cache import row_key
 
 router = APIRouter(prefix="/users", tags=["users"])
 logger = logging.getLogger("api.users")
 
+# کلید صفحه‌بندی لیست کاربران
+USER_SORT = "id"
+USER_KEYSET = ("id",)
+USER_SEARCH_COLUMNS = ("username", "email")
+
 
 @router.get("/", response_model=UserListResponse)
 async def list_users(
     current_user: dict = Depends(get_current_user),
-    page: int = Query(1, ge=1, description="شماره صفحه"),
+    page: int = Query(1, ge=1, description="شماره صفحه (در صورت نبود cursor)"),
     limit: int = Query(10, ge=1, le=100, description="تعداد آیتم در هر صفحه"),
-    search: Optional[str] = Query(None, description="جستجو براساس نام کاربری یا ایمیل")
+    search: Optional[str] = Query(None, description="جستجو براساس نام کاربری یا ایمیل"),
+    cursor: Optional[str] = Query(None, description="cursor صفحه‌ی بعد (next_cursor پاسخ قبلی)"),
+    exact_count: bool = Query(False, description="شمارش دقیق به‌جای تعداد تقریبی")
 ):
     """
     دریافت لیست کاربران
 
+    با cursor صفحه‌ی بعد از آخرین شناسه‌ی صفحه‌ی قبل ادامه می‌یابد و page نادیده گرفته
+    می‌شود. total برای جداول بزرگ تقریبی است مگر exact_count درخواست شود. نتایج جستجو
+    به ترتیب شباهت به متن جستجو (و سپس شناسه) مرتب می‌شوند.
+
     Args:
         current_user: کاربر جاری
         page: شماره صفحه
         limit: تعداد آیتم در هر صفحه
         search: متن جستجو
+        cursor: cursor صفحه‌ی بعد
+        exact_count: شمارش دقیق
 
     Returns:
         UserListResponse: لیست کاربران
@@ -42,43 +58,73 @@ async def list_users(
             detail="شما دسترسی به این منبع را ندارید"
         )
 
-    # محاسبه آفست
-    offset = (page - 1) * limit
-
     # ساخت کوئری
     base_query = "FROM users"
     where_clauses = []
     params = []
 
     if search:
-        where_clauses.append("(username ILIKE $1 OR email ILIKE $1)")
-        params.append(f"%{search}%")
+        # ILIKE با ایندکس trigram (الگو escape شده تا % و _ کاربر wildcard نباشند)
+        where_clauses.append(match_condition(USER_SEARCH_COLUMNS, 1))
+        params.append(like_pattern(search))
+
+    sort = RANK_SORT if search else USER_SORT
+    keyset = (RANK_COLUMN, "id") if search else USER_KEYSET
+    after = decode_cursor(cursor, sort, len(keyset)) if cursor else None
+
+    filter_query = base_query
+    if where_clauses:
+        filter_query += " WHERE " + " AND ".join(where_clauses)
+
+    # شمارش (تقریبی مگر شمارش دقیق درخواست شده باشد)
+    if exact_count:
+        total = await db_cache.count("users", f"SELECT COUNT(*) {filter_query}", tuple(params))
+        total_exact = True
+    else:
+        total, total_exact = await db_cache.estimate_count("users", f"SELECT 1 {filter_query}", tuple(params))
+
+    # رتبه‌بندی نتایج جستجو براساس شباهت و سپس شناسه
+    order_by, rank_select = "id ASC", ""
+    key_columns, descending = USER_KEYSET, ()
+    if search:
+        params.append(search)
+        rank = rank_expression(USER_SEARCH_COLUMNS, len(params))
+        order_by, rank_select = f"{RANK_COLUMN} DESC, id ASC", f", {rank} AS {RANK_COLUMN}"
+        key_columns, descending = (rank, "id"), (True, False)
+
+    # ادامه از آخرین کلید صفحه‌ی قبل به‌جای OFFSET
+    offset = 0
+    if after is not None:
+        where_clauses.append(keyset_condition(key_columns, len(params) + 1, descending))
+        params.extend(after)
+        page = None
+    else:
+        offset = (page - 1) * limit
 
     if where_clauses:
         base_query += " WHERE " + " AND ".join(where_clauses)
 
-    # کوئری شمارش
-    count_query = f"SELECT COUNT(*) {base_query}"
-    count_result = await db_cache.count("users", count_query, tuple(params))
-
-    # کوئری دریافت کاربران
+    # کوئری دریافت کاربران (یک ردیف اضافه برای تشخیص صفحه‌ی بعد)
     query = f"""
     SELECT id, username, email, full_name, telegram_id, telegram_username, role,
-           is_active, created_at, updated_at
+           is_active, created_at, updated_at{rank_select}
     {base_query}
-    ORDER BY id ASC
-    LIMIT {limit} OFFSET {offset}
+    ORDER BY {order_by}
+    LIMIT {limit + 1} OFFSET {offset}
     """
 
-    users = await db_cache.fetch_all("users", query, tuple(params))
+    rows = await db_cache.fetch_all("users", query, tuple(params))
+    users, next_cursor = split_page(rows, limit, sort, keyset)
 
     return {
         "success": True,
         "message": "لیست کاربران با موفقیت دریافت شد",
         "data": users,
-        "total": count_result,
+        "total": total,
+        "total_exact": total_exact,
         "page": page,
-        "limit": limit
+        "limit": limit,
+        "next_cursor": next_cursor
     }
 
 
@@ -112,7 +158,7 @@ async def get_user(
     WHERE id = $1
     """
 
-    user = await db_cache.fetch_one("users", query, (user_id,))
+    user = await db_cache.fetch_one("users", query, (user_id,), depends_on=[row_key("users", id=user_id)])
 
     if not user:
         raise HTTPException(
@@ -122,7 +168,8 @@ async def get_user(
 
     # دریافت تنظیمات کاربر
     settings_query = "SELECT settings FROM user_settings WHERE user_id = $1"
-    settings_result = await db_cache.fetch_one("user_settings", settings_query, (user_id,))
+    settings_result = await db_cache.fetch_one("user_settings", settings_query, (user_id,),
+                                               depends_on=[row_key("user_settings", user_id=user_id)])
 
     settings = settings_result["settings"] if settings_result else {}
     user["settings"] = settings
@@ -185,7 +232,8 @@ async def create_user(
     )
 
     try:
-        result = await db_cache.fetch_one("users", insert_query, params)
+        # کاربر جدید فقط لیست‌ها و شمارش‌های کاربران را نامعتبر می‌کند
+        result = await db_cache.execute_returning(["users"], insert_query, params, keys=[])
 
         # ایجاد تنظیمات پیش‌فرض
         settings_query = """
@@ -193,7 +241,8 @@ async def create_user(
         VALUES ($1, $2)
         """
 
-        await db_cache.execute(["user_settings"], settings_query, (result["id"], {}))
+        await db_cache.execute(["user_settings"], settings_query, (result["id"], {}),
+                               keys=[row_key("user_settings", user_id=result["id"])])
 
         return result
     except Exception as e:
@@ -230,7 +279,8 @@ async def update_user(
 
     # بررسی وجود کاربر
     query = "SELECT id FROM users WHERE id = $1"
-    existing_user = await db_cache.fetch_one("users", query, (user_id,))
+    existing_user = await db_cache.fetch_one("users", query, (user_id,),
+                                             depends_on=[row_key("users", id=user_id)])
 
     if not existing_user:
         raise HTTPException(
@@ -301,7 +351,8 @@ async def update_user(
     """
 
     try:
-        result = await db_cache.fetch_one("users", update_query, tuple(params))
+        result = await db_cache.execute_returning(["users"], update_query, tuple(params),
+                                                  keys=[row_key("users", id=user_id)])
         return result
     except Exception as e:
         logger.error(f"خطا در به‌روزرسانی کاربر: {str(e)}")
@@ -335,7 +386,8 @@ async def delete_user(
 
     # بررسی وجود کاربر
     query = "SELECT id FROM users WHERE id = $1"
-    existing_user = await db_cache.fetch_one("users", query, (user_id,))
+    existing_user = await db_cache.fetch_one("users", query, (user_id,),
+                                             depends_on=[row_key("users", id=user_id)])
 
     if not existing_user:
         raise HTTPException(
@@ -347,7 +399,8 @@ async def delete_user(
     delete_query = "DELETE FROM users WHERE id = $1"
 
     try:
-        await db_cache.execute(["users", "user_settings"], delete_query, (user_id,))
+        await db_cache.execute(["users", "user_settings"], delete_query, (user_id,),
+                               keys=[row_key("users", id=user_id), row_key("user_settings", user_id=user_id)])
 
         return {
             "success": True,
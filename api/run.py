@@ -5,11 +5,10 @@ import os
 import logging
 import uvicorn
 
+from core.logger import setup_logging
+
 # تنظیم لاگر
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-)
+setup_logging(log_file="api.log")
 logger = logging.getLogger("api.launcher")
 
 if __name__ == "__main__":
@@ -0,0 +1,59 @@
+"""
+ابزارهای جستجوی متنی برای endpointهای لیست
+
+جستجو با ILIKE '%...%' انجام می‌شود که ایندکس‌های GIN trigram (migration
+04_search_indexes) آن را بدون اسکن کامل جدول پوشش می‌دهند. نتایج جستجو براساس
+similarity() همان افزونه‌ی pg_trgm رتبه‌بندی می‌شوند.
+"""
+from typing import Sequence
+
+# نام مرتب‌سازی و ستون رتبه در نتایج جستجو
+RANK_SORT = "rank"
+RANK_COLUMN = "rank"
+
+
+def like_pattern(text: str) -> str:
+    """
+    ساخت الگوی ILIKE با escape کاراکترهای ویژه
+
+    Args:
+        text: متن جستجوی کاربر
+
+    Returns:
+        str: الگوی '%...%' که % و _ کاربر در آن معنای wildcard ندارند
+    """
+    escaped = text.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+    return f"%{escaped}%"
+
+
+def match_condition(columns: Sequence[str], param: int) -> str:
+    """
+    شرط تطبیق ILIKE روی چند ستون
+
+    Args:
+        columns: ستون‌های جستجو
+        param: شماره‌ی پارامتر الگو
+
+    Returns:
+        str: شرط SQL
+    """
+    return "(" + " OR ".join(f"{column} ILIKE ${param}" for column in columns) + ")"
+
+
+def rank_expression(columns: Sequence[str], param: int, words: Sequence[str] = ()) -> str:
+    """
+    عبارت رتبه‌ی شباهت متن جستجو
+
+    Args:
+        columns: ستون‌های کوتاه (نام، ایمیل) که با similarity مقایسه می‌شوند
+        param: شماره‌ی پارامتر متن جستجو
+        words: ستون‌های متن بلند (توضیحات) که با word_similarity مقایسه می‌شوند
+
+    Returns:
+        str: عبارت SQL از نوع real بین 0 و 1
+    """
+    parts = [f"similarity(coalesce({column}, ''), ${param})" for column in columns]
+    parts += [f"word_similarity(${param}, coalesce({column}, ''))" for column in words]
+    if len(parts) == 1:
+        return parts[0]
+    return f"GREATEST({', '.join(parts)})"
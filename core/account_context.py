@@ -0,0 +1,99 @@
+"""
+حساب کاربری جاری در اجرای چند حسابی
+
+هر بروزرسانی در task مربوط به خود با شناسه‌ی حسابی که آن را دریافت کرده برچسب می‌خورد
+تا پلاگین‌های مشترک بین حساب‌ها وضعیت و کلیدهای هر حساب را جدا نگه دارند.
+"""
+from contextvars import ContextVar
+from typing import Any, Dict, List, Optional
+
+# حساب بروزرسانی در حال پردازش (None در اجرای تک حسابی)
+_current_account: ContextVar[Optional[str]] = ContextVar('current_account', default=None)
+
+
+def get_current_account() -> Optional[str]:
+    """
+    دریافت شناسه‌ی حساب بروزرسانی در حال پردازش
+
+    Returns:
+        Optional[str]: شناسه حساب یا None در اجرای تک حسابی
+    """
+    return _current_account.get()
+
+
+def set_current_account(account_id: Optional[str]) -> None:
+    """
+    تنظیم حساب جاری در task فعلی
+
+    Args:
+        account_id: شناسه حساب
+    """
+    _current_account.set(account_id)
+
+
+def account_key(key: str, account_id: Optional[str] = None) -> str:
+    """
+    ساخت کلید جدا شده برای یک حساب (برای Redis و کش)
+
+    Args:
+        key: کلید
+        account_id: شناسه حساب (پیش‌فرض حساب جاری)
+
+    Returns:
+        str: کلید با پیشوند حساب یا خود کلید در اجرای تک حسابی
+    """
+    if account_id is None:
+        account_id = _current_account.get()
+    if account_id is None:
+        return key
+    return f"account:{account_id}:{key}"
+
+
+class AccountStateStore:
+    """
+    فضای وضعیت جداگانه برای هر حساب در یک نمونه‌ی مشترک پلاگین
+    """
+
+    def __init__(self):
+        """
+        مقداردهی اولیه
+        """
+        self._states: Dict[Optional[str], Dict[str, Any]] = {}
+
+    def get(self, account_id: Optional[str] = None) -> Dict[str, Any]:
+        """
+        دریافت وضعیت یک حساب
+
+        Args:
+            account_id: شناسه حساب (پیش‌فرض حساب جاری)
+
+        Returns:
+            Dict[str, Any]: دیکشنری وضعیت حساب
+        """
+        if account_id is None:
+            account_id = _current_account.get()
+        state = self._states.get(account_id)
+        if state is None:
+            state = self._states[account_id] = {}
+        return state
+
+    def drop(self, account_id: Optional[str]) -> bool:
+        """
+        حذف وضعیت یک حساب
+
+        Args:
+            account_id: شناسه حساب
+
+        Returns:
+            bool: آیا وضعیتی حذف شد
+        """
+        return self._states.pop(account_id, None) is not None
+
+    def accounts(self) -> List[Optional[str]]:
+        """
+        حساب‌های دارای وضعیت
+
+        Returns:
+            List[Optional[str]]: لیست شناسه‌ها
+        """
+        return list(self._states.keys())
@@ -10,22 +10,14 @@ import signal
 import sys
 import time
 import uuid
-from typing import Any, Callable, Dict, List, Optional, Tuple, Union
+from typing import Any, Callable, Dict, List, Optional, Set, Union
 from dataclasses import dataclass, field, asdict
-import multiprocessing
 from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 
 from core.database.redis import RedisManager
+from core.metrics import get_metrics
+from core.task_queue import PriorityScheduler, QueueEntry, StreamTaskQueue
 
-# تنظیم سیستم لاگینگ
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.FileHandler("data/logs/background_tasks.log"),
-        logging.StreamHandler()
-    ]
-)
 logger = logging.getLogger(__name__)
 
 
@@ -36,6 +28,13 @@ class TaskPriority:
     HIGH = "high"
 
 
+# اولویت‌ها به ترتیب بررسی
+PRIORITIES = [TaskPriority.HIGH, TaskPriority.NORMAL, TaskPriority.LOW]
+
+# پیشوند صف‌های list نسخه‌های قبلی؛ وظایف باقی‌مانده در شروع به stream منتقل می‌شوند
+LEGACY_QUEUE_PREFIX = "task_queue:"
+
+
 class TaskStatus:
     PENDING = "pending"
     RUNNING = "running"
@@ -113,10 +112,19 @@ class TaskManager:
         self.process_pool = ProcessPoolExecutor(max_workers=3)
 
         # کلیدهای Redis
-        self.queue_prefix = "task_queue:"
         self.task_prefix = "task:"
         self.result_prefix = "task_result:"
 
+        # صف پایدار مشترک بین کارگرها (Redis Streams)
+        self.queue = StreamTaskQueue(stream_prefix="task_stream:")
+        self._running_tasks: Set[asyncio.Task] = set()
+
+        # زمان‌بند واحد: حداکثر وظایف هم‌زمان این کارگر و انتخاب بین اولویت‌ها
+        self.max_concurrency = max(int(os.getenv("TASK_MAX_CONCURRENCY", "10")), 1)
+        self.scheduler = PriorityScheduler(PRIORITIES)
+        self._slots: Optional[asyncio.Semaphore] = None
+        get_metrics().register_collector('task_scheduler', self._gauges)
+
         # بارگذاری وظایف موجود
         self.load_tasks()
 
@@ -189,7 +197,7 @@ class TaskManager:
         self.redis.set(f"{self.task_prefix}{task_id}", task.to_dict())
 
         # افزودن به صف
-        self.redis.enqueue(f"{self.queue_prefix}{priority}", task_id)
+        self.redis.stream_add(self.queue.stream(priority), {'task_id': task_id})
 
         logger.info(f"وظیفه {name} (ID: {task_id}) ایجاد شد")
         return task_id
@@ -257,19 +265,54 @@ class TaskManager:
         self.redis.set(f"{self.task_prefix}{task_id}", task.to_dict())
         return True
 
-    def list_tasks(self, status: Optional[str] = None) -> List[Task]:
+    def list_tasks(self, status: Optional[str] = None,
+                   with_stats: bool = False) -> Union[List[Task], Dict[str, Any]]:
         """
         لیست وظایف
 
         Args:
             status: وضعیت فیلتر
+            with_stats: افزودن آمار زمان‌بند هر اولویت به خروجی
 
         Returns:
-            List[Task]: لیست وظایف
+            Union[List[Task], Dict[str, Any]]: لیست وظایف یا {'tasks': ...، 'stats': ...} با with_stats
         """
         if status:
-            return [task for task in self.tasks.values() if task.status == status]
-        return list(self.tasks.values())
+            tasks = [task for task in self.tasks.values() if task.status == status]
+        else:
+            tasks = list(self.tasks.values())
+        if with_stats:
+            return {'tasks': tasks, 'stats': self.get_scheduler_stats()}
+        return tasks
+
+    def get_scheduler_stats(self) -> Dict[str, Any]:
+        """
+        آمار زمان‌بند: ظرفیت، وظایف در حال اجرا و تأخیر و توان عملیاتی هر اولویت
+
+        Returns:
+            Dict[str, Any]: آمار
+        """
+        return {
+            'policy': self.scheduler.policy,
+            'weights': dict(self.scheduler.weights),
+            'aging_seconds': self.scheduler.aging,
+            'max_concurrency': self.max_concurrency,
+            'running': len(self._running_tasks),
+            'priorities': self.scheduler.get_stats(),
+        }
+
+    def _gauges(self) -> Dict[str, float]:
+        """
+        مقادیر لحظه‌ای زمان‌بند برای /metrics
+
+        Returns:
+            Dict[str, float]: آمار هر اولویت با پیشوند نام اولویت
+        """
+        gauges = {'running': len(self._running_tasks), 'max_concurrency': self.max_concurrency}
+        for priority, stats in self.scheduler.get_stats().items():
+            for key, value in stats.items():
+                gauges[f"{priority}_{key}"] = value
+        return gauges
 
     def clear_completed_tasks(self, age: int = 86400) -> int:
         """
@@ -299,8 +342,7 @@ class TaskManager:
         logger.info(f"{cleared_count} وظیفه قدیمی پاکسازی شد")
         return cleared_count
 
-    def _load_function(self, function_name: str, module_path: Optional[str] = None) \
-        -> Optional[Callable]: \
+    def _load_function(self, function_name: str, module_path: Optional[str] = None) -> Optional[Callable]:
         """
         بارگذاری دینامیک تابع
 
@@ -332,18 +374,63 @@ class TaskManager:
             logger.error(f"خطا در بارگذاری تابع {function_name}: {str(e)}")
             return None
 
-    async def _execute_task(self, task: Task):
+    async def _load_task(self, task_id: str) -> Optional[Task]:
+        """
+        دریافت آخرین وضعیت وظیفه از Redis با کلاینت async
+
+        Args:
+            task_id: شناسه وظیفه
+
+        Returns:
+            Optional[Task]: وظیفه یا None
+        """
+        raw = await self.queue.client.get(f"{self.task_prefix}{task_id}")
+        if raw is None:
+            return None
+        task = Task.from_dict(json.loads(raw))
+        self.tasks[task_id] = task
+        return task
+
+    async def _save_task(self, task: Task) -> None:
+        """
+        ذخیره وضعیت وظیفه در Redis با کلاینت async
+
+        Args:
+            task: وظیفه
+        """
+        await self.queue.client.set(f"{self.task_prefix}{task.id}", json.dumps(task.to_dict(), default=str))
+
+    async def _heartbeat(self, entry: QueueEntry) -> None:
+        """
+        تمدید visibility timeout پیام تا پایان اجرای وظیفه
+
+        Args:
+            entry: پیام صف
+        """
+        interval = max(self.queue.visibility_timeout / 3, 0.1)
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                await self.queue.touch(entry)
+            except Exception as e:
+                logger.error(f"خطا در تمدید زمان وظیفه {entry.task_id}: {str(e)}")
+
+    async def _execute_task(self, task: Task, entry: QueueEntry):
         """
         اجرای یک وظیفه
 
         Args:
             task: وظیفه
+            entry: پیام صف (پس از ذخیره‌ی وضعیت نهایی ack می‌شود)
         """
         # بروزرسانی وضعیت
         task.status = TaskStatus.RUNNING
         task.started_at = time.time()
-        self.redis.set(f"{self.task_prefix}{task.id}", task.to_dict())
+        await self._save_task(task)
+        started = time.perf_counter()
 
+        retry = False
+        heartbeat = asyncio.create_task(self._heartbeat(entry))
         try:
             # بارگذاری تابع
             function = self._load_function(task.function_name, task.module_path)
@@ -381,55 +468,144 @@ class TaskManager:
             if task.retries < task.max_retries:
                 task.retries += 1
                 task.status = TaskStatus.PENDING
-
-                # افزودن مجدد به صف
-                self.redis.enqueue(f"{self.queue_prefix}{task.priority}", task.id)
+                retry = True
 
                 logger.warning(f"وظیفه {task.name} (ID: {task.id}) با خطا مواجه شد، تلاش مجدد {task.retries}/{task.max_retries}")
             else:
                 logger.error(f"وظیفه {task.name} (ID: {task.id}) با خطا شکست خورد: {str(e)}")
+        finally:
+            heartbeat.cancel()
+            self.scheduler.record_done(entry.priority, time.perf_counter() - started,
+                                       task.status == TaskStatus.COMPLETED)
 
-        # ذخیره وضعیت نهایی
-        self.redis.set(f"{self.task_prefix}{task.id}", task.to_dict())
+        # ذخیره وضعیت نهایی (برای تلاش مجدد، PENDING پیش از افزودن مجدد به صف ذخیره می‌شود)
+        await self._save_task(task)
+        if retry:
+            await self.queue.enqueue(task.priority, task.id)
 
         # ذخیره نتیجه در Redis جداگانه برای مدیریت حافظه بهتر
         if task.status == TaskStatus.COMPLETED:
             try:
-                self.redis.set(f"{self.result_prefix}{task.id}", task.result)
+                result = task.result
+                if isinstance(result, (dict, list, tuple)):
+                    result = json.dumps(result, default=str)
+                elif result is not None and not isinstance(result, (str, bytes, int, float)):
+                    result = str(result)
+                if result is not None:
+                    await self.queue.client.set(f"{self.result_prefix}{task.id}", result)
             except Exception as e:
                 logger.error(f"خطا در ذخیره نتیجه: {str(e)}")
 
-    async def _process_queue(self, priority: str):
+        # پایان پیام پس از ذخیره‌ی وضعیت؛ در صورت از کار افتادن پیش از این، پیام واگذار می‌شود
+        await self.queue.ack(entry)
+
+    async def _dispatch(self, entry: QueueEntry) -> bool:
         """
-        پردازش صف وظایف
+        بررسی وضعیت وظیفه‌ی پیام دریافتی و شروع اجرای آن
 
         Args:
-            priority: اولویت
+            entry: پیام صف
+
+        Returns:
+            bool: آیا اجرای وظیفه شروع شد (ظرفیت اشغال شده با پایان آن آزاد می‌شود)
         """
-        queue_name = f"{self.queue_prefix}{priority}"
+        task = await self._load_task(entry.task_id)
+        if not task:
+            logger.warning(f"وظیفه {entry.task_id} یافت نشد")
+            await self.queue.ack(entry)
+            return False
+
+        if entry.reclaimed and task.status == TaskStatus.RUNNING:
+            # کارگر قبلی پیش از پایان وظیفه از کار افتاده است؛ یک تلاش ناموفق محسوب می‌شود
+            if task.retries >= task.max_retries:
+                task.status = TaskStatus.FAILED
+                task.error = "کارگر پیش از پایان وظیفه متوقف شد"
+                task.completed_at = time.time()
+                await self._save_task(task)
+                await self.queue.ack(entry)
+                logger.error(f"وظیفه {task.name} (ID: {task.id}) پس از {task.retries} تلاش کنار گذاشته شد")
+                return False
+            task.retries += 1
+            task.status = TaskStatus.PENDING
+
+        # بررسی وضعیت (لغو شده، تکمیل شده یا پیام تکراری)
+        if task.status != TaskStatus.PENDING:
+            await self.queue.ack(entry)
+            return False
+
+        # اجرای وظیفه
+        running = asyncio.create_task(self._execute_task(task, entry))
+        self._running_tasks.add(running)
+        running.add_done_callback(self._running_tasks.discard)
+        running.add_done_callback(lambda _: self._slots.release())
+        return True
 
+    async def _next_entry(self) -> Optional[QueueEntry]:
+        """
+        انتخاب پیام بعدی بین اولویت‌ها
+
+        برای هر اولویتی که پیامی در بافر زمان‌بند ندارد یک پیام خوانده می‌شود؛ اگر
+        همه‌ی بافرها خالی باشند XREADGROUP تا block_ms روی همه‌ی اولویت‌ها منتظر می‌ماند.
+
+        Returns:
+            Optional[QueueEntry]: پیام یا None اگر پیامی نرسید
+        """
+        empty = self.scheduler.empty_priorities()
+        if empty:
+            block_ms = 0 if len(self.scheduler) else None
+            for entry in await self.queue.read(empty, count=1, block_ms=block_ms):
+                self.scheduler.add(entry)
+        return self.scheduler.next()
+
+    async def _schedule(self):
+        """
+        حلقه‌ی زمان‌بند: با آزاد شدن هر ظرفیت، پیام بعدی انتخاب و اجرا می‌شود
+        """
         while self.running:
+            await self._slots.acquire()
+            started = False
             try:
-                # دریافت یک وظیفه از صف
-                task_id = self.redis.dequeue(queue_name, timeout=1)
-                if not task_id:
-                    await asyncio.sleep(0.1)
-                    continue
-
-                task = self.get_task(task_id)
-                if not task:
-                    logger.warning(f"وظیفه {task_id} یافت نشد")
-                    continue
-
-                # بررسی وضعیت
-                if task.status != TaskStatus.PENDING:
-                    continue
-
-                # اجرای وظیفه
-                asyncio.create_task(self._execute_task(task))
+                entry = await self._next_entry()
+                if entry is not None:
+                    started = await self._dispatch(entry)
+            except asyncio.CancelledError:
+                raise
             except Exception as e:
-                logger.error(f"خطا در پردازش صف {priority}: {str(e)}")
+                logger.error(f"خطا در زمان‌بندی وظایف: {str(e)}")
                 await asyncio.sleep(1)
+            finally:
+                if not started:
+                    self._slots.release()
+
+    async def _reclaim_stuck(self):
+        """
+        واگذاری دوره‌ای وظایف کارگرهای از کار افتاده به این کارگر
+
+        پیام‌های در انتظار ظرفیت در بافر زمان‌بند هم تمدید می‌شوند تا به کارگر دیگری داده نشوند.
+        """
+        while self.running:
+            await asyncio.sleep(max(self.queue.visibility_timeout / 2, 1))
+            for entry in self.scheduler.buffered():
+                try:
+                    await self.queue.touch(entry)
+                except Exception as e:
+                    logger.error(f"خطا در تمدید زمان وظیفه {entry.task_id}: {str(e)}")
+            for priority in PRIORITIES:
+                try:
+                    for entry in await self.queue.claim_stuck(priority):
+                        self.scheduler.add(entry)
+                except Exception as e:
+                    logger.error(f"خطا در واگذاری وظایف بی‌پاسخ صف {priority}: {str(e)}")
+
+    async def _drain_legacy_queues(self):
+        """
+        انتقال وظایف در انتظار صف‌های list قدیمی به stream ها پس از ارتقا
+        """
+        for priority in PRIORITIES:
+            try:
+                await self.queue.drain_list(f"{LEGACY_QUEUE_PREFIX}{priority}", priority)
+            except Exception as e:
+                logger.error(f"خطا در انتقال صف قدیمی {priority}: {str(e)}")
 
     async def run(self):
         """
@@ -438,12 +614,15 @@ class TaskManager:
         self.running = True
         self.loop = asyncio.get_event_loop()
 
-        # راه‌اندازی پردازشگرهای صف
-        queue_processors = [
-            self._process_queue(TaskPriority.HIGH),
-            self._process_queue(TaskPriority.NORMAL),
-            self._process_queue(TaskPriority.LOW)
-        ]
+        if not await self.queue.connect():
+            self.running = False
+            return
+        await self.queue.ensure_groups(PRIORITIES)
+        await self._drain_legacy_queues()
+        self._slots = asyncio.Semaphore(self.max_concurrency)
+
+        # راه‌اندازی زمان‌بند و واگذاری وظایف بی‌پاسخ
+        queue_processors = [self._schedule(), self._reclaim_stuck()]
 
         try:
             # اجرای همزمان تمام پردازشگرها
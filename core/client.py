@@ -20,15 +20,6 @@ from telethon.sessions import StringSession
 # بارگذاری متغیرهای محیطی
 load_dotenv()
 
-# تنظیم سیستم لاگینگ
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.FileHandler("data/logs/telegram_client.log"),
-        logging.StreamHandler()
-    ]
-)
 logger = logging.getLogger(__name__)
 
 
@@ -161,10 +152,7 @@ class TelegramClient:
     """
     کلاس اصلی برای ارتباط با تلگرام
     """
-    def __init__(self, client_type: str = ClientType.PYROGRAM, session_manager: Optional[TelegramSessionManager] = None) \
-        \ \
-        \ \
-        : \
+    def __init__(self, client_type: str = ClientType.PYROGRAM, session_manager: Optional[TelegramSessionManager] = None):
         """
         مقداردهی اولیه
 
@@ -387,10 +375,7 @@ class TelegramClientManager:
         self.clients = {}
         self.session_manager = TelegramSessionManager()
 
-    def create_client(self, phone_number: str, client_type: str = ClientType.PYROGRAM, api_id: Optional[str] = None, api_hash: Optional[str] = None) \
-        \ \
-        \ \
-        -> TelegramClient: \
+    def create_client(self, phone_number: str, client_type: str = ClientType.PYROGRAM, api_id: Optional[str] = None, api_hash: Optional[str] = None) -> TelegramClient:
         """
         ایجاد کلاینت جدید
 
@@ -422,8 +407,7 @@ class TelegramClientManager:
         self.clients[client_key] = client
         return client
 
-    def get_client(self, phone_number: str, client_type: str = ClientType.PYROGRAM) \
-        -> Optional[TelegramClient]: \
+    def get_client(self, phone_number: str, client_type: str = ClientType.PYROGRAM) -> Optional[TelegramClient]:
         """
         دریافت کلاینت موجود
 
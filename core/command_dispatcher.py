@@ -0,0 +1,226 @@
+"""
+پخش‌کننده‌ی مرکزی دستورات
+
+به‌جای اینکه هر پلاگین برای هر دستور یک هندلر پیام با فیلتر پیشوند ثبت کند و متن پیام
+را دوباره تقسیم کند، تمام دستورات در یک جدول ثبت می‌شوند و فقط یک هندلر پیام توکن اول
+را (که یک بار در پاکت رویداد استخراج شده) در جدول جستجو می‌کند. پیام‌هایی که با پیشوند
+دستور شروع نمی‌شوند از هیچ هندلر دستوری عبور نمی‌کنند.
+"""
+import logging
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+from core.event_envelope import COMMAND_PREFIXES, EventEnvelope, get_envelope
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class CommandEntry:
+    """
+    یک دستور ثبت شده
+    """
+    name: str
+    handler: Callable
+    plugin: Optional[str] = None
+    aliases: List[str] = field(default_factory=list)
+    prefixes: frozenset = frozenset(COMMAND_PREFIXES)
+    description: str = ""
+    usage: str = ""
+
+
+class CommandDispatcher:
+    """
+    جدول دستورات و هندلر پیام مشترک آن‌ها
+    """
+    _instance = None
+
+    def __new__(cls):
+        if cls._instance is None:
+            cls._instance = super(CommandDispatcher, cls).__new__(cls)
+            cls._instance.initialize()
+        return cls._instance
+
+    def initialize(self):
+        """
+        مقداردهی اولیه
+        """
+        # نام و نام‌های مستعار (حروف کوچک) -> دستور
+        self._table: Dict[str, CommandEntry] = {}
+        self.commands: Dict[str, CommandEntry] = {}
+        self._attached: set = set()
+        self.stats = {
+            'dispatched': 0,
+            'unknown': 0,
+            'failed': 0,
+        }
+
+    def register(self, name: str, handler: Callable, plugin: Optional[str] = None,
+                 aliases: Optional[Iterable[str]] = None, prefixes: Optional[Iterable[str]] = None,
+                 description: str = "", usage: str = "") -> bool:
+        """
+        ثبت یک دستور
+
+        Args:
+            name: نام دستور
+            handler: تابع اجرا کننده دستور
+            plugin: نام پلاگین ثبت کننده
+            aliases: نام‌های مستعار
+            prefixes: پیشوندهای مجاز (پیش‌فرض تمام پیشوندهای دستور)
+            description: توضیحات دستور
+            usage: نحوه استفاده از دستور
+
+        Returns:
+            bool: وضعیت ثبت (False در صورت تداخل با دستور پلاگین دیگر)
+        """
+        entry = CommandEntry(
+            name=name.lower(),
+            handler=handler,
+            plugin=plugin,
+            aliases=[alias.lower() for alias in aliases or []],
+            prefixes=frozenset(prefixes) & frozenset(COMMAND_PREFIXES) if prefixes else frozenset(COMMAND_PREFIXES),
+            description=description,
+            usage=usage
+        )
+
+        keys = [entry.name, *entry.aliases]
+        for key in keys:
+            existing = self._table.get(key)
+            if existing is not None and existing.plugin != plugin:
+                logger.warning(f"دستور {key} قبلاً توسط پلاگین {existing.plugin} ثبت شده است")
+                return False
+
+        # ثبت مجدد دستور همان پلاگین جایگزین نسخه‌ی قبلی می‌شود
+        self.unregister(entry.name)
+        for key in keys:
+            self._table[key] = entry
+        self.commands[entry.name] = entry
+        return True
+
+    def unregister(self, name: str) -> bool:
+        """
+        حذف یک دستور و نام‌های مستعار آن
+
+        Args:
+            name: نام دستور
+
+        Returns:
+            bool: وضعیت حذف
+        """
+        entry = self.commands.pop(name.lower(), None)
+        if entry is None:
+            return False
+
+        for key in (entry.name, *entry.aliases):
+            if self._table.get(key) is entry:
+                del self._table[key]
+        return True
+
+    def unregister_plugin(self, plugin: str) -> int:
+        """
+        حذف تمام دستورات یک پلاگین
+
+        Args:
+            plugin: نام پلاگین
+
+        Returns:
+            int: تعداد دستورات حذف شده
+        """
+        names = [name for name, entry in self.commands.items() if entry.plugin == plugin]
+        for name in names:
+            self.unregister(name)
+        return len(names)
+
+    def get(self, name: str) -> Optional[CommandEntry]:
+        """
+        دریافت دستور با نام یا نام مستعار
+
+        Args:
+            name: نام دستور
+
+        Returns:
+            Optional[CommandEntry]: دستور یا None
+        """
+        return self._table.get(name.lower())
+
+    def resolve(self, envelope: EventEnvelope) -> Optional[CommandEntry]:
+        """
+        یافتن دستور متناظر با توکن اول پیام
+
+        Args:
+            envelope: پاکت رویداد
+
+        Returns:
+            Optional[CommandEntry]: دستور یا None برای پیام‌های غیر دستوری
+        """
+        if envelope.command is None:
+            return None
+
+        entry = self._table.get(envelope.command)
+        if entry is None or envelope.command_prefix not in entry.prefixes:
+            return None
+        return entry
+
+    async def dispatch(self, *args) -> Any:
+        """
+        هندلر پیام مشترک دستورات
+
+        Args:
+            *args: پارامترهای هندلر ((client, message) یا (event,))
+
+        Returns:
+            Any: نتیجه‌ی هندلر دستور یا None
+        """
+        envelope = get_envelope(args[-1])
+        if envelope.command is None:
+            return None
+
+        entry = self.resolve(envelope)
+        if entry is None:
+            self.stats['unknown'] += 1
+            return None
+
+        self.stats['dispatched'] += 1
+        try:
+            return await entry.handler(*args)
+        except Exception as e:
+            self.stats['failed'] += 1
+            logger.error(f"خطا در اجرای دستور {entry.name}: {str(e)}")
+            return None
+
+    def attach(self, event_handler: Any) -> None:
+        """
+        ثبت هندلر پیام مشترک در مدیریت رویدادها (فقط یک بار)
+
+        Args:
+            event_handler: نمونه EventHandler
+        """
+        if id(event_handler) in self._attached:
+            return
+
+        from core.event_handler import EventType
+        event_handler.register_handler(EventType.MESSAGE, self.dispatch, {'text_startswith': list(COMMAND_PREFIXES)})
+        self._attached.add(id(event_handler))
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        دریافت آمار دستورات
+
+        Returns:
+            Dict[str, Any]: آمار
+        """
+        return {
+            'commands': len(self.commands),
+            'aliases': len(self._table) - len(self.commands),
+            **self.stats,
+        }
+
+
+def get_command_dispatcher() -> CommandDispatcher:
+    """
+    دریافت نمونه‌ی پخش‌کننده‌ی دستورات
+
+    Returns:
+        CommandDispatcher: پخش‌کننده‌ی دستورات
+    """
+    return CommandDispatcher()
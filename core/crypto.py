@@ -18,15 +18,6 @@ from dotenv import load_dotenv
 # بارگذاری متغیرهای محیطی
 load_dotenv()
 
-# تنظیم سیستم لاگینگ
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.FileHandler("data/logs/crypto.log"),
-        logging.StreamHandler()
-    ]
-)
 logger = logging.getLogger(__name__)
 
 
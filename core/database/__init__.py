@@ -0,0 +1,10 @@
+"""
+بسته‌ی دیتابیس
+
+Database (استخر اتصال مشترک asyncpg) در pool و رابط پایه‌ی دیتابیس پلاگین‌ها و
+پیاده‌سازی‌های آن در base، sql، postgres و redis قرار دارند.
+"""
+from core.database.base import DatabaseInterface, DatabaseManager
+from core.database.pool import Database
+
+__all__ = ["Database", "DatabaseInterface", "DatabaseManager"]
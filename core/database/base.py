@@ -42,8 +42,8 @@ class DatabaseInterface(ABC):
         """
 
     @abstractmethod
-    async def fetch_one(self, query: str, values: Optional[Tuple[Any, ...]] = None) \
-        -> Optional[Dict[str, Any]]: \
+    async def fetch_one(self, query: str,
+                        values: Optional[Tuple[Any, ...]] = None) -> Optional[Dict[str, Any]]:
         """
         دریافت یک رکورد از دیتابیس
 
@@ -57,8 +57,7 @@ class DatabaseInterface(ABC):
         pass
 
     @abstractmethod
-    async def fetch_all(self, query: str, values: Optional[Tuple[Any, ...]] = None) \
-        -> List[Dict[str, Any]]: \
+    async def fetch_all(self, query: str, values: Optional[Tuple[Any, ...]] = None) -> List[Dict[str, Any]]:
         """
         دریافت تمام رکوردهای مطابق با کوئری
 
@@ -84,11 +83,27 @@ class DatabaseInterface(ABC):
             Optional[Dict[str, Any]]: رکورد افزوده شده یا None
         """
 
+    async def insert_many(self, table: str, rows: List[Dict[str, Any]]) -> int:
+        """
+        افزودن چند رکورد به جدول
+        پیاده‌سازی پیش‌فرض رکوردها را تک‌تک و تا اولین شکست درج می‌کند؛ پیاده‌سازی‌ها باید آن را با درج دسته‌ای جایگزین کنند
+
+        Args:
+            table: نام جدول
+            rows: داده‌های رکوردهای جدید
+
+        Returns:
+            int: تعداد رکوردهای افزوده شده (همیشه رکوردهای ابتدای لیست)
+        """
+        count = 0
+        for row in rows:
+            if not await self.insert(table, row):
+                break
+            count += 1
+        return count
+
     @abstractmethod
-    async def update(self, table: str, data: Dict[str, Any], condition: str, values: Tuple[Any, ...]) \
-        \ \
-        \ \
-        -> int: \
+    async def update(self, table: str, data: Dict[str, Any], condition: str, values: Tuple[Any, ...]) -> int:
         """
         بروزرسانی یک یا چند رکورد
 
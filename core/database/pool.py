@@ -0,0 +1,394 @@
+#!/usr/bin/env python
+"""
+ماژول مدیریت ارتباط با پایگاه داده
+
+این ماژول کلاس Database را پیاده‌سازی می‌کند که مسئول برقراری ارتباط با پایگاه داده و اجرای کوئری‌هاست.
+الگوی طراحی Singleton برای اطمینان از یکتایی نمونه کلاس استفاده شده است.
+
+اندازه‌ی استخر اتصال، زمان انتظار برای گرفتن اتصال، عمر اتصال‌های بیکار، کش prepared
+statement و آستانه‌ی کوئری کند از Config خوانده می‌شوند. زمان انتظار استخر، اتصال‌های
+در حال استفاده و کوئری‌های کند با نام db_pool در /metrics منتشر می‌شوند.
+"""
+
+import asyncio
+import os
+import logging
+import time
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional, Sequence, Tuple
+
+import asyncpg
+
+from core.config import Config
+from core.metrics import get_metrics
+
+logger = logging.getLogger(__name__)
+
+# حداکثر طول کوئری در لاگ کوئری‌های کند
+SLOW_QUERY_LOG_LENGTH = 300
+
+
+def _setting(config: Config, key: str, default: Any, cast: Callable[[Any], Any]) -> Any:
+    """
+    خواندن یک تنظیم عددی از Config
+
+    Args:
+        config: شیء Config
+        key: کلید تنظیم
+        default: مقدار پیش‌فرض
+        cast: تابع تبدیل نوع (int یا float)
+
+    Returns:
+        Any: مقدار تنظیم یا پیش‌فرض در صورت نامعتبر بودن
+    """
+    value = config.get(key, default)
+    if value in (None, ""):
+        return default
+    try:
+        return cast(value)
+    except (TypeError, ValueError):
+        logger.warning(f"مقدار نامعتبر برای {key}: {value}، از {default} استفاده می‌شود")
+        return default
+
+
+class Database:
+    """
+    کلاس مدیریت ارتباط با پایگاه داده.
+
+    از الگوی طراحی Singleton برای اطمینان از وجود فقط یک نمونه در کل برنامه استفاده می‌کند.
+    """
+    _instance = None
+    _pool = None
+
+    def __new__(cls, *args, **kwargs):
+        """پیاده‌سازی الگوی Singleton"""
+        if cls._instance is None:
+            cls._instance = super(Database, cls).__new__(cls)
+            cls._instance._initialized = False
+        return cls._instance
+
+    def __init__(self, conn_string: Optional[str] = None, host: Optional[str] = None,
+                 port: Optional[int] = None, user: Optional[str] = None,
+                 password: Optional[str] = None, database: Optional[str] = None):
+        """
+        مقداردهی اولیه کلاس Database
+
+        Args:
+            conn_string: آدرس اتصال (پیش‌فرض DATABASE_URL)
+            host: میزبان، در صورت نبود آدرس اتصال
+            port: پورت
+            user: نام کاربری
+            password: رمز عبور
+            database: نام پایگاه داده
+        """
+        if self._initialized:
+            return
+
+        self._initialized = True
+        self.conn_string = conn_string or os.getenv('DATABASE_URL')
+        self.connect_kwargs = {
+            key: value for key, value in {
+                'host': host,
+                'port': int(port) if port else None,
+                'user': user,
+                'password': password,
+                'database': database,
+            }.items() if value is not None
+        }
+
+        config = Config()
+        self.pool_min_size = _setting(config, 'DB_POOL_MIN_SIZE', 2, int)
+        self.pool_max_size = max(_setting(config, 'DB_POOL_MAX_SIZE', 10, int), self.pool_min_size, 1)
+        # حداکثر انتظار برای گرفتن اتصال از استخر (ثانیه، صفر برای انتظار نامحدود)
+        self.acquire_timeout = _setting(config, 'DB_POOL_ACQUIRE_TIMEOUT', 10.0, float)
+        # بستن اتصال‌های بیکار پس از این مدت (ثانیه، صفر برای غیرفعال)
+        self.max_inactive_lifetime = _setting(config, 'DB_POOL_MAX_INACTIVE_LIFETIME', 300.0, float)
+        # تعداد prepared statementهای نگه‌داری شده در هر اتصال (صفر برای غیرفعال، مثلاً پشت pgbouncer)
+        self.statement_cache_size = _setting(config, 'DB_STATEMENT_CACHE_SIZE', 100, int)
+        # کوئری‌های طولانی‌تر از این آستانه با سطح WARNING لاگ می‌شوند (میلی‌ثانیه، صفر برای غیرفعال)
+        self.slow_query_ms = _setting(config, 'DB_SLOW_QUERY_MS', 500.0, float)
+
+        self._connected = False
+        self._connect_lock = asyncio.Lock()
+        self._in_use = 0
+        self._waiting = 0
+        self.stats = {
+            'queries': 0,
+            'slow_queries': 0,
+            'errors': 0,
+            'acquires': 0,
+            'acquire_timeouts': 0,
+            'acquire_wait_ms_total': 0.0,
+            'acquire_wait_ms_max': 0.0,
+        }
+
+        # بررسی وجود اطلاعات اتصال به دیتابیس
+        if not self.conn_string and not self.connect_kwargs:
+            logger.warning("اتصال به دیتابیس: آدرس اتصال تنظیم نشده است (DATABASE_URL)")
+
+        get_metrics().register_collector('db_pool', self._gauges)
+
+    async def connect(self) -> bool:
+        """
+        برقراری ارتباط با پایگاه داده
+
+        Returns:
+            bool: نتیجه برقراری ارتباط
+        """
+        if self._connected:
+            return True
+
+        async with self._connect_lock:
+            if self._connected:
+                return True
+
+            try:
+                # ایجاد یک استخر اتصال
+                pool_args = self.connect_kwargs if not self.conn_string else {'dsn': self.conn_string}
+                self._pool = await asyncpg.create_pool(
+                    **pool_args,
+                    min_size=self.pool_min_size,
+                    max_size=self.pool_max_size,
+                    max_inactive_connection_lifetime=self.max_inactive_lifetime,
+                    statement_cache_size=self.statement_cache_size
+                )
+                self._connected = True
+                logger.info("اتصال به پایگاه داده با موفقیت برقرار شد")
+                return True
+
+            except Exception as e:
+                logger.error(f"خطا در برقراری ارتباط با پایگاه داده: {e}")
+                self._connected = False
+                return False
+
+    async def get_pool(self) -> Optional[asyncpg.Pool]:
+        """
+        دریافت استخر اتصال مشترک
+
+        Returns:
+            Optional[asyncpg.Pool]: استخر اتصال یا None در صورت عدم اتصال
+        """
+        if not self._connected:
+            await self.connect()
+        return self._pool if self._connected else None
+
+    async def disconnect(self) -> None:
+        """قطع ارتباط با پایگاه داده"""
+        if self._pool:
+            await self._pool.close()
+            self._pool = None
+            self._connected = False
+            logger.info("ارتباط با پایگاه داده قطع شد")
+
+    @asynccontextmanager
+    async def _acquire(self) -> AsyncIterator[asyncpg.Connection]:
+        """
+        گرفتن اتصال از استخر با محدودیت زمانی و ثبت زمان انتظار
+
+        Yields:
+            asyncpg.Connection: اتصال
+
+        Raises:
+            asyncio.TimeoutError: در صورت آزاد نشدن اتصال در زمان acquire_timeout
+        """
+        self._waiting += 1
+        start = time.perf_counter()
+        try:
+            conn = await self._pool.acquire(timeout=self.acquire_timeout or None)
+        except asyncio.TimeoutError:
+            self.stats['acquire_timeouts'] += 1
+            logger.warning(f"اتصال آزادی در استخر پس از {self.acquire_timeout} ثانیه یافت نشد "
+                           f"({self._in_use} از {self.pool_max_size} در حال استفاده)")
+            raise
+        finally:
+            self._waiting -= 1
+
+        wait_ms = (time.perf_counter() - start) * 1000
+        self.stats['acquires'] += 1
+        self.stats['acquire_wait_ms_total'] += wait_ms
+        self.stats['acquire_wait_ms_max'] = max(self.stats['acquire_wait_ms_max'], wait_ms)
+
+        self._in_use += 1
+        try:
+            yield conn
+        finally:
+            self._in_use -= 1
+            await self._pool.release(conn)
+
+    async def _timed(self, operation: Any, query: str) -> Any:
+        """
+        اجرای عملیات دیتابیس با اندازه‌گیری زمان و لاگ کوئری‌های کند
+
+        Args:
+            operation: coroutine اجرای کوئری
+            query: کوئری SQL (برای لاگ)
+
+        Returns:
+            Any: نتیجه‌ی عملیات
+        """
+        start = time.perf_counter()
+        try:
+            return await operation
+        finally:
+            elapsed_ms = (time.perf_counter() - start) * 1000
+            self.stats['queries'] += 1
+            if self.slow_query_ms and elapsed_ms >= self.slow_query_ms:
+                self.stats['slow_queries'] += 1
+                text = " ".join(query.split())
+                if len(text) > SLOW_QUERY_LOG_LENGTH:
+                    text = text[:SLOW_QUERY_LOG_LENGTH] + "..."
+                logger.warning(f"کوئری کند ({elapsed_ms:.0f} ms): {text}")
+
+    async def _run(self, method: str, query: str, args: Tuple[Any, ...], kwargs: Dict[str, Any],
+                   default: Any) -> Any:
+        """
+        اجرای یک کوئری روی اتصالی از استخر
+
+        Args:
+            method: نام متد اتصال (execute، fetch یا fetchrow)
+            query: کوئری SQL
+            args: پارامترهای کوئری
+            kwargs: پارامترهای اضافی
+            default: مقدار بازگشتی در صورت خطا
+
+        Returns:
+            Any: نتیجه‌ی asyncpg یا default
+        """
+        if not self._connected:
+            await self.connect()
+
+        if not self._connected:
+            logger.error("عدم امکان اجرای کوئری: ارتباط با پایگاه داده برقرار نیست")
+            return default
+
+        try:
+            async with self._acquire() as conn:
+                return await self._timed(getattr(conn, method)(query, *args, **kwargs), query)
+        except Exception as e:
+            self.stats['errors'] += 1
+            logger.error(f"خطا در اجرای کوئری: {e}")
+            logger.debug(f"کوئری: {query}")
+            logger.debug(f"پارامترها: {args}, {kwargs}")
+            return default
+
+    async def execute(self, query: str, *args, **kwargs) -> str:
+        """
+        اجرای کوئری بدون دریافت نتیجه
+
+        Args:
+            query (str): کوئری SQL برای اجرا
+            *args: پارامترهای کوئری
+            **kwargs: پارامترهای اضافی
+
+        Returns:
+            str: شناسه یا تعداد رکوردهای تحت تاثیر
+        """
+        return await self._run('execute', query, args, kwargs, None)
+
+    async def fetch(self, query: str, *args, **kwargs) -> List[Dict[str, Any]]:
+        """
+        اجرای کوئری و دریافت چندین رکورد
+
+        Args:
+            query (str): کوئری SQL برای اجرا
+            *args: پارامترهای کوئری
+            **kwargs: پارامترهای اضافی
+
+        Returns:
+            List[Dict[str, Any]]: لیستی از نتایج به صورت دیکشنری
+        """
+        rows = await self._run('fetch', query, args, kwargs, [])
+        return [dict(row) for row in rows]
+
+    async def fetchrow(self, query: str, *args, **kwargs) -> Optional[Dict[str, Any]]:
+        """
+        اجرای کوئری و دریافت یک رکورد
+
+        Args:
+            query (str): کوئری SQL برای اجرا
+            *args: پارامترهای کوئری
+            **kwargs: پارامترهای اضافی
+
+        Returns:
+            Optional[Dict[str, Any]]: نتیجه به صورت دیکشنری یا None اگر رکوردی یافت نشود
+        """
+        row = await self._run('fetchrow', query, args, kwargs, None)
+        return dict(row) if row else None
+
+    @asynccontextmanager
+    async def unit_of_work(self, transactional: bool = True) -> AsyncIterator[asyncpg.Connection]:
+        """
+        نگه داشتن یک اتصال برای چند دستور پشت سر هم
+
+        تمام دستورات داخل بلوک روی همان اتصال اجرا می‌شوند و با transactional=True در
+        پایان بلوک commit یا در صورت بروز استثنا rollback می‌شوند.
+
+        Args:
+            transactional: اجرای دستورات در یک تراکنش
+
+        Yields:
+            asyncpg.Connection: اتصال اختصاصی
+
+        Raises:
+            ConnectionError: در صورت برقرار نبودن ارتباط با پایگاه داده
+        """
+        if not self._connected:
+            await self.connect()
+
+        if not self._connected:
+            raise ConnectionError("ارتباط با پایگاه داده برقرار نیست")
+
+        async with self._acquire() as conn:
+            if transactional:
+                async with conn.transaction():
+                    yield conn
+            else:
+                yield conn
+
+    async def transaction(self, queries: Sequence[Tuple[str, Optional[Sequence[Any]]]]) -> bool:
+        """
+        اجرای چند کوئری در یک تراکنش
+
+        Args:
+            queries: لیست کوئری‌ها و پارامترهای آن‌ها
+
+        Returns:
+            bool: True در صورت commit شدن تمام کوئری‌ها
+        """
+        try:
+            async with self.unit_of_work() as conn:
+                for query, params in queries:
+                    await self._timed(conn.execute(query, *(params or ())), query)
+            return True
+        except Exception as e:
+            self.stats['errors'] += 1
+            logger.error(f"خطا در اجرای تراکنش: {e}")
+            return False
+
+    def _gauges(self) -> Dict[str, float]:
+        """
+        مقادیر لحظه‌ای استخر برای /metrics
+
+        Returns:
+            Dict[str, float]: اندازه‌ی استخر، اتصال‌های در حال استفاده و زمان انتظار
+        """
+        pool = self._pool
+        acquires = self.stats['acquires']
+        return {
+            'size': pool.get_size() if pool else 0,
+            'idle': pool.get_idle_size() if pool else 0,
+            'max_size': self.pool_max_size,
+            'in_use': self._in_use,
+            'waiting': self._waiting,
+            'acquire_wait_ms_avg': self.stats['acquire_wait_ms_total'] / acquires if acquires else 0.0,
+            **self.stats,
+        }
+
+    def get_stats(self) -> Dict[str, float]:
+        """
+        دریافت آمار استخر اتصال
+
+        Returns:
+            Dict[str, float]: آمار
+        """
+        return self._gauges()
@@ -0,0 +1,264 @@
+"""
+پیاده‌سازی PostgreSQL با asyncpg برای دیتابیس
+
+برخلاف PostgreSQLDatabase که هر عملیات را با کلاینت همگام Supabase (یک درخواست HTTP)
+انجام می‌دهد، این کلاس کوئری SQL پارامتری ($1، $2، ...) را مستقیم روی استخر اتصال مشترک
+core.database.pool.Database اجرا می‌کند. asyncpg هر کوئری را در هر اتصال یک بار prepare و
+در کش statement نگه می‌دارد، پس کوئری‌های تکراری پلاگین‌ها دوباره تجزیه نمی‌شوند.
+"""
+import logging
+import re
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from core.database.pool import Database
+from core.database.base import DatabaseInterface
+
+logger = logging.getLogger(__name__)
+
+# حداکثر تعداد پارامترهای یک کوئری در پروتکل PostgreSQL
+MAX_QUERY_PARAMS = 32767
+
+# نام مجاز جدول و ستون (با اسکیمای اختیاری)
+_IDENTIFIER = re.compile(r"^[A-Za-z_][A-Za-z0-9_]*(\.[A-Za-z_][A-Za-z0-9_]*)?$")
+
+
+def quote_identifier(name: str) -> str:
+    """
+    بررسی و نقل‌قول نام جدول یا ستون
+
+    Args:
+        name: نام جدول یا ستون (مثلاً users یا public.users)
+
+    Returns:
+        str: نام نقل‌قول شده
+
+    Raises:
+        ValueError: در صورت نامعتبر بودن نام
+    """
+    if not _IDENTIFIER.match(name):
+        raise ValueError(f"نام نامعتبر برای جدول یا ستون: {name!r}")
+    return ".".join(f'"{part}"' for part in name.split("."))
+
+
+def affected_rows(status: Optional[str]) -> int:
+    """
+    استخراج تعداد رکوردهای تحت تاثیر از وضعیت اجرای asyncpg
+
+    Args:
+        status: وضعیت اجرا (مثلاً "UPDATE 3" یا "INSERT 0 1")
+
+    Returns:
+        int: تعداد رکوردها
+    """
+    if not status:
+        return 0
+    count = status.rsplit(" ", 1)[-1]
+    return int(count) if count.isdigit() else 0
+
+
+class AsyncPGDatabase(DatabaseInterface):
+    """
+    پیاده‌سازی اینترفیس دیتابیس با asyncpg و استخر اتصال مشترک
+    """
+
+    def __init__(self, database: Optional[Database] = None):
+        """
+        مقداردهی اولیه
+
+        Args:
+            database: شیء Database (پیش‌فرض نمونه‌ی Singleton مشترک)
+        """
+        self.database = database or Database()
+
+    async def connect(self) -> bool:
+        """
+        اتصال به دیتابیس (ایجاد استخر مشترک در صورت نیاز)
+
+        Returns:
+            bool: وضعیت اتصال
+        """
+        return await self.database.connect()
+
+    async def disconnect(self) -> bool:
+        """
+        قطع اتصال از دیتابیس
+        استخر بین پلاگین‌ها و بقیه‌ی برنامه مشترک است و فقط مالک آن (main) آن را می‌بندد
+
+        Returns:
+            bool: وضعیت قطع اتصال
+        """
+        return True
+
+    async def execute(self, query: str, values: Optional[Sequence[Any]] = None) -> Any:
+        """
+        اجرای کوئری روی دیتابیس
+
+        Args:
+            query: کوئری SQL با پارامترهای $1، $2، ...
+            values: مقادیر پارامترها
+
+        Returns:
+            Any: وضعیت اجرا (مثلاً "INSERT 0 1") یا None در صورت خطا
+        """
+        return await self.database.execute(query, *(values or ()))
+
+    async def fetch_one(self, query: str, values: Optional[Sequence[Any]] = None) -> Optional[Dict[str, Any]]:
+        """
+        دریافت یک رکورد از دیتابیس
+
+        Args:
+            query: کوئری SQL با پارامترهای $1، $2، ...
+            values: مقادیر پارامترها
+
+        Returns:
+            Optional[Dict[str, Any]]: رکورد یافته شده یا None
+        """
+        return await self.database.fetchrow(query, *(values or ()))
+
+    async def fetch_all(self, query: str, values: Optional[Sequence[Any]] = None) -> List[Dict[str, Any]]:
+        """
+        دریافت تمام رکوردهای مطابق با کوئری
+
+        Args:
+            query: کوئری SQL با پارامترهای $1، $2، ...
+            values: مقادیر پارامترها
+
+        Returns:
+            List[Dict[str, Any]]: لیست رکوردهای یافته شده
+        """
+        return await self.database.fetch(query, *(values or ()))
+
+    async def insert(self, table: str, data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """
+        افزودن یک رکورد به جدول
+
+        Args:
+            table: نام جدول
+            data: داده‌های رکورد جدید
+
+        Returns:
+            Optional[Dict[str, Any]]: رکورد افزوده شده یا None
+        """
+        try:
+            if data:
+                columns = ", ".join(quote_identifier(column) for column in data)
+                placeholders = ", ".join(f"${index}" for index in range(1, len(data) + 1))
+                query = f"INSERT INTO {quote_identifier(table)} ({columns}) VALUES ({placeholders}) RETURNING *"
+            else:
+                query = f"INSERT INTO {quote_identifier(table)} DEFAULT VALUES RETURNING *"
+        except ValueError as e:
+            logger.error(f"خطا در افزودن رکورد: {str(e)}")
+            return None
+
+        return await self.database.fetchrow(query, *data.values())
+
+    async def insert_many(self, table: str, rows: List[Dict[str, Any]]) -> int:
+        """
+        افزودن چند رکورد با INSERT چند ردیفی در یک تراکنش
+
+        رکوردها بر اساس مجموعه ستون‌ها گروه‌بندی و در صورت نیاز به چند کوئری تقسیم می‌شوند
+        تا تعداد پارامترها از سقف پروتکل بیشتر نشود؛ در صورت خطا هیچ رکوردی درج نمی‌شود.
+
+        Args:
+            table: نام جدول
+            rows: داده‌های رکوردهای جدید
+
+        Returns:
+            int: تعداد رکوردهای افزوده شده
+        """
+        if not rows:
+            return 0
+
+        groups: Dict[Tuple[str, ...], List[Dict[str, Any]]] = {}
+        for row in rows:
+            groups.setdefault(tuple(row), []).append(row)
+
+        try:
+            statements = []
+            for columns, group in groups.items():
+                if not columns:
+                    statements.extend((f"INSERT INTO {quote_identifier(table)} DEFAULT VALUES", ()) for _ in group)
+                    continue
+                column_list = ", ".join(quote_identifier(column) for column in columns)
+                chunk_size = MAX_QUERY_PARAMS // len(columns)
+                for start in range(0, len(group), chunk_size):
+                    chunk = group[start:start + chunk_size]
+                    placeholders = ", ".join(
+                        "(" + ", ".join(f"${index * len(columns) + offset}" for offset in range(1, len(columns) + 1)) + ")"
+                        for index in range(len(chunk))
+                    )
+                    params = [row[column] for row in chunk for column in columns]
+                    statements.append((
+                        f"INSERT INTO {quote_identifier(table)} ({column_list}) VALUES {placeholders}", params
+                    ))
+
+            count = 0
+            async with self.database.unit_of_work() as conn:
+                for query, params in statements:
+                    count += affected_rows(await conn.execute(query, *params))
+            return count
+        except Exception as e:
+            logger.error(f"خطا در افزودن رکوردها: {str(e)}")
+            return 0
+
+    async def update(self, table: str, data: Dict[str, Any], condition: str,
+                     values: Tuple[Any, ...]) -> int:
+        """
+        بروزرسانی یک یا چند رکورد
+
+        پارامترهای شرط همان $1 تا $n باقی می‌مانند و مقادیر جدید پس از آن‌ها شماره‌گذاری می‌شوند.
+
+        Args:
+            table: نام جدول
+            data: داده‌های جدید
+            condition: شرط بروزرسانی (مثلاً "name = $1")
+            values: مقادیر شرط
+
+        Returns:
+            int: تعداد رکوردهای بروزرسانی شده
+        """
+        if not data:
+            return 0
+
+        values = tuple(values or ())
+        try:
+            assignments = ", ".join(
+                f"{quote_identifier(column)} = ${index}"
+                for index, column in enumerate(data, start=len(values) + 1)
+            )
+            query = f"UPDATE {quote_identifier(table)} SET {assignments} WHERE {condition}"
+        except ValueError as e:
+            logger.error(f"خطا در بروزرسانی رکورد: {str(e)}")
+            return 0
+
+        return affected_rows(await self.database.execute(query, *values, *data.values()))
+
+    async def delete(self, table: str, condition: str, values: Tuple[Any, ...]) -> int:
+        """
+        حذف یک یا چند رکورد
+
+        Args:
+            table: نام جدول
+            condition: شرط حذف (مثلاً "id = $1")
+            values: مقادیر شرط
+
+        Returns:
+            int: تعداد رکوردهای حذف شده
+        """
+        try:
+            query = f"DELETE FROM {quote_identifier(table)} WHERE {condition}"
+        except ValueError as e:
+            logger.error(f"خطا در حذف رکورد: {str(e)}")
+            return 0
+
+        return affected_rows(await self.database.execute(query, *(values or ())))
+
+    async def create_tables(self) -> bool:
+        """
+        ایجاد جداول در دیتابیس
+        جداول با MigrationManager ساخته می‌شوند
+
+        Returns:
+            bool: وضعیت ایجاد جداول
+        """
+        return True
@@ -3,7 +3,7 @@
 """
 import os
 import json
-from typing import Any, Optional
+from typing import Any, Dict, Optional
 import redis
 from dotenv import load_dotenv
 
@@ -233,3 +233,25 @@ class RedisManager:
         except Exception as e:
             print(f"خطا در دریافت از صف Redis: {str(e)}")
             return None
+
+    def stream_add(self, stream: str, fields: Dict[str, Any]) -> Optional[str]:
+        """
+        افزودن پیام به stream
+
+        Args:
+            stream: نام stream
+            fields: فیلدهای پیام
+
+        Returns:
+            Optional[str]: شناسه پیام یا None در صورت خطا
+        """
+        if not self.redis_client:
+            if not self.connect():
+                return None
+
+        try:
+            message_id = self.redis_client.xadd(stream, fields)
+            return message_id.decode('utf-8') if isinstance(message_id, bytes) else message_id
+        except Exception as e:
+            print(f"خطا در افزودن به stream Redis: {str(e)}")
+            return None
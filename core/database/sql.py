@@ -1,6 +1,11 @@
 """
 پیاده‌سازی PostgreSQL (Supabase) برای دیتابیس
+
+کلاینت supabase-py همگام است و هر execute یک درخواست HTTP کامل است، پس تمام
+فراخوانی‌های آن در thread pool اجرا می‌شوند تا حلقه‌ی رویداد مسدود نشود. برای SQL
+پارامتری واقعی و استخر اتصال مشترک از AsyncPGDatabase استفاده کنید.
 """
+import asyncio
 import os
 from typing import Any, Dict, List, Optional, Tuple
 
@@ -34,7 +39,7 @@ class PostgreSQLDatabase(DatabaseInterface):
             bool: وضعیت اتصال
         """
         try:
-            self.client = create_client(self.supabase_url, self.supabase_key)
+            self.client = await asyncio.to_thread(create_client, self.supabase_url, self.supabase_key)
             return True
         except Exception as e:
             print(f"خطا در اتصال به Supabase: {str(e)}")
@@ -51,6 +56,19 @@ class PostgreSQLDatabase(DatabaseInterface):
         self.client = None
         return True
 
+    @staticmethod
+    async def _run(request: Any) -> Any:
+        """
+        اجرای درخواست همگام Supabase در thread pool
+
+        Args:
+            request: query builder یا فراخوانی RPC آماده‌ی execute
+
+        Returns:
+            Any: پاسخ Supabase
+        """
+        return await asyncio.to_thread(request.execute)
+
     async def execute(self, query: str, values: Optional[Tuple[Any, ...]] = None) -> Any:
         """
         اجرای کوئری روی دیتابیس
@@ -73,13 +91,13 @@ class PostgreSQLDatabase(DatabaseInterface):
                     params[f"param_{i+1}"] = value
 
             # استفاده از RPC برای اجرای کوئری
-            return self.client.rpc(query, params).execute()
+            return await self._run(self.client.rpc(query, params))
         except Exception as e:
             print(f"خطا در اجرای کوئری: {str(e)}")
             return None
 
-    async def fetch_one(self, query: str, values: Optional[Tuple[Any, ...]] = None) \
-        -> Optional[Dict[str, Any]]: \
+    async def fetch_one(self, query: str,
+                        values: Optional[Tuple[Any, ...]] = None) -> Optional[Dict[str, Any]]:
         """
         دریافت یک رکورد از دیتابیس
 
@@ -95,8 +113,7 @@ class PostgreSQLDatabase(DatabaseInterface):
 
         try:
             # روش استاندارد برای کوئری‌های ساده
-            table_name = query.split("FROM")[1].split() \
-                [0].strip() if "FROM" in query.upper() else None \
+            table_name = query.split("FROM")[1].split()[0].strip() if "FROM" in query.upper() else None
 
             if table_name:
                 query_builder = self.client.table(table_name).select("*")
@@ -109,7 +126,7 @@ class PostgreSQLDatabase(DatabaseInterface):
                         column = column.strip()
                         query_builder = query_builder.eq(column, values[0])
 
-                result = query_builder.limit(1).execute()
+                result = await self._run(query_builder.limit(1))
                 return result.data[0] if result.data else None
             else:
                 # برای کوئری‌های پیچیده‌تر از RPC استفاده می‌کنیم
@@ -118,14 +135,13 @@ class PostgreSQLDatabase(DatabaseInterface):
                     for i, value in enumerate(values):
                         params[f"param_{i+1}"] = value
 
-                result = self.client.rpc(query, params).execute()
+                result = await self._run(self.client.rpc(query, params))
                 return result.data[0] if result.data else None
         except Exception as e:
             print(f"خطا در دریافت رکورد: {str(e)}")
             return None
 
-    async def fetch_all(self, query: str, values: Optional[Tuple[Any, ...]] = None) \
-        -> List[Dict[str, Any]]: \
+    async def fetch_all(self, query: str, values: Optional[Tuple[Any, ...]] = None) -> List[Dict[str, Any]]:
         """
         دریافت تمام رکوردهای مطابق با کوئری
 
@@ -141,8 +157,7 @@ class PostgreSQLDatabase(DatabaseInterface):
 
         try:
             # روش استاندارد برای کوئری‌های ساده
-            table_name = query.split("FROM")[1].split() \
-                [0].strip() if "FROM" in query.upper() else None \
+            table_name = query.split("FROM")[1].split()[0].strip() if "FROM" in query.upper() else None
 
             if table_name:
                 query_builder = self.client.table(table_name).select("*")
@@ -155,7 +170,7 @@ class PostgreSQLDatabase(DatabaseInterface):
                         column = column.strip()
                         query_builder = query_builder.eq(column, values[0])
 
-                result = query_builder.execute()
+                result = await self._run(query_builder)
                 return result.data if result.data else []
             else:
                 # برای کوئری‌های پیچیده‌تر از RPC استفاده می‌کنیم
@@ -164,7 +179,7 @@ class PostgreSQLDatabase(DatabaseInterface):
                     for i, value in enumerate(values):
                         params[f"param_{i+1}"] = value
 
-                result = self.client.rpc(query, params).execute()
+                result = await self._run(self.client.rpc(query, params))
                 return result.data if result.data else []
         except Exception as e:
             print(f"خطا در دریافت رکوردها: {str(e)}")
@@ -185,16 +200,44 @@ class PostgreSQLDatabase(DatabaseInterface):
             await self.connect()
 
         try:
-            result = self.client.table(table).insert(data).execute()
+            result = await self._run(self.client.table(table).insert(data))
             return result.data[0] if result.data else None
         except Exception as e:
             print(f"خطا در افزودن رکورد: {str(e)}")
             return None
 
-    async def update(self, table: str, data: Dict[str, Any], condition: str, values: Tuple[Any, ...]) \
-        \ \
-        \ \
-        -> int: \
+    async def insert_many(self, table: str, rows: List[Dict[str, Any]]) -> int:
+        """
+        افزودن چند رکورد با یک درخواست به ازای هر مجموعه ستون
+
+        Args:
+            table: نام جدول
+            rows: داده‌های رکوردهای جدید
+
+        Returns:
+            int: تعداد رکوردهای افزوده شده
+        """
+        if not rows:
+            return 0
+        if not self.client:
+            await self.connect()
+
+        # PostgREST در درج دسته‌ای ستون‌های یکسان انتظار دارد
+        groups: Dict[Tuple[str, ...], List[Dict[str, Any]]] = {}
+        for row in rows:
+            groups.setdefault(tuple(row), []).append(row)
+
+        count = 0
+        try:
+            for group in groups.values():
+                result = await self._run(self.client.table(table).insert(group))
+                count += len(result.data) if result.data else 0
+            return count
+        except Exception as e:
+            print(f"خطا در افزودن رکوردها: {str(e)}")
+            return count
+
+    async def update(self, table: str, data: Dict[str, Any], condition: str, values: Tuple[Any, ...]) -> int:
         """
         بروزرسانی یک یا چند رکورد
 
@@ -216,7 +259,7 @@ class PostgreSQLDatabase(DatabaseInterface):
             column = column.strip()
             value = values[0]
 
-            result = self.client.table(table).update(data).eq(column, value).execute()
+            result = await self._run(self.client.table(table).update(data).eq(column, value))
             return len(result.data) if result.data else 0
         except Exception as e:
             print(f"خطا در بروزرسانی رکورد: {str(e)}")
@@ -243,7 +286,7 @@ class PostgreSQLDatabase(DatabaseInterface):
             column = column.strip()
             value = values[0]
 
-            result = self.client.table(table).delete().eq(column, value).execute()
+            result = await self._run(self.client.table(table).delete().eq(column, value))
             return len(result.data) if result.data else 0
         except Exception as e:
             print(f"خطا در حذف رکورد: {str(e)}")
@@ -1,24 +1,133 @@
 """
 ماژول مدیریت کش دیتابیس برای سلف بات تلگرام
+
+کش دو لایه است: L1 یک کش LRU درون پردازه‌ای (core.local_cache) با عمر کوتاه و L2
+کش مشترک Redis. نوشتن روی یک جدول هر دو لایه را نامعتبر می‌کند و از طریق pub/sub
+به پردازه‌های دیگر (سرور API و سلف بات) اطلاع داده می‌شود تا L1 خود را پاک کنند.
+
+هر مقدار کش با تگ جدول ثبت می‌شود و علاوه بر آن:
+    - اگر خواندن کلیدهای وابستگی ردیف (depends_on، مثلاً row_key("users", id=42)) اعلام کند،
+      با تگ همان ردیف‌ها ثبت می‌شود؛
+    - در غیر این صورت (لیست‌ها، شمارش‌ها و جستجو با ستون‌های دیگر) با تگ تجمیعی جدول.
+نوشتنی که کلیدهای ردیف‌های تغییر یافته را بدهد (keys) فقط همان ردیف‌ها و کوئری‌های
+تجمیعی جداول را حذف می‌کند؛ بدون keys کل جدول مثل قبل حذف می‌شود.
 """
-import json
 import logging
 import asyncio
-from typing import Any, Dict, List, Optional, Union, Tuple, Set
-from datetime import datetime, timedelta
+import functools
+import json
+import math
+import os
+import random
+import time
+import uuid
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional, Tuple, Set
 
 from core.database import Database
+from core.local_cache import MISSING, LocalCache
+from core.metrics import get_metrics
+from core.query_fingerprint import explain_fingerprint, query_fingerprint
 from core.redis_manager import RedisManager
 
 logger = logging.getLogger(__name__)
 
+# کانال pub/sub اعلام جداول تغییر یافته
+INVALIDATION_CHANNEL = "db_cache:invalidate"
+
+# نشانه‌ی مقدارهای ذخیره شده همراه با زمان محاسبه و انقضا در Redis
+ENVELOPE_MARKER = "__dbc__"
+
+# تابع بارگذاری از دیتابیس: (مقدار، قابل ذخیره در کش)
+Loader = Callable[[], Awaitable[Tuple[Any, bool]]]
+
+
+@dataclass
+class CachePolicy:
+    """
+    سیاست کش یک جدول
+    """
+    ttl: Optional[int] = None
+    local_ttl: Optional[float] = None
+
+
+def parse_table_policies(value: Optional[str]) -> Dict[str, CachePolicy]:
+    """
+    خواندن سیاست کش جداول از متغیر محیطی
+
+    قالب: "users:300:10,plugins:3600" یعنی جدول:TTL در Redis:TTL در L1
+    (مقدار L1 اختیاری است و صفر کش L1 آن جدول را غیرفعال می‌کند)
+
+    Args:
+        value: مقدار متغیر
+
+    Returns:
+        Dict[str, CachePolicy]: نام جدول -> سیاست
+    """
+    policies = {}
+    for item in (value or "").split(","):
+        parts = [part.strip() for part in item.split(":")]
+        if not parts[0]:
+            continue
+        try:
+            policies[parts[0]] = CachePolicy(
+                ttl=int(parts[1]) if len(parts) > 1 and parts[1] else None,
+                local_ttl=float(parts[2]) if len(parts) > 2 and parts[2] else None
+            )
+        except ValueError:
+            logger.warning(f"سیاست کش نامعتبر برای جدول {parts[0]}: {item}")
+    return policies
+
+
+def row_key(table: str, **columns: Any) -> str:
+    """
+    ساخت کلید وابستگی یک ردیف
+
+    Args:
+        table: نام جدول
+        **columns: ستون‌ها و مقادیر شناسایی ردیف
+
+    Returns:
+        str: کلید وابستگی (مثلاً "users:id=42")
+    """
+    return f"{table}:" + ",".join(f"{name}={columns[name]}" for name in sorted(columns))
+
+
+def _unwrap(cached: Any) -> Tuple[Any, Optional[float], Optional[float]]:
+    """
+    جدا کردن مقدار از زمان محاسبه و زمان انقضای ذخیره شده در Redis
+
+    Args:
+        cached: مقدار خوانده شده از Redis
+
+    Returns:
+        Tuple[Any, Optional[float], Optional[float]]: مقدار، زمان محاسبه و زمان انقضا
+        (برای مقدارهای قالب قدیمی فقط مقدار)
+    """
+    if isinstance(cached, dict) and cached.get(ENVELOPE_MARKER) == 1:
+        return cached.get('v'), cached.get('d'), cached.get('e')
+    return cached, None, None
+
+
+def _copy_value(value: Any) -> Any:
+    """
+    کپی سطحی رکوردها تا تغییر نتیجه توسط فراخواننده مقدار L1 را تغییر ندهد
+    """
+    if isinstance(value, dict):
+        return dict(value)
+    if isinstance(value, list):
+        return [dict(row) if isinstance(row, dict) else row for row in value]
+    return value
+
 
 class DatabaseCache:
     """
     کلاس مدیریت کش دیتابیس با استفاده از Redis
     """
 
-    def __init__(self, database: Database, redis: RedisManager, default_ttl: int = 3600):
+    def __init__(self, database: Database, redis: RedisManager, default_ttl: int = 3600,
+                 local_size: Optional[int] = None, local_ttl: Optional[float] = None,
+                 table_policies: Optional[Dict[str, CachePolicy]] = None):
         """
         مقداردهی اولیه
 
@@ -26,11 +135,359 @@ class DatabaseCache:
             database: شیء اتصال به دیتابیس
             redis: شیء مدیریت Redis
             default_ttl: زمان پیش‌فرض انقضای کش (ثانیه)
+            local_size: حداکثر کلیدهای کش L1 (پیش‌فرض DB_CACHE_LOCAL_SIZE، صفر برای غیرفعال)
+            local_ttl: زمان پیش‌فرض انقضای کش L1 (پیش‌فرض DB_CACHE_LOCAL_TTL)
+            table_policies: سیاست کش هر جدول (پیش‌فرض DB_CACHE_TABLE_TTL)
         """
         self.db = database
         self.redis = redis
         self.default_ttl = default_ttl
-        self._cache_tags = {}  # {tag: set(keys)}
+
+        if local_size is None:
+            local_size = int(os.getenv("DB_CACHE_LOCAL_SIZE", "1024"))
+        if local_ttl is None:
+            local_ttl = float(os.getenv("DB_CACHE_LOCAL_TTL", "30"))
+        if table_policies is None:
+            table_policies = parse_table_policies(os.getenv("DB_CACHE_TABLE_TTL"))
+        self.local = LocalCache(local_size, local_ttl)
+        self.table_policies = table_policies
+
+        # نسل هر جدول؛ نتیجه‌ای که پیش از نامعتبرسازی خوانده شده در Redis و L1 ذخیره نمی‌شود
+        self._generations: Dict[str, int] = {}
+        self.instance_id = uuid.uuid4().hex
+        self._subscribed = False
+
+        # درخواست‌های هم‌زمان یک کلید منتظر یک کوئری در حال اجرا می‌مانند
+        self._inflight: Dict[str, asyncio.Task] = {}
+        self._refresh_tasks: Set[asyncio.Task] = set()
+
+        # قفل توزیع شده برای یک کوئری در تمام پردازه‌ها (پیش‌فرض غیرفعال)
+        self.fill_lock = os.getenv("DB_CACHE_FILL_LOCK", "false").lower() in ("1", "true", "yes")
+        self.fill_lock_wait = float(os.getenv("DB_CACHE_FILL_LOCK_WAIT", "2"))
+        self.fill_lock_expire = int(os.getenv("DB_CACHE_FILL_LOCK_EXPIRE", "30"))
+
+        # ضریب تازه‌سازی زودهنگام احتمالی (صفر برای غیرفعال)
+        self.early_refresh_beta = float(os.getenv("DB_CACHE_EARLY_REFRESH_BETA", "1.0"))
+
+        # تعداد تقریبی از برآورد planner؛ با نوشتن نامعتبر نمی‌شود و فقط منقضی می‌شود
+        self.estimate_ttl = int(os.getenv("DB_CACHE_ESTIMATE_TTL", "300"))
+        # برآوردهای کمتر از این مقدار با شمارش دقیق جایگزین می‌شوند
+        self.estimate_exact_below = int(os.getenv("DB_CACHE_ESTIMATE_EXACT_BELOW", "10000"))
+
+        self.stats = {
+            'l1_hits': 0,
+            'l1_misses': 0,
+            'l2_hits': 0,
+            'l2_misses': 0,
+            'db_queries': 0,
+            'coalesced': 0,
+            'lock_waits': 0,
+            'stale_skips': 0,
+            'early_refreshes': 0,
+            'invalidations_sent': 0,
+            'invalidations_received': 0,
+        }
+
+        get_metrics().register_collector('db_cache', self._gauges)
+
+    async def start(self) -> bool:
+        """
+        اشتراک در کانال نامعتبرسازی برای دریافت تغییرات پردازه‌های دیگر
+
+        Returns:
+            bool: وضعیت اشتراک
+        """
+        if not self._subscribed:
+            self._subscribed = await self.redis.subscribe(INVALIDATION_CHANNEL, self._on_invalidation)
+        return self._subscribed
+
+    async def stop(self) -> None:
+        """
+        لغو اشتراک کانال نامعتبرسازی
+        """
+        if self._subscribed:
+            await self.redis.unsubscribe(INVALIDATION_CHANNEL)
+            self._subscribed = False
+
+    def _policy_ttl(self, table: str, ttl: Optional[int]) -> int:
+        """
+        زمان انقضای کش Redis برای یک جدول
+
+        Args:
+            table: نام جدول
+            ttl: زمان درخواست شده
+
+        Returns:
+            int: زمان انقضا (ثانیه)
+        """
+        if ttl is not None:
+            return ttl
+        policy = self.table_policies.get(table)
+        if policy is not None and policy.ttl is not None:
+            return policy.ttl
+        return self.default_ttl
+
+    def _local_ttl(self, table: str, ttl: int) -> float:
+        """
+        زمان انقضای کش L1 برای یک جدول (حداکثر برابر انقضای Redis)
+
+        Args:
+            table: نام جدول
+            ttl: زمان انقضای Redis
+
+        Returns:
+            float: زمان انقضا (ثانیه)
+        """
+        policy = self.table_policies.get(table)
+        local_ttl = self.local.default_ttl
+        if policy is not None and policy.local_ttl is not None:
+            local_ttl = policy.local_ttl
+        return min(local_ttl, ttl)
+
+    async def _read(self, cache_key: str, table: str, ttl: Optional[int], skip_cache: bool,
+                    loader: Loader, tags: Tuple[str, ...]) -> Any:
+        """
+        خواندن از کش یا دیتابیس
+
+        Args:
+            cache_key: کلید کش
+            table: نام جدول
+            ttl: زمان انقضای درخواست شده
+            skip_cache: نادیده گرفتن کش (کوئری مستقل اجرا و نتیجه ذخیره می‌شود)
+            loader: تابع بارگذاری از دیتابیس
+            tags: تگ‌های کلید (جدول و وابستگی‌ها)
+
+        Returns:
+            Any: مقدار
+        """
+        if skip_cache:
+            return await self._query(cache_key, table, ttl, loader, tags, self._generations.get(table, 0))
+
+        cached = await self._get_cached(cache_key, table, ttl, loader, tags)
+        if cached is not MISSING:
+            return cached
+        return await self._load(cache_key, table, ttl, loader, tags)
+
+    async def _get_cached(self, cache_key: str, table: str, ttl: Optional[int], loader: Loader,
+                          tags: Tuple[str, ...]) -> Any:
+        """
+        خواندن از L1 و سپس Redis
+
+        در خواندن از Redis، اگر زمان انقضا نزدیک باشد به احتمالی که با نزدیک شدن به
+        انقضا و طول کشیدن کوئری بیشتر می‌شود (XFetch)، مقدار فعلی برگردانده و تازه‌سازی
+        در پس‌زمینه شروع می‌شود تا کلیدهای پرتکرار هیچ‌گاه هم‌زمان منقضی نشوند.
+
+        Args:
+            cache_key: کلید کش
+            table: نام جدول
+            ttl: زمان انقضای درخواست شده
+            loader: تابع بارگذاری برای تازه‌سازی زودهنگام
+            tags: تگ‌های کلید (جدول و وابستگی‌ها)
+
+        Returns:
+            Any: مقدار یا MISSING
+        """
+        value = self.local.get(cache_key)
+        if value is not MISSING:
+            self.stats['l1_hits'] += 1
+            return _copy_value(value)
+        self.stats['l1_misses'] += 1
+
+        generation = self._generations.get(table, 0)
+        cached = await self.redis.get(cache_key)
+        if cached is None:
+            self.stats['l2_misses'] += 1
+            return MISSING
+
+        self.stats['l2_hits'] += 1
+        logger.debug(f"داده از کش دریافت شد: {cache_key}")
+        value, delta, expires_at = _unwrap(cached)
+
+        if expires_at is not None and self._should_refresh(delta, expires_at):
+            self._schedule_refresh(cache_key, table, ttl, loader, tags)
+        elif self._generations.get(table, 0) == generation:
+            local_ttl = self._local_ttl(table, self._policy_ttl(table, ttl))
+            if expires_at is not None:
+                local_ttl = min(local_ttl, expires_at - time.time())
+            self.local.set(cache_key, _copy_value(value), local_ttl, tags)
+        return value
+
+    def _should_refresh(self, delta: Optional[float], expires_at: float) -> bool:
+        """
+        تصمیم احتمالی تازه‌سازی زودهنگام
+
+        Args:
+            delta: مدت اجرای کوئری در آخرین بارگذاری (ثانیه)
+            expires_at: زمان انقضای مقدار (timestamp)
+
+        Returns:
+            bool: آیا تازه‌سازی شروع شود
+        """
+        if self.early_refresh_beta <= 0 or not delta:
+            return False
+        # -log(u) با u در (0, 1] همیشه نامنفی است
+        gap = -delta * self.early_refresh_beta * math.log(1.0 - random.random())
+        return time.time() + gap >= expires_at
+
+    def _schedule_refresh(self, cache_key: str, table: str, ttl: Optional[int], loader: Loader,
+                          tags: Tuple[str, ...]) -> None:
+        """
+        شروع تازه‌سازی یک کلید در پس‌زمینه (در صورت نبود بارگذاری در حال اجرا)
+
+        Args:
+            cache_key: کلید کش
+            table: نام جدول
+            ttl: زمان انقضای درخواست شده
+            loader: تابع بارگذاری
+            tags: تگ‌های کلید (جدول و وابستگی‌ها)
+        """
+        if cache_key in self._inflight:
+            return
+
+        self.stats['early_refreshes'] += 1
+        task = asyncio.create_task(self._refresh(cache_key, table, ttl, loader, tags))
+        self._refresh_tasks.add(task)
+        task.add_done_callback(self._refresh_tasks.discard)
+
+    async def _refresh(self, cache_key: str, table: str, ttl: Optional[int], loader: Loader,
+                       tags: Tuple[str, ...]) -> None:
+        """
+        تازه‌سازی پس‌زمینه‌ی یک کلید
+        """
+        try:
+            await self._load(cache_key, table, ttl, loader, tags)
+        except Exception as e:
+            logger.error(f"خطا در تازه‌سازی کش {cache_key}: {str(e)}")
+
+    async def _load(self, cache_key: str, table: str, ttl: Optional[int], loader: Loader,
+                    tags: Tuple[str, ...]) -> Any:
+        """
+        بارگذاری یک کلید با یک کوئری برای تمام درخواست‌های هم‌زمان (single-flight)
+
+        Args:
+            cache_key: کلید کش
+            table: نام جدول
+            ttl: زمان انقضای درخواست شده
+            loader: تابع بارگذاری
+            tags: تگ‌های کلید (جدول و وابستگی‌ها)
+
+        Returns:
+            Any: مقدار
+        """
+        future = self._inflight.get(cache_key)
+        if future is not None:
+            self.stats['coalesced'] += 1
+            return _copy_value(await asyncio.shield(future))
+
+        # بارگذاری در task جداگانه اجرا می‌شود تا لغو درخواست اول (مثلاً قطع اتصال کلاینت)
+        # بارگذاری را برای سایر منتظرها لغو نکند
+        task = asyncio.create_task(self._fill(cache_key, table, ttl, loader, tags))
+        self._inflight[cache_key] = task
+        task.add_done_callback(functools.partial(self._load_done, cache_key))
+        return await asyncio.shield(task)
+
+    def _load_done(self, cache_key: str, task: asyncio.Task) -> None:
+        """
+        حذف بارگذاری پایان یافته از لیست بارگذاری‌های در حال اجرا
+
+        Args:
+            cache_key: کلید کش
+            task: task بارگذاری
+        """
+        if self._inflight.get(cache_key) is task:
+            del self._inflight[cache_key]
+        if not task.cancelled():
+            # بدون منتظر باقی‌مانده، خطا فقط به فراخوانندگان می‌رسد و هشدار ثبت نمی‌شود
+            task.exception()
+
+    async def _fill(self, cache_key: str, table: str, ttl: Optional[int], loader: Loader,
+                    tags: Tuple[str, ...]) -> Any:
+        """
+        اجرای کوئری، در صورت فعال بودن قفل توزیع شده فقط در یک پردازه
+
+        پردازه‌ای که قفل را نگیرد تا fill_lock_wait ثانیه منتظر ذخیره شدن نتیجه در
+        Redis می‌ماند و پس از آن خودش کوئری را اجرا می‌کند.
+
+        Args:
+            cache_key: کلید کش
+            table: نام جدول
+            ttl: زمان انقضای درخواست شده
+            loader: تابع بارگذاری
+            tags: تگ‌های کلید (جدول و وابستگی‌ها)
+
+        Returns:
+            Any: مقدار
+        """
+        generation = self._generations.get(table, 0)
+        if not self.fill_lock:
+            return await self._query(cache_key, table, ttl, loader, tags, generation)
+
+        lock_name = f"db_cache:fill:{cache_key}"
+        # acquire_lock با timeout کوتاه فقط یک بار تلاش می‌کند
+        token = await self.redis.acquire_lock(lock_name, timeout=0.05, expire=self.fill_lock_expire)
+        if token:
+            try:
+                return await self._query(cache_key, table, ttl, loader, tags, generation)
+            finally:
+                await self.redis.release_lock(lock_name, token)
+
+        self.stats['lock_waits'] += 1
+        deadline = time.monotonic() + self.fill_lock_wait
+        while time.monotonic() < deadline:
+            await asyncio.sleep(0.05)
+            cached = await self.redis.get(cache_key)
+            if cached is not None:
+                return _unwrap(cached)[0]
+
+        return await self._query(cache_key, table, ttl, loader, tags, generation)
+
+    async def _query(self, cache_key: str, table: str, ttl: Optional[int], loader: Loader,
+                     tags: Tuple[str, ...], generation: int) -> Any:
+        """
+        اجرای کوئری و ذخیره نتیجه
+
+        Args:
+            cache_key: کلید کش
+            table: نام جدول
+            ttl: زمان انقضای درخواست شده
+            loader: تابع بارگذاری
+            tags: تگ‌های کلید (جدول و وابستگی‌ها)
+            generation: نسل جدول پیش از اجرای کوئری
+
+        Returns:
+            Any: مقدار
+        """
+        self.stats['db_queries'] += 1
+        started = time.monotonic()
+        value, cacheable = await loader()
+        if cacheable:
+            await self._store(cache_key, table, value, ttl, tags, generation, time.monotonic() - started)
+        return value
+
+    async def _store(self, cache_key: str, table: str, value: Any, ttl: Optional[int], tags: Tuple[str, ...],
+                     generation: int, delta: float = 0.0) -> None:
+        """
+        ذخیره نتیجه در Redis و L1
+
+        Args:
+            cache_key: کلید کش
+            table: نام جدول
+            value: مقدار
+            ttl: زمان انقضای درخواست شده
+            tags: تگ‌های کلید (جدول و وابستگی‌ها)
+            generation: نسل جدول پیش از اجرای کوئری
+            delta: مدت اجرای کوئری (برای تازه‌سازی زودهنگام)
+        """
+        # جدول در حین اجرای کوئری تغییر کرده است؛ نتیجه‌ی قدیمی نه در Redis و نه در L1 ذخیره نمی‌شود
+        if self._generations.get(table, 0) != generation:
+            self.stats['stale_skips'] += 1
+            return
+
+        ttl_value = self._policy_ttl(table, ttl)
+        envelope = {ENVELOPE_MARKER: 1, 'v': value, 'd': round(delta, 6), 'e': time.time() + ttl_value}
+        await self.redis.set_tagged(cache_key, envelope, ttl_value, *tags)
+        if self._generations.get(table, 0) == generation:
+            self.local.set(cache_key, _copy_value(value), self._local_ttl(table, ttl_value), tags)
 
     def _get_cache_key(self, query_type: str, table: str, query_hash: str) -> str:
         """
@@ -39,13 +496,31 @@ class DatabaseCache:
         Args:
             query_type: نوع کوئری (select, count, etc)
             table: نام جدول
-            query_hash: هش کوئری (ترکیبی از پارامترها)
+            query_hash: اثر انگشت کوئری و پارامترها (query_fingerprint)
 
         Returns:
             str: کلید کش
         """
         return f"db:{table}:{query_type}:{query_hash}"
 
+    def explain_key(self, query_type: str, table: str, query: str,
+                    params: Optional[Tuple] = None) -> Dict[str, str]:
+        """
+        نمایش اجزای کلید کش یک کوئری برای اشکال‌زدایی
+
+        Args:
+            query_type: نوع کوئری (one, all, count)
+            table: نام جدول
+            query: کوئری SQL
+            params: پارامترهای کوئری
+
+        Returns:
+            Dict[str, str]: کوئری استاندارد، پارامترهای کدگذاری شده، اثر انگشت و کلید کش
+        """
+        details = explain_fingerprint(query, params)
+        details['key'] = self._get_cache_key(query_type, table, details['fingerprint'])
+        return details
+
     def _get_tag_key(self, table: str) -> str:
         """
         ساخت کلید تگ برای جدول
@@ -58,56 +533,102 @@ class DatabaseCache:
         """
         return f"tag:{table}"
 
-    async def _add_to_tag(self, table: str, cache_key: str) -> None:
+    def _get_aggregate_tag_key(self, table: str) -> str:
         """
-        افزودن کلید به تگ
+        ساخت کلید تگ کوئری‌های تجمیعی جدول (کوئری‌های بدون وابستگی ردیف)
 
         Args:
             table: نام جدول
-            cache_key: کلید کش
+
+        Returns:
+            str: کلید تگ
         """
-        tag_key = self._get_tag_key(table)
+        return f"tag:{table}:agg"
 
-        # افزودن به نگاشت داخلی
-        if tag_key not in self._cache_tags:
-            self._cache_tags[tag_key] = set()
+    def _get_dependency_tag_key(self, key: str) -> str:
+        """
+        ساخت کلید تگ یک کلید وابستگی ردیف
 
-        self._cache_tags[tag_key].add(cache_key)
+        Args:
+            key: کلید وابستگی (row_key)
 
-        # افزودن به redis
-        await self.redis.hset(tag_key, cache_key, "1")
+        Returns:
+            str: کلید تگ
+        """
+        return f"tag:dep:{key}"
 
-    async def _invalidate_tag(self, table: str) -> None:
+    def _entry_tags(self, table: str, depends_on: Optional[Iterable[str]]) -> Tuple[str, ...]:
         """
-        نامعتبر کردن تمام کش‌های مرتبط با یک جدول
+        تگ‌های یک مقدار کش
 
         Args:
             table: نام جدول
+            depends_on: کلیدهای وابستگی ردیف (None برای کوئری تجمیعی)
+
+        Returns:
+            Tuple[str, ...]: کلیدهای تگ
         """
-        tag_key = self._get_tag_key(table)
+        if isinstance(depends_on, str):
+            depends_on = (depends_on,)
+        if depends_on:
+            return (self._get_tag_key(table), *(self._get_dependency_tag_key(key) for key in depends_on))
+        return self._get_tag_key(table), self._get_aggregate_tag_key(table)
 
-        # دریافت کلیدهای مرتبط
-        keys = set()
+    def _invalidate_local(self, tables: Iterable[str], keys: Optional[Iterable[str]]) -> List[str]:
+        """
+        نامعتبر کردن L1 و برگرداندن تگ‌هایی که باید در Redis حذف شوند
 
-        # از نگاشت داخلی
-        if tag_key in self._cache_tags:
-            keys = self._cache_tags[tag_key]
-            del self._cache_tags[tag_key]
+        Args:
+            tables: لیست جداول
+            keys: کلیدهای وابستگی ردیف‌های تغییر یافته (None برای کل جدول)
 
-        # از redis
-        redis_keys = await self.redis.hgetall(tag_key)
-        if redis_keys:
-            keys.update(redis_keys.keys())
+        Returns:
+            List[str]: کلیدهای تگ
+        """
+        if keys is None:
+            tag_keys = [self._get_tag_key(table) for table in tables]
+        else:
+            tag_keys = [self._get_aggregate_tag_key(table) for table in tables]
+            tag_keys.extend(self._get_dependency_tag_key(key) for key in keys)
 
-        # حذف کش‌ها
-        for key in keys:
-            await self.redis.delete(key)
+        for table in tables:
+            self._generations[table] = self._generations.get(table, 0) + 1
+        for tag_key in tag_keys:
+            self.local.invalidate_tag(tag_key)
+        return tag_keys
+
+    async def _invalidate(self, tables: List[str], keys: Optional[Iterable[str]] = None) -> None:
+        """
+        نامعتبر کردن کش پس از نوشتن و اطلاع به پردازه‌های دیگر
+
+        Args:
+            tables: لیست جداول تحت تأثیر
+            keys: کلیدهای وابستگی ردیف‌های تغییر یافته (None برای کل جدول)
+        """
+        if keys is None:
+            for table in tables:
+                await self._invalidate_tag(table)
+        else:
+            keys = [keys] if isinstance(keys, str) else list(keys)
+            await self.redis.delete_tags(*self._invalidate_local(tables, keys))
+        await self._publish_invalidation(tables, keys)
 
-        # حذف تگ
-        await self.redis.delete(tag_key)
+    async def _invalidate_tag(self, table: str) -> None:
+        """
+        نامعتبر کردن تمام کش‌های مرتبط با یک جدول
+
+        کلیدهای جدول فقط در hash تگ Redis ثبت می‌شوند و حذف آن‌ها، مستقل از تعداد
+        کلیدها، در یک رفت و برگشت با اسکریپت Lua انجام می‌شود.
+
+        Args:
+            table: نام جدول
+        """
+        # نامعتبر کردن L1 و حذف کش‌ها و تگ از redis
+        await self.redis.delete_tags(*self._invalidate_local([table], None))
 
     async def fetch_one(self, table: str, query: str, params: Optional[Tuple] = None,
-                        ttl: Optional[int] = None, skip_cache: bool = False) -> Optional[Dict[str, Any]]:
+                        ttl: Optional[int] = None, skip_cache: bool = False,
+                        depends_on: Optional[Iterable[str]] = None) -> Optional[Dict[str, Any]]:
         """
         دریافت یک رکورد از دیتابیس با پشتیبانی از کش
 
@@ -117,35 +638,25 @@ class DatabaseCache:
             params: پارامترهای کوئری
             ttl: زمان انقضای کش (ثانیه)
             skip_cache: نادیده گرفتن کش
+            depends_on: کلیدهای ردیف‌هایی که نتیجه فقط به آن‌ها وابسته است (row_key)
 
         Returns:
             Optional[Dict[str, Any]]: رکورد یافت شده یا None
         """
         # ساخت کلید کش
-        params_str = json.dumps(params) if params else ""
-        query_hash = str(hash(f"{query}:{params_str}"))
-        cache_key = self._get_cache_key("one", table, query_hash)
-
-        # بررسی کش
-        if not skip_cache:
-            cached = await self.redis.get(cache_key)
-            if cached is not None:
-                logger.debug(f"داده از کش دریافت شد: {cache_key}")
-                return cached
+        cache_key = self._get_cache_key("one", table, query_fingerprint(query, params))
 
-        # دریافت از دیتابیس
-        result = await self.db.fetch_one(query, params)
+        async def loader():
+            # دریافت از دیتابیس (فقط رکورد موجود ذخیره می‌شود)
+            result = await self.db.fetchrow(query, *(params or ()))
+            return (dict(result) if result else None), result is not None
 
-        # ذخیره در کش
-        if result is not None:
-            ttl_value = ttl if ttl is not None else self.default_ttl
-            await self.redis.set(cache_key, dict(result), ttl_value)
-            await self._add_to_tag(table, cache_key)
-
-        return dict(result) if result else None
+        tags = self._entry_tags(table, depends_on)
+        return await self._read(cache_key, table, ttl, skip_cache, loader, tags)
 
     async def fetch_all(self, table: str, query: str, params: Optional[Tuple] = None,
-                       ttl: Optional[int] = None, skip_cache: bool = False) -> List[Dict[str, Any]]:
+                       ttl: Optional[int] = None, skip_cache: bool = False,
+                       depends_on: Optional[Iterable[str]] = None) -> List[Dict[str, Any]]:
         """
         دریافت چندین رکورد از دیتابیس با پشتیبانی از کش
 
@@ -155,36 +666,24 @@ class DatabaseCache:
             params: پارامترهای کوئری
             ttl: زمان انقضای کش (ثانیه)
             skip_cache: نادیده گرفتن کش
+            depends_on: کلیدهای ردیف‌هایی که نتیجه فقط به آن‌ها وابسته است (row_key)
 
         Returns:
             List[Dict[str, Any]]: لیست رکوردهای یافت شده
         """
         # ساخت کلید کش
-        params_str = json.dumps(params) if params else ""
-        query_hash = str(hash(f"{query}:{params_str}"))
-        cache_key = self._get_cache_key("all", table, query_hash)
+        cache_key = self._get_cache_key("all", table, query_fingerprint(query, params))
 
-        # بررسی کش
-        if not skip_cache:
-            cached = await self.redis.get(cache_key)
-            if cached is not None:
-                logger.debug(f"داده از کش دریافت شد: {cache_key}")
-                return cached
-
-        # دریافت از دیتابیس
-        results = await self.db.fetch_all(query, params)
-
-        # ذخیره در کش
-        if results:
-            ttl_value = ttl if ttl is not None else self.default_ttl
-            data = [dict(row) for row in results]
-            await self.redis.set(cache_key, data, ttl_value)
-            await self._add_to_tag(table, cache_key)
-            return data
+        async def loader():
+            # دریافت از دیتابیس (نتیجه‌ی خالی ذخیره نمی‌شود)
+            results = await self.db.fetch(query, *(params or ()))
+            return [dict(row) for row in results or []], bool(results)
 
-        return []
+        tags = self._entry_tags(table, depends_on)
+        return await self._read(cache_key, table, ttl, skip_cache, loader, tags)
 
-    async def execute(self, tables: List[str], query: str, params: Optional[Tuple] = None) -> None:
+    async def execute(self, tables: List[str], query: str, params: Optional[Tuple] = None,
+                      keys: Optional[Iterable[str]] = None) -> None:
         """
         اجرای کوئری دیتابیس و نامعتبر کردن کش
 
@@ -192,16 +691,36 @@ class DatabaseCache:
             tables: لیست جداول تحت تأثیر
             query: کوئری SQL
             params: پارامترهای کوئری
+            keys: کلیدهای ردیف‌های تغییر یافته (row_key)؛ None کل کش جداول را حذف می‌کند
+                و لیست خالی (مثلاً برای INSERT) فقط کوئری‌های تجمیعی را
         """
         # اجرای کوئری
-        await self.db.execute(query, params)
+        await self.db.execute(query, *(params or ()))
 
         # نامعتبر کردن کش‌های مرتبط
-        for table in tables:
-            await self._invalidate_tag(table)
+        await self._invalidate(tables, keys)
+
+    async def execute_returning(self, tables: List[str], query: str, params: Optional[Tuple] = None,
+                                keys: Optional[Iterable[str]] = None) -> Optional[Dict[str, Any]]:
+        """
+        اجرای کوئری نوشتن با RETURNING (بدون کش) و نامعتبر کردن کش
+
+        Args:
+            tables: لیست جداول تحت تأثیر
+            query: کوئری SQL
+            params: پارامترهای کوئری
+            keys: کلیدهای ردیف‌های تغییر یافته (مانند execute)
+
+        Returns:
+            Optional[Dict[str, Any]]: ردیف برگردانده شده یا None
+        """
+        result = await self.db.fetchrow(query, *(params or ()))
+        await self._invalidate(tables, keys)
+        return dict(result) if result else None
 
     async def count(self, table: str, query: str, params: Optional[Tuple] = None,
-                   ttl: Optional[int] = None, skip_cache: bool = False) -> int:
+                   ttl: Optional[int] = None, skip_cache: bool = False,
+                   depends_on: Optional[Iterable[str]] = None) -> int:
         """
         شمارش تعداد رکوردها با پشتیبانی از کش
 
@@ -211,56 +730,91 @@ class DatabaseCache:
             params: پارامترهای کوئری
             ttl: زمان انقضای کش (ثانیه)
             skip_cache: نادیده گرفتن کش
+            depends_on: کلیدهای ردیف‌هایی که نتیجه فقط به آن‌ها وابسته است (row_key)
 
         Returns:
             int: تعداد رکوردها
         """
         # ساخت کلید کش
-        params_str = json.dumps(params) if params else ""
-        query_hash = str(hash(f"{query}:{params_str}"))
-        cache_key = self._get_cache_key("count", table, query_hash)
+        cache_key = self._get_cache_key("count", table, query_fingerprint(query, params))
 
-        # بررسی کش
-        if not skip_cache:
-            cached = await self.redis.get(cache_key)
-            if cached is not None:
-                logger.debug(f"داده از کش دریافت شد: {cache_key}")
-                return int(cached)
+        async def loader():
+            # دریافت از دیتابیس
+            result = await self.db.fetchrow(query, *(params or ()))
 
-        # دریافت از دیتابیس
-        result = await self.db.fetch_one(query, params)
+            # استخراج مقدار count
+            count = 0
+            if result:
+                # معمولاً اولین ستون نتیجه count است
+                count = list(dict(result).values())[0]
+            return count, True
 
-        # استخراج مقدار count
-        count = 0
-        if result:
-            # معمولاً اولین ستون نتیجه count است
-            count = list(dict(result).values())[0]
+        tags = self._entry_tags(table, depends_on)
+        return int(await self._read(cache_key, table, ttl, skip_cache, loader, tags))
 
-        # ذخیره در کش
-        ttl_value = ttl if ttl is not None else self.default_ttl
-        await self.redis.set(cache_key, count, ttl_value)
-        await self._add_to_tag(table, cache_key)
+    async def estimate_count(self, table: str, query: str, params: Optional[Tuple] = None,
+                             ttl: Optional[int] = None,
+                             exact_below: Optional[int] = None) -> Tuple[int, bool]:
+        """
+        شمارش تقریبی رکوردها با برآورد planner
 
-        return count
+        تعداد ردیف‌های برآورد شده‌ی EXPLAIN برای کوئری (با همان فیلترها) بدون اسکن جدول
+        خوانده و تا ttl ثانیه کش می‌شود و با نوشتن روی جدول نامعتبر نمی‌شود. اگر برآورد
+        در دسترس نباشد یا کمتر از exact_below باشد، شمارش دقیق (کش شده) برگردانده می‌شود.
 
-    async def invalidate_cache(self, tables: List[str]) -> None:
+        Args:
+            table: نام جدول
+            query: کوئری SELECT بدون ORDER BY و LIMIT (مثلاً "SELECT 1 FROM users WHERE ...")
+            params: پارامترهای کوئری
+            ttl: زمان انقضای برآورد (پیش‌فرض DB_CACHE_ESTIMATE_TTL)
+            exact_below: آستانه‌ی شمارش دقیق (پیش‌فرض DB_CACHE_ESTIMATE_EXACT_BELOW)
+
+        Returns:
+            Tuple[int, bool]: تعداد و اینکه آیا دقیق است
+        """
+        cache_key = self._get_cache_key("estimate", table, query_fingerprint(query, params))
+
+        async def loader():
+            result = await self.db.fetchrow(f"EXPLAIN (FORMAT JSON) {query}", *(params or ()))
+            if not result:
+                return None, False
+            plan = list(dict(result).values())[0]
+            if isinstance(plan, str):
+                plan = json.loads(plan)
+            return int(plan[0]['Plan']['Plan Rows']), True
+
+        try:
+            estimate = await self._read(cache_key, table, self.estimate_ttl if ttl is None else ttl,
+                                        False, loader, ())
+        except (KeyError, IndexError, TypeError, ValueError) as e:
+            logger.error(f"خطا در برآورد تعداد رکوردها: {str(e)}")
+            estimate = None
+
+        if exact_below is None:
+            exact_below = self.estimate_exact_below
+        if estimate is None or estimate < exact_below:
+            return await self.count(table, f"SELECT COUNT(*) FROM ({query}) AS counted", params), True
+        return estimate, False
+
+    async def invalidate_cache(self, tables: List[str], keys: Optional[Iterable[str]] = None) -> None:
         """
         نامعتبر کردن کش برای جداول مشخص
 
         Args:
             tables: لیست جداول
+            keys: کلیدهای ردیف‌های تغییر یافته (None برای کل جدول)
         """
-        for table in tables:
-            await self._invalidate_tag(table)
+        await self._invalidate(tables, keys)
 
-    async def transaction(self, tables: List[str], queries: List[Tuple[str, Optional[Tuple]]]) \
-        -> bool: \
+    async def transaction(self, tables: List[str], queries: List[Tuple[str, Optional[Tuple]]],
+                          keys: Optional[Iterable[str]] = None) -> bool:
         """
         اجرای کوئری‌ها در یک تراکنش
 
         Args:
             tables: لیست جداول تحت تأثیر
             queries: لیست کوئری‌ها و پارامترهای آن‌ها
+            keys: کلیدهای ردیف‌های تغییر یافته (None برای کل جدول)
 
         Returns:
             bool: نتیجه اجرای تراکنش
@@ -270,7 +824,65 @@ class DatabaseCache:
 
         # نامعتبر کردن کش‌ها در صورت موفقیت
         if success:
-            for table in tables:
-                await self._invalidate_tag(table)
+            await self._invalidate(tables, keys)
 
         return success
+
+    async def _publish_invalidation(self, tables: List[str], keys: Optional[List[str]] = None) -> None:
+        """
+        اعلام جداول و ردیف‌های تغییر یافته به پردازه‌های دیگر
+
+        Args:
+            tables: لیست جداول
+            keys: کلیدهای ردیف‌های تغییر یافته (None برای کل جدول)
+        """
+        if not tables:
+            return
+        try:
+            await self.redis.publish(INVALIDATION_CHANNEL, {
+                'origin': self.instance_id,
+                'tables': list(tables),
+                'keys': keys,
+            })
+            self.stats['invalidations_sent'] += 1
+        except Exception as e:
+            logger.error(f"خطا در انتشار نامعتبرسازی کش: {str(e)}")
+
+    async def _on_invalidation(self, channel: str, data: Any) -> None:
+        """
+        پاک کردن L1 برای جداولی که پردازه‌ی دیگری تغییر داده است
+
+        Args:
+            channel: نام کانال
+            data: پیام ({'origin': ..., 'tables': [...], 'keys': [...] یا None})
+        """
+        if not isinstance(data, dict) or data.get('origin') == self.instance_id:
+            return
+
+        self.stats['invalidations_received'] += 1
+        self._invalidate_local(data.get('tables') or [], data.get('keys'))
+
+    def _gauges(self) -> Dict[str, int]:
+        """
+        مقادیر لحظه‌ای برای /metrics
+
+        Returns:
+            Dict[str, int]: شمارنده‌های هر لایه و اندازه‌ی L1
+        """
+        return {'l1_size': len(self.local), 'inflight': len(self._inflight), **self.stats}
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        دریافت آمار کش به تفکیک لایه
+
+        Returns:
+            Dict[str, Any]: آمار
+        """
+        l1_total = self.stats['l1_hits'] + self.stats['l1_misses']
+        l2_total = self.stats['l2_hits'] + self.stats['l2_misses']
+        return {
+            **self.stats,
+            'l1_hit_ratio': self.stats['l1_hits'] / l1_total if l1_total else 0.0,
+            'l2_hit_ratio': self.stats['l2_hits'] / l2_total if l2_total else 0.0,
+            'local': self.local.get_stats(),
+        }
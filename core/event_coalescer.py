@@ -0,0 +1,154 @@
+"""
+ادغام ویرایش‌های پیاپی یک پیام در یک رویداد
+
+کلاینت‌هایی که پیام را به صورت زنده ویرایش می‌کنند (نوار پیشرفت، پاسخ‌های جریانی هوش
+مصنوعی) در هر ثانیه ده‌ها رویداد ویرایش تولید می‌کنند. این ماژول برای هر
+(chat_id, message_id) فقط آخرین ویرایش درون یک پنجره‌ی زمانی را ارسال می‌کند.
+"""
+import asyncio
+import logging
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional, Set, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+def edit_key(update: Any) -> Optional[Tuple[Any, Any]]:
+    """
+    کلید ادغام یک ویرایش (شناسه چت و شناسه پیام)
+
+    Args:
+        update: پیام ویرایش شده (Pyrogram) یا رویداد MessageEdited (Telethon)
+
+    Returns:
+        Optional[Tuple[Any, Any]]: کلید یا None اگر شناسه‌ها در دسترس نباشند
+    """
+    message_id = getattr(update, 'id', None)
+    if message_id is None:
+        message_id = getattr(update, 'message_id', None)
+
+    chat = getattr(update, 'chat', None)
+    chat_id = chat.id if chat is not None else getattr(update, 'chat_id', None)
+
+    if message_id is None or chat_id is None:
+        return None
+    return chat_id, message_id
+
+
+class EditCoalescer:
+    """
+    ارسال آخرین ویرایش هر پیام در پایان پنجره‌ی زمانی
+
+    پنجره از اولین ویرایش شروع می‌شود، بنابراین پیامی که پیوسته ویرایش می‌شود نیز
+    حداکثر یک بار در هر پنجره ارسال می‌شود و هیچ‌گاه به تأخیر نامحدود نمی‌افتد.
+    """
+
+    def __init__(self, window: float = 1.0):
+        """
+        مقداردهی اولیه
+
+        Args:
+            window: طول پنجره‌ی ادغام (ثانیه)
+        """
+        self.window = window
+        # کلید -> (callback، آخرین آرگومان‌ها، تایمر)
+        self._pending: Dict[Hashable, Tuple[Callable[..., Awaitable[Any]], tuple, asyncio.TimerHandle]] = {}
+        self._tasks: Set[asyncio.Task] = set()
+        self.stats = {
+            'received': 0,
+            'coalesced': 0,
+            'dispatched': 0,
+        }
+
+    @property
+    def pending(self) -> int:
+        """تعداد پیام‌های در انتظار ارسال"""
+        return len(self._pending)
+
+    def submit(self, key: Hashable, callback: Callable[..., Awaitable[Any]], *args) -> None:
+        """
+        ثبت یک ویرایش؛ ویرایش قبلی همان کلید در پنجره‌ی جاری جایگزین می‌شود
+
+        Args:
+            key: کلید ادغام
+            callback: تابع async ارسال
+            *args: آرگومان‌های callback
+        """
+        self.stats['received'] += 1
+
+        pending = self._pending.get(key)
+        if pending is not None:
+            self._pending[key] = (callback, args, pending[2])
+            self.stats['coalesced'] += 1
+            return
+
+        timer = asyncio.get_running_loop().call_later(self.window, self._flush, key)
+        self._pending[key] = (callback, args, timer)
+
+    def wrap(self, callback: Callable[..., Awaitable[Any]], namespace: Hashable = None) -> Callable:
+        """
+        ساخت callback کلاینت که ویرایش‌ها را پیش از ارسال ادغام می‌کند
+
+        Args:
+            callback: تابع async ارسال
+            namespace: پیشوند کلید برای جدا کردن callback های مختلف
+
+        Returns:
+            Callable: callback ادغام کننده
+        """
+        async def coalesced(*args):
+            key = edit_key(args[-1])
+            if key is None:
+                return await callback(*args)
+            self.submit((namespace, key), callback, *args)
+
+        coalesced.__name__ = getattr(callback, '__name__', 'coalesced')
+        coalesced.__wrapped__ = callback
+        return coalesced
+
+    def _flush(self, key: Hashable) -> None:
+        """
+        ارسال آخرین ویرایش یک کلید
+
+        Args:
+            key: کلید ادغام
+        """
+        pending = self._pending.pop(key, None)
+        if pending is None:
+            return
+
+        callback, args, _ = pending
+        self.stats['dispatched'] += 1
+        task = asyncio.ensure_future(self._run(callback, args))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    @staticmethod
+    async def _run(callback: Callable[..., Awaitable[Any]], args: tuple) -> None:
+        try:
+            await callback(*args)
+        except Exception as e:
+            logger.error(f"خطا در ارسال ویرایش ادغام شده: {str(e)}")
+
+    async def flush_all(self) -> None:
+        """
+        ارسال فوری تمام ویرایش‌های در انتظار و انتظار برای پایان آن‌ها
+        """
+        for key, (_, _, timer) in list(self._pending.items()):
+            timer.cancel()
+            self._flush(key)
+
+        if self._tasks:
+            await asyncio.gather(*list(self._tasks), return_exceptions=True)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        دریافت آمار ادغام
+
+        Returns:
+            Dict[str, Any]: آمار
+        """
+        return {
+            'window': self.window,
+            'pending': len(self._pending),
+            **self.stats,
+        }
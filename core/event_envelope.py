@@ -0,0 +1,204 @@
+"""
+پاکت رویداد: مقادیر نرمال‌شده‌ی یک بروزرسانی که یک بار ساخته و بین فیلترها،
+میان‌افزارها و هندلرها به اشتراک گذاشته می‌شود
+"""
+from contextvars import ContextVar
+from typing import Any, Optional
+
+from core.account_context import get_current_account
+
+# پیشوندهای دستور (مطابق دستورات ثبت شده‌ی پلاگین‌ها)
+COMMAND_PREFIXES = ('.', '/', '!')
+
+
+class ChatTypeMask:
+    """
+    بیت‌های نوع چت برای فیلترهای کامپایل شده
+    """
+    PRIVATE = 1
+    BOT = 2
+    GROUP = 4
+    SUPERGROUP = 8
+    CHANNEL = 16
+    ALL = PRIVATE | BOT | GROUP | SUPERGROUP | CHANNEL
+
+
+class DirectionMask:
+    """
+    بیت‌های جهت پیام برای فیلترهای کامپایل شده
+    """
+    INCOMING = 1
+    OUTGOING = 2
+    ALL = INCOMING | OUTGOING
+
+
+# نگاشت نوع چت بروزرسانی به بیت
+CHAT_TYPE_BITS = {
+    'private': ChatTypeMask.PRIVATE,
+    'bot': ChatTypeMask.BOT,
+    'group': ChatTypeMask.GROUP,
+    'supergroup': ChatTypeMask.SUPERGROUP,
+    'channel': ChatTypeMask.CHANNEL,
+}
+
+
+def _get_attr(obj: Any, *names: str) -> Any:
+    """
+    دریافت اولین ویژگی موجود از یک شیء
+
+    Args:
+        obj: شیء
+        *names: نام ویژگی‌ها (به ترتیب اولویت)
+
+    Returns:
+        Any: مقدار ویژگی یا None
+    """
+    for name in names:
+        value = getattr(obj, name, None)
+        if value is not None:
+            return value
+    return None
+
+
+def _media_kind(update: Any) -> Optional[str]:
+    """
+    تعیین نوع رسانه‌ی پیام
+
+    Args:
+        update: بروزرسانی
+
+    Returns:
+        Optional[str]: نوع رسانه (photo, video, document, ...) یا None
+    """
+    media = getattr(update, 'media', None)
+    if not media:
+        return None
+
+    # Pyrogram: MessageMediaType.PHOTO - Telethon: MessageMediaPhoto
+    value = getattr(media, 'value', None)
+    if isinstance(value, str):
+        return value.lower()
+    name = type(media).__name__
+    if name.startswith('MessageMedia'):
+        name = name[len('MessageMedia'):]
+    return name.lower()
+
+
+class EventEnvelope:
+    """
+    مقادیر نرمال‌شده‌ی یک بروزرسانی
+
+    برای هر بروزرسانی یک بار ساخته می‌شود تا میان‌افزارها و هندلرها شناسه‌ها، متن
+    کوچک‌شده و توکن دستور را دوباره از شیء پیام استخراج نکنند.
+    """
+    __slots__ = ('update', 'event_type', 'account_id', 'sender_id', 'chat_id', 'chat_type', 'direction',
+                 'text', 'text_lower', 'media_kind', 'command', 'command_prefix', 'command_args')
+
+    def __init__(self, update: Any, event_type: Optional[str], sender_id: Optional[int], chat_id: Optional[int],
+                 chat_type: int, direction: int, text: str, media_kind: Optional[str] = None):
+        self.update = update
+        self.event_type = event_type
+        # حساب دریافت کننده در اجرای چند حسابی
+        self.account_id = get_current_account()
+        self.sender_id = sender_id
+        self.chat_id = chat_id
+        self.chat_type = chat_type
+        self.direction = direction
+        self.text = text
+        self.text_lower = text.lower()
+        self.media_kind = media_kind
+
+        self.command = None
+        self.command_prefix = None
+        self.command_args = ""
+        if text and text[0] in COMMAND_PREFIXES:
+            parts = text[1:].split(None, 1)
+            if parts:
+                # حذف نام کاربری ربات از انتهای دستور (/help@bot)
+                self.command = parts[0].split('@', 1)[0].lower()
+                self.command_prefix = text[0]
+                self.command_args = parts[1] if len(parts) > 1 else ""
+
+    @property
+    def is_outgoing(self) -> bool:
+        """آیا پیام ارسالی است"""
+        return self.direction == DirectionMask.OUTGOING
+
+    @property
+    def has_media(self) -> bool:
+        """آیا پیام رسانه دارد"""
+        return self.media_kind is not None
+
+
+def build_envelope(update: Any, event_type: Optional[str] = None) -> EventEnvelope:
+    """
+    ساخت پاکت رویداد از بروزرسانی
+
+    Args:
+        update: بروزرسانی (پیام Pyrogram یا رویداد Telethon)
+        event_type: نوع رویداد
+
+    Returns:
+        EventEnvelope: پاکت رویداد
+    """
+    from_user = _get_attr(update, 'from_user')
+    sender_id = from_user.id if from_user else _get_attr(update, 'sender_id')
+
+    chat = _get_attr(update, 'chat')
+    chat_id = chat.id if chat else _get_attr(update, 'chat_id')
+
+    chat_type = 0
+    raw_type = _get_attr(chat, 'type') if chat else None
+    if raw_type is not None:
+        chat_type = CHAT_TYPE_BITS.get(str(getattr(raw_type, 'value', raw_type)).lower(), 0)
+    elif getattr(update, 'is_private', False):
+        chat_type = ChatTypeMask.PRIVATE
+    elif getattr(update, 'is_group', False):
+        chat_type = ChatTypeMask.GROUP
+    elif getattr(update, 'is_channel', False):
+        chat_type = ChatTypeMask.CHANNEL
+
+    outgoing = _get_attr(update, 'outgoing') or _get_attr(update, 'out')
+    direction = DirectionMask.OUTGOING if outgoing else DirectionMask.INCOMING
+
+    text = _get_attr(update, 'text', 'raw_text', 'caption') or ""
+    if not isinstance(text, str):
+        text = str(text)
+
+    return EventEnvelope(update, event_type, sender_id, chat_id, chat_type, direction, text, _media_kind(update))
+
+
+# پاکت آخرین بروزرسانی پردازش شده در task جاری
+_current_envelope: ContextVar[Optional[EventEnvelope]] = ContextVar('current_envelope', default=None)
+
+
+def get_envelope(update: Any, event_type: Optional[str] = None) -> EventEnvelope:
+    """
+    دریافت پاکت یک بروزرسانی؛ در صورت ساخته شدن قبلی در همین task دوباره ساخته نمی‌شود
+
+    Args:
+        update: بروزرسانی
+        event_type: نوع رویداد
+
+    Returns:
+        EventEnvelope: پاکت رویداد
+    """
+    envelope = _current_envelope.get()
+    if envelope is not None and envelope.update is update:
+        if envelope.event_type is None:
+            envelope.event_type = event_type
+        return envelope
+
+    envelope = build_envelope(update, event_type)
+    _current_envelope.set(envelope)
+    return envelope
+
+
+def set_current_envelope(envelope: EventEnvelope) -> None:
+    """
+    تنظیم پاکت ساخته شده در task دیگر (مثلاً هنگام انتقال رویداد به worker اجراکننده)
+
+    Args:
+        envelope: پاکت رویداد
+    """
+    _current_envelope.set(envelope)
@@ -0,0 +1,307 @@
+"""
+اجراکننده‌ی هندلرهای رویداد با صف‌های مرتب به ازای هر چت و کنترل فشار برگشتی
+"""
+import asyncio
+import logging
+import time
+from collections import deque
+from typing import Any, Awaitable, Callable, Deque, Dict, Hashable, List, Optional, Set
+
+logger = logging.getLogger(__name__)
+
+
+class OverflowPolicy:
+    """
+    سیاست‌های برخورد با پر شدن صف
+    """
+    DROP_OLDEST = "drop_oldest"  # حذف قدیمی‌ترین رویداد پرترافیک‌ترین چت
+    DROP_NEWEST = "drop_newest"  # رد رویداد جدید
+    BLOCK = "block"  # منتظر ماندن تا آزاد شدن ظرفیت صف
+
+    ALL = (DROP_OLDEST, DROP_NEWEST, BLOCK)
+
+
+class _Job:
+    """
+    یک کار در صف اجرا
+    """
+    __slots__ = ('func', 'args', 'enqueued_at')
+
+    def __init__(self, func: Callable[..., Awaitable[Any]], args: tuple, enqueued_at: float):
+        self.func = func
+        self.args = args
+        self.enqueued_at = enqueued_at
+
+
+class EventExecutor:
+    """
+    اجرای هندلرها با تعداد محدودی worker
+
+    رویدادهای هر چت به ترتیب ورود و یکی‌یکی اجرا می‌شوند و چت‌های مختلف به صورت
+    موازی پردازش می‌شوند. تعداد کل رویدادهای در انتظار به max_queue_size محدود است.
+    """
+
+    def __init__(self, workers: int = 8, max_queue_size: int = 1000,
+                 overflow_policy: str = OverflowPolicy.DROP_OLDEST):
+        """
+        مقداردهی اولیه
+
+        Args:
+            workers: تعداد worker ها
+            max_queue_size: حداکثر تعداد رویدادهای در انتظار
+            overflow_policy: سیاست پر شدن صف (drop_oldest, drop_newest, block)
+        """
+        if overflow_policy not in OverflowPolicy.ALL:
+            raise ValueError(f"سیاست صف نامعتبر: {overflow_policy}")
+
+        self.workers = max(1, int(workers))
+        self.max_queue_size = max(1, int(max_queue_size))
+        self.overflow_policy = overflow_policy
+
+        # صف رویدادهای هر چت و صف چت‌های آماده‌ی پردازش
+        self._chat_queues: Dict[Hashable, Deque[_Job]] = {}
+        self._ready: Deque[Hashable] = deque()
+        self._busy: Set[Hashable] = set()
+        self._pending = 0
+
+        self._tasks: List[asyncio.Task] = []
+        self._work_available: Optional[asyncio.Condition] = None
+        self._space_available: Optional[asyncio.Condition] = None
+        self._running = False
+
+        # آمار
+        self.stats = {
+            'submitted': 0,
+            'started': 0,
+            'processed': 0,
+            'failed': 0,
+            'dropped_oldest': 0,
+            'dropped_newest': 0,
+            'blocked': 0,
+            'max_depth': 0,
+            'last_lag': 0.0,
+            'max_lag': 0.0,
+            'total_lag': 0.0,
+        }
+
+    @property
+    def queue_depth(self) -> int:
+        """تعداد کل رویدادهای در انتظار"""
+        return self._pending
+
+    @property
+    def is_running(self) -> bool:
+        """وضعیت اجرای worker ها"""
+        return self._running
+
+    def start(self) -> None:
+        """
+        شروع worker ها در حلقه‌ی رویداد جاری
+        """
+        if self._running:
+            return
+
+        self._work_available = asyncio.Condition()
+        self._space_available = asyncio.Condition()
+        self._running = True
+        self._tasks = [
+            asyncio.create_task(self._worker(index), name=f"event_worker_{index}")
+            for index in range(self.workers)
+        ]
+        logger.info(f"اجراکننده‌ی رویداد با {self.workers} worker شروع شد")
+
+    async def stop(self, drain: bool = True, timeout: Optional[float] = 10.0) -> None:
+        """
+        توقف worker ها
+
+        Args:
+            drain: پردازش رویدادهای باقی‌مانده قبل از توقف
+            timeout: حداکثر زمان انتظار برای تخلیه‌ی صف (ثانیه)
+        """
+        if not self._running:
+            return
+
+        if drain:
+            try:
+                await asyncio.wait_for(self.join(), timeout)
+            except asyncio.TimeoutError:
+                logger.warning(f"تخلیه‌ی صف رویدادها در زمان مقرر کامل نشد ({self._pending} رویداد باقی ماند)")
+
+        self._running = False
+        async with self._space_available:
+            self._space_available.notify_all()
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+        self._chat_queues.clear()
+        self._ready.clear()
+        self._busy.clear()
+        self._pending = 0
+        logger.info("اجراکننده‌ی رویداد متوقف شد")
+
+    async def join(self) -> None:
+        """
+        انتظار تا خالی شدن صف و پایان کارهای در حال اجرا
+        """
+        async with self._space_available:
+            await self._space_available.wait_for(lambda: self._pending == 0 and not self._busy)
+
+    async def submit(self, chat_key: Hashable, func: Callable[..., Awaitable[Any]], *args) -> bool:
+        """
+        افزودن یک کار به صف چت
+
+        Args:
+            chat_key: کلید ترتیب (معمولاً شناسه چت)
+            func: تابع async برای اجرا
+            *args: آرگومان‌های تابع
+
+        Returns:
+            bool: آیا کار پذیرفته شد
+        """
+        if not self._running:
+            self.start()
+
+        self.stats['submitted'] += 1
+
+        if self._pending >= self.max_queue_size:
+            if self.overflow_policy == OverflowPolicy.DROP_NEWEST:
+                self.stats['dropped_newest'] += 1
+                logger.warning(f"صف رویدادها پر است، رویداد جدید چت {chat_key} رد شد")
+                return False
+
+            if self.overflow_policy == OverflowPolicy.DROP_OLDEST:
+                self._drop_oldest()
+            else:
+                self.stats['blocked'] += 1
+                async with self._space_available:
+                    await self._space_available.wait_for(
+                        lambda: self._pending < self.max_queue_size or not self._running
+                    )
+                if not self._running:
+                    return False
+
+        queue = self._chat_queues.get(chat_key)
+        if queue is None:
+            queue = self._chat_queues[chat_key] = deque()
+        queue.append(_Job(func, args, time.monotonic()))
+        self._pending += 1
+        if self._pending > self.stats['max_depth']:
+            self.stats['max_depth'] = self._pending
+
+        # چتی که در حال پردازش است پس از اتمام کار جاری دوباره در صف آماده قرار می‌گیرد
+        if len(queue) == 1 and chat_key not in self._busy:
+            async with self._work_available:
+                self._ready.append(chat_key)
+                self._work_available.notify()
+
+        return True
+
+    def _drop_oldest(self) -> None:
+        """
+        حذف قدیمی‌ترین رویداد از پرترافیک‌ترین چت
+        """
+        chat_key = max(self._chat_queues, key=lambda key: len(self._chat_queues[key]), default=None)
+        if chat_key is None:
+            return
+
+        queue = self._chat_queues[chat_key]
+        queue.popleft()
+        self._pending -= 1
+        self.stats['dropped_oldest'] += 1
+        logger.warning(f"صف رویدادها پر است، قدیمی‌ترین رویداد چت {chat_key} حذف شد")
+
+        if not queue:
+            del self._chat_queues[chat_key]
+            if chat_key in self._ready:
+                self._ready.remove(chat_key)
+
+    async def _worker(self, index: int) -> None:
+        """
+        حلقه‌ی یک worker
+
+        Args:
+            index: شماره worker
+        """
+        while True:
+            async with self._work_available:
+                await self._work_available.wait_for(lambda: bool(self._ready))
+                chat_key = self._ready.popleft()
+
+            queue = self._chat_queues.get(chat_key)
+            if not queue:
+                continue
+
+            job = queue.popleft()
+            self._pending -= 1
+            self._busy.add(chat_key)
+
+            self.stats['started'] += 1
+            lag = time.monotonic() - job.enqueued_at
+            self.stats['last_lag'] = lag
+            self.stats['total_lag'] += lag
+            if lag > self.stats['max_lag']:
+                self.stats['max_lag'] = lag
+
+            async with self._space_available:
+                self._space_available.notify_all()
+
+            try:
+                await job.func(*job.args)
+                self.stats['processed'] += 1
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self.stats['failed'] += 1
+                logger.error(f"خطا در اجرای رویداد چت {chat_key} در worker {index}: {str(e)}")
+            finally:
+                self._busy.discard(chat_key)
+
+            # ادامه‌ی پردازش چت در انتهای صف آماده برای رعایت عدالت بین چت‌ها
+            queue = self._chat_queues.get(chat_key)
+            if queue:
+                async with self._work_available:
+                    self._ready.append(chat_key)
+                    self._work_available.notify()
+            elif queue is not None:
+                del self._chat_queues[chat_key]
+
+            if not self._pending and not self._busy:
+                async with self._space_available:
+                    self._space_available.notify_all()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        دریافت آمار صف و تأخیر
+
+        Returns:
+            Dict[str, Any]: آمار اجراکننده
+        """
+        started = self.stats['started']
+        chat_depths = [len(queue) for queue in self._chat_queues.values()]
+        return {
+            'workers': self.workers,
+            'running': self._running,
+            'overflow_policy': self.overflow_policy,
+            'max_queue_size': self.max_queue_size,
+            'queue_depth': self._pending,
+            'active_chats': len(self._chat_queues),
+            'busy_workers': len(self._busy),
+            'max_chat_depth': max(chat_depths, default=0),
+            'oldest_lag': self._oldest_lag(),
+            'avg_lag': self.stats['total_lag'] / started if started else 0.0,
+            **self.stats,
+        }
+
+    def _oldest_lag(self) -> float:
+        """
+        محاسبه‌ی زمان انتظار قدیمی‌ترین رویداد در صف
+
+        Returns:
+            float: زمان انتظار (ثانیه)
+        """
+        heads = [queue[0].enqueued_at for queue in self._chat_queues.values() if queue]
+        if not heads:
+            return 0.0
+        return time.monotonic() - min(heads)
@@ -1,25 +1,29 @@
 """
 سیستم پردازش رویدادهای تلگرام با پشتیبانی از میان‌افزارها
 """
-import asyncio
-import inspect
 import logging
-from typing import Any, Callable, Dict, List, Optional, Set, Tuple, Union
+import os
+import random
+import time
+from contextvars import ContextVar
+from typing import Any, Callable, Dict, List, Optional, Set
 from functools import wraps
 
+from core.account_context import set_current_account
 from core.client import TelegramClient, ClientType
+from core.event_coalescer import EditCoalescer, edit_key
+from core.event_executor import EventExecutor, OverflowPolicy
+from core.event_envelope import EventEnvelope, get_envelope, set_current_envelope
+from core.event_router import EventRouter, StopPropagation, compile_filters
+from core.logger import parse_sample_rates
+from core.metrics import get_metrics
+from core.rate_limiter import GCRALimiter, RateLimitKey, RedisGCRALimiter, build_rate_limit_key
 
-# تنظیم سیستم لاگینگ
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.FileHandler("data/logs/event_handler.log"),
-        logging.StreamHandler()
-    ]
-)
 logger = logging.getLogger(__name__)
 
+# زمان شروع رویداد نمونه‌برداری شده در LoggingMiddleware (before_event و after_event یک رویداد در یک task اجرا می‌شوند)
+_log_context: ContextVar[Optional[float]] = ContextVar('event_log_started', default=None)
+
 
 class EventType:
     """
@@ -38,6 +42,14 @@ class EventType:
     RAW = "raw"  # برای رویدادهای خام
 
 
+class DispatchMode:
+    """
+    حالت‌های پخش رویداد
+    """
+    PER_HANDLER = "per_handler"  # یک هندلر در کلاینت برای هر callback پلاگین
+    ROUTER = "router"  # یک هندلر در کلاینت برای هر نوع رویداد
+
+
 class EventFilter:
     """
     فیلترهای رویداد
@@ -97,8 +109,9 @@ class EventFilter:
             return combined_filter or filters.all
 
         elif client_type == ClientType.TELETHON:
-            # برای تلتون از پارامترها برای فیلتر در زمان فراخوانی استفاده می‌کنیم
-            return kwargs
+            # برای تلتون فیلتر کامپایل شده به صورت پارامتر func به سازنده‌ی رویداد داده می‌شود
+            compiled = compile_filters(kwargs)
+            return {'func': lambda event: compiled.matches(get_envelope(event))}
 
         return lambda *args, **kwargs: True
 
@@ -107,6 +120,20 @@ class Middleware:
     """
     کلاس پایه برای میان‌افزارها
     """
+    @staticmethod
+    def envelope(event: Any, event_type: Optional[str] = None) -> EventEnvelope:
+        """
+        دریافت پاکت رویداد (شناسه‌ها، متن و توکن دستور) بدون استخراج دوباره از رویداد
+
+        Args:
+            event: رویداد
+            event_type: نوع رویداد
+
+        Returns:
+            EventEnvelope: پاکت رویداد
+        """
+        return get_envelope(event, event_type)
+
     async def before_event(self, client: Any, event: Any, event_type: str) -> bool:
         """
         پردازش قبل از رویداد
@@ -156,6 +183,25 @@ class EventHandler:
         self.handlers: Dict[str, List[Dict[str, Any]]] = {}
         self.middlewares: List[Middleware] = []
         self.telegram_client: Optional[TelegramClient] = None
+        # کلاینت‌های متصل به ازای شناسه حساب (کلید None برای اجرای تک حسابی)
+        self.clients: Dict[Optional[str], TelegramClient] = {}
+        self.dispatch_mode = os.getenv("EVENT_DISPATCH_MODE", DispatchMode.PER_HANDLER)
+        self.router = EventRouter()
+        self._router_attached: Dict[Optional[str], Set[str]] = {}
+        # ثبت‌های انجام شده در کلاینت هر حساب (برای حذف از کلاینت)
+        self._attached: Dict[Optional[str], List[Dict[str, Any]]] = {}
+
+        # اجرای هندلرها در worker ها (EVENT_WORKERS=0 یعنی اجرای مستقیم در callback کلاینت)
+        self.executor: Optional[EventExecutor] = None
+        self.configure_executor(
+            workers=int(os.getenv("EVENT_WORKERS", "0")),
+            max_queue_size=int(os.getenv("EVENT_QUEUE_SIZE", "1000")),
+            overflow_policy=os.getenv("EVENT_OVERFLOW_POLICY", OverflowPolicy.DROP_OLDEST)
+        )
+
+        # ادغام ویرایش‌های پیاپی یک پیام (EVENT_EDIT_COALESCE_WINDOW=0 یعنی غیرفعال)
+        self.coalescer: Optional[EditCoalescer] = None
+        self.configure_edit_coalescing(float(os.getenv("EVENT_EDIT_COALESCE_WINDOW", "0")))
 
     def set_client(self, client: TelegramClient):
         """
@@ -165,6 +211,66 @@ class EventHandler:
             client: کلاینت تلگرام
         """
         self.telegram_client = client
+        self.clients = {None: client} if client else {}
+        self._router_attached = {}
+        self._attached = {}
+
+        # در حالت مسیریاب، هندلرهای ثبت شده پیش از تنظیم کلاینت نیز متصل می‌شوند
+        if client and self.dispatch_mode == DispatchMode.ROUTER:
+            for event_type in self.router.event_types():
+                self._attach_router(event_type)
+
+    def add_client(self, account_id: str, client: TelegramClient):
+        """
+        افزودن کلاینت یک حساب در اجرای چند حسابی
+
+        تمام هندلرهای ثبت شده (در هر دو حالت پخش) روی کلاینت جدید نیز ثبت می‌شوند و
+        بروزرسانی‌های آن با شناسه‌ی حساب برچسب می‌خورند.
+
+        Args:
+            account_id: شناسه حساب
+            client: کلاینت متصل تلگرام
+        """
+        if account_id in self.clients:
+            logger.warning(f"کلاینت حساب {account_id} قبلاً اضافه شده است")
+            return
+
+        self.clients[account_id] = client
+        if self.telegram_client is None:
+            self.telegram_client = client
+
+        if self.dispatch_mode == DispatchMode.ROUTER:
+            for event_type in self.router.event_types():
+                self._attach_router(event_type, account_id)
+        else:
+            for event_type, configs in self.handlers.items():
+                for config in configs:
+                    self._attach_handler(event_type, config['handler'], config['filters'],
+                                         config['coalesce'], account_id)
+
+    def remove_client(self, account_id: str) -> bool:
+        """
+        حذف کلاینت یک حساب و هندلرهای ثبت شده در آن (کلاینت باید جداگانه قطع شود)
+
+        Args:
+            account_id: شناسه حساب
+
+        Returns:
+            bool: وضعیت حذف
+        """
+        client = self.clients.get(account_id)
+        if client is None:
+            return False
+
+        # حذف هندلرهای ثبت شده در کلاینت تا بروزرسانی‌های بعدی آن پردازش نشوند
+        for attachment in self._attached.pop(account_id, []):
+            self._detach_callback(client, attachment)
+        del self.clients[account_id]
+
+        self._router_attached.pop(account_id, None)
+        if self.telegram_client is client:
+            self.telegram_client = next(iter(self.clients.values()), None)
+        return True
 
     def register_middleware(self, middleware: Middleware):
         """
@@ -185,10 +291,147 @@ class EventHandler:
         if middleware in self.middlewares:
             self.middlewares.remove(middleware)
 
-    def register_handler(self, event_type: str, handler: Callable, filters: Optional[Dict[str, Any]] = None) \
-        \ \
-        \ \
-        : \
+    def set_dispatch_mode(self, mode: str) -> bool:
+        """
+        تنظیم حالت پخش رویدادها
+
+        حالت باید قبل از ثبت هندلرها در کلاینت تنظیم شود.
+
+        Args:
+            mode: حالت پخش (per_handler یا router)
+
+        Returns:
+            bool: وضعیت تنظیم
+        """
+        if mode not in (DispatchMode.PER_HANDLER, DispatchMode.ROUTER):
+            logger.error(f"حالت پخش نامعتبر: {mode}")
+            return False
+
+        if self.clients and any(self.handlers.values()):
+            logger.error("تغییر حالت پخش پس از ثبت هندلرها در کلاینت امکان‌پذیر نیست")
+            return False
+
+        self.dispatch_mode = mode
+        return True
+
+    def configure_executor(self, workers: int, max_queue_size: int = 1000,
+                           overflow_policy: str = OverflowPolicy.DROP_OLDEST) -> bool:
+        """
+        تنظیم اجراکننده‌ی هندلرها
+
+        رویدادهای هر چت به ترتیب و چت‌های مختلف به صورت موازی اجرا می‌شوند.
+        اجراکننده باید قبل از شروع دریافت رویدادها تنظیم شود.
+
+        Args:
+            workers: تعداد worker ها (صفر برای اجرای مستقیم)
+            max_queue_size: حداکثر تعداد رویدادهای در انتظار
+            overflow_policy: سیاست پر شدن صف (drop_oldest, drop_newest, block)
+
+        Returns:
+            bool: وضعیت تنظیم
+        """
+        if self.executor and self.executor.is_running:
+            logger.error("تغییر اجراکننده در حین اجرا امکان‌پذیر نیست")
+            return False
+
+        if workers <= 0:
+            self.executor = None
+            get_metrics().unregister_collector('event_executor')
+            return True
+
+        try:
+            self.executor = EventExecutor(workers, max_queue_size, overflow_policy)
+        except ValueError as e:
+            logger.error(f"خطا در تنظیم اجراکننده‌ی رویداد: {str(e)}")
+            self.executor = None
+            return False
+
+        get_metrics().register_collector('event_executor', self.get_executor_stats)
+        return True
+
+    def configure_edit_coalescing(self, window: float) -> bool:
+        """
+        تنظیم ادغام ویرایش‌های پیاپی یک پیام
+
+        برای هر (chat_id, message_id) فقط آخرین ویرایش درون پنجره به هندلرهای
+        EDITED_MESSAGE ارسال می‌شود. هندلرهایی که با coalesce=False ثبت شده‌اند
+        همچنان تمام ویرایش‌ها را دریافت می‌کنند. در هر دو حالت ارسال، میان‌افزارها برای
+        تمام ویرایش‌ها اجرا می‌شوند و فقط هندلرها ادغام می‌شوند. باید قبل از تنظیم کلاینت
+        فراخوانی شود.
+
+        Args:
+            window: طول پنجره‌ی ادغام (ثانیه، صفر برای غیرفعال کردن)
+
+        Returns:
+            bool: وضعیت تنظیم
+        """
+        if self.clients and self.handlers.get(EventType.EDITED_MESSAGE):
+            logger.error("تغییر ادغام ویرایش‌ها پس از ثبت هندلرها در کلاینت امکان‌پذیر نیست")
+            return False
+
+        if window <= 0:
+            self.coalescer = None
+            get_metrics().unregister_collector('edit_coalescer')
+            return True
+
+        self.coalescer = EditCoalescer(window)
+        get_metrics().register_collector('edit_coalescer', self.coalescer.get_stats)
+        return True
+
+    async def shutdown(self, timeout: float = 10.0):
+        """
+        ارسال ویرایش‌های در انتظار، توقف اجراکننده و پردازش رویدادهای باقی‌مانده
+
+        Args:
+            timeout: حداکثر زمان انتظار برای تخلیه‌ی صف (ثانیه)
+        """
+        if self.coalescer:
+            await self.coalescer.flush_all()
+
+        if self.executor:
+            await self.executor.stop(drain=True, timeout=timeout)
+
+    def get_executor_stats(self) -> Optional[Dict[str, Any]]:
+        """
+        دریافت آمار صف و تأخیر اجراکننده
+
+        Returns:
+            Optional[Dict[str, Any]]: آمار یا None در حالت اجرای مستقیم
+        """
+        return self.executor.get_stats() if self.executor else None
+
+    def _schedule(self, process: Callable) -> Callable:
+        """
+        قرار دادن callback کلاینت در صف چت مربوطه در صورت فعال بودن اجراکننده
+
+        Args:
+            process: تابع پردازش بروزرسانی
+
+        Returns:
+            Callable: callback نهایی برای ثبت در کلاینت
+        """
+        executor = self.executor
+        if executor is None:
+            return process
+
+        # پاکت ساخته شده برای کلید صف به worker منتقل می‌شود تا دوباره ساخته نشود
+        async def run(envelope, *args):
+            set_current_envelope(envelope)
+            set_current_account(envelope.account_id)
+            return await process(*args)
+
+        @wraps(process)
+        async def scheduled(*args):
+            envelope = get_envelope(args[-1])
+            chat_key = envelope.chat_id if envelope.chat_id is not None else envelope.sender_id
+            if envelope.account_id is not None:
+                chat_key = (envelope.account_id, chat_key)
+            await executor.submit(chat_key, run, envelope, *args)
+
+        return scheduled
+
+    def register_handler(self, event_type: str, handler: Callable, filters: Optional[Dict[str, Any]] = None,
+                         order: int = 0, coalesce: bool = True) -> str:
         """
         ثبت هندلر برای رویداد
 
@@ -196,229 +439,547 @@ class EventHandler:
             event_type: نوع رویداد
             handler: تابع پردازش
             filters: فیلترها
+            order: ترتیب اجرا در حالت مسیریاب (مقدار کمتر زودتر اجرا می‌شود)
+            coalesce: دریافت ویرایش‌های ادغام شده در صورت فعال بودن ادغام (False برای دریافت تمام ویرایش‌ها)
+
+        Returns:
+            str: شناسه هندلر
         """
         if event_type not in self.handlers:
             self.handlers[event_type] = []
 
+        handler_id = self.router.add_handler(event_type, handler, filters, order, coalesce=coalesce)
+
         handler_config = {
+            'id': handler_id,
             'handler': handler,
-            'filters': filters or {}
+            'filters': filters or {},
+            'order': order,
+            'coalesce': coalesce
         }
 
         self.handlers[event_type].append(handler_config)
 
-        # اگر کلاینت تلگرام ست شده باشد، هندلر را به آن اضافه می‌کنیم
-        if self.telegram_client:
-            client_type = self.telegram_client.client_type
-
-            if client_type == ClientType.PYROGRAM:
-                if event_type == EventType.MESSAGE:
-                    filter_obj = EventFilter.create_filter(client_type, **filters) \
-                        if filters else None \
-                    self.telegram_client.client.on_message(filter_obj) \
-                        (self._create_pyrogram_wrapper(handler)) \
-                elif event_type == EventType.EDITED_MESSAGE:
-                    filter_obj = EventFilter.create_filter(client_type, **filters) \
-                        if filters else None \
-                    self.telegram_client.client.on_edited_message(filter_obj) \
-                        (self._create_pyrogram_wrapper(handler)) \
-                elif event_type == EventType.CALLBACK_QUERY:
-                    filter_obj = EventFilter.create_filter(client_type, **filters) \
-                        if filters else None \
-                    self.telegram_client.client.on_callback_query(filter_obj) \
-                        (self._create_pyrogram_wrapper(handler)) \
-                elif event_type == EventType.INLINE_QUERY:
-                    filter_obj = EventFilter.create_filter(client_type, **filters) \
-                        if filters else None \
-                    self.telegram_client.client.on_inline_query(filter_obj) \
-                        (self._create_pyrogram_wrapper(handler)) \
-                elif event_type == EventType.RAW:
-                    self.telegram_client.client.on_raw_update() \
-                        (self._create_pyrogram_wrapper(handler)) \
-
-            elif client_type == ClientType.TELETHON:
-                from telethon import events
-                if event_type == EventType.MESSAGE:
-                    self.telegram_client.client.add_event_handler(
-                        self._create_telethon_wrapper(handler),
-                        events.NewMessage(**filters) if filters else events.NewMessage()
-                    )
-                elif event_type == EventType.EDITED_MESSAGE:
-                    self.telegram_client.client.add_event_handler(
-                        self._create_telethon_wrapper(handler),
-                        events.MessageEdited(**filters) if filters else events.MessageEdited()
-                    )
-                elif event_type == EventType.CALLBACK_QUERY:
-                    self.telegram_client.client.add_event_handler(
-                        self._create_telethon_wrapper(handler),
-                        events.CallbackQuery(**filters) if filters else events.CallbackQuery()
-                    )
-                elif event_type == EventType.INLINE_QUERY:
-                    self.telegram_client.client.add_event_handler(
-                        self._create_telethon_wrapper(handler),
-                        events.InlineQuery(**filters) if filters else events.InlineQuery()
-                    )
-                elif event_type == EventType.RAW:
-                    self.telegram_client.client.add_event_handler(
-                        self._create_telethon_wrapper(handler),
-                        events.Raw()
-                    )
-
-    def _create_pyrogram_wrapper(self, handler: Callable) -> Callable:
+        # اگر کلاینت تلگرام ست شده باشد، هندلر را به کلاینت تمام حساب‌ها اضافه می‌کنیم
+        for account_id in list(self.clients):
+            if self.dispatch_mode == DispatchMode.ROUTER:
+                self._attach_router(event_type, account_id)
+            else:
+                self._attach_handler(event_type, handler, filters, coalesce, account_id)
+
+        return handler_id
+
+    def remove_handler(self, event_type: str, handler: Callable) -> bool:
+        """
+        حذف هندلر از جدول مسیریاب و در حالت per_handler از کلاینت تمام حساب‌ها
+
+        Args:
+            event_type: نوع رویداد
+            handler: تابع پردازش
+
+        Returns:
+            bool: وضعیت حذف
+        """
+        handler_ids = self.router.find_handler_ids(event_type, handler)
+        for handler_id in handler_ids:
+            self.router.remove_handler(handler_id)
+
+        if event_type in self.handlers:
+            self.handlers[event_type] = [
+                config for config in self.handlers[event_type] if config['handler'] != handler
+            ]
+
+        # در حالت per_handler هر هندلر جداگانه در کلاینت ثبت شده است
+        for account_id, attachments in self._attached.items():
+            kept = []
+            for attachment in attachments:
+                if attachment['handler'] == handler and attachment['event_type'] == event_type:
+                    self._detach_callback(self.clients[account_id], attachment)
+                else:
+                    kept.append(attachment)
+            attachments[:] = kept
+
+        return bool(handler_ids)
+
+    def update_handler_filters(self, event_type: str, handler: Callable, filters: Optional[Dict[str, Any]]) -> bool:
+        """
+        بروزرسانی فیلترهای یک هندلر ثبت شده
+
+        فقط در حالت مسیریاب اثر دارد؛ فیلترهای ثبت شده در کلاینت در حالت per_handler ثابت هستند.
+
+        Args:
+            event_type: نوع رویداد
+            handler: تابع پردازش
+            filters: فیلترهای جدید
+
+        Returns:
+            bool: وضعیت بروزرسانی
+        """
+        handler_ids = self.router.find_handler_ids(event_type, handler)
+        for handler_id in handler_ids:
+            self.router.update_filters(handler_id, filters)
+
+        for config in self.handlers.get(event_type, []):
+            if config['handler'] == handler:
+                config['filters'] = filters or {}
+
+        return bool(handler_ids) and self.dispatch_mode == DispatchMode.ROUTER
+
+    def _attach_router(self, event_type: str, account_id: Optional[str] = None):
+        """
+        ثبت یک هندلر واحد مسیریاب در کلاینت برای نوع رویداد
+
+        Args:
+            event_type: نوع رویداد
+            account_id: شناسه حساب (None برای اجرای تک حسابی)
+        """
+        attached = self._router_attached.setdefault(account_id, set())
+        if event_type in attached:
+            return
+
+        if self.clients[account_id].client_type == ClientType.PYROGRAM:
+            create_dispatcher = self._create_pyrogram_dispatcher
+        else:
+            create_dispatcher = self._create_telethon_dispatcher
+
+        defer = None
+        if event_type == EventType.EDITED_MESSAGE and self.coalescer:
+            # میان‌افزارها و هندلرهای بدون ادغام برای هر ویرایش فوراً اجرا می‌شوند و بقیه‌ی
+            # هندلرها فقط آخرین ویرایش پنجره را (بدون اجرای دوباره‌ی میان‌افزارها) دریافت می‌کنند
+            defer = self._create_deferred_dispatch(('router', account_id))
+        callback = self._schedule(create_dispatcher(event_type, defer=defer))
+
+        if self._attach_callback(event_type, callback, None, account_id):
+            attached.add(event_type)
+
+    def _attach_handler(self, event_type: str, handler: Callable, filters: Optional[Dict[str, Any]],
+                        coalesce: bool = True, account_id: Optional[str] = None):
+        """
+        ثبت هندلر به صورت مستقل در کلاینت (حالت per_handler)
+
+        Args:
+            event_type: نوع رویداد
+            handler: تابع پردازش
+            filters: فیلترها
+            coalesce: دریافت ویرایش‌های ادغام شده
+            account_id: شناسه حساب (None برای اجرای تک حسابی)
+        """
+        # مانند حالت router، میان‌افزارها برای هر ویرایش اجرا می‌شوند و فقط خود هندلر ادغام می‌شود
+        coalesce = event_type == EventType.EDITED_MESSAGE and self.coalescer is not None and coalesce
+        if self.clients[account_id].client_type == ClientType.PYROGRAM:
+            callback = self._create_pyrogram_wrapper(handler, event_type, coalesce)
+        else:
+            callback = self._create_telethon_wrapper(handler, event_type, coalesce)
+
+        self._attach_callback(event_type, self._schedule(callback), filters, account_id, handler)
+
+    def _attach_callback(self, event_type: str, callback: Callable, filters: Optional[Dict[str, Any]],
+                         account_id: Optional[str] = None, handler: Optional[Callable] = None) -> bool:
+        """
+        ثبت callback در کلاینت تلگرام بر اساس نوع رویداد
+
+        شیء ثبت شده در کلاینت نگهداری می‌شود تا با remove_client یا remove_handler حذف شود.
+
+        Args:
+            event_type: نوع رویداد
+            callback: تابع ثبت شونده
+            filters: فیلترها
+            account_id: شناسه حساب (None برای اجرای تک حسابی)
+            handler: هندلر اصلی (None برای هندلر واحد مسیریاب)
+
+        Returns:
+            bool: آیا callback ثبت شد
+        """
+        telegram_client = self.clients[account_id]
+        client_type = telegram_client.client_type
+        client = telegram_client.client
+        if account_id is not None:
+            callback = self._bind_account(account_id, callback)
+
+        if client_type == ClientType.PYROGRAM:
+            from pyrogram import handlers
+
+            filter_obj = EventFilter.create_filter(client_type, **filters) if filters else None
+
+            if event_type == EventType.MESSAGE:
+                client_handler = handlers.MessageHandler(callback, filter_obj)
+            elif event_type == EventType.EDITED_MESSAGE:
+                client_handler = handlers.EditedMessageHandler(callback, filter_obj)
+            elif event_type == EventType.CALLBACK_QUERY:
+                client_handler = handlers.CallbackQueryHandler(callback, filter_obj)
+            elif event_type == EventType.INLINE_QUERY:
+                client_handler = handlers.InlineQueryHandler(callback, filter_obj)
+            elif event_type == EventType.RAW:
+                client_handler = handlers.RawUpdateHandler(callback)
+            else:
+                return False
+
+            handle = client.add_handler(client_handler)
+
+        elif client_type == ClientType.TELETHON:
+            from telethon import events
+
+            event_kwargs = EventFilter.create_filter(client_type, **filters) if filters else {}
+
+            if event_type == EventType.MESSAGE:
+                event_builder = events.NewMessage(**event_kwargs)
+            elif event_type == EventType.EDITED_MESSAGE:
+                event_builder = events.MessageEdited(**event_kwargs)
+            elif event_type == EventType.CALLBACK_QUERY:
+                event_builder = events.CallbackQuery(**event_kwargs)
+            elif event_type == EventType.INLINE_QUERY:
+                event_builder = events.InlineQuery(**event_kwargs)
+            elif event_type == EventType.RAW:
+                event_builder = events.Raw()
+            else:
+                return False
+
+            client.add_event_handler(callback, event_builder)
+            handle = (callback, event_builder)
+
+        else:
+            return False
+
+        self._attached.setdefault(account_id, []).append({
+            'event_type': event_type,
+            'handler': handler,
+            'handle': handle
+        })
+        return True
+
+    @staticmethod
+    def _detach_callback(telegram_client: TelegramClient, attachment: Dict[str, Any]) -> None:
+        """
+        حذف یک callback ثبت شده از کلاینت تلگرام
+
+        Args:
+            telegram_client: کلاینت تلگرام
+            attachment: ثبت انجام شده در _attach_callback
+        """
+        client = telegram_client.client
+        try:
+            if telegram_client.client_type == ClientType.PYROGRAM:
+                client.remove_handler(*attachment['handle'])
+            else:
+                client.remove_event_handler(*attachment['handle'])
+        except Exception as e:
+            logger.error(f"خطا در حذف هندلر {attachment['event_type']} از کلاینت: {str(e)}")
+
+    @staticmethod
+    def _bind_account(account_id: str, callback: Callable) -> Callable:
+        """
+        برچسب زدن بروزرسانی‌های یک کلاینت با شناسه‌ی حساب
+
+        Args:
+            account_id: شناسه حساب
+            callback: callback کلاینت
+
+        Returns:
+            Callable: callback برچسب زننده
+        """
+        @wraps(callback)
+        async def bound(*args):
+            set_current_account(account_id)
+            # پاکت ممکن است پیش‌تر توسط فیلتر Telethon و بدون حساب ساخته شده باشد
+            get_envelope(args[-1]).account_id = account_id
+            return await callback(*args)
+
+        return bound
+
+    def _create_deferred_dispatch(self, namespace: Any) -> Callable:
+        """
+        ساخت تابع سپردن هندلرهای ادغامی یک ویرایش به ادغام کننده
+
+        هندلرها با آخرین ویرایش هر پیام در پایان پنجره اجرا می‌شوند؛ میان‌افزارها پیش‌تر
+        برای هر ویرایش در dispatch اجرا شده‌اند.
+
+        Args:
+            namespace: پیشوند کلید ادغام
+
+        Returns:
+            Callable: تابع async با پارامترهای (entries, *handler_args)
+        """
+        router = self.router
+        coalescer = self.coalescer
+
+        async def run(entries, *handler_args):
+            await router.run_handlers(entries, handler_args)
+
+        scheduled = self._schedule(run)
+
+        async def defer(entries, *handler_args):
+            key = edit_key(handler_args[-1])
+            if key is None:
+                # بدون کلید ادغام، هندلرها در همین نوبت اجرا می‌شوند
+                await run(entries, *handler_args)
+                return
+            coalescer.submit((namespace, key), scheduled, entries, *handler_args)
+
+        return defer
+
+    def _create_deferred_handler(self, invoke: Callable) -> Callable:
+        """
+        ساخت تابع سپردن اجرای یک هندلر per_handler به ادغام کننده
+
+        هندلر با آخرین ویرایش هر پیام در پایان پنجره اجرا می‌شود؛ میان‌افزارها پیش‌تر
+        برای هر ویرایش در wrapper اجرا شده‌اند.
+
+        Args:
+            invoke: تابع async اجرای هندلر (بدون میان‌افزار)
+
+        Returns:
+            Callable: تابع async با پارامترهای هندلر
+        """
+        coalescer = self.coalescer
+        scheduled = self._schedule(invoke)
+
+        async def defer(*handler_args):
+            key = edit_key(handler_args[-1])
+            if key is None:
+                # بدون کلید ادغام، هندلر در همین نوبت اجرا می‌شود
+                return await invoke(*handler_args)
+            coalescer.submit((id(invoke), key), scheduled, *handler_args)
+
+        return defer
+
+    def _create_pyrogram_dispatcher(self, event_type: str, coalesce: Optional[bool] = None,
+                                  defer: Optional[Callable] = None) -> Callable:
+        """
+        ساخت هندلر واحد مسیریاب برای Pyrogram
+
+        Args:
+            event_type: نوع رویداد
+            coalesce: فقط هندلرهای با این تنظیم ادغام ویرایش (None برای همه)
+            defer: سپردن هندلرهای ادغامی به ادغام کننده‌ی ویرایش (_create_deferred_dispatch)
+
+        Returns:
+            Callable: هندلر مسیریاب
+        """
+        router = self.router
+        middlewares = self.middlewares
+
+        async def dispatcher(client, update):
+            return await router.dispatch(client, update, event_type, middlewares, (client, update), coalesce, defer)
+
+        return dispatcher
+
+    def _create_telethon_dispatcher(self, event_type: str, coalesce: Optional[bool] = None,
+                                  defer: Optional[Callable] = None) -> Callable:
+        """
+        ساخت هندلر واحد مسیریاب برای Telethon
+
+        Args:
+            event_type: نوع رویداد
+            coalesce: فقط هندلرهای با این تنظیم ادغام ویرایش (None برای همه)
+            defer: سپردن هندلرهای ادغامی به ادغام کننده‌ی ویرایش (_create_deferred_dispatch)
+
+        Returns:
+            Callable: هندلر مسیریاب
+        """
+        router = self.router
+        middlewares = self.middlewares
+
+        async def dispatcher(event):
+            return await router.dispatch(event.client, event, event_type, middlewares, (event,), coalesce, defer)
+
+        return dispatcher
+
+    def _create_pyrogram_wrapper(self, handler: Callable, event_type: str, coalesce: bool = False) -> Callable:
         """
         ساخت wrapper برای هندلر Pyrogram
 
         Args:
             handler: تابع پردازش
+            event_type: نوع رویداد (در زمان ثبت مشخص است)
+            coalesce: سپردن اجرای هندلر به ادغام کننده‌ی ویرایش پس از میان‌افزارهای قبل از رویداد
 
         Returns:
             Callable: wrapper
         """
         middlewares = self.middlewares
+        metrics = get_metrics()
+        handler_metrics = metrics.for_handler(handler)
+
+        async def invoke(client, update):
+            started = time.perf_counter()
+            try:
+                result = await handler(client, update)
+                handler_metrics.observe(time.perf_counter() - started)
+            except StopPropagation:
+                handler_metrics.observe(time.perf_counter() - started)
+                result = None
+            except Exception as e:
+                handler_metrics.observe(time.perf_counter() - started, True)
+                logger.error(f"خطا در اجرای هندلر: {str(e)}")
+                result = None
+            return result
+
+        run_handler = self._create_deferred_handler(invoke) if coalesce else invoke
 
         @wraps(handler)
         async def wrapper(client, update):
-            # تعیین نوع رویداد
-            event_type = EventType.MESSAGE
-            if hasattr(update, 'callback_query'):
-                event_type = EventType.CALLBACK_QUERY
-            elif hasattr(update, 'inline_query'):
-                event_type = EventType.INLINE_QUERY
+            # ساخت یک‌باره‌ی پاکت برای میان‌افزارها و هندلر
+            get_envelope(update, event_type)
 
             # اجرای میان‌افزارهای قبل از رویداد
             for middleware in middlewares:
+                started = time.perf_counter()
                 try:
                     result = await middleware.before_event(client, update, event_type)
+                    metrics.for_middleware(middleware, 'before_event').observe(time.perf_counter() - started)
                     if not result:
                         logger.info(f"رویداد توسط میان‌افزار {middleware.__class__.__name__} رد شد")
                         return None
                 except Exception as e:
+                    metrics.for_middleware(middleware, 'before_event').observe(time.perf_counter() - started, True)
                     logger.error(f"خطا در اجرای میان‌افزار {middleware.__class__.__name__}: {str(e)}")
 
-            # اجرای هندلر
-            try:
-                result = await handler(client, update)
-            except Exception as e:
-                logger.error(f"خطا در اجرای هندلر: {str(e)}")
-                result = None
+            # اجرای هندلر (هندلر ادغامی نتیجه‌ای به میان‌افزارهای بعد از رویداد نمی‌دهد)
+            result = await run_handler(client, update)
 
             # اجرای میان‌افزارهای بعد از رویداد
             for middleware in reversed(middlewares):
+                started = time.perf_counter()
                 try:
                     result = await middleware.after_event(client, update, event_type, result)
+                    metrics.for_middleware(middleware, 'after_event').observe(time.perf_counter() - started)
                 except Exception as e:
+                    metrics.for_middleware(middleware, 'after_event').observe(time.perf_counter() - started, True)
                     logger.error(f"خطا در اجرای میان‌افزار {middleware.__class__.__name__}: {str(e)}")
 
             return result
 
         return wrapper
 
-    def _create_telethon_wrapper(self, handler: Callable) -> Callable:
+    def _create_telethon_wrapper(self, handler: Callable, event_type: str, coalesce: bool = False) -> Callable:
         """
         ساخت wrapper برای هندلر Telethon
 
         Args:
             handler: تابع پردازش
+            event_type: نوع رویداد (در زمان ثبت مشخص است)
+            coalesce: سپردن اجرای هندلر به ادغام کننده‌ی ویرایش پس از میان‌افزارهای قبل از رویداد
 
         Returns:
             Callable: wrapper
         """
         middlewares = self.middlewares
+        metrics = get_metrics()
+        handler_metrics = metrics.for_handler(handler)
+
+        async def invoke(event):
+            started = time.perf_counter()
+            try:
+                result = await handler(event)
+                handler_metrics.observe(time.perf_counter() - started)
+            except StopPropagation:
+                handler_metrics.observe(time.perf_counter() - started)
+                result = None
+            except Exception as e:
+                handler_metrics.observe(time.perf_counter() - started, True)
+                logger.error(f"خطا در اجرای هندلر: {str(e)}")
+                result = None
+            return result
+
+        run_handler = self._create_deferred_handler(invoke) if coalesce else invoke
 
         @wraps(handler)
         async def wrapper(event):
-            # تعیین نوع رویداد
-            event_type = EventType.MESSAGE
-            if hasattr(event, 'query'):
-                event_type = EventType.CALLBACK_QUERY
-            elif hasattr(event, 'query_id'):
-                event_type = EventType.INLINE_QUERY
+            # ساخت یک‌باره‌ی پاکت برای میان‌افزارها و هندلر
+            get_envelope(event, event_type)
 
             # اجرای میان‌افزارهای قبل از رویداد
             for middleware in middlewares:
+                started = time.perf_counter()
                 try:
                     result = await middleware.before_event(event.client, event, event_type)
+                    metrics.for_middleware(middleware, 'before_event').observe(time.perf_counter() - started)
                     if not result:
                         logger.info(f"رویداد توسط میان‌افزار {middleware.__class__.__name__} رد شد")
                         return None
                 except Exception as e:
+                    metrics.for_middleware(middleware, 'before_event').observe(time.perf_counter() - started, True)
                     logger.error(f"خطا در اجرای میان‌افزار {middleware.__class__.__name__}: {str(e)}")
 
-            # اجرای هندلر
-            try:
-                result = await handler(event)
-            except Exception as e:
-                logger.error(f"خطا در اجرای هندلر: {str(e)}")
-                result = None
+            # اجرای هندلر (هندلر ادغامی نتیجه‌ای به میان‌افزارهای بعد از رویداد نمی‌دهد)
+            result = await run_handler(event)
 
             # اجرای میان‌افزارهای بعد از رویداد
             for middleware in reversed(middlewares):
+                started = time.perf_counter()
                 try:
                     result = await middleware.after_event(event.client, event, event_type, result)
+                    metrics.for_middleware(middleware, 'after_event').observe(time.perf_counter() - started)
                 except Exception as e:
+                    metrics.for_middleware(middleware, 'after_event').observe(time.perf_counter() - started, True)
                     logger.error(f"خطا در اجرای میان‌افزار {middleware.__class__.__name__}: {str(e)}")
 
             return result
 
         return wrapper
 
-    def on_message(self, filters: Optional[Dict[str, Any]] = None):
+    def on_message(self, filters: Optional[Dict[str, Any]] = None, order: int = 0):
         """
         دکوراتور برای ثبت هندلر پیام
 
         Args:
             filters: فیلترها
+            order: ترتیب اجرا در حالت مسیریاب
 
         Returns:
             Callable: دکوراتور
         """
         def decorator(func):
-            self.register_handler(EventType.MESSAGE, func, filters)
+            self.register_handler(EventType.MESSAGE, func, filters, order)
             return func
         return decorator
 
-    def on_edited_message(self, filters: Optional[Dict[str, Any]] = None):
+    def on_edited_message(self, filters: Optional[Dict[str, Any]] = None, order: int = 0, coalesce: bool = True):
         """
         دکوراتور برای ثبت هندلر پیام ویرایش شده
 
         Args:
             filters: فیلترها
+            order: ترتیب اجرا در حالت مسیریاب
+            coalesce: دریافت ویرایش‌های ادغام شده (False برای دریافت تمام ویرایش‌ها)
 
         Returns:
             Callable: دکوراتور
         """
         def decorator(func):
-            self.register_handler(EventType.EDITED_MESSAGE, func, filters)
+            self.register_handler(EventType.EDITED_MESSAGE, func, filters, order, coalesce)
             return func
         return decorator
 
-    def on_callback_query(self, filters: Optional[Dict[str, Any]] = None):
+    def on_callback_query(self, filters: Optional[Dict[str, Any]] = None, order: int = 0):
         """
         دکوراتور برای ثبت هندلر callback query
 
         Args:
             filters: فیلترها
+            order: ترتیب اجرا در حالت مسیریاب
 
         Returns:
             Callable: دکوراتور
         """
         def decorator(func):
-            self.register_handler(EventType.CALLBACK_QUERY, func, filters)
+            self.register_handler(EventType.CALLBACK_QUERY, func, filters, order)
             return func
         return decorator
 
-    def on_inline_query(self, filters: Optional[Dict[str, Any]] = None):
+    def on_inline_query(self, filters: Optional[Dict[str, Any]] = None, order: int = 0):
         """
         دکوراتور برای ثبت هندلر inline query
 
         Args:
             filters: فیلترها
+            order: ترتیب اجرا در حالت مسیریاب
 
         Returns:
             Callable: دکوراتور
         """
         def decorator(func):
-            self.register_handler(EventType.INLINE_QUERY, func, filters)
+            self.register_handler(EventType.INLINE_QUERY, func, filters, order)
             return func
         return decorator
 
@@ -439,19 +1000,33 @@ class EventHandler:
 
 class RateLimitMiddleware(Middleware):
     """
-    میان‌افزار محدودیت نرخ درخواست
+    میان‌افزار محدودیت نرخ درخواست (GCRA با حافظه‌ی ثابت برای هر کلید)
     """
-    def __init__(self, rate_limit: int = 5, per_seconds: int = 3):
+    def __init__(self, rate_limit: int = 5, per_seconds: int = 3, key_by: str = RateLimitKey.USER,
+                 burst: Optional[int] = None, max_keys: int = 10000, redis_manager: Any = None):
         """
         مقداردهی اولیه
 
         Args:
             rate_limit: تعداد درخواست
             per_seconds: در چند ثانیه
+            key_by: کلید محدودیت (user, chat یا user_chat)
+            burst: حداکثر درخواست پشت سر هم (پیش‌فرض برابر rate_limit)
+            max_keys: حداکثر تعداد کلیدهای نگهداری شده در حافظه
+            redis_manager: نمونه RedisManager برای اشتراک محدودیت بین چند پردازه (اختیاری)
         """
+        if key_by not in RateLimitKey.ALL:
+            raise ValueError(f"کلید محدودیت نامعتبر: {key_by}")
+
         self.rate_limit = rate_limit
         self.per_seconds = per_seconds
-        self.user_requests = {}
+        self.key_by = key_by
+
+        if redis_manager is not None:
+            self.limiter = RedisGCRALimiter(redis_manager, rate_limit, per_seconds, burst,
+                                            namespace=f"ratelimit:{key_by}", max_keys=max_keys)
+        else:
+            self.limiter = GCRALimiter(rate_limit, per_seconds, burst, max_keys)
 
     async def before_event(self, client: Any, event: Any, event_type: str) -> bool:
         """
@@ -466,47 +1041,56 @@ class RateLimitMiddleware(Middleware):
             bool: ادامه پردازش
         """
         # تنها برای پیام‌ها و کوئری‌ها
-        if event_type not in [EventType.MESSAGE, EventType.CALLBACK_QUERY, EventType.INLINE_QUERY]:
+        if event_type not in (EventType.MESSAGE, EventType.CALLBACK_QUERY, EventType.INLINE_QUERY):
             return True
 
-        # دریافت شناسه کاربر
-        import time
-        user_id = None
-
         try:
-            # پردازش برای پیروگرام
-            if hasattr(event, 'from_user') and event.from_user:
-                user_id = event.from_user.id
-            # پردازش برای تلتون
-            elif hasattr(event, 'sender_id'):
-                user_id = event.sender_id
-        except:
+            envelope = self.envelope(event, event_type)
+        except Exception:
             return True
 
-        if user_id:
-            current_time = time.time()
+        key = build_rate_limit_key(self.key_by, envelope.sender_id, envelope.chat_id)
+        if key is None:
+            return True
 
-            if user_id not in self.user_requests:
-                self.user_requests[user_id] = []
+        if isinstance(self.limiter, RedisGCRALimiter):
+            allowed = await self.limiter.allow(key)
+        else:
+            allowed = self.limiter.allow(key)
 
-            # پاک کردن درخواست‌های قدیمی
-            self.user_requests[user_id] = [t for t in self.user_requests[user_id] if current_time - t < self.per_seconds]
+        if not allowed:
+            logger.warning(f"درخواست {key} به دلیل محدودیت نرخ رد شد")
+        return allowed
 
-            # بررسی تعداد درخواست‌ها
-            if len(self.user_requests[user_id]) >= self.rate_limit:
-                logger.warning(f"درخواست کاربر {user_id} به دلیل محدودیت نرخ رد شد")
-                return False
-
-            # افزودن زمان درخواست جدید
-            self.user_requests[user_id].append(current_time)
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        دریافت آمار محدودیت نرخ
 
-        return True
+        Returns:
+            Dict[str, Any]: آمار
+        """
+        stats = self.limiter.get_stats()
+        stats['key_by'] = self.key_by
+        return stats
 
 
 class LoggingMiddleware(Middleware):
     """
-    میان‌افزار ثبت وقایع
+    میان‌افزار ثبت وقایع با نمونه‌برداری به ازای نوع رویداد و خروجی ساختاریافته
     """
+    def __init__(self, sample_rates: Optional[Dict[str, float]] = None, default_sample_rate: float = 1.0):
+        """
+        مقداردهی اولیه
+
+        Args:
+            sample_rates: نرخ نمونه‌برداری هر نوع رویداد بین 0 و 1 (پیش‌فرض: متغیر LOG_SAMPLE_RATES)
+            default_sample_rate: نرخ نمونه‌برداری انواع رویداد بدون تنظیم
+        """
+        if sample_rates is None:
+            sample_rates = parse_sample_rates(os.getenv("LOG_SAMPLE_RATES"))
+        self.sample_rates = sample_rates
+        self.default_sample_rate = default_sample_rate
+
     async def before_event(self, client: Any, event: Any, event_type: str) -> bool:
         """
         پردازش قبل از رویداد
@@ -519,24 +1103,12 @@ class LoggingMiddleware(Middleware):
         Returns:
             bool: ادامه پردازش
         """
-        user_id = None
-        chat_id = None
-
-        try:
-            # پردازش برای پیروگرام
-            if hasattr(event, 'from_user') and event.from_user:
-                user_id = event.from_user.id
-            elif hasattr(event, 'sender_id'):
-                user_id = event.sender_id
-
-            if hasattr(event, 'chat') and event.chat:
-                chat_id = event.chat.id
-            elif hasattr(event, 'chat_id'):
-                chat_id = event.chat_id
-        except:
-            pass
+        rate = self.sample_rates.get(event_type, self.default_sample_rate)
+        if rate <= 0 or (rate < 1 and random.random() >= rate):
+            _log_context.set(None)
+            return True
 
-        logger.info(f"رویداد {event_type} دریافت شد - کاربر: {user_id}, چت: {chat_id}")
+        _log_context.set(time.perf_counter())
         return True
 
     async def after_event(self, client: Any, event: Any, event_type: str, result: Any) -> Any:
@@ -552,5 +1124,26 @@ class LoggingMiddleware(Middleware):
         Returns:
             Any: نتیجه نهایی
         """
-        logger.info(f"رویداد {event_type} با موفقیت پردازش شد")
+        started = _log_context.get()
+        if started is None:
+            return result
+        _log_context.set(None)
+
+        user_id = None
+        chat_id = None
+        account_id = None
+        try:
+            envelope = self.envelope(event, event_type)
+            user_id = envelope.sender_id
+            chat_id = envelope.chat_id
+            account_id = envelope.account_id
+        except Exception:
+            pass
+
+        latency_ms = round((time.perf_counter() - started) * 1000, 3)
+        logger.info(
+            f"رویداد {event_type} پردازش شد - کاربر: {user_id}, چت: {chat_id}, زمان: {latency_ms}ms",
+            extra={'event_type': event_type, 'chat_id': chat_id, 'user_id': user_id, 'latency_ms': latency_ms,
+                   'account_id': account_id}
+        )
         return result
@@ -0,0 +1,532 @@
+"""
+مسیریاب رویدادها با یک نقطه‌ی ورود برای هر نوع رویداد
+
+در حالت مسیریاب، به‌جای ثبت یک هندلر جداگانه در کلاینت برای هر callback پلاگین،
+برای هر نوع رویداد فقط یک هندلر در کلاینت ثبت می‌شود. زنجیره‌ی میان‌افزارها یک بار
+برای هر بروزرسانی اجرا شده و سپس رویداد بین هندلرهای ثبت شده در جدول پخش می‌شود.
+"""
+import heapq
+import itertools
+import logging
+import re
+import time
+from bisect import insort
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Sequence, Tuple
+
+from core.event_envelope import ChatTypeMask, DirectionMask, EventEnvelope, get_envelope
+from core.metrics import HandlerMetrics, get_metrics
+
+logger = logging.getLogger(__name__)
+
+
+class StopPropagation(Exception):
+    """
+    توقف ارسال رویداد به هندلرهای بعدی
+
+    هندلری که این استثنا را ایجاد کند، اجرای هندلرهای با ترتیب بالاتر را متوقف می‌کند.
+    """
+
+
+@dataclass
+class HandlerEntry:
+    """
+    یک ردیف از جدول هندلرهای مسیریاب
+    """
+    handler_id: str
+    event_type: str
+    handler: Callable
+    filters: Dict[str, Any] = field(default_factory=dict)
+    order: int = 0
+    sequence: int = 0
+    compiled: 'CompiledFilter' = None
+    metrics: Optional[HandlerMetrics] = None
+    coalesce: bool = True
+
+
+def _entry_sort_key(entry: HandlerEntry) -> Tuple[int, int]:
+    """
+    کلید مرتب‌سازی هندلرها (ابتدا ترتیب اعلام شده، سپس ترتیب ثبت)
+
+    Args:
+        entry: ردیف هندلر
+
+    Returns:
+        Tuple[int, int]: کلید مرتب‌سازی
+    """
+    return entry.order, entry.sequence
+
+
+# نگاشت مقدار chat_type در فیلترها به بیت‌ها (مطابق فیلترهای Pyrogram)
+CHAT_TYPE_FILTERS = {
+    'private': ChatTypeMask.PRIVATE | ChatTypeMask.BOT,
+    'bot': ChatTypeMask.BOT,
+    'group': ChatTypeMask.GROUP | ChatTypeMask.SUPERGROUP,
+    'supergroup': ChatTypeMask.SUPERGROUP,
+    'channel': ChatTypeMask.CHANNEL,
+}
+
+
+def _as_id_set(value: Any) -> frozenset:
+    """
+    تبدیل مقدار فیلتر شناسه به مجموعه
+
+    Args:
+        value: شناسه یا لیست شناسه‌ها
+
+    Returns:
+        frozenset: مجموعه شناسه‌ها
+    """
+    if isinstance(value, (list, tuple, set, frozenset)):
+        return frozenset(value)
+    return frozenset((value,))
+
+
+@dataclass
+class CompiledFilter:
+    """
+    فیلتر کامپایل شده از دیکشنری فیلترهای پلاگین
+    """
+    chat_ids: Optional[frozenset] = None
+    user_ids: Optional[frozenset] = None
+    chat_type_mask: int = ChatTypeMask.ALL
+    direction_mask: int = DirectionMask.ALL
+    text_check: Optional[Callable[[str], bool]] = None
+
+    def matches(self, envelope: EventEnvelope) -> bool:
+        """
+        بررسی تطابق مقادیر بروزرسانی با فیلتر
+
+        Args:
+            envelope: پاکت رویداد
+
+        Returns:
+            bool: نتیجه تطابق
+        """
+        if not envelope.direction & self.direction_mask:
+            return False
+        if self.chat_type_mask != ChatTypeMask.ALL and not envelope.chat_type & self.chat_type_mask:
+            return False
+        if self.chat_ids is not None and envelope.chat_id not in self.chat_ids:
+            return False
+        if self.user_ids is not None and envelope.sender_id not in self.user_ids:
+            return False
+        if self.text_check is not None and not self.text_check(envelope.text):
+            return False
+        return True
+
+
+def _compile_text_check(filters: Dict[str, Any]) -> Optional[Callable[[str], bool]]:
+    """
+    کامپایل فیلترهای متنی به یک تابع بررسی
+
+    Args:
+        filters: فیلترها
+
+    Returns:
+        Optional[Callable[[str], bool]]: تابع بررسی یا None
+    """
+    checks = []
+
+    if 'text' in filters:
+        expected = filters['text']
+        if isinstance(expected, (list, tuple, set, frozenset)):
+            exact = frozenset(expected)
+            checks.append(lambda text: text.strip() in exact)
+        else:
+            pattern = re.compile(expected)
+            checks.append(lambda text: pattern.search(text) is not None)
+
+    if 'text_startswith' in filters:
+        prefixes = filters['text_startswith']
+        prefixes = (prefixes,) if isinstance(prefixes, str) else tuple(prefixes)
+        checks.append(lambda text: text.startswith(prefixes))
+
+    if not checks:
+        return None
+    if len(checks) == 1:
+        return checks[0]
+    return lambda text: all(check(text) for check in checks)
+
+
+def compile_filters(filters: Optional[Dict[str, Any]]) -> CompiledFilter:
+    """
+    کامپایل دیکشنری فیلترها به شناسه‌های قابل جستجو و ماسک‌های بیتی
+
+    Args:
+        filters: فیلترها
+
+    Returns:
+        CompiledFilter: فیلتر کامپایل شده
+    """
+    filters = filters or {}
+    compiled = CompiledFilter(text_check=_compile_text_check(filters))
+
+    if 'chat_id' in filters:
+        compiled.chat_ids = _as_id_set(filters['chat_id'])
+    if 'user_id' in filters:
+        compiled.user_ids = _as_id_set(filters['user_id'])
+
+    if filters.get('incoming'):
+        compiled.direction_mask &= DirectionMask.INCOMING
+    if filters.get('outgoing'):
+        compiled.direction_mask &= DirectionMask.OUTGOING
+
+    if filters.get('is_private'):
+        compiled.chat_type_mask &= CHAT_TYPE_FILTERS['private']
+    if 'chat_type' in filters:
+        compiled.chat_type_mask &= CHAT_TYPE_FILTERS.get(filters['chat_type'], ChatTypeMask.ALL)
+
+    return compiled
+
+
+def match_filters(update: Any, filters: Dict[str, Any]) -> bool:
+    """
+    بررسی تطابق یک بروزرسانی با دیکشنری فیلترهای پلاگین
+
+    Args:
+        update: بروزرسانی (پیام Pyrogram یا رویداد Telethon)
+        filters: فیلترها
+
+    Returns:
+        bool: آیا بروزرسانی با فیلترها مطابقت دارد
+    """
+    if not filters:
+        return True
+    return compile_filters(filters).matches(get_envelope(update))
+
+
+class FilterIndex:
+    """
+    نمایه‌ی هندلرهای یک نوع رویداد براساس شناسه چت و کاربر
+
+    هندلرهای دارای فیلتر chat_id در سطل چت‌ها و هندلرهای دارای فیلتر user_id
+    در سطل کاربران قرار می‌گیرند تا هر بروزرسانی فقط هندلرهای کاندید را بررسی کند.
+    """
+
+    def __init__(self):
+        """
+        مقداردهی اولیه
+        """
+        self.by_chat: Dict[Any, List['HandlerEntry']] = {}
+        self.by_user: Dict[Any, List['HandlerEntry']] = {}
+        self.unkeyed: List['HandlerEntry'] = []
+
+    def add(self, entry: 'HandlerEntry') -> None:
+        """
+        افزودن هندلر به نمایه
+
+        Args:
+            entry: ردیف هندلر
+        """
+        compiled = entry.compiled
+        if compiled.chat_ids is not None:
+            for chat_id in compiled.chat_ids:
+                insort(self.by_chat.setdefault(chat_id, []), entry, key=_entry_sort_key)
+        elif compiled.user_ids is not None:
+            for user_id in compiled.user_ids:
+                insort(self.by_user.setdefault(user_id, []), entry, key=_entry_sort_key)
+        else:
+            insort(self.unkeyed, entry, key=_entry_sort_key)
+
+    def remove(self, entry: 'HandlerEntry') -> None:
+        """
+        حذف هندلر از نمایه
+
+        Args:
+            entry: ردیف هندلر
+        """
+        compiled = entry.compiled
+        if compiled.chat_ids is not None:
+            self._remove_from(self.by_chat, compiled.chat_ids, entry)
+        elif compiled.user_ids is not None:
+            self._remove_from(self.by_user, compiled.user_ids, entry)
+        elif entry in self.unkeyed:
+            self.unkeyed.remove(entry)
+
+    @staticmethod
+    def _remove_from(buckets: Dict[Any, List['HandlerEntry']], keys: frozenset, entry: 'HandlerEntry') -> None:
+        for key in keys:
+            bucket = buckets.get(key)
+            if bucket and entry in bucket:
+                bucket.remove(entry)
+                if not bucket:
+                    del buckets[key]
+
+    def candidates(self, envelope: EventEnvelope) -> List['HandlerEntry']:
+        """
+        دریافت هندلرهای کاندید برای یک بروزرسانی به ترتیب اجرا
+
+        Args:
+            envelope: پاکت رویداد
+
+        Returns:
+            List[HandlerEntry]: هندلرهای کاندید
+        """
+        buckets = [bucket for bucket in (
+            self.unkeyed,
+            self.by_chat.get(envelope.chat_id) if self.by_chat else None,
+            self.by_user.get(envelope.sender_id) if self.by_user else None,
+        ) if bucket]
+
+        if not buckets:
+            return []
+        if len(buckets) == 1:
+            return list(buckets[0])
+        return list(heapq.merge(*buckets, key=_entry_sort_key))
+
+
+class EventRouter:
+    """
+    جدول هندلرها و پخش‌کننده‌ی رویداد برای حالت مسیریاب
+    """
+
+    def __init__(self):
+        """
+        مقداردهی اولیه
+        """
+        self.handlers: Dict[str, List[HandlerEntry]] = {}
+        self._indexes: Dict[str, FilterIndex] = {}
+        self._by_id: Dict[str, HandlerEntry] = {}
+        self._sequence = itertools.count()
+
+    def add_handler(self, event_type: str, handler: Callable, filters: Optional[Dict[str, Any]] = None,
+                    order: int = 0, handler_id: Optional[str] = None, coalesce: bool = True) -> str:
+        """
+        افزودن هندلر به جدول
+
+        Args:
+            event_type: نوع رویداد
+            handler: تابع پردازش
+            filters: فیلترها
+            order: ترتیب اجرا (مقدار کمتر زودتر اجرا می‌شود)
+            handler_id: شناسه هندلر (اختیاری)
+            coalesce: دریافت ویرایش‌های ادغام شده (False برای دریافت تمام ویرایش‌ها)
+
+        Returns:
+            str: شناسه هندلر
+        """
+        sequence = next(self._sequence)
+        if handler_id is None:
+            handler_id = f"{event_type}_{getattr(handler, '__qualname__', 'handler')}_{sequence}"
+
+        entry = HandlerEntry(
+            handler_id=handler_id,
+            event_type=event_type,
+            handler=handler,
+            filters=filters or {},
+            order=order,
+            sequence=sequence,
+            compiled=compile_filters(filters),
+            metrics=get_metrics().for_handler(handler),
+            coalesce=coalesce
+        )
+
+        insort(self.handlers.setdefault(event_type, []), entry, key=_entry_sort_key)
+        self._indexes.setdefault(event_type, FilterIndex()).add(entry)
+        self._by_id[handler_id] = entry
+
+        return handler_id
+
+    def remove_handler(self, handler_id: str) -> bool:
+        """
+        حذف هندلر از جدول
+
+        Args:
+            handler_id: شناسه هندلر
+
+        Returns:
+            bool: وضعیت حذف
+        """
+        entry = self._by_id.pop(handler_id, None)
+        if entry is None:
+            return False
+
+        entries = self.handlers.get(entry.event_type, [])
+        if entry in entries:
+            entries.remove(entry)
+        self._indexes[entry.event_type].remove(entry)
+
+        if not entries:
+            self.handlers.pop(entry.event_type, None)
+            self._indexes.pop(entry.event_type, None)
+
+        return True
+
+    def update_filters(self, handler_id: str, filters: Optional[Dict[str, Any]]) -> bool:
+        """
+        بروزرسانی فیلترهای یک هندلر و بازسازی نمایه‌ی آن
+
+        Args:
+            handler_id: شناسه هندلر
+            filters: فیلترهای جدید
+
+        Returns:
+            bool: وضعیت بروزرسانی
+        """
+        entry = self._by_id.get(handler_id)
+        if entry is None:
+            return False
+
+        index = self._indexes[entry.event_type]
+        index.remove(entry)
+        entry.filters = filters or {}
+        entry.compiled = compile_filters(filters)
+        index.add(entry)
+
+        return True
+
+    def find_handler_ids(self, event_type: str, handler: Callable) -> List[str]:
+        """
+        یافتن شناسه‌های ثبت شده برای یک تابع
+
+        Args:
+            event_type: نوع رویداد
+            handler: تابع پردازش
+
+        Returns:
+            List[str]: لیست شناسه‌ها
+        """
+        return [entry.handler_id for entry in self.handlers.get(event_type, []) if entry.handler == handler]
+
+    def get_handlers(self, event_type: str) -> List[HandlerEntry]:
+        """
+        دریافت هندلرهای یک نوع رویداد به ترتیب اجرا
+
+        Args:
+            event_type: نوع رویداد
+
+        Returns:
+            List[HandlerEntry]: لیست هندلرها
+        """
+        return self.handlers.get(event_type, [])
+
+    def event_types(self) -> List[str]:
+        """
+        انواع رویدادهایی که هندلر دارند
+
+        Returns:
+            List[str]: لیست انواع رویداد
+        """
+        return list(self.handlers.keys())
+
+    def match(self, event_type: str, update: Any, coalesce: Optional[bool] = None) -> List[HandlerEntry]:
+        """
+        یافتن هندلرهای منطبق با بروزرسانی با استفاده از نمایه
+
+        Args:
+            event_type: نوع رویداد
+            update: بروزرسانی دریافتی
+            coalesce: فقط هندلرهای با این تنظیم ادغام ویرایش (None برای همه)
+
+        Returns:
+            List[HandlerEntry]: هندلرهای منطبق به ترتیب اجرا
+        """
+        index = self._indexes.get(event_type)
+        if index is None:
+            return []
+
+        envelope = get_envelope(update, event_type)
+        return [
+            entry for entry in index.candidates(envelope)
+            if (coalesce is None or entry.coalesce == coalesce) and entry.compiled.matches(envelope)
+        ]
+
+    async def dispatch(self, client: Any, update: Any, event_type: str, middlewares: Sequence[Any],
+                       handler_args: Tuple[Any, ...], coalesce: Optional[bool] = None,
+                       defer: Optional[Callable[..., Awaitable[Any]]] = None) -> Optional[List[Any]]:
+        """
+        اجرای زنجیره‌ی میان‌افزارها یک بار و پخش رویداد بین هندلرها
+
+        مانند حالت per_handler، فیلترها پیش از میان‌افزارها ارزیابی می‌شوند و
+        بروزرسانی‌ای که هیچ هندلری با آن منطبق نباشد از میان‌افزارها عبور نمی‌کند.
+
+        با defer، هندلرهای منطبق با coalesce=True اجرا نمی‌شوند و پس از هندلرهای فوری با
+        defer(entries, *handler_args) برای اجرای بعدی (آخرین ویرایش پنجره) سپرده می‌شوند؛
+        میان‌افزارها برای هر بروزرسانی فقط یک بار اجرا می‌شوند. StopPropagation یک هندلر
+        فوری هندلرهای ادغامی بعد از آن (به ترتیب order) را هم متوقف می‌کند.
+
+        Args:
+            client: کلاینت تلگرام
+            update: بروزرسانی دریافتی
+            event_type: نوع رویداد
+            middlewares: میان‌افزارها
+            handler_args: پارامترهای فراخوانی هندلر ((client, update) یا (event,))
+            coalesce: فقط هندلرهای با این تنظیم ادغام ویرایش (None برای همه)
+            defer: تابع async سپردن هندلرهای ادغامی (None برای اجرای همه‌ی هندلرها)
+
+        Returns:
+            Optional[List[Any]]: نتایج هندلرهای اجرا شده یا None در صورت رد رویداد
+        """
+        entries = self.match(event_type, update, coalesce)
+        if not entries:
+            return None
+
+        metrics = get_metrics()
+
+        # اجرای میان‌افزارهای قبل از رویداد
+        for middleware in middlewares:
+            started = time.perf_counter()
+            try:
+                result = await middleware.before_event(client, update, event_type)
+                metrics.for_middleware(middleware, 'before_event').observe(time.perf_counter() - started)
+                if not result:
+                    logger.info(f"رویداد توسط میان‌افزار {middleware.__class__.__name__} رد شد")
+                    return None
+            except Exception as e:
+                metrics.for_middleware(middleware, 'before_event').observe(time.perf_counter() - started, True)
+                logger.error(f"خطا در اجرای میان‌افزار {middleware.__class__.__name__}: {str(e)}")
+
+        # پخش رویداد بین هندلرهای منطبق
+        if defer is None:
+            results, _ = await self.run_handlers(entries, handler_args)
+        else:
+            results, stopped_at = await self.run_handlers(
+                [entry for entry in entries if not entry.coalesce], handler_args
+            )
+            deferred = [
+                entry for entry in entries
+                if entry.coalesce and (stopped_at is None or _entry_sort_key(entry) < _entry_sort_key(stopped_at))
+            ]
+            if deferred:
+                await defer(deferred, *handler_args)
+
+        # اجرای میان‌افزارهای بعد از رویداد
+        for middleware in reversed(middlewares):
+            started = time.perf_counter()
+            try:
+                results = await middleware.after_event(client, update, event_type, results)
+                metrics.for_middleware(middleware, 'after_event').observe(time.perf_counter() - started)
+            except Exception as e:
+                metrics.for_middleware(middleware, 'after_event').observe(time.perf_counter() - started, True)
+                logger.error(f"خطا در اجرای میان‌افزار {middleware.__class__.__name__}: {str(e)}")
+
+        return results
+
+    @staticmethod
+    async def run_handlers(entries: Sequence[HandlerEntry],
+                           handler_args: Tuple[Any, ...]) -> Tuple[List[Any], Optional[HandlerEntry]]:
+        """
+        اجرای هندلرها به ترتیب (بدون میان‌افزار) تا پایان یا StopPropagation
+
+        Args:
+            entries: هندلرها به ترتیب اجرا
+            handler_args: پارامترهای فراخوانی هندلر
+
+        Returns:
+            Tuple[List[Any], Optional[HandlerEntry]]: نتایج و هندلری که StopPropagation داد
+        """
+        results = []
+        for entry in entries:
+            started = time.perf_counter()
+            try:
+                results.append(await entry.handler(*handler_args))
+                entry.metrics.observe(time.perf_counter() - started)
+            except StopPropagation:
+                entry.metrics.observe(time.perf_counter() - started)
+                return results, entry
+            except Exception as e:
+                entry.metrics.observe(time.perf_counter() - started, True)
+                logger.error(f"خطا در اجرای هندلر {entry.handler_id}: {str(e)}")
+                results.append(None)
+        return results, None
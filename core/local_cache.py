@@ -0,0 +1,181 @@
+"""
+کش درون پردازه‌ای LRU با زمان انقضا
+
+لایه‌ی اول (L1) کش دیتابیس: کلیدهای پرتکرار بدون رفت و برگشت به Redis و بدون
+json.loads پاسخ داده می‌شوند. اندازه با حذف قدیمی‌ترین استفاده (LRU) و عمر هر مقدار
+با TTL محدود می‌شود و کلیدها با تگ (نام جدول) گروه‌بندی می‌شوند تا با هر نوشتن روی
+جدول یک‌جا حذف شوند.
+"""
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Iterable, Optional, Set, Tuple, Union
+
+# نشانه‌ی نبود مقدار (None خود یک مقدار معتبر کش است)
+MISSING = object()
+
+
+class LocalCache:
+    """
+    کش LRU با TTL و گروه‌بندی تگی
+    """
+
+    def __init__(self, max_size: int = 1024, default_ttl: float = 30.0):
+        """
+        مقداردهی اولیه
+
+        Args:
+            max_size: حداکثر تعداد کلیدها (0 برای غیرفعال کردن)
+            default_ttl: زمان پیش‌فرض انقضا (ثانیه)
+        """
+        self.max_size = max_size
+        self.default_ttl = default_ttl
+        # کلید -> (مقدار، زمان انقضا، تگ‌ها)
+        self._entries: "OrderedDict[Hashable, Tuple[Any, float, Tuple[str, ...]]]" = OrderedDict()
+        self._tags: Dict[str, Set[Hashable]] = {}
+        self.stats = {
+            'hits': 0,
+            'misses': 0,
+            'expired': 0,
+            'evicted': 0,
+            'invalidated': 0,
+        }
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @property
+    def enabled(self) -> bool:
+        """آیا کش فعال است"""
+        return self.max_size > 0
+
+    def get(self, key: Hashable, default: Any = MISSING) -> Any:
+        """
+        دریافت مقدار
+
+        Args:
+            key: کلید
+            default: مقدار بازگشتی در صورت نبود یا انقضای کلید
+
+        Returns:
+            Any: مقدار یا default
+        """
+        entry = self._entries.get(key)
+        if entry is None:
+            self.stats['misses'] += 1
+            return default
+
+        value, expires_at, tags = entry
+        if expires_at <= time.monotonic():
+            self._remove(key, tags)
+            self.stats['expired'] += 1
+            self.stats['misses'] += 1
+            return default
+
+        self._entries.move_to_end(key)
+        self.stats['hits'] += 1
+        return value
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None,
+            tag: Union[str, Iterable[str], None] = None) -> None:
+        """
+        ذخیره مقدار
+
+        Args:
+            key: کلید
+            value: مقدار
+            ttl: زمان انقضا (ثانیه، پیش‌فرض default_ttl؛ صفر یا کمتر ذخیره نمی‌شود)
+            tag: تگ یا تگ‌های گروه (مثلاً نام جدول و کلیدهای وابستگی)
+        """
+        ttl = self.default_ttl if ttl is None else ttl
+        if not self.enabled or ttl <= 0:
+            return
+
+        if tag is None:
+            tags = ()
+        elif isinstance(tag, str):
+            tags = (tag,)
+        else:
+            tags = tuple(tag)
+
+        previous = self._entries.pop(key, None)
+        if previous is not None:
+            self._untag(key, previous[2])
+
+        self._entries[key] = (value, time.monotonic() + ttl, tags)
+        for name in tags:
+            self._tags.setdefault(name, set()).add(key)
+
+        while len(self._entries) > self.max_size:
+            old_key, (_, _, old_tags) = self._entries.popitem(last=False)
+            self._untag(old_key, old_tags)
+            self.stats['evicted'] += 1
+
+    def delete(self, key: Hashable) -> bool:
+        """
+        حذف یک کلید
+
+        Args:
+            key: کلید
+
+        Returns:
+            bool: آیا کلید وجود داشت
+        """
+        entry = self._entries.get(key)
+        if entry is None:
+            return False
+        self._remove(key, entry[2])
+        return True
+
+    def invalidate_tag(self, tag: str) -> int:
+        """
+        حذف تمام کلیدهای یک تگ
+
+        Args:
+            tag: تگ
+
+        Returns:
+            int: تعداد کلیدهای حذف شده
+        """
+        keys = self._tags.pop(tag, None)
+        if not keys:
+            return 0
+        for key in keys:
+            entry = self._entries.pop(key, None)
+            if entry is not None:
+                # حذف کلید از تگ‌های دیگر آن
+                self._untag(key, entry[2])
+        self.stats['invalidated'] += len(keys)
+        return len(keys)
+
+    def clear(self) -> None:
+        """
+        پاک کردن کامل کش
+        """
+        self._entries.clear()
+        self._tags.clear()
+
+    def _remove(self, key: Hashable, tags: Tuple[str, ...]) -> None:
+        del self._entries[key]
+        self._untag(key, tags)
+
+    def _untag(self, key: Hashable, tags: Tuple[str, ...]) -> None:
+        for tag in tags:
+            keys = self._tags.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._tags[tag]
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        دریافت آمار کش
+
+        Returns:
+            Dict[str, Any]: آمار
+        """
+        return {
+            'size': len(self._entries),
+            'max_size': self.max_size,
+            'tags': len(self._tags),
+            **self.stats,
+        }
@@ -3,10 +3,16 @@
 """
 import os
 import sys
+import json
+import queue
 import logging
 from pathlib import Path
 from datetime import datetime
-from logging.handlers import RotatingFileHandler, TimedRotatingFileHandler
+from typing import Dict, Optional
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler, TimedRotatingFileHandler
+
+# فیلدهای ساختاریافته‌ای که از طریق extra به رکورد لاگ اضافه می‌شوند
+STRUCTURED_FIELDS = ('event_type', 'account_id', 'chat_id', 'user_id', 'latency_ms', 'plugin', 'handler')
 
 
 class UTF8StreamHandler(logging.StreamHandler):
@@ -60,6 +66,26 @@ class UTF8TimedRotatingFileHandler(TimedRotatingFileHandler):
         TimedRotatingFileHandler.__init__(self, filename, when, interval, backupCount, encoding, delay, utc, atTime)
 
 
+class JSONFormatter(logging.Formatter):
+    """
+    فرمتر لاگ ساختاریافته به صورت یک شیء JSON در هر خط
+    """
+    def format(self, record):
+        data = {
+            'time': datetime.fromtimestamp(record.created).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+        }
+        for field in STRUCTURED_FIELDS:
+            value = getattr(record, field, None)
+            if value is not None:
+                data[field] = value
+        if record.exc_info:
+            data['exc_info'] = self.formatException(record.exc_info)
+        return json.dumps(data, ensure_ascii=False, default=str)
+
+
 class Logger:
     """
     کلاس مدیریت لاگ مرکزی با پشتیبانی از UTF-8 و سینگلتون
@@ -120,6 +146,13 @@ class Logger:
         # اگر لاگر قبلاً ایجاد شده، بازگرداندن آن
         if name in self._loggers:
             return self._loggers[name]
+
+        # در حالت لاگ مرکزی، لاگر فقط به هندلر صف ریشه منتشر می‌کند
+        if _listener is not None:
+            logger = logging.getLogger(name)
+            logger.setLevel(level or self.log_level)
+            self._loggers[name] = logger
+            return logger
         
         # ایجاد لاگر جدید
         logger = logging.getLogger(name)
@@ -179,3 +212,106 @@ def get_logger(name=None, log_file=None, level=None):
     
     logger_instance = Logger()
     return logger_instance.get_logger(name, log_file, level)
+
+
+# شنونده‌ی صف لاگ که نوشتن روی کنسول و فایل را در یک نخ جداگانه انجام می‌دهد
+_listener: Optional[QueueListener] = None
+
+
+def setup_logging(log_dir: Optional[str] = None, log_file: str = "selfbot.log", level: Optional[str] = None,
+                  json_format: Optional[bool] = None, console_output: bool = True, file_output: bool = True,
+                  max_file_size: int = 10*1024*1024, backup_count: int = 5) -> None:
+    """
+    پیکربندی یک‌باره‌ی لاگ برای کل برنامه
+
+    لاگرها فقط رکورد را در صف قرار می‌دهند و نوشتن روی دیسک و کنسول در نخ QueueListener
+    انجام می‌شود، بنابراین حلقه‌ی رویداد منتظر I/O نمی‌ماند.
+
+    Args:
+        log_dir: مسیر دایرکتوری لاگ (پیش‌فرض: data/logs)
+        log_file: نام فایل لاگ
+        level: سطح لاگ (پیش‌فرض: متغیر LOG_LEVEL یا INFO)
+        json_format: خروجی JSON (پیش‌فرض: LOG_FORMAT=json)
+        console_output: نمایش لاگ‌ها در کنسول
+        file_output: ذخیره لاگ‌ها در فایل
+        max_file_size: حداکثر اندازه فایل لاگ قبل از چرخش (به بایت)
+        backup_count: تعداد فایل‌های لاگ پشتیبان
+    """
+    global _listener
+
+    if _listener is not None:
+        return
+
+    level = level or os.getenv("LOG_LEVEL", "INFO")
+    if json_format is None:
+        json_format = os.getenv("LOG_FORMAT", "text").lower() == "json"
+
+    if json_format:
+        formatter = JSONFormatter()
+    else:
+        formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+
+    handlers = []
+    if console_output:
+        console_handler = UTF8StreamHandler()
+        console_handler.setFormatter(formatter)
+        handlers.append(console_handler)
+
+    if file_output:
+        log_dir = log_dir or os.path.join(Path(__file__).parent.parent.absolute(), 'data', 'logs')
+        os.makedirs(log_dir, exist_ok=True)
+        file_handler = UTF8RotatingFileHandler(
+            os.path.join(log_dir, log_file),
+            maxBytes=max_file_size,
+            backupCount=backup_count,
+            encoding='utf-8'
+        )
+        file_handler.setFormatter(formatter)
+        handlers.append(file_handler)
+
+    log_queue = queue.SimpleQueue()
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    root.addHandler(QueueHandler(log_queue))
+    root.setLevel(level)
+
+    _listener = QueueListener(log_queue, *handlers, respect_handler_level=True)
+    _listener.start()
+
+
+def shutdown_logging() -> None:
+    """
+    توقف شنونده‌ی صف و نوشتن لاگ‌های باقی‌مانده
+    """
+    global _listener
+
+    if _listener is None:
+        return
+
+    _listener.stop()
+    for handler in _listener.handlers:
+        handler.close()
+    _listener = None
+
+
+def parse_sample_rates(value: Optional[str]) -> Dict[str, float]:
+    """
+    تبدیل رشته‌ی نرخ نمونه‌برداری به دیکشنری
+
+    Args:
+        value: رشته به شکل "message=0.1,edited_message=0.05"
+
+    Returns:
+        Dict[str, float]: نرخ نمونه‌برداری هر نوع رویداد
+    """
+    rates = {}
+    for item in (value or "").split(','):
+        if '=' not in item:
+            continue
+        event_type, rate = item.split('=', 1)
+        try:
+            rates[event_type.strip()] = min(1.0, max(0.0, float(rate)))
+        except ValueError:
+            continue
+    return rates
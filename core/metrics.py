@@ -0,0 +1,463 @@
+"""
+جمع‌آوری آمار اجرای هندلرها و میان‌افزارها و خروجی با فرمت متنی Prometheus
+
+هر هندلر یک شیء HandlerMetrics دارد که هنگام ثبت هندلر ساخته می‌شود، بنابراین ثبت
+هر فراخوانی فقط چند عمل جمع و یک جستجوی دودویی در مرزهای هیستوگرام است.
+"""
+import asyncio
+import json
+import logging
+import os
+import socket
+import time
+from bisect import bisect_left
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# مرزهای هیستوگرام زمان اجرا (ثانیه)
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# کلید هش Redis برای اشتراک آمار پردازه‌ی ربات با سرور API
+REDIS_METRICS_KEY = "metrics"
+
+
+def default_instance() -> str:
+    """
+    نام پیش‌فرض پردازه در برچسب instance
+
+    Returns:
+        str: مقدار METRICS_INSTANCE یا "hostname:pid" تا آمار چند پردازه روی هم نوشته نشود
+    """
+    return os.getenv("METRICS_INSTANCE") or f"{socket.gethostname()}:{os.getpid()}"
+
+
+class HandlerKind:
+    """
+    انواع واحدهای اندازه‌گیری شده
+    """
+    HANDLER = "handler"
+    MIDDLEWARE = "middleware"
+    COMMAND = "command"
+
+
+class HandlerMetrics:
+    """
+    آمار یک هندلر: تعداد فراخوانی، تعداد خطا و هیستوگرام زمان اجرا
+    """
+    __slots__ = ('plugin', 'handler', 'kind', 'calls', 'errors', 'total_time', 'buckets')
+
+    def __init__(self, plugin: str, handler: str, kind: str):
+        self.plugin = plugin
+        self.handler = handler
+        self.kind = kind
+        self.calls = 0
+        self.errors = 0
+        self.total_time = 0.0
+        self.buckets = [0] * (len(LATENCY_BUCKETS) + 1)
+
+    def observe(self, elapsed: float, error: bool = False) -> None:
+        """
+        ثبت یک فراخوانی
+
+        Args:
+            elapsed: زمان اجرا (ثانیه)
+            error: آیا فراخوانی با خطا همراه بود
+        """
+        self.calls += 1
+        self.total_time += elapsed
+        self.buckets[bisect_left(LATENCY_BUCKETS, elapsed)] += 1
+        if error:
+            self.errors += 1
+
+    def quantile(self, q: float) -> float:
+        """
+        تخمین چندک زمان اجرا از روی هیستوگرام (مرز بالای سطل)
+
+        Args:
+            q: چندک بین 0 و 1
+
+        Returns:
+            float: زمان تخمینی (ثانیه)
+        """
+        if not self.calls:
+            return 0.0
+        target = q * self.calls
+        cumulative = 0
+        for index, count in enumerate(self.buckets):
+            cumulative += count
+            if cumulative >= target:
+                return LATENCY_BUCKETS[index] if index < len(LATENCY_BUCKETS) else float('inf')
+        return float('inf')
+
+    def reset(self) -> None:
+        """
+        صفر کردن آمار
+        """
+        self.calls = 0
+        self.errors = 0
+        self.total_time = 0.0
+        self.buckets = [0] * (len(LATENCY_BUCKETS) + 1)
+
+
+def handler_labels(handler: Callable) -> Tuple[str, str]:
+    """
+    استخراج نام پلاگین و نام هندلر از تابع
+
+    Args:
+        handler: تابع یا متد هندلر
+
+    Returns:
+        Tuple[str, str]: (نام پلاگین، نام هندلر)
+    """
+    owner = getattr(handler, '__self__', None)
+    if owner is not None:
+        plugin = getattr(owner, 'name', None) or owner.__class__.__name__
+    else:
+        plugin = getattr(handler, '__module__', None) or 'unknown'
+        plugin = plugin.rsplit('.', 1)[-1]
+    name = getattr(handler, '__name__', None) or handler.__class__.__name__
+    return str(plugin), name
+
+
+def _escape(value: str) -> str:
+    """فرار دادن مقدار برچسب Prometheus"""
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+class MetricsRegistry:
+    """
+    مخزن آمار اجرای هندلرها
+    از الگوی طراحی Singleton استفاده می‌کند
+    """
+    _instance = None
+
+    def __new__(cls):
+        if cls._instance is None:
+            cls._instance = super(MetricsRegistry, cls).__new__(cls)
+            cls._instance.initialize()
+        return cls._instance
+
+    def initialize(self):
+        """
+        مقداردهی اولیه
+        """
+        self._metrics: Dict[Tuple[str, str, str], HandlerMetrics] = {}
+        self._collectors: Dict[str, Callable[[], Optional[Dict[str, Any]]]] = {}
+        # آمار مراحل هر نمونه‌ی میان‌افزار به ازای id آن (بدون ساخت کلید رشته‌ای در هر رویداد)؛
+        # نگه داشتن خود میان‌افزار مانع استفاده‌ی دوباره از id می‌شود
+        self._middleware_metrics: Dict[int, Tuple[Any, Dict[str, HandlerMetrics]]] = {}
+        self.started_at = time.time()
+
+    def get(self, plugin: str, handler: str, kind: str = HandlerKind.HANDLER) -> HandlerMetrics:
+        """
+        دریافت یا ایجاد آمار یک هندلر
+
+        Args:
+            plugin: نام پلاگین
+            handler: نام هندلر
+            kind: نوع (handler, middleware, command)
+
+        Returns:
+            HandlerMetrics: آمار هندلر
+        """
+        key = (plugin, handler, kind)
+        metrics = self._metrics.get(key)
+        if metrics is None:
+            metrics = self._metrics[key] = HandlerMetrics(plugin, handler, kind)
+        return metrics
+
+    def for_handler(self, handler: Callable, kind: str = HandlerKind.HANDLER) -> HandlerMetrics:
+        """
+        دریافت آمار بر اساس تابع هندلر
+
+        Args:
+            handler: تابع یا متد هندلر
+            kind: نوع
+
+        Returns:
+            HandlerMetrics: آمار هندلر
+        """
+        plugin, name = handler_labels(handler)
+        return self.get(plugin, name, kind)
+
+    def for_middleware(self, middleware: Any, stage: str) -> HandlerMetrics:
+        """
+        دریافت آمار یک مرحله از میان‌افزار
+
+        Args:
+            middleware: میان‌افزار
+            stage: مرحله (before_event یا after_event)
+
+        Returns:
+            HandlerMetrics: آمار میان‌افزار
+        """
+        entry = self._middleware_metrics.get(id(middleware))
+        if entry is None:
+            entry = self._middleware_metrics[id(middleware)] = (middleware, {})
+        stages = entry[1]
+        metrics = stages.get(stage)
+        if metrics is None:
+            metrics = stages[stage] = self.get('middleware', f"{middleware.__class__.__name__}.{stage}",
+                                               HandlerKind.MIDDLEWARE)
+        return metrics
+
+    def instrument(self, handler: Callable, plugin: Optional[str] = None, name: Optional[str] = None,
+                   kind: str = HandlerKind.COMMAND) -> Callable:
+        """
+        ساخت wrapper اندازه‌گیری برای یک تابع async
+
+        Args:
+            handler: تابع async
+            plugin: نام پلاگین (اختیاری)
+            name: نام هندلر (اختیاری)
+            kind: نوع
+
+        Returns:
+            Callable: تابع اندازه‌گیری شده
+        """
+        default_plugin, default_name = handler_labels(handler)
+        metrics = self.get(plugin or default_plugin, name or default_name, kind)
+
+        async def instrumented(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                result = await handler(*args, **kwargs)
+            except Exception:
+                metrics.observe(time.perf_counter() - start, True)
+                raise
+            metrics.observe(time.perf_counter() - start)
+            return result
+
+        instrumented.__name__ = getattr(handler, '__name__', 'instrumented')
+        instrumented.__wrapped__ = handler
+        return instrumented
+
+    def register_collector(self, name: str, callback: Callable[[], Optional[Dict[str, Any]]]) -> None:
+        """
+        ثبت تابع جمع‌آوری مقادیر لحظه‌ای (gauge)
+
+        Args:
+            name: پیشوند نام متریک‌ها
+            callback: تابعی که دیکشنری مقادیر عددی را برمی‌گرداند
+        """
+        self._collectors[name] = callback
+
+    def unregister_collector(self, name: str) -> None:
+        """
+        حذف تابع جمع‌آوری
+
+        Args:
+            name: پیشوند نام متریک‌ها
+        """
+        self._collectors.pop(name, None)
+
+    def reset(self) -> None:
+        """
+        صفر کردن تمام آمار
+        """
+        for metrics in self._metrics.values():
+            metrics.reset()
+        self.started_at = time.time()
+
+    def top(self, limit: int = 10, kind: Optional[str] = None) -> List[HandlerMetrics]:
+        """
+        هندلرهای پرهزینه بر اساس مجموع زمان اجرا
+
+        Args:
+            limit: تعداد
+            kind: فیلتر نوع (اختیاری)
+
+        Returns:
+            List[HandlerMetrics]: آمار هندلرها
+        """
+        items = [m for m in self._metrics.values() if m.calls and (kind is None or m.kind == kind)]
+        items.sort(key=lambda m: m.total_time, reverse=True)
+        return items[:limit]
+
+    def plugin_totals(self) -> Dict[str, Dict[str, float]]:
+        """
+        مجموع آمار به ازای هر پلاگین
+
+        Returns:
+            Dict[str, Dict[str, float]]: آمار هر پلاگین
+        """
+        totals: Dict[str, Dict[str, float]] = {}
+        for metrics in self._metrics.values():
+            if metrics.kind == HandlerKind.MIDDLEWARE:
+                continue
+            plugin = totals.setdefault(metrics.plugin, {'calls': 0, 'errors': 0, 'total_time': 0.0})
+            plugin['calls'] += metrics.calls
+            plugin['errors'] += metrics.errors
+            plugin['total_time'] += metrics.total_time
+        return totals
+
+    def collect_gauges(self) -> Dict[str, float]:
+        """
+        جمع‌آوری مقادیر لحظه‌ای از توابع ثبت شده
+
+        Returns:
+            Dict[str, float]: نام متریک و مقدار
+        """
+        gauges = {}
+        for name, callback in list(self._collectors.items()):
+            try:
+                values = callback() or {}
+            except Exception as e:
+                logger.error(f"خطا در جمع‌آوری آمار {name}: {str(e)}")
+                continue
+            for key, value in values.items():
+                if isinstance(value, bool) or not isinstance(value, (int, float)):
+                    continue
+                gauges[f"selfbot_{name}_{key}"] = value
+        return gauges
+
+    def snapshot(self) -> Dict[str, Any]:
+        """
+        تهیه‌ی تصویر قابل سریال‌سازی از آمار
+
+        Returns:
+            Dict[str, Any]: آمار هندلرها و مقادیر لحظه‌ای
+        """
+        return {
+            'timestamp': time.time(),
+            'handlers': [
+                [m.plugin, m.handler, m.kind, m.calls, m.errors, m.total_time, list(m.buckets)]
+                for m in list(self._metrics.values())
+            ],
+            'gauges': self.collect_gauges(),
+        }
+
+    def render_prometheus(self, instance: Optional[str] = None) -> str:
+        """
+        تولید خروجی با فرمت متنی Prometheus برای همین پردازه
+
+        Args:
+            instance: نام پردازه (پیش‌فرض default_instance)
+
+        Returns:
+            str: متن متریک‌ها
+        """
+        return render_prometheus({instance or default_instance(): self.snapshot()})
+
+    async def export_to_redis(self, redis_manager: Any, instance: Optional[str] = None) -> bool:
+        """
+        ذخیره‌ی آمار در Redis برای سرور API
+
+        Args:
+            redis_manager: نمونه RedisManager
+            instance: نام پردازه (پیش‌فرض default_instance)
+
+        Returns:
+            bool: وضعیت ذخیره‌سازی
+        """
+        return await redis_manager.hset(REDIS_METRICS_KEY, instance or default_instance(), self.snapshot())
+
+    async def run_exporter(self, redis_manager: Any, instance: Optional[str] = None,
+                           interval: float = 15.0) -> None:
+        """
+        ذخیره‌ی دوره‌ای آمار در Redis
+
+        Args:
+            redis_manager: نمونه RedisManager
+            instance: نام پردازه (پیش‌فرض default_instance)
+            interval: فاصله‌ی ذخیره‌سازی (ثانیه)
+        """
+        instance = instance or default_instance()
+        while True:
+            try:
+                await self.export_to_redis(redis_manager, instance)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"خطا در ذخیره‌ی متریک‌ها در Redis: {str(e)}")
+            await asyncio.sleep(interval)
+
+
+def render_prometheus(snapshots: Dict[str, Dict[str, Any]]) -> str:
+    """
+    تولید خروجی Prometheus از آمار یک یا چند پردازه
+
+    Args:
+        snapshots: آمار هر پردازه (خروجی MetricsRegistry.snapshot)
+
+    Returns:
+        str: متن متریک‌ها
+    """
+    rows = []
+    gauges: Dict[str, List[Tuple[str, float]]] = {}
+    for instance, snapshot in snapshots.items():
+        for plugin, handler, kind, calls, errors, total_time, buckets in snapshot.get('handlers', []):
+            labels = (f'instance="{_escape(instance)}",plugin="{_escape(plugin)}",'
+                      f'handler="{_escape(handler)}",kind="{_escape(kind)}"')
+            rows.append((labels, calls, errors, total_time, buckets))
+        for name, value in snapshot.get('gauges', {}).items():
+            gauges.setdefault(name, []).append((instance, value))
+
+    lines = [
+        "# HELP selfbot_handler_calls_total تعداد فراخوانی هندلرها",
+        "# TYPE selfbot_handler_calls_total counter",
+    ]
+    lines += [f"selfbot_handler_calls_total{{{labels}}} {calls}" for labels, calls, _, _, _ in rows]
+
+    lines += [
+        "# HELP selfbot_handler_errors_total تعداد خطاهای هندلرها",
+        "# TYPE selfbot_handler_errors_total counter",
+    ]
+    lines += [f"selfbot_handler_errors_total{{{labels}}} {errors}" for labels, _, errors, _, _ in rows]
+
+    lines += [
+        "# HELP selfbot_handler_latency_seconds زمان اجرای هندلرها",
+        "# TYPE selfbot_handler_latency_seconds histogram",
+    ]
+    for labels, calls, _, total_time, buckets in rows:
+        cumulative = 0
+        for bound, count in zip(LATENCY_BUCKETS, buckets):
+            cumulative += count
+            lines.append(f'selfbot_handler_latency_seconds_bucket{{{labels},le="{bound}"}} {cumulative}')
+        lines.append(f'selfbot_handler_latency_seconds_bucket{{{labels},le="+Inf"}} {calls}')
+        lines.append(f"selfbot_handler_latency_seconds_sum{{{labels}}} {total_time:.6f}")
+        lines.append(f"selfbot_handler_latency_seconds_count{{{labels}}} {calls}")
+
+    for name, values in gauges.items():
+        lines.append(f"# TYPE {name} gauge")
+        lines += [f'{name}{{instance="{_escape(instance)}"}} {value}' for instance, value in values]
+
+    return "\n".join(lines) + "\n"
+
+
+async def load_exported_snapshots(redis_manager: Any, max_age: float = 60.0) -> Dict[str, Dict[str, Any]]:
+    """
+    خواندن آمار ذخیره شده‌ی پردازه‌های ربات از Redis
+
+    Args:
+        redis_manager: نمونه RedisManager
+        max_age: حداکثر عمر قابل قبول آمار (ثانیه)
+
+    Returns:
+        Dict[str, Dict[str, Any]]: آمار هر پردازه
+    """
+    snapshots = await redis_manager.hgetall(REDIS_METRICS_KEY)
+    now = time.time()
+    fresh = {}
+    for instance, snapshot in snapshots.items():
+        if isinstance(snapshot, (str, bytes)):
+            try:
+                snapshot = json.loads(snapshot)
+            except ValueError:
+                continue
+        if isinstance(instance, bytes):
+            instance = instance.decode()
+        if isinstance(snapshot, dict) and now - snapshot.get('timestamp', 0) <= max_age:
+            fresh[instance] = snapshot
+    return fresh
+
+
+def get_metrics() -> MetricsRegistry:
+    """
+    دریافت نمونه مخزن آمار
+
+    Returns:
+        MetricsRegistry: مخزن آمار
+    """
+    return MetricsRegistry()
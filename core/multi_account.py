@@ -0,0 +1,316 @@
+"""
+اجرای چند حساب تلگرام در یک پردازه با پلاگین‌ها و اتصال‌های مشترک
+
+تمام حساب‌ها روی یک حلقه‌ی رویداد اجرا می‌شوند و از یک EventHandler، یک مدیریت
+پلاگین و یک استخر دیتابیس و Redis استفاده می‌کنند. بروزرسانی هر کلاینت با شناسه‌ی
+حساب برچسب می‌خورد (core.account_context) تا پلاگین‌ها وضعیت هر حساب را جدا نگه دارند.
+"""
+import asyncio
+import logging
+import os
+import random
+import time
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional
+
+from core.account_context import get_current_account
+from core.client import ClientType, TelegramClient, TelegramClientManager
+from core.event_handler import EventHandler
+from core.metrics import get_metrics
+
+logger = logging.getLogger(__name__)
+
+
+class AccountStatus:
+    """
+    وضعیت‌های اتصال یک حساب
+    """
+    PENDING = "pending"
+    CONNECTING = "connecting"
+    CONNECTED = "connected"
+    FAILED = "failed"
+    STOPPED = "stopped"
+
+
+@dataclass
+class AccountSession:
+    """
+    یک حساب در اجرای چند حسابی
+    """
+    account_id: str
+    phone_number: str
+    client_type: str = ClientType.PYROGRAM
+    client: Optional[TelegramClient] = None
+    status: str = AccountStatus.PENDING
+    attempts: int = 0
+    error: Optional[str] = None
+    connected_at: Optional[float] = None
+    connect_time: float = 0.0
+
+    def to_dict(self) -> Dict[str, Any]:
+        """
+        تبدیل به دیکشنری
+
+        Returns:
+            Dict[str, Any]: دیکشنری
+        """
+        return {
+            'account_id': self.account_id,
+            'phone_number': self.phone_number,
+            'client_type': self.client_type,
+            'status': self.status,
+            'attempts': self.attempts,
+            'error': self.error,
+            'connected_at': self.connected_at,
+            'connect_time': self.connect_time,
+        }
+
+
+def parse_accounts(value: Optional[str]) -> List[Dict[str, str]]:
+    """
+    خواندن لیست حساب‌ها از متغیر محیطی
+
+    قالب: "+98912...,+98935...:telethon" (نوع کلاینت پیش‌فرض pyrogram)
+
+    Args:
+        value: مقدار متغیر
+
+    Returns:
+        List[Dict[str, str]]: لیست حساب‌ها (phone_number و client_type)
+    """
+    accounts = []
+    for item in (value or "").split(","):
+        item = item.strip()
+        if not item:
+            continue
+        phone_number, _, client_type = item.partition(":")
+        accounts.append({
+            'phone_number': phone_number.strip(),
+            'client_type': client_type.strip() or ClientType.PYROGRAM,
+        })
+    return accounts
+
+
+class MultiAccountRuntime:
+    """
+    مدیریت اتصال هم‌زمان چند حساب
+    """
+    _instance = None
+
+    def __new__(cls):
+        if cls._instance is None:
+            cls._instance = super(MultiAccountRuntime, cls).__new__(cls)
+            cls._instance.initialize()
+        return cls._instance
+
+    def initialize(self):
+        """
+        مقداردهی اولیه
+        """
+        self.sessions: Dict[str, AccountSession] = {}
+        self.client_manager = TelegramClientManager()
+        self.event_handler = EventHandler()
+
+        # اتصال پلکانی: حداکثر اتصال هم‌زمان و فاصله‌ی شروع دو اتصال
+        self.connect_concurrency = max(1, int(os.getenv("ACCOUNT_CONNECT_CONCURRENCY", "5")))
+        self.connect_interval = float(os.getenv("ACCOUNT_CONNECT_INTERVAL", "0.5"))
+        self.connect_timeout = float(os.getenv("ACCOUNT_CONNECT_TIMEOUT", "60"))
+        self.connect_retries = int(os.getenv("ACCOUNT_CONNECT_RETRIES", "2"))
+
+        get_metrics().register_collector('accounts', self._gauges)
+
+    def add_account(self, phone_number: str, client_type: str = ClientType.PYROGRAM,
+                    api_id: Optional[str] = None, api_hash: Optional[str] = None,
+                    account_id: Optional[str] = None) -> AccountSession:
+        """
+        افزودن یک حساب
+
+        Args:
+            phone_number: شماره تلفن
+            client_type: نوع کلاینت
+            api_id: API ID (پیش‌فرض متغیر محیطی)
+            api_hash: API Hash (پیش‌فرض متغیر محیطی)
+            account_id: شناسه حساب (پیش‌فرض شماره تلفن)
+
+        Returns:
+            AccountSession: حساب
+        """
+        account_id = account_id or phone_number
+        session = self.sessions.get(account_id)
+        if session is not None:
+            return session
+
+        client = self.client_manager.create_client(phone_number, client_type, api_id, api_hash)
+        session = AccountSession(account_id=account_id, phone_number=phone_number,
+                                 client_type=client_type, client=client)
+        self.sessions[account_id] = session
+        return session
+
+    def load_accounts(self, value: Optional[str] = None) -> int:
+        """
+        افزودن حساب‌های تعریف شده در متغیر TELEGRAM_ACCOUNTS
+
+        Args:
+            value: لیست حساب‌ها (پیش‌فرض متغیر محیطی)
+
+        Returns:
+            int: تعداد حساب‌ها
+        """
+        if value is None:
+            value = os.getenv("TELEGRAM_ACCOUNTS", "")
+        for account in parse_accounts(value):
+            self.add_account(account['phone_number'], account['client_type'])
+        return len(self.sessions)
+
+    async def start(self, staggered: bool = True) -> int:
+        """
+        اتصال تمام حساب‌های در انتظار
+
+        در حالت پلکانی هر connect_interval ثانیه حداکثر یک اتصال شروع می‌شود و تعداد
+        اتصال‌های در حال انجام از connect_concurrency بیشتر نمی‌شود، تا راه‌اندازی ده‌ها
+        حساب باعث انبوه درخواست‌های ورود و مسدود شدن حلقه‌ی رویداد نشود.
+
+        Args:
+            staggered: شروع پلکانی اتصال‌ها
+
+        Returns:
+            int: تعداد حساب‌های متصل
+        """
+        pending = [
+            session for session in self.sessions.values()
+            if session.status in (AccountStatus.PENDING, AccountStatus.FAILED, AccountStatus.STOPPED)
+        ]
+        if not pending:
+            return self.connected_count
+
+        slots = asyncio.Semaphore(self.connect_concurrency if staggered else len(pending))
+        tasks = []
+        for index, session in enumerate(pending):
+            await slots.acquire()
+            tasks.append(asyncio.create_task(self._connect(session, slots), name=f"connect_{session.account_id}"))
+            if staggered and self.connect_interval > 0 and index < len(pending) - 1:
+                await asyncio.sleep(self.connect_interval)
+
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+        logger.info(f"{self.connected_count} حساب از {len(self.sessions)} حساب متصل شد")
+        return self.connected_count
+
+    async def _connect(self, session: AccountSession, slots: asyncio.Semaphore) -> bool:
+        """
+        اتصال یک حساب با تلاش مجدد
+
+        Args:
+            session: حساب
+            slots: سمافور اتصال‌های هم‌زمان (پس از پایان آزاد می‌شود)
+
+        Returns:
+            bool: وضعیت اتصال
+        """
+        try:
+            for attempt in range(self.connect_retries + 1):
+                session.status = AccountStatus.CONNECTING
+                session.attempts += 1
+                started = time.monotonic()
+                try:
+                    connected = await asyncio.wait_for(session.client.connect(), self.connect_timeout)
+                    session.error = None if connected else "connect failed"
+                except asyncio.TimeoutError:
+                    connected = False
+                    session.error = "timeout"
+                except Exception as e:
+                    connected = False
+                    session.error = str(e)
+                session.connect_time = time.monotonic() - started
+
+                if connected:
+                    session.status = AccountStatus.CONNECTED
+                    session.connected_at = time.time()
+                    self.event_handler.add_client(session.account_id, session.client)
+                    logger.info(f"حساب {session.account_id} در {session.connect_time:.2f} ثانیه متصل شد")
+                    return True
+
+                if attempt < self.connect_retries:
+                    await asyncio.sleep(min(30.0, 2 ** attempt) + random.random())
+
+            session.status = AccountStatus.FAILED
+            logger.error(f"خطا در اتصال حساب {session.account_id}: {session.error}")
+            return False
+        finally:
+            slots.release()
+
+    async def stop_account(self, account_id: str) -> bool:
+        """
+        قطع اتصال یک حساب
+
+        Args:
+            account_id: شناسه حساب
+
+        Returns:
+            bool: وضعیت قطع اتصال
+        """
+        session = self.sessions.get(account_id)
+        if session is None:
+            return False
+
+        self.event_handler.remove_client(account_id)
+        if session.status == AccountStatus.CONNECTED:
+            await session.client.disconnect()
+        session.status = AccountStatus.STOPPED
+        return True
+
+    async def stop(self) -> None:
+        """
+        قطع اتصال تمام حساب‌ها
+        """
+        await asyncio.gather(
+            *(self.stop_account(account_id) for account_id in list(self.sessions)),
+            return_exceptions=True
+        )
+
+    def get_client(self, account_id: Optional[str] = None) -> Optional[TelegramClient]:
+        """
+        دریافت کلاینت یک حساب
+
+        Args:
+            account_id: شناسه حساب (پیش‌فرض حساب بروزرسانی در حال پردازش)
+
+        Returns:
+            Optional[TelegramClient]: کلاینت یا None
+        """
+        if account_id is None:
+            account_id = get_current_account()
+        session = self.sessions.get(account_id)
+        return session.client if session is not None else None
+
+    @property
+    def connected_count(self) -> int:
+        """تعداد حساب‌های متصل"""
+        return sum(1 for session in self.sessions.values() if session.status == AccountStatus.CONNECTED)
+
+    def _gauges(self) -> Dict[str, int]:
+        """
+        مقادیر لحظه‌ای برای /metrics
+
+        Returns:
+            Dict[str, int]: تعداد حساب‌ها به تفکیک وضعیت
+        """
+        gauges = {'total': len(self.sessions)}
+        for session in self.sessions.values():
+            gauges[session.status] = gauges.get(session.status, 0) + 1
+        return gauges
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        دریافت وضعیت حساب‌ها
+
+        Returns:
+            Dict[str, Any]: آمار
+        """
+        return {
+            'accounts': len(self.sessions),
+            'connected': self.connected_count,
+            'connect_concurrency': self.connect_concurrency,
+            'connect_interval': self.connect_interval,
+            'sessions': [session.to_dict() for session in self.sessions.values()],
+        }
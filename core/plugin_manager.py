@@ -5,21 +5,16 @@ import os
 import sys
 import importlib
 import importlib.util
+import inspect
 import logging
 import json
 import yaml
 from typing import Any, Dict, List, Optional, Callable
 from dataclasses import dataclass, field, asdict
 
-# تنظیم سیستم لاگینگ
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.FileHandler("data/logs/plugin_manager.log"),
-        logging.StreamHandler()
-    ]
-)
+from core.command_dispatcher import get_command_dispatcher
+from core.metrics import HandlerKind, get_metrics
+
 logger = logging.getLogger(__name__)
 
 
@@ -258,9 +253,18 @@ class PluginManager:
                 if hasattr(module, 'commands'):
                     for command in module.commands:
                         cmd_name = command['name']
+                        handler = command['handler']
+                        # اندازه‌گیری زمان اجرا و خطاهای دستور به نام پلاگین
+                        if inspect.iscoroutinefunction(handler):
+                            handler = get_metrics().instrument(handler, plugin_name, cmd_name, HandlerKind.COMMAND)
+                        if not get_command_dispatcher().register(
+                            cmd_name, handler, plugin_name, command.get('aliases'), command.get('prefixes'),
+                            command.get('description', ''), command.get('usage', '')
+                        ):
+                            continue
                         self.commands[cmd_name] = {
                             'plugin': plugin_name,
-                            'handler': command['handler'],
+                            'handler': handler,
                             'description': command.get('description', ''),
                             'usage': command.get('usage', ''),
                             'category': plugin.category
@@ -306,6 +310,7 @@ class PluginManager:
 
             for cmd_name in commands_to_remove:
                 del self.commands[cmd_name]
+            get_command_dispatcher().unregister_plugin(plugin_name)
 
             # حذف ماژول از لیست بارگذاری شده
             if plugin.module_name in self.loaded_modules:
@@ -426,14 +431,31 @@ class PluginManager:
         دریافت هندلر یک دستور
 
         Args:
-            command_name: نام دستور
+            command_name: نام یا نام مستعار دستور
 
         Returns:
             Optional[Callable]: هندلر دستور یا None
         """
-        if command_name in self.commands:
-            return self.commands[command_name]['handler']
-        return None
+        entry = get_command_dispatcher().get(command_name)
+        return entry.handler if entry is not None else None
+
+    def get_performance_stats(self) -> Dict[str, Dict[str, float]]:
+        """
+        آمار اجرای هندلرها و دستورات به ازای هر پلاگین
+
+        Returns:
+            Dict[str, Dict[str, float]]: تعداد فراخوانی، خطا و میانگین زمان اجرای هر پلاگین
+        """
+        stats = {}
+        for plugin_name, totals in get_metrics().plugin_totals().items():
+            calls = totals['calls']
+            stats[plugin_name] = {
+                'calls': calls,
+                'errors': totals['errors'],
+                'total_time': totals['total_time'],
+                'avg_time': totals['total_time'] / calls if calls else 0.0,
+            }
+        return stats
 
     def list_commands(self, category: Optional[str] = None) -> List[Dict[str, Any]]:
         """
@@ -0,0 +1,172 @@
+"""
+اثر انگشت پایدار کوئری‌ها برای کلیدهای کش
+
+کلید کش باید در تمام پردازه‌ها (سلف بات و سرور API) و پس از راه‌اندازی مجدد یکسان
+باشد، پس به‌جای hash() پایتون که در هر پردازه تصادفی است، کوئری به شکل استاندارد
+(فاصله‌ها و حروف خارج از رشته‌ها) و پارامترها با نوعشان کدگذاری و با blake2b خلاصه می‌شوند.
+"""
+import hashlib
+import math
+from datetime import date, datetime, time, timedelta
+from decimal import Decimal
+from typing import Any, Dict, List, Optional
+from uuid import UUID
+
+# طول خلاصه (بایت) - 16 بایت برای جلوگیری از برخورد در عمل کافی است
+DIGEST_SIZE = 16
+
+# نسخه‌ی قالب کدگذاری؛ با تغییر قالب، کلیدهای قدیمی خودبه‌خود استفاده نمی‌شوند
+FINGERPRINT_VERSION = "1"
+
+
+def normalize_query(query: str) -> str:
+    """
+    استانداردسازی متن کوئری
+
+    فاصله‌های پشت سر هم به یک فاصله تبدیل و حروف خارج از کوتیشن کوچک می‌شوند.
+    رشته‌های '...' و شناسه‌های "..." (که در PostgreSQL به بزرگی و کوچکی حروف
+    حساس‌اند) دست نخورده باقی می‌مانند.
+
+    Args:
+        query: کوئری SQL
+
+    Returns:
+        str: کوئری استاندارد
+    """
+    parts: List[str] = []
+    quote: Optional[str] = None
+    pending_space = False
+
+    for char in query.strip().rstrip(";").rstrip():
+        if quote is not None:
+            parts.append(char)
+            if char == quote:
+                quote = None
+            continue
+
+        if char.isspace():
+            pending_space = True
+            continue
+
+        if pending_space:
+            # فاصله‌ی کنار پرانتز و کاما معنایی ندارد
+            if parts and parts[-1] not in "(," and char not in "),":
+                parts.append(" ")
+            pending_space = False
+
+        if char in ("'", '"'):
+            quote = char
+            parts.append(char)
+        else:
+            parts.append(char.lower())
+
+    return "".join(parts)
+
+
+def _encode(value: Any, out: List[str]) -> None:
+    """
+    کدگذاری یک پارامتر همراه با نوع آن
+
+    Args:
+        value: مقدار
+        out: لیست خروجی
+    """
+    # ترتیب بررسی مهم است: bool زیرکلاس int و datetime زیرکلاس date است
+    if value is None:
+        out.append("n;")
+    elif isinstance(value, bool):
+        out.append("b1;" if value else "b0;")
+    elif isinstance(value, int):
+        out.append(f"i{value};")
+    elif isinstance(value, float):
+        out.append(f"f{value!r};" if math.isfinite(value) else f"f{str(value)};")
+    elif isinstance(value, Decimal):
+        out.append(f"D{value};")
+    elif isinstance(value, str):
+        out.append(f"s{len(value)}:{value}")
+    elif isinstance(value, (bytes, bytearray, memoryview)):
+        out.append(f"y{bytes(value).hex()};")
+    elif isinstance(value, datetime):
+        out.append(f"t{value.isoformat()};")
+    elif isinstance(value, date):
+        out.append(f"d{value.isoformat()};")
+    elif isinstance(value, time):
+        out.append(f"T{value.isoformat()};")
+    elif isinstance(value, timedelta):
+        out.append(f"r{value.total_seconds()!r};")
+    elif isinstance(value, UUID):
+        out.append(f"u{value.hex};")
+    elif isinstance(value, dict):
+        out.append(f"m{len(value)}[")
+        for key in sorted(value, key=str):
+            _encode(str(key), out)
+            _encode(value[key], out)
+        out.append("]")
+    elif isinstance(value, (list, tuple)):
+        out.append(f"l{len(value)}[")
+        for item in value:
+            _encode(item, out)
+        out.append("]")
+    elif isinstance(value, (set, frozenset)):
+        items = sorted(encode_params(item) for item in value)
+        out.append(f"S{len(items)}[{''.join(items)}]")
+    else:
+        text = str(value)
+        out.append(f"o{type(value).__name__}:{len(text)}:{text}")
+
+
+def encode_params(params: Any) -> str:
+    """
+    کدگذاری پارامترهای کوئری با نوع آن‌ها
+
+    برخلاف json.dumps، مقدار 1 و "1" و True و 1.0 کدهای متفاوت دارند و نوع‌هایی مثل
+    datetime و Decimal بدون خطا کدگذاری می‌شوند.
+
+    Args:
+        params: پارامترها (tuple، list، dict یا None)
+
+    Returns:
+        str: رشته‌ی کدگذاری شده
+    """
+    out: List[str] = []
+    _encode(params, out)
+    return "".join(out)
+
+
+def query_fingerprint(query: str, params: Any = None) -> str:
+    """
+    محاسبه‌ی اثر انگشت پایدار کوئری و پارامترها
+
+    Args:
+        query: کوئری SQL
+        params: پارامترهای کوئری
+
+    Returns:
+        str: خلاصه‌ی هگزادسیمال
+    """
+    digest = hashlib.blake2b(digest_size=DIGEST_SIZE)
+    digest.update(FINGERPRINT_VERSION.encode())
+    digest.update(b"\x00")
+    digest.update(normalize_query(query).encode("utf-8"))
+    digest.update(b"\x00")
+    digest.update(encode_params(params).encode("utf-8", "surrogatepass"))
+    return digest.hexdigest()
+
+
+def explain_fingerprint(query: str, params: Any = None) -> Dict[str, str]:
+    """
+    اجزای اثر انگشت برای اشکال‌زدایی
+
+    Args:
+        query: کوئری SQL
+        params: پارامترهای کوئری
+
+    Returns:
+        Dict[str, str]: کوئری استاندارد، پارامترهای کدگذاری شده و خلاصه
+    """
+    return {
+        'version': FINGERPRINT_VERSION,
+        'query': normalize_query(query),
+        'params': encode_params(params),
+        'fingerprint': query_fingerprint(query, params),
+    }
@@ -0,0 +1,239 @@
+"""
+محدودکننده‌ی نرخ بر پایه‌ی الگوریتم GCRA (معادل سطل توکن) با حافظه‌ی ثابت برای هر کلید
+"""
+import logging
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class RateLimitKey:
+    """
+    حالت‌های کلیدگذاری محدودیت نرخ
+    """
+    USER = "user"  # محدودیت برای هر کاربر
+    CHAT = "chat"  # محدودیت برای هر چت
+    USER_CHAT = "user_chat"  # محدودیت برای هر کاربر در هر چت
+
+    ALL = (USER, CHAT, USER_CHAT)
+
+
+class GCRALimiter:
+    """
+    محدودکننده‌ی نرخ درون‌پردازه‌ای
+
+    برای هر کلید فقط زمان نظری رسیدن درخواست بعدی (TAT) نگهداری می‌شود. کلیدهایی که
+    TAT آن‌ها گذشته باشد معادل کلید تازه هستند و بدون تغییر رفتار حذف می‌شوند؛
+    علاوه بر آن تعداد کلیدها به max_keys محدود است (LRU).
+    """
+
+    def __init__(self, rate: int, period: float, burst: Optional[int] = None, max_keys: int = 10000):
+        """
+        مقداردهی اولیه
+
+        Args:
+            rate: تعداد درخواست مجاز
+            period: بازه‌ی زمانی (ثانیه)
+            burst: حداکثر درخواست پشت سر هم (پیش‌فرض برابر rate)
+            max_keys: حداکثر تعداد کلیدهای نگهداری شده
+        """
+        if rate <= 0 or period <= 0:
+            raise ValueError("rate و period باید مثبت باشند")
+
+        self.rate = rate
+        self.period = float(period)
+        self.burst = burst or rate
+        self.max_keys = max_keys
+
+        # فاصله‌ی بین دو درخواست و تحمل انفجار درخواست‌ها
+        self.emission_interval = self.period / self.rate
+        self.tolerance = self.emission_interval * (self.burst - 1)
+
+        self._tat: "OrderedDict[Hashable, float]" = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._tat)
+
+    def allow(self, key: Hashable, now: Optional[float] = None) -> bool:
+        """
+        بررسی و ثبت یک درخواست
+
+        Args:
+            key: کلید محدودیت
+            now: زمان جاری (برای تست)
+
+        Returns:
+            bool: آیا درخواست مجاز است
+        """
+        if now is None:
+            now = time.monotonic()
+
+        self._evict(now)
+
+        tat = self._tat.get(key, now)
+        if tat < now:
+            tat = now
+
+        if tat - now > self.tolerance:
+            self._tat.move_to_end(key)
+            return False
+
+        self._tat[key] = tat + self.emission_interval
+        self._tat.move_to_end(key)
+        return True
+
+    def retry_after(self, key: Hashable, now: Optional[float] = None) -> float:
+        """
+        زمان باقی‌مانده تا مجاز شدن درخواست بعدی
+
+        Args:
+            key: کلید محدودیت
+            now: زمان جاری (برای تست)
+
+        Returns:
+            float: زمان انتظار (ثانیه)
+        """
+        if now is None:
+            now = time.monotonic()
+        tat = self._tat.get(key)
+        if tat is None:
+            return 0.0
+        return max(0.0, tat - self.tolerance - now)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        دریافت آمار محدودکننده
+
+        Returns:
+            Dict[str, Any]: آمار
+        """
+        return {
+            'backend': 'memory',
+            'rate': self.rate,
+            'period': self.period,
+            'burst': self.burst,
+            'tracked_keys': len(self._tat),
+            'max_keys': self.max_keys,
+        }
+
+    def _evict(self, now: float) -> None:
+        """
+        حذف کلیدهای بیکار از ابتدای LRU
+
+        Args:
+            now: زمان جاری
+        """
+        tat = self._tat
+        while tat:
+            key, oldest = next(iter(tat.items()))
+            if oldest > now and len(tat) < self.max_keys:
+                break
+            del tat[key]
+
+
+# اسکریپت GCRA اتمیک؛ زمان از خود Redis خوانده می‌شود تا پردازه‌ها ساعت مشترک داشته باشند
+_GCRA_SCRIPT = """
+local interval = tonumber(ARGV[1])
+local tolerance = tonumber(ARGV[2])
+local t = redis.call('TIME')
+local now = tonumber(t[1]) * 1000000 + tonumber(t[2])
+local tat = tonumber(redis.call('GET', KEYS[1]) or now)
+if tat < now then
+    tat = now
+end
+if tat - now > tolerance then
+    return 0
+end
+local new_tat = tat + interval
+redis.call('SET', KEYS[1], new_tat, 'PX', math.ceil((new_tat - now) / 1000))
+return 1
+"""
+
+
+class RedisGCRALimiter:
+    """
+    محدودکننده‌ی نرخ مشترک بین چند پردازه با استفاده از Redis
+
+    هر کلید فقط یک عدد (TAT به میکروثانیه) با انقضای خودکار است. در صورت خطای Redis
+    از محدودکننده‌ی درون‌پردازه‌ای استفاده می‌شود.
+    """
+
+    def __init__(self, redis_manager: Any, rate: int, period: float, burst: Optional[int] = None,
+                 namespace: str = "ratelimit", max_keys: int = 10000):
+        """
+        مقداردهی اولیه
+
+        Args:
+            redis_manager: نمونه RedisManager متصل
+            rate: تعداد درخواست مجاز
+            period: بازه‌ی زمانی (ثانیه)
+            burst: حداکثر درخواست پشت سر هم (پیش‌فرض برابر rate)
+            namespace: پیشوند کلیدهای محدودیت
+            max_keys: حداکثر تعداد کلیدهای محدودکننده‌ی جایگزین
+        """
+        self.redis_manager = redis_manager
+        self.namespace = namespace
+        self.fallback = GCRALimiter(rate, period, burst, max_keys)
+        self._interval_us = int(self.fallback.emission_interval * 1_000_000)
+        self._tolerance_us = int(self.fallback.tolerance * 1_000_000)
+        self._script = None
+
+    async def allow(self, key: Hashable) -> bool:
+        """
+        بررسی و ثبت یک درخواست
+
+        Args:
+            key: کلید محدودیت
+
+        Returns:
+            bool: آیا درخواست مجاز است
+        """
+        client = getattr(self.redis_manager, 'redis', None)
+        if client is None:
+            return self.fallback.allow(key)
+
+        try:
+            if self._script is None:
+                self._script = client.register_script(_GCRA_SCRIPT)
+            full_key = self.redis_manager._build_key(f"{self.namespace}:{key}")
+            result = await self._script(keys=[full_key], args=[self._interval_us, self._tolerance_us])
+            return bool(int(result))
+        except Exception as e:
+            logger.error(f"خطا در بررسی محدودیت نرخ در Redis: {str(e)}")
+            return self.fallback.allow(key)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        دریافت آمار محدودکننده
+
+        Returns:
+            Dict[str, Any]: آمار
+        """
+        stats = self.fallback.get_stats()
+        stats['backend'] = 'redis'
+        stats['namespace'] = self.namespace
+        return stats
+
+
+def build_rate_limit_key(key_by: str, user_id: Optional[int], chat_id: Optional[int]) -> Optional[str]:
+    """
+    ساخت کلید محدودیت بر اساس حالت کلیدگذاری
+
+    Args:
+        key_by: حالت کلیدگذاری (user, chat, user_chat)
+        user_id: شناسه کاربر
+        chat_id: شناسه چت
+
+    Returns:
+        Optional[str]: کلید یا None در صورت نبود شناسه‌ی لازم
+    """
+    if key_by == RateLimitKey.USER:
+        return f"u{user_id}" if user_id else None
+    if key_by == RateLimitKey.CHAT:
+        return f"c{chat_id}" if chat_id else None
+    if user_id and chat_id:
+        return f"u{user_id}:c{chat_id}"
+    return None
+
@@ -0,0 +1,218 @@
+"""
+سریال‌سازی مقادیر Redis با قالب و فشرده‌سازی قابل انتخاب
+
+مقادیر ساختاریافته (دیکشنری، لیست و ...) با یکی از قالب‌های json (با orjson در صورت
+نصب بودن) یا msgpack سریال می‌شوند و در صورت بزرگ‌تر بودن از آستانه با zstd یا lz4
+فشرده می‌شوند. مقادیر msgpack یا فشرده یک سرآیند چهار بایتی دارند:
+
+    b"\\x00R" + قالب (b"j" یا b"m") + فشرده‌سازی (b"-"، b"z" یا b"l")
+
+json فشرده نشده بدون سرآیند و هم‌قالب مقادیر قبلی ذخیره می‌شود، پس مقادیر قدیمی و
+نمونه‌های قدیمی برنامه همچنان آن را می‌خوانند. خواندن مستقیماً از bytes انجام می‌شود.
+"""
+import json
+import logging
+import os
+from datetime import date, datetime, time
+from typing import Any, Optional, Union
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+try:
+    import lz4.frame as lz4_frame
+except ImportError:
+    lz4_frame = None
+
+logger = logging.getLogger(__name__)
+
+# سرآیند مقادیر دارای قالب یا فشرده‌سازی غیرپیش‌فرض
+MAGIC = b"\x00R"
+HEADER_SIZE = len(MAGIC) + 2
+
+CODEC_JSON = "json"
+CODEC_MSGPACK = "msgpack"
+COMPRESSION_NONE = "none"
+COMPRESSION_ZSTD = "zstd"
+COMPRESSION_LZ4 = "lz4"
+
+_CODEC_TAGS = {CODEC_JSON: b"j", CODEC_MSGPACK: b"m"}
+_COMPRESSION_TAGS = {COMPRESSION_NONE: b"-", COMPRESSION_ZSTD: b"z", COMPRESSION_LZ4: b"l"}
+_CODEC_NAMES = {tag[0]: name for name, tag in _CODEC_TAGS.items()}
+_COMPRESSION_NAMES = {tag[0]: name for name, tag in _COMPRESSION_TAGS.items()}
+
+
+def _default(value: Any) -> Any:
+    """
+    تبدیل انواع غیر json (تاریخ، Decimal، UUID و ...) به رشته
+
+    Args:
+        value: مقدار
+
+    Returns:
+        Any: مقدار قابل سریال‌سازی
+    """
+    if isinstance(value, (datetime, date, time)):
+        return value.isoformat()
+    return str(value)
+
+
+def _available(codec: str, compression: str) -> bool:
+    """
+    بررسی نصب بودن کتابخانه‌ی قالب و فشرده‌سازی
+
+    Args:
+        codec: نام قالب
+        compression: نام فشرده‌سازی
+
+    Returns:
+        bool: آیا هر دو قابل استفاده‌اند
+    """
+    if codec == CODEC_MSGPACK and msgpack is None:
+        return False
+    if compression == COMPRESSION_ZSTD and zstandard is None:
+        return False
+    if compression == COMPRESSION_LZ4 and lz4_frame is None:
+        return False
+    return codec in _CODEC_TAGS and compression in _COMPRESSION_TAGS
+
+
+class RedisCodec:
+    """
+    تبدیل مقادیر ساختاریافته به bytes برای Redis و برعکس
+    """
+
+    def __init__(self, codec: Optional[str] = None, compression: Optional[str] = None,
+                 threshold: Optional[int] = None):
+        """
+        مقداردهی اولیه
+
+        Args:
+            codec: قالب سریال‌سازی (json یا msgpack)
+            compression: فشرده‌سازی (none، zstd یا lz4)
+            threshold: حداقل اندازه‌ی مقدار (بایت) برای فشرده‌سازی
+        """
+        codec = (codec or os.getenv("REDIS_CODEC", CODEC_JSON)).lower()
+        compression = (compression or os.getenv("REDIS_COMPRESSION", COMPRESSION_NONE)).lower()
+        self.threshold = int(os.getenv("REDIS_COMPRESS_THRESHOLD", "4096")) if threshold is None else threshold
+
+        if not _available(codec, COMPRESSION_NONE):
+            logger.warning(f"قالب {codec} برای Redis در دسترس نیست؛ از json استفاده می‌شود")
+            codec = CODEC_JSON
+        if not _available(codec, compression):
+            logger.warning(f"فشرده‌سازی {compression} برای Redis در دسترس نیست؛ مقادیر فشرده نمی‌شوند")
+            compression = COMPRESSION_NONE
+
+        self.codec = codec
+        self.compression = compression
+        self._zstd_compressor = zstandard.ZstdCompressor(level=3) if compression == COMPRESSION_ZSTD else None
+        self._zstd_decompressor = zstandard.ZstdDecompressor() if zstandard is not None else None
+
+    def encode(self, value: Any) -> bytes:
+        """
+        سریال‌سازی مقدار
+
+        Args:
+            value: مقدار ساختاریافته
+
+        Returns:
+            bytes: مقدار قابل ذخیره در Redis
+        """
+        payload = self._serialize(self.codec, value)
+
+        compression = COMPRESSION_NONE
+        if self.compression != COMPRESSION_NONE and len(payload) >= self.threshold:
+            compressed = self._compress(payload)
+            if len(compressed) < len(payload):
+                payload, compression = compressed, self.compression
+
+        if self.codec == CODEC_JSON and compression == COMPRESSION_NONE:
+            return payload
+        return MAGIC + _CODEC_TAGS[self.codec] + _COMPRESSION_TAGS[compression] + payload
+
+    def decode(self, raw: Union[bytes, str]) -> Any:
+        """
+        خواندن مقدار (دارای سرآیند یا json بدون سرآیند)
+
+        Args:
+            raw: مقدار خوانده شده از Redis
+
+        Returns:
+            Any: مقدار
+
+        Raises:
+            ValueError: در صورت نامعتبر بودن مقدار یا نصب نبودن کتابخانه‌ی لازم
+        """
+        if isinstance(raw, str):
+            return self._deserialize(CODEC_JSON, raw)
+        if not raw.startswith(MAGIC):
+            return self._deserialize(CODEC_JSON, raw)
+
+        codec = _CODEC_NAMES.get(raw[2])
+        compression = _COMPRESSION_NAMES.get(raw[3])
+        if codec is None or compression is None:
+            raise ValueError("سرآیند مقدار Redis نامعتبر است")
+        if not _available(codec, compression):
+            raise ValueError(f"کتابخانه‌ی {codec}/{compression} برای خواندن مقدار Redis نصب نیست")
+
+        payload = memoryview(raw)[HEADER_SIZE:]
+        if compression != COMPRESSION_NONE:
+            payload = self._decompress(compression, payload)
+        return self._deserialize(codec, payload)
+
+    @staticmethod
+    def is_encoded(raw: Any) -> bool:
+        """
+        آیا مقدار سرآیند قالب دارد
+
+        Args:
+            raw: مقدار خوانده شده از Redis
+
+        Returns:
+            bool: True برای مقادیر msgpack یا فشرده
+        """
+        return isinstance(raw, bytes) and raw.startswith(MAGIC)
+
+    @staticmethod
+    def _serialize(codec: str, value: Any) -> bytes:
+        if codec == CODEC_MSGPACK:
+            return msgpack.packb(value, use_bin_type=True, default=_default)
+        if orjson is not None:
+            try:
+                return orjson.dumps(value, default=_default, option=orjson.OPT_NON_STR_KEYS)
+            except TypeError:
+                # اعداد صحیح بزرگ‌تر از 64 بیت و انواع دیگر پشتیبانی نشده در orjson
+                pass
+        return json.dumps(value, ensure_ascii=False, default=_default).encode("utf-8")
+
+    @staticmethod
+    def _deserialize(codec: str, payload: Any) -> Any:
+        if codec == CODEC_MSGPACK:
+            return msgpack.unpackb(payload, raw=False, strict_map_key=False)
+        if orjson is not None:
+            return orjson.loads(payload)
+        if isinstance(payload, memoryview):
+            payload = bytes(payload)
+        return json.loads(payload)
+
+    def _compress(self, payload: bytes) -> bytes:
+        if self.compression == COMPRESSION_ZSTD:
+            return self._zstd_compressor.compress(payload)
+        return lz4_frame.compress(payload)
+
+    def _decompress(self, compression: str, payload: memoryview) -> bytes:
+        if compression == COMPRESSION_ZSTD:
+            return self._zstd_decompressor.decompress(payload)
+        return lz4_frame.decompress(payload)
@@ -1,16 +1,178 @@
 """
 ماژول مدیریت کش Redis برای سلف بات تلگرام
 """
-import json
+import inspect
 import logging
 import asyncio
-from typing import Any, Dict, Optional
+import os
+import time
+import uuid
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Callable, Dict, Iterable, List, Optional, Set
 from datetime import datetime, timedelta
 
 import redis.asyncio as redis
 
+from core.metrics import get_metrics
+from core.redis_codec import RedisCodec
+
 logger = logging.getLogger(__name__)
 
+# ذخیره‌ی یک کلید و ثبت آن در hash تگ‌ها در یک رفت و برگشت
+# KEYS[1]: کلید، KEYS[2..n]: کلیدهای تگ؛ ARGV[1]: مقدار، ARGV[2]: زمان انقضا (0 بدون انقضا)، ARGV[3]: نام فیلد
+# عمر hash هر تگ حداقل برابر طولانی‌ترین عمر کلیدهای آن نگه داشته می‌شود تا بی‌نهایت بزرگ نشود
+SET_TAGGED_SCRIPT = """
+local ttl = tonumber(ARGV[2])
+if ttl > 0 then
+    redis.call('SET', KEYS[1], ARGV[1], 'EX', ttl)
+else
+    redis.call('SET', KEYS[1], ARGV[1])
+end
+for i = 2, #KEYS do
+    local current = redis.call('TTL', KEYS[i])
+    redis.call('HSET', KEYS[i], ARGV[3], '1')
+    if ttl <= 0 then
+        redis.call('PERSIST', KEYS[i])
+    elseif current == -2 or (current >= 0 and current < ttl) then
+        redis.call('EXPIRE', KEYS[i], ttl)
+    end
+end
+return 1
+"""
+
+# حذف تمام کلیدهای ثبت شده در hash تگ‌ها و خود تگ‌ها در یک رفت و برگشت
+# KEYS: کلیدهای تگ؛ ARGV[1]: پیشوند کلیدها (فیلدهای hash بدون پیشوند ذخیره شده‌اند)
+# کلیدها در دسته‌های 500 تایی با UNLINK حذف می‌شوند تا محدودیت unpack در Lua رعایت شود
+DELETE_TAGS_SCRIPT = """
+local deleted = 0
+for _, tag in ipairs(KEYS) do
+    local fields = redis.call('HKEYS', tag)
+    for i = 1, #fields, 500 do
+        local batch = {}
+        for j = i, math.min(i + 499, #fields) do
+            batch[#batch + 1] = ARGV[1] .. fields[j]
+        end
+        deleted = deleted + redis.call('UNLINK', unpack(batch))
+    end
+    redis.call('DEL', tag)
+end
+return deleted
+"""
+
+# آزاد کردن قفل فقط توسط صاحب آن (مقایسه‌ی توکن و حذف به صورت اتمی)
+# KEYS[1]: کلید قفل؛ ARGV[1]: توکن گرفته شده در acquire_lock
+RELEASE_LOCK_SCRIPT = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('DEL', KEYS[1])
+end
+return 0
+"""
+
+
+# فاصله‌ی اولیه و حداکثر تلاش برای اتصال مجدد PubSub (ثانیه)
+PUBSUB_RECONNECT_DELAY = 0.5
+PUBSUB_RECONNECT_MAX_DELAY = 30.0
+
+
+def _text(value: Any) -> str:
+    """
+    تبدیل نام کانال دریافتی به str
+
+    Args:
+        value: نام کانال (bytes یا str)
+
+    Returns:
+        str: نام کانال
+    """
+    return value.decode('utf-8') if isinstance(value, bytes) else value
+
+
+def _expire_seconds(expire: Optional[int]) -> Optional[int]:
+    """
+    زمان انقضا برای آرگومان EX (None یا صفر بدون انقضا، مانند set_tagged)
+
+    Args:
+        expire: زمان انقضا به ثانیه
+
+    Returns:
+        Optional[int]: زمان انقضا یا None
+    """
+    return int(expire) if expire and expire > 0 else None
+
+
+class RedisPipeline:
+    """
+    صف دستورات Redis که در یک رفت و برگشت اجرا می‌شوند
+
+    با RedisManager.pipeline ساخته می‌شود؛ دستورات پیشوند کلید و سریال‌سازی همان
+    متدهای RedisManager را دارند و نتیجه‌ی get ها پس از اجرا تبدیل می‌شود.
+    """
+
+    def __init__(self, manager: "RedisManager", pipeline: Any):
+        """
+        مقداردهی اولیه
+
+        Args:
+            manager: نمونه RedisManager
+            pipeline: pipeline کلاینت redis
+        """
+        self._manager = manager
+        self._pipeline = pipeline
+        self._decoders: List[Optional[Callable[[Any], Any]]] = []
+        self.results: List[Any] = []
+
+    def __len__(self) -> int:
+        return len(self._decoders)
+
+    def _queue(self, command: str, *args: Any, decoder: Optional[Callable[[Any], Any]] = None,
+               **kwargs: Any) -> "RedisPipeline":
+        getattr(self._pipeline, command)(*args, **kwargs)
+        self._decoders.append(decoder)
+        return self
+
+    def set(self, key: str, value: Any, expire: Optional[int] = None) -> "RedisPipeline":
+        """ذخیره مقدار با زمان انقضا (SET ... EX)"""
+        return self._queue('set', self._manager._build_key(key), self._manager._encode(value), ex=_expire_seconds(expire))
+
+    def get(self, key: str, default: Any = None, parse_json: bool = True) -> "RedisPipeline":
+        """دریافت مقدار"""
+        return self._queue('get', self._manager._build_key(key),
+                           decoder=lambda value: self._manager._decode(value, default, parse_json))
+
+    def delete(self, *keys: str) -> "RedisPipeline":
+        """حذف کلیدها"""
+        return self._queue('unlink', *(self._manager._build_key(key) for key in keys))
+
+    def expire(self, key: str, seconds: int) -> "RedisPipeline":
+        """تنظیم زمان انقضا"""
+        return self._queue('expire', self._manager._build_key(key), seconds)
+
+    def incr(self, key: str, amount: int = 1) -> "RedisPipeline":
+        """افزایش مقدار عددی"""
+        return self._queue('incrby', self._manager._build_key(key), amount)
+
+    def hset(self, key: str, field: str, value: Any) -> "RedisPipeline":
+        """ذخیره مقدار در hash"""
+        return self._queue('hset', self._manager._build_key(key), field, self._manager._encode(value))
+
+    def hdel(self, key: str, field: str) -> "RedisPipeline":
+        """حذف فیلد از hash"""
+        return self._queue('hdel', self._manager._build_key(key), field)
+
+    async def execute(self) -> List[Any]:
+        """
+        اجرای دستورات صف شده در یک رفت و برگشت
+
+        Returns:
+            List[Any]: نتیجه‌ی دستورات به ترتیب افزودن
+        """
+        if not self._decoders:
+            return []
+        raw = await self._pipeline.execute()
+        self.results = [decoder(value) if decoder else value for decoder, value in zip(self._decoders, raw)]
+        self._decoders = []
+        return self.results
+
 
 class RedisManager:
     """
@@ -27,7 +189,8 @@ class RedisManager:
         return cls._instance
 
     def __init__(self, host: str = 'localhost', port: int = 6379, db: int = 0,
-                 password: Optional[str] = None, prefix: str = 'selfbot:'):
+                 password: Optional[str] = None, prefix: str = 'selfbot:',
+                 codec: Optional[RedisCodec] = None, max_concurrent_handlers: Optional[int] = None):
         """
         مقداردهی اولیه
 
@@ -37,6 +200,9 @@ class RedisManager:
             db: شماره دیتابیس Redis
             password: رمز عبور Redis (اختیاری)
             prefix: پیشوند کلیدهای Redis
+            codec: سریال‌ساز مقادیر (پیش‌فرض از REDIS_CODEC و REDIS_COMPRESSION)
+            max_concurrent_handlers: حداکثر handler های هم‌زمان پیام‌های اشتراکی
+                (پیش‌فرض از REDIS_PUBSUB_CONCURRENCY)
         """
         # اگر قبلاً مقداردهی شده، خروج
         if hasattr(self, '_initialized') and self._initialized:
@@ -48,10 +214,21 @@ class RedisManager:
         self.db = db
         self.password = password
         self.prefix = prefix
+        self.codec = codec or RedisCodec()
         self.redis = None
         self._pubsub = None
         self._active_subscriptions = {}
+        self._pattern_subscriptions = {}
         self._running_tasks = []
+        self._scripts = {}
+
+        # محدودیت handler های هم‌زمان و آمار تحویل پیام‌های اشتراکی
+        self.max_concurrent_handlers = max_concurrent_handlers or int(os.getenv("REDIS_PUBSUB_CONCURRENCY", "32"))
+        self._handler_slots = asyncio.Semaphore(self.max_concurrent_handlers)
+        self._handler_tasks: Set[asyncio.Task] = set()
+        self._channel_stats: Dict[str, Dict[str, Any]] = {}
+        self._pubsub_stats = {'resubscribes': 0}
+        get_metrics().register_collector('redis_pubsub', self._gauges)
 
     async def connect(self) -> bool:
         """
@@ -90,10 +267,17 @@ class RedisManager:
                 if not task.done():
                     task.cancel()
 
+            # فرصت پایان برای handler های در حال اجرا
+            if self._handler_tasks:
+                await asyncio.wait(list(self._handler_tasks), timeout=5)
+
             # لغو اشتراک‌ها
+            self._active_subscriptions.clear()
+            self._pattern_subscriptions.clear()
             if self._pubsub:
                 await self._pubsub.unsubscribe()
-                await self._pubsub.close()
+                await self._pubsub.punsubscribe()
+                await self._pubsub.aclose()
 
             # بستن اتصال
             if self.redis:
@@ -115,14 +299,72 @@ class RedisManager:
         """
         return f"{self.prefix}{key}"
 
+    def _encode(self, value: Any) -> Any:
+        """
+        سریال‌سازی مقادیر ساختاریافته (رشته و عدد بدون تغییر ذخیره می‌شوند تا incr و
+        خواننده‌های دیگر با آن‌ها کار کنند)
+
+        Args:
+            value: مقدار
+
+        Returns:
+            Any: مقدار قابل ذخیره
+        """
+        if not isinstance(value, (str, bytes, int, float)):
+            return self.codec.encode(value)
+        return value
+
+    def _decode(self, value: Any, default: Any = None, parse_json: bool = True) -> Any:
+        """
+        تبدیل مقدار خوانده شده از Redis بدون تبدیل میانی bytes به str
+
+        Args:
+            value: مقدار خام
+            default: مقدار پیش‌فرض در صورت عدم وجود
+            parse_json: تبدیل json به دیکشنری (مقادیر دارای سرآیند همیشه تبدیل می‌شوند)
+
+        Returns:
+            Any: مقدار تبدیل شده یا مقدار پیش‌فرض
+        """
+        if value is None:
+            return default
+        if self.codec.is_encoded(value):
+            return self.codec.decode(value)
+
+        if parse_json and value:
+            try:
+                return self.codec.decode(value)
+            except ValueError:
+                pass
+
+        # تبدیل از bytes به str
+        if isinstance(value, bytes):
+            value = value.decode('utf-8')
+        return value
+
+    def _script(self, source: str) -> Any:
+        """
+        دریافت اسکریپت Lua ثبت شده (با EVALSHA و بارگذاری خودکار در صورت نبود در سرور)
+
+        Args:
+            source: متن اسکریپت
+
+        Returns:
+            Any: شیء اسکریپت
+        """
+        script = self._scripts.get(source)
+        if script is None:
+            script = self._scripts[source] = self.redis.register_script(source)
+        return script
+
     async def set(self, key: str, value: Any, expire: Optional[int] = None) -> bool:
         """
         ذخیره مقدار در Redis
 
         Args:
             key: کلید
-            value: مقدار (در صورت نیاز به json تبدیل می‌شود)
-            expire: زمان انقضا به ثانیه (اختیاری)
+            value: مقدار (مقادیر ساختاریافته با codec سریال می‌شوند)
+            expire: زمان انقضا به ثانیه (اختیاری، None یا صفر بدون انقضا)
 
         Returns:
             bool: وضعیت عملیات
@@ -132,18 +374,9 @@ class RedisManager:
                 logger.error("اتصال Redis برقرار نیست")
                 return False
 
-            # تبدیل مقادیر پیچیده به json
-            if not isinstance(value, (str, bytes, int, float)):
-                value = json.dumps(value, ensure_ascii=False)
-
-            # ذخیره با پیشوند کلید
+            # ذخیره با پیشوند کلید و زمان انقضا در یک دستور اتمی (SET ... EX)
             full_key = self._build_key(key)
-            await self.redis.set(full_key, value)
-
-            # تنظیم زمان انقضا
-            if expire is not None:
-                await self.redis.expire(full_key, expire)
-
+            await self.redis.set(full_key, self._encode(value), ex=_expire_seconds(expire))
             return True
         except Exception as e:
             logger.error(f"خطا در ذخیره مقدار در Redis: {str(e)}")
@@ -168,23 +401,7 @@ class RedisManager:
 
             # دریافت با پیشوند کلید
             full_key = self._build_key(key)
-            value = await self.redis.get(full_key)
-
-            if value is None:
-                return default
-
-            # تبدیل از bytes به str
-            if isinstance(value, bytes):
-                value = value.decode('utf-8')
-
-            # تبدیل از json در صورت نیاز
-            if parse_json and value:
-                try:
-                    return json.loads(value)
-                except json.JSONDecodeError:
-                    return value
-
-            return value
+            return self._decode(await self.redis.get(full_key), default, parse_json)
         except Exception as e:
             logger.error(f"خطا در دریافت مقدار از Redis: {str(e)}")
             return default
@@ -212,6 +429,167 @@ class RedisManager:
             logger.error(f"خطا در حذف کلید از Redis: {str(e)}")
             return False
 
+    async def mget(self, keys: Iterable[str], default: Any = None, parse_json: bool = True) -> List[Any]:
+        """
+        دریافت چند مقدار در یک رفت و برگشت (MGET)
+
+        Args:
+            keys: کلیدها
+            default: مقدار پیش‌فرض برای کلیدهای موجود نبوده
+            parse_json: تبدیل json به دیکشنری
+
+        Returns:
+            List[Any]: مقادیر به ترتیب کلیدها
+        """
+        keys = list(keys)
+        try:
+            if self.redis is None:
+                logger.error("اتصال Redis برقرار نیست")
+                return [default] * len(keys)
+            if not keys:
+                return []
+
+            values = await self.redis.mget([self._build_key(key) for key in keys])
+            return [self._decode(value, default, parse_json) for value in values]
+        except Exception as e:
+            logger.error(f"خطا در دریافت چند مقدار از Redis: {str(e)}")
+            return [default] * len(keys)
+
+    async def mset_with_ttl(self, mapping: Dict[str, Any], expire: Optional[int] = None) -> bool:
+        """
+        ذخیره چند مقدار با زمان انقضا در یک رفت و برگشت
+
+        Redis دستور MSET با زمان انقضا ندارد؛ برای هر کلید یک SET ... EX در pipeline
+        بدون تراکنش ارسال می‌شود.
+
+        Args:
+            mapping: دیکشنری کلید به مقدار
+            expire: زمان انقضا به ثانیه (None یا صفر بدون انقضا)
+
+        Returns:
+            bool: وضعیت عملیات
+        """
+        try:
+            if self.redis is None:
+                logger.error("اتصال Redis برقرار نیست")
+                return False
+            if not mapping:
+                return True
+
+            if _expire_seconds(expire) is None:
+                await self.redis.mset({self._build_key(key): self._encode(value) for key, value in mapping.items()})
+                return True
+
+            async with self.pipeline() as pipe:
+                for key, value in mapping.items():
+                    pipe.set(key, value, expire)
+            return True
+        except Exception as e:
+            logger.error(f"خطا در ذخیره چند مقدار در Redis: {str(e)}")
+            return False
+
+    async def delete_many(self, keys: Iterable[str]) -> int:
+        """
+        حذف چند کلید در یک رفت و برگشت (UNLINK)
+
+        Args:
+            keys: کلیدها
+
+        Returns:
+            int: تعداد کلیدهای حذف شده (-1 در صورت خطا)
+        """
+        try:
+            if self.redis is None:
+                logger.error("اتصال Redis برقرار نیست")
+                return -1
+
+            full_keys = [self._build_key(key) for key in keys]
+            if not full_keys:
+                return 0
+            return int(await self.redis.unlink(*full_keys))
+        except Exception as e:
+            logger.error(f"خطا در حذف چند کلید از Redis: {str(e)}")
+            return -1
+
+    @asynccontextmanager
+    async def pipeline(self, transaction: bool = False) -> AsyncIterator[RedisPipeline]:
+        """
+        صف کردن چند دستور و اجرای آن‌ها در یک رفت و برگشت هنگام خروج از بلوک
+
+        مثال:
+            async with redis_manager.pipeline() as pipe:
+                pipe.set("a", 1, 60).incr("counter").get("b")
+            a_ok, counter, b = pipe.results
+
+        Args:
+            transaction: اجرای دستورات در MULTI/EXEC
+
+        Yields:
+            RedisPipeline: صف دستورات
+
+        Raises:
+            ConnectionError: در صورت برقرار نبودن اتصال
+        """
+        if self.redis is None:
+            raise ConnectionError("اتصال Redis برقرار نیست")
+
+        async with self.redis.pipeline(transaction=transaction) as raw:
+            pipe = RedisPipeline(self, raw)
+            yield pipe
+            await pipe.execute()
+
+    async def set_tagged(self, key: str, value: Any, expire: Optional[int], *tags: str) -> bool:
+        """
+        ذخیره مقدار و ثبت کلید در hash تگ‌ها به صورت اتمی و در یک رفت و برگشت
+
+        Args:
+            key: کلید
+            value: مقدار (مقادیر ساختاریافته با codec سریال می‌شوند)
+            expire: زمان انقضا به ثانیه (None بدون انقضا)
+            *tags: کلیدهای hash تگ
+
+        Returns:
+            bool: وضعیت عملیات
+        """
+        try:
+            if self.redis is None:
+                logger.error("اتصال Redis برقرار نیست")
+                return False
+
+            await self._script(SET_TAGGED_SCRIPT)(
+                keys=[self._build_key(key), *(self._build_key(tag) for tag in tags)],
+                args=[self._encode(value), int(expire or 0), key]
+            )
+            return True
+        except Exception as e:
+            logger.error(f"خطا در ذخیره مقدار تگ‌دار در Redis: {str(e)}")
+            return False
+
+    async def delete_tags(self, *tags: str) -> int:
+        """
+        حذف تمام کلیدهای ثبت شده در تگ‌ها و خود تگ‌ها در یک رفت و برگشت
+
+        Args:
+            *tags: کلیدهای hash تگ
+
+        Returns:
+            int: تعداد کلیدهای حذف شده (-1 در صورت خطا)
+        """
+        try:
+            if self.redis is None:
+                logger.error("اتصال Redis برقرار نیست")
+                return -1
+            if not tags:
+                return 0
+
+            return int(await self._script(DELETE_TAGS_SCRIPT)(
+                keys=[self._build_key(tag) for tag in tags],
+                args=[self.prefix]
+            ))
+        except Exception as e:
+            logger.error(f"خطا در حذف کلیدهای تگ از Redis: {str(e)}")
+            return -1
+
     async def exists(self, key: str) -> bool:
         """
         بررسی وجود کلید در Redis
@@ -333,7 +711,7 @@ class RedisManager:
         Args:
             key: کلید hash
             field: فیلد hash
-            value: مقدار (در صورت نیاز به json تبدیل می‌شود)
+            value: مقدار (مقادیر ساختاریافته با codec سریال می‌شوند)
 
         Returns:
             bool: وضعیت عملیات
@@ -343,13 +721,9 @@ class RedisManager:
                 logger.error("اتصال Redis برقرار نیست")
                 return False
 
-            # تبدیل مقادیر پیچیده به json
-            if not isinstance(value, (str, bytes, int, float)):
-                value = json.dumps(value, ensure_ascii=False)
-
             # ذخیره با پیشوند کلید
             full_key = self._build_key(key)
-            await self.redis.hset(full_key, field, value)
+            await self.redis.hset(full_key, field, self._encode(value))
             return True
         except Exception as e:
             logger.error(f"خطا در ذخیره مقدار در hash: {str(e)}")
@@ -375,23 +749,7 @@ class RedisManager:
 
             # دریافت با پیشوند کلید
             full_key = self._build_key(key)
-            value = await self.redis.hget(full_key, field)
-
-            if value is None:
-                return default
-
-            # تبدیل از bytes به str
-            if isinstance(value, bytes):
-                value = value.decode('utf-8')
-
-            # تبدیل از json در صورت نیاز
-            if parse_json and value:
-                try:
-                    return json.loads(value)
-                except json.JSONDecodeError:
-                    return value
-
-            return value
+            return self._decode(await self.redis.hget(full_key, field), default, parse_json)
         except Exception as e:
             logger.error(f"خطا در دریافت مقدار از hash: {str(e)}")
             return default
@@ -440,23 +798,11 @@ class RedisManager:
             full_key = self._build_key(key)
             values = await self.redis.hgetall(full_key)
 
-            result = {}
-
             # تبدیل مقادیر
-            for k, v in values.items():
-                k_str = k.decode('utf-8') if isinstance(k, bytes) else k
-                v_str = v.decode('utf-8') if isinstance(v, bytes) else v
-
-                # تبدیل از json در صورت نیاز
-                if parse_json and v_str:
-                    try:
-                        result[k_str] = json.loads(v_str)
-                    except json.JSONDecodeError:
-                        result[k_str] = v_str
-                else:
-                    result[k_str] = v_str
-
-            return result
+            return {
+                (k.decode('utf-8') if isinstance(k, bytes) else k): self._decode(v, None, parse_json)
+                for k, v in values.items()
+            }
         except Exception as e:
             logger.error(f"خطا در دریافت تمام مقادیر hash: {str(e)}")
             return {}
@@ -467,7 +813,7 @@ class RedisManager:
 
         Args:
             channel: نام کانال
-            message: پیام (در صورت نیاز به json تبدیل می‌شود)
+            message: پیام (مقادیر ساختاریافته با codec سریال می‌شوند)
 
         Returns:
             int: تعداد دریافت‌کنندگان
@@ -477,13 +823,9 @@ class RedisManager:
                 logger.error("اتصال Redis برقرار نیست")
                 return 0
 
-            # تبدیل مقادیر پیچیده به json
-            if not isinstance(message, (str, bytes, int, float)):
-                message = json.dumps(message, ensure_ascii=False)
-
             # انتشار با پیشوند کانال
             full_channel = self._build_key(channel)
-            return await self.redis.publish(full_channel, message)
+            return await self.redis.publish(full_channel, self._encode(message))
         except Exception as e:
             logger.error(f"خطا در انتشار پیام در کانال: {str(e)}")
             return 0
@@ -494,7 +836,7 @@ class RedisManager:
 
         Args:
             channel: نام کانال
-            handler: تابع پردازش پیام
+            handler: تابع پردازش پیام با آرگومان‌های (کانال، داده)
 
         Returns:
             bool: وضعیت عملیات
@@ -506,19 +848,44 @@ class RedisManager:
 
             # اشتراک با پیشوند کانال
             full_channel = self._build_key(channel)
-            await self._pubsub.subscribe(full_channel)
-
-            # ذخیره handler
             self._active_subscriptions[full_channel] = handler
+            await self._pubsub.subscribe(full_channel)
 
             # ایجاد وظیفه دریافت پیام در صورت عدم وجود
             await self._ensure_subscription_worker()
 
             return True
         except Exception as e:
+            self._active_subscriptions.pop(self._build_key(channel), None)
             logger.error(f"خطا در اشتراک کانال: {str(e)}")
             return False
 
+    async def psubscribe(self, pattern: str, handler: callable) -> bool:
+        """
+        اشتراک در کانال‌های منطبق با الگو (مثلاً "events:*")
+
+        Args:
+            pattern: الگوی نام کانال (بدون پیشوند)
+            handler: تابع پردازش پیام با آرگومان‌های (کانال، داده)
+
+        Returns:
+            bool: وضعیت عملیات
+        """
+        try:
+            if self.redis is None or self._pubsub is None:
+                logger.error("اتصال Redis برقرار نیست")
+                return False
+
+            full_pattern = self._build_key(pattern)
+            self._pattern_subscriptions[full_pattern] = handler
+            await self._pubsub.psubscribe(full_pattern)
+            await self._ensure_subscription_worker()
+            return True
+        except Exception as e:
+            self._pattern_subscriptions.pop(self._build_key(pattern), None)
+            logger.error(f"خطا در اشتراک الگوی کانال: {str(e)}")
+            return False
+
     async def unsubscribe(self, channel: str) -> bool:
         """
         لغو اشتراک از کانال
@@ -536,15 +903,34 @@ class RedisManager:
 
             # لغو اشتراک با پیشوند کانال
             full_channel = self._build_key(channel)
+            self._active_subscriptions.pop(full_channel, None)
             await self._pubsub.unsubscribe(full_channel)
+            return True
+        except Exception as e:
+            logger.error(f"خطا در لغو اشتراک کانال: {str(e)}")
+            return False
+
+    async def punsubscribe(self, pattern: str) -> bool:
+        """
+        لغو اشتراک الگوی کانال
+
+        Args:
+            pattern: الگوی نام کانال
 
-            # حذف handler
-            if full_channel in self._active_subscriptions:
-                del self._active_subscriptions[full_channel]
+        Returns:
+            bool: وضعیت عملیات
+        """
+        try:
+            if self.redis is None or self._pubsub is None:
+                logger.error("اتصال Redis برقرار نیست")
+                return False
 
+            full_pattern = self._build_key(pattern)
+            self._pattern_subscriptions.pop(full_pattern, None)
+            await self._pubsub.punsubscribe(full_pattern)
             return True
         except Exception as e:
-            logger.error(f"خطا در لغو اشتراک کانال: {str(e)}")
+            logger.error(f"خطا در لغو اشتراک الگوی کانال: {str(e)}")
             return False
 
     async def _ensure_subscription_worker(self) -> None:
@@ -557,55 +943,169 @@ class RedisManager:
                 return
 
         # ایجاد وظیفه جدید
-        task = asyncio.create_task(self._subscription_worker())
-        self._running_tasks.append(task)
+        self._running_tasks = [asyncio.create_task(self._subscription_worker())]
 
     async def _subscription_worker(self) -> None:
         """
         وظیفه پردازش پیام‌های اشتراکی
+
+        پیام‌ها با pubsub.listen() بدون حلقه‌ی poll دریافت می‌شوند. در صورت قطع اتصال،
+        PubSub جدیدی ساخته و تمام کانال‌ها و الگوها دوباره مشترک می‌شوند.
         """
+        logger.info("آغاز وظیفه پردازش پیام‌های اشتراکی Redis")
+        delay = PUBSUB_RECONNECT_DELAY
         try:
-            if self._pubsub is None:
-                return
+            while self._active_subscriptions or self._pattern_subscriptions:
+                try:
+                    async for message in self._pubsub.listen():
+                        delay = PUBSUB_RECONNECT_DELAY
+                        await self._dispatch_message(message)
+                    if not (self._active_subscriptions or self._pattern_subscriptions):
+                        break
+                    # پایان listen بدون لغو اشتراک: اتصال PubSub از دست رفته است
+                    raise ConnectionError("اشتراک‌های PubSub از دست رفت")
+                except asyncio.CancelledError:
+                    raise
+                except Exception as e:
+                    logger.error(f"خطا در دریافت پیام‌های اشتراکی Redis: {str(e)}؛ "
+                                 f"اتصال مجدد پس از {delay:.1f} ثانیه")
+                    await asyncio.sleep(delay)
+                    delay = min(delay * 2, PUBSUB_RECONNECT_MAX_DELAY)
+                    await self._resubscribe()
+        except asyncio.CancelledError:
+            logger.info("توقف وظیفه پردازش پیام‌های اشتراکی Redis")
 
-            logger.info("آغاز وظیفه پردازش پیام‌های اشتراکی Redis")
+    async def _resubscribe(self) -> bool:
+        """
+        ساخت PubSub جدید و اشتراک دوباره در تمام کانال‌ها و الگوها
 
-            while True:
-                # دریافت پیام
-                message = await self._pubsub.get_message(ignore_subscribe_messages=True, timeout=1.0)
+        Returns:
+            bool: وضعیت عملیات
+        """
+        try:
+            if self._pubsub is not None:
+                try:
+                    await self._pubsub.aclose()
+                except Exception:
+                    pass
 
-                if message is None:
-                    await asyncio.sleep(0.01)  # کاهش مصرف CPU
-                    continue
+            self._pubsub = self.redis.pubsub()
+            if self._active_subscriptions:
+                await self._pubsub.subscribe(*self._active_subscriptions)
+            if self._pattern_subscriptions:
+                await self._pubsub.psubscribe(*self._pattern_subscriptions)
+
+            self._pubsub_stats['resubscribes'] += 1
+            logger.info(f"اشتراک مجدد در {len(self._active_subscriptions)} کانال و "
+                        f"{len(self._pattern_subscriptions)} الگوی Redis")
+            return True
+        except Exception as e:
+            logger.error(f"خطا در اشتراک مجدد کانال‌های Redis: {str(e)}")
+            return False
 
-                # پردازش پیام
-                try:
-                    channel = message.get('channel', b'').decode('utf-8')
-                    data = message.get('data', b'')
+    async def _dispatch_message(self, message: Dict[str, Any]) -> None:
+        """
+        اجرای handler پیام با محدودیت تعداد handler های هم‌زمان
+
+        وقتی تمام ظرفیت پر است، دریافت پیام بعدی تا آزاد شدن یک handler متوقف می‌شود.
+
+        Args:
+            message: پیام دریافتی از pubsub
+        """
+        kind = message.get('type')
+        if kind not in ('message', 'pmessage'):
+            return
 
-                    # تبدیل data به str
-                    if isinstance(data, bytes):
-                        data = data.decode('utf-8')
+        try:
+            channel = _text(message.get('channel', b''))
+            if kind == 'pmessage':
+                subscription = _text(message.get('pattern', b''))
+                handler = self._pattern_subscriptions.get(subscription)
+            else:
+                subscription = channel
+                handler = self._active_subscriptions.get(channel)
+            if handler is None:
+                return
 
-                    # فراخوانی handler
-                    if channel in self._active_subscriptions:
-                        handler = self._active_subscriptions[channel]
+            # تبدیل json یا قالب سریال‌ساز در صورت امکان
+            data = self._decode(message.get('data', b''), '')
+        except Exception as e:
+            logger.error(f"خطا در پردازش پیام اشتراکی: {str(e)}")
+            return
 
-                        # تبدیل json در صورت امکان
-                        try:
-                            data = json.loads(data)
-                        except json.JSONDecodeError:
-                            pass
+        received = time.monotonic()
+        await self._handler_slots.acquire()
+        task = asyncio.create_task(self._run_handler(subscription, handler, channel, data, received))
+        self._handler_tasks.add(task)
+        task.add_done_callback(self._handler_tasks.discard)
 
-                        # فراخوانی handler به صورت asyncio
-                        asyncio.create_task(handler(channel, data))
-                except Exception as inner_e:
-                    logger.error(f"خطا در پردازش پیام اشتراکی: {str(inner_e)}")
+    async def _run_handler(self, subscription: str, handler: callable, channel: str, data: Any,
+                           received: float) -> None:
+        """
+        اجرای handler و ثبت آمار تحویل کانال
 
-        except asyncio.CancelledError:
-            logger.info("توقف وظیفه پردازش پیام‌های اشتراکی Redis")
+        Args:
+            subscription: کانال یا الگوی اشتراک
+            handler: تابع پردازش پیام
+            channel: کانال پیام
+            data: داده‌ی پیام
+            received: زمان دریافت پیام (monotonic)
+        """
+        stats = self._channel_stats.setdefault(subscription, {
+            'delivered': 0, 'errors': 0, 'latency_total': 0.0, 'latency_max': 0.0,
+        })
+        try:
+            result = handler(channel, data)
+            if inspect.isawaitable(result):
+                await result
         except Exception as e:
-            logger.error(f"خطا در وظیفه پردازش پیام‌های اشتراکی Redis: {str(e)}")
+            stats['errors'] += 1
+            logger.error(f"خطا در handler کانال {channel}: {str(e)}")
+        finally:
+            self._handler_slots.release()
+            latency = time.monotonic() - received
+            stats['delivered'] += 1
+            stats['latency_total'] += latency
+            stats['latency_max'] = max(stats['latency_max'], latency)
+
+    def get_pubsub_stats(self) -> Dict[str, Any]:
+        """
+        دریافت آمار تحویل پیام‌های اشتراکی به تفکیک کانال یا الگو
+
+        Returns:
+            Dict[str, Any]: تعداد تحویل، خطا و تأخیر (میلی‌ثانیه، از دریافت تا پایان handler)
+        """
+        channels = {}
+        for subscription, stats in self._channel_stats.items():
+            delivered = stats['delivered']
+            channels[subscription] = {
+                'delivered': delivered,
+                'errors': stats['errors'],
+                'latency_avg_ms': stats['latency_total'] / delivered * 1000 if delivered else 0.0,
+                'latency_max_ms': stats['latency_max'] * 1000,
+            }
+        return {
+            'channels': len(self._active_subscriptions),
+            'patterns': len(self._pattern_subscriptions),
+            'handlers_running': len(self._handler_tasks),
+            'max_handlers': self.max_concurrent_handlers,
+            'resubscribes': self._pubsub_stats['resubscribes'],
+            'subscriptions': channels,
+        }
+
+    def _gauges(self) -> Dict[str, Any]:
+        """
+        مقادیر لحظه‌ای pubsub برای /metrics
+
+        Returns:
+            Dict[str, Any]: مجموع شمارنده‌ها
+        """
+        return {
+            'handlers_running': len(self._handler_tasks),
+            'resubscribes': self._pubsub_stats['resubscribes'],
+            'delivered': sum(stats['delivered'] for stats in self._channel_stats.values()),
+            'errors': sum(stats['errors'] for stats in self._channel_stats.values()),
+        }
 
     # --- متدهای مدیریت کش اطلاعات --- #
 
@@ -653,7 +1153,7 @@ class RedisManager:
 
     # --- متدهای قفل توزیع شده --- #
 
-    async def acquire_lock(self, lock_name: str, timeout: int = 10, expire: int = 30) -> bool:
+    async def acquire_lock(self, lock_name: str, timeout: float = 10, expire: int = 30) -> Optional[str]:
         """
         گرفتن قفل توزیع شده
 
@@ -663,37 +1163,41 @@ class RedisManager:
             expire: زمان انقضای قفل (ثانیه)
 
         Returns:
-            bool: آیا قفل گرفته شد
+            Optional[str]: توکن تصادفی قفل برای release_lock یا None اگر قفل گرفته نشد
         """
         try:
             if self.redis is None:
                 logger.error("اتصال Redis برقرار نیست")
-                return False
+                return None
 
             lock_key = self._build_key(f"lock:{lock_name}")
-            lock_id = f"{datetime.now().timestamp()}"
+            token = uuid.uuid4().hex
 
             end_time = datetime.now() + timedelta(seconds=timeout)
 
             while datetime.now() < end_time:
                 # تلاش برای گرفتن قفل
-                if await self.redis.set(lock_key, lock_id, nx=True, ex=expire):
-                    return True
+                if await self.redis.set(lock_key, token, nx=True, ex=expire):
+                    return token
 
                 # انتظار کوتاه
                 await asyncio.sleep(0.1)
 
-            return False
+            return None
         except Exception as e:
             logger.error(f"خطا در گرفتن قفل: {str(e)}")
-            return False
+            return None
 
-    async def release_lock(self, lock_name: str) -> bool:
+    async def release_lock(self, lock_name: str, token: str) -> bool:
         """
         آزاد کردن قفل توزیع شده
 
+        قفل فقط اگر هنوز با همان توکن نگه داشته شده باشد حذف می‌شود تا قفلی که پس از
+        انقضا توسط پردازه‌ی دیگری گرفته شده آزاد نشود.
+
         Args:
             lock_name: نام قفل
+            token: توکن برگردانده شده از acquire_lock
 
         Returns:
             bool: آیا قفل آزاد شد
@@ -704,8 +1208,7 @@ class RedisManager:
                 return False
 
             lock_key = self._build_key(f"lock:{lock_name}")
-            await self.redis.delete(lock_key)
-            return True
+            return bool(await self._script(RELEASE_LOCK_SCRIPT)(keys=[lock_key], args=[token]))
         except Exception as e:
             logger.error(f"خطا در آزاد کردن قفل: {str(e)}")
             return False
@@ -0,0 +1,486 @@
+"""
+صف پایدار وظایف پس‌زمینه روی Redis Streams
+
+هر اولویت یک stream با یک consumer group مشترک دارد. کارگرها (در پردازه‌ها یا
+سرورهای مختلف) با XREADGROUP به صورت مسدودکننده و بدون معطل کردن event loop پیام
+می‌گیرند و پس از پایان وظیفه آن را ack می‌کنند. پیام‌هایی که کارگرشان بیش از
+visibility timeout بی‌پاسخ مانده‌اند (مثلاً کارگر از کار افتاده) با XAUTOCLAIM به
+کارگر دیگری داده می‌شوند؛ کارگر زنده با touch زمان بیکاری پیام را صفر نگه می‌دارد.
+"""
+import logging
+import os
+import socket
+import time
+import uuid
+from collections import deque
+from dataclasses import dataclass
+from typing import Any, Deque, Dict, Iterable, List, Optional
+
+import redis.asyncio as redis
+from redis.exceptions import ResponseError
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class QueueEntry:
+    """
+    پیام دریافت شده از صف
+    """
+    priority: str
+    message_id: str
+    task_id: str
+    reclaimed: bool = False
+
+    @property
+    def enqueued_at(self) -> float:
+        """زمان افزودن به صف (از بخش میلی‌ثانیه‌ی شناسه‌ی پیام stream)"""
+        try:
+            return int(self.message_id.split("-", 1)[0]) / 1000
+        except ValueError:
+            return time.time()
+
+
+# انتقال اتمی شناسه‌های یک صف list قدیمی (LPUSH/BRPOP) به stream، از قدیمی‌ترین
+_DRAIN_LIST_SCRIPT = """
+local moved = 0
+while moved < tonumber(ARGV[1]) do
+    local task_id = redis.call('RPOP', KEYS[1])
+    if not task_id then
+        break
+    end
+    redis.call('XADD', KEYS[2], '*', 'task_id', task_id)
+    moved = moved + 1
+end
+return moved
+"""
+
+# سیاست‌های انتخاب بین اولویت‌ها
+POLICY_STRICT = "strict"
+POLICY_WEIGHTED = "weighted"
+
+
+def parse_priority_weights(value: Optional[str]) -> Dict[str, int]:
+    """
+    خواندن وزن اولویت‌ها از رشته‌ی تنظیمات
+
+    Args:
+        value: رشته با قالب "high:6,normal:3,low:1"
+
+    Returns:
+        Dict[str, int]: وزن هر اولویت (موارد نامعتبر نادیده گرفته می‌شوند)
+    """
+    weights = {}
+    for item in (value or "").split(","):
+        name, _, weight = item.strip().partition(":")
+        try:
+            if name and int(weight) > 0:
+                weights[name] = int(weight)
+        except ValueError:
+            logger.warning(f"وزن اولویت نامعتبر نادیده گرفته شد: {item}")
+    return weights
+
+
+def _text(value: Any) -> str:
+    return value.decode('utf-8') if isinstance(value, bytes) else str(value)
+
+
+class StreamTaskQueue:
+    """
+    صف وظایف با Redis Streams و consumer group
+    """
+
+    def __init__(self, redis_url: Optional[str] = None, stream_prefix: str = "task_stream:",
+                 group: Optional[str] = None, consumer: Optional[str] = None,
+                 visibility_timeout: Optional[float] = None, block_ms: Optional[int] = None):
+        """
+        مقداردهی اولیه
+
+        Args:
+            redis_url: آدرس Redis (پیش‌فرض REDIS_URL، همان Redis رکوردهای وظایف)
+            stream_prefix: پیشوند نام stream هر اولویت
+            group: نام consumer group مشترک کارگرها
+            consumer: نام یکتای این کارگر (پیش‌فرض میزبان:pid:تصادفی)
+            visibility_timeout: حداکثر زمان بیکاری پیام پیش از واگذاری به کارگر دیگر (ثانیه)
+            block_ms: حداکثر انتظار هر XREADGROUP (میلی‌ثانیه)
+        """
+        self.redis_url = redis_url or os.getenv("REDIS_URL", "redis://localhost:6379/0")
+        self.stream_prefix = stream_prefix
+        self.group = group or os.getenv("TASK_QUEUE_GROUP", "workers")
+        self.consumer = consumer or f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:6]}"
+        self.visibility_timeout = float(os.getenv("TASK_VISIBILITY_TIMEOUT", "300")) \
+            if visibility_timeout is None else visibility_timeout
+        self.block_ms = int(os.getenv("TASK_QUEUE_BLOCK_MS", "5000")) if block_ms is None else block_ms
+
+        self.client = None
+        self._groups = set()
+        self.stats = {
+            'enqueued': 0,
+            'delivered': 0,
+            'acked': 0,
+            'reclaimed': 0,
+        }
+
+    def stream(self, priority: str) -> str:
+        """
+        نام stream یک اولویت
+
+        Args:
+            priority: اولویت
+
+        Returns:
+            str: نام stream
+        """
+        return f"{self.stream_prefix}{priority}"
+
+    async def connect(self) -> bool:
+        """
+        ساخت کلاینت async
+
+        Returns:
+            bool: وضعیت اتصال
+        """
+        try:
+            if self.client is None:
+                self.client = redis.from_url(self.redis_url)
+            await self.client.ping()
+            return True
+        except Exception as e:
+            logger.error(f"خطا در اتصال صف وظایف به Redis: {str(e)}")
+            return False
+
+    async def close(self) -> None:
+        """
+        بستن کلاینت
+        """
+        if self.client is not None:
+            await self.client.aclose()
+            self.client = None
+
+    async def ensure_groups(self, priorities: Iterable[str]) -> None:
+        """
+        ساخت stream و consumer group هر اولویت در صورت نبود
+
+        Args:
+            priorities: اولویت‌ها
+        """
+        for priority in priorities:
+            stream = self.stream(priority)
+            if stream in self._groups:
+                continue
+            try:
+                await self.client.xgroup_create(stream, self.group, id="0", mkstream=True)
+            except ResponseError as e:
+                if "BUSYGROUP" not in str(e):
+                    raise
+            self._groups.add(stream)
+
+    async def enqueue(self, priority: str, task_id: str) -> Optional[str]:
+        """
+        افزودن وظیفه به صف
+
+        Args:
+            priority: اولویت
+            task_id: شناسه وظیفه
+
+        Returns:
+            Optional[str]: شناسه پیام یا None در صورت خطا
+        """
+        try:
+            message_id = await self.client.xadd(self.stream(priority), {'task_id': task_id})
+            self.stats['enqueued'] += 1
+            return _text(message_id)
+        except Exception as e:
+            logger.error(f"خطا در افزودن وظیفه {task_id} به صف: {str(e)}")
+            return None
+
+    async def read(self, priorities: List[str], count: int = 1,
+                   block_ms: Optional[int] = None) -> List[QueueEntry]:
+        """
+        دریافت پیام‌های جدید با XREADGROUP مسدودکننده
+
+        Args:
+            priorities: اولویت‌ها به ترتیب بررسی
+            count: حداکثر پیام از هر stream
+            block_ms: حداکثر انتظار (پیش‌فرض block_ms صف، صفر بدون انتظار)
+
+        Returns:
+            List[QueueEntry]: پیام‌ها
+        """
+        await self.ensure_groups(priorities)
+        block = self.block_ms if block_ms is None else block_ms
+        response = await self.client.xreadgroup(
+            self.group, self.consumer,
+            {self.stream(priority): ">" for priority in priorities},
+            count=count, block=block or None
+        )
+        streams = {self.stream(priority): priority for priority in priorities}
+        entries = []
+        for stream, messages in response or []:
+            priority = streams[_text(stream)]
+            for message_id, fields in messages:
+                entries.append(self._entry(priority, message_id, fields))
+        self.stats['delivered'] += len(entries)
+        return entries
+
+    async def drain_list(self, list_key: str, priority: str, batch: int = 1000) -> int:
+        """
+        انتقال وظایف باقی‌مانده در صف list قدیمی به stream یک اولویت
+
+        هر دسته با یک اسکریپت Lua منتقل می‌شود تا با از کار افتادن کارگر یا اجرای
+        هم‌زمان چند کارگر وظیفه‌ای گم یا تکراری نشود.
+
+        Args:
+            list_key: کلید list قدیمی (مثلاً task_queue:high)
+            priority: اولویت
+            batch: حداکثر وظایف هر اجرای اسکریپت
+
+        Returns:
+            int: تعداد وظایف منتقل شده
+        """
+        moved = 0
+        while True:
+            count = int(await self.client.eval(_DRAIN_LIST_SCRIPT, 2, list_key, self.stream(priority), batch))
+            moved += count
+            if count < batch:
+                break
+        if moved:
+            self.stats['enqueued'] += moved
+            logger.warning(f"{moved} وظیفه از صف قدیمی {list_key} به {self.stream(priority)} منتقل شد")
+        return moved
+
+    async def claim_stuck(self, priority: str, count: int = 10) -> List[QueueEntry]:
+        """
+        واگذاری پیام‌های بی‌پاسخ مانده بیش از visibility timeout به این کارگر
+
+        Args:
+            priority: اولویت
+            count: حداکثر تعداد پیام
+
+        Returns:
+            List[QueueEntry]: پیام‌های واگذار شده
+        """
+        await self.ensure_groups([priority])
+        stream = self.stream(priority)
+        response = await self.client.xautoclaim(
+            stream, self.group, self.consumer, int(self.visibility_timeout * 1000),
+            start_id="0-0", count=count
+        )
+        entries = []
+        for message_id, fields in response[1] if response else []:
+            if not fields:
+                # پیام حذف شده اما هنوز در فهرست انتظار
+                await self.client.xack(stream, self.group, message_id)
+                continue
+            entries.append(self._entry(priority, message_id, fields, reclaimed=True))
+        if entries:
+            self.stats['reclaimed'] += len(entries)
+            logger.warning(f"{len(entries)} وظیفه‌ی بی‌پاسخ از صف {priority} به کارگر {self.consumer} واگذار شد")
+        return entries
+
+    async def touch(self, entry: QueueEntry) -> None:
+        """
+        صفر کردن زمان بیکاری پیام در حال اجرا تا به کارگر دیگری واگذار نشود
+
+        Args:
+            entry: پیام
+        """
+        await self.client.xclaim(self.stream(entry.priority), self.group, self.consumer, 0,
+                                 [entry.message_id], justid=True)
+
+    async def ack(self, entry: QueueEntry) -> None:
+        """
+        تأیید پایان پیام و حذف آن از stream
+
+        Args:
+            entry: پیام
+        """
+        stream = self.stream(entry.priority)
+        async with self.client.pipeline(transaction=True) as pipe:
+            pipe.xack(stream, self.group, entry.message_id)
+            pipe.xdel(stream, entry.message_id)
+            await pipe.execute()
+        self.stats['acked'] += 1
+
+    def _entry(self, priority: str, message_id: Any, fields: Dict[Any, Any], reclaimed: bool = False) -> QueueEntry:
+        task_id = fields.get(b'task_id', fields.get('task_id', b''))
+        return QueueEntry(priority, _text(message_id), _text(task_id), reclaimed)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        دریافت آمار صف
+
+        Returns:
+            Dict[str, Any]: آمار
+        """
+        return {
+            'consumer': self.consumer,
+            'group': self.group,
+            'visibility_timeout': self.visibility_timeout,
+            **self.stats,
+        }
+
+
+class PriorityScheduler:
+    """
+    انتخاب پیام بعدی از بافر هر اولویت
+
+    در حالت strict همیشه بالاترین اولویت و در حالت weighted به نسبت وزن‌ها (weighted
+    round robin هموار) انتخاب می‌شود. در هر دو حالت پیامی که بیش از زمان aging در صف
+    مانده است پیش از بقیه انتخاب می‌شود تا اولویت‌های پایین گرسنه نمانند.
+    """
+
+    def __init__(self, priorities: List[str], policy: Optional[str] = None,
+                 weights: Optional[Dict[str, int]] = None, aging: Optional[float] = None):
+        """
+        مقداردهی اولیه
+
+        Args:
+            priorities: اولویت‌ها از بالا به پایین
+            policy: سیاست انتخاب (strict یا weighted)
+            weights: وزن هر اولویت در حالت weighted
+            aging: حداکثر انتظار (ثانیه) پیش از انتخاب خارج از نوبت (صفر برای غیرفعال)
+        """
+        self.priorities = list(priorities)
+        self.policy = (policy or os.getenv("TASK_SCHEDULING", POLICY_WEIGHTED)).lower()
+        if self.policy not in (POLICY_STRICT, POLICY_WEIGHTED):
+            logger.warning(f"سیاست زمان‌بندی {self.policy} نامعتبر است؛ از weighted استفاده می‌شود")
+            self.policy = POLICY_WEIGHTED
+        configured = weights if weights is not None else parse_priority_weights(
+            os.getenv("TASK_PRIORITY_WEIGHTS", "high:6,normal:3,low:1"))
+        # اولویت‌های بدون وزن: 1، 2، 4، ... از پایین‌ترین به بالاترین اولویت
+        self.weights = {
+            priority: configured.get(priority, 2 ** (len(self.priorities) - index - 1))
+            for index, priority in enumerate(self.priorities)
+        }
+        self.aging = float(os.getenv("TASK_AGING_SECONDS", "30")) if aging is None else aging
+
+        self._buffers: Dict[str, Deque[QueueEntry]] = {priority: deque() for priority in self.priorities}
+        self._current = {priority: 0 for priority in self.priorities}
+        self.started_at = time.time()
+        self.stats = {priority: {
+            'dispatched': 0,
+            'aged': 0,
+            'completed': 0,
+            'failed': 0,
+            'wait_total': 0.0,
+            'wait_max': 0.0,
+            'run_total': 0.0,
+        } for priority in self.priorities}
+
+    def __len__(self) -> int:
+        return sum(len(buffer) for buffer in self._buffers.values())
+
+    def add(self, entry: QueueEntry) -> None:
+        """
+        افزودن پیام دریافت شده به بافر اولویت آن
+
+        Args:
+            entry: پیام
+        """
+        self._buffers.setdefault(entry.priority, deque()).append(entry)
+
+    def empty_priorities(self) -> List[str]:
+        """
+        اولویت‌هایی که پیامی در بافر ندارند
+
+        Returns:
+            List[str]: اولویت‌ها
+        """
+        return [priority for priority in self.priorities if not self._buffers[priority]]
+
+    def buffered(self) -> List[QueueEntry]:
+        """
+        پیام‌های در انتظار انتخاب
+
+        Returns:
+            List[QueueEntry]: پیام‌ها
+        """
+        return [entry for buffer in self._buffers.values() for entry in buffer]
+
+    def next(self, now: Optional[float] = None) -> Optional[QueueEntry]:
+        """
+        انتخاب و برداشتن پیام بعدی
+
+        Args:
+            now: زمان فعلی (برای تست)
+
+        Returns:
+            Optional[QueueEntry]: پیام یا None در صورت خالی بودن بافرها
+        """
+        now = time.time() if now is None else now
+        ready = [priority for priority in self.priorities if self._buffers[priority]]
+        if not ready:
+            return None
+
+        priority = self._aged(ready, now)
+        aged = priority is not None
+        if not aged:
+            priority = ready[0] if self.policy == POLICY_STRICT else self._weighted(ready)
+
+        entry = self._buffers[priority].popleft()
+        wait = max(now - entry.enqueued_at, 0.0)
+        stats = self.stats[priority]
+        stats['dispatched'] += 1
+        stats['aged'] += int(aged)
+        stats['wait_total'] += wait
+        stats['wait_max'] = max(stats['wait_max'], wait)
+        return entry
+
+    def _aged(self, ready: List[str], now: float) -> Optional[str]:
+        if self.aging <= 0:
+            return None
+        oldest = min(ready, key=lambda priority: self._buffers[priority][0].enqueued_at)
+        if now - self._buffers[oldest][0].enqueued_at >= self.aging:
+            return oldest
+        return None
+
+    def _weighted(self, ready: List[str]) -> str:
+        # weighted round robin هموار: هر اولویت به اندازه‌ی وزنش اعتبار می‌گیرد و انتخاب شده به اندازه‌ی مجموع کم می‌شود
+        total = 0
+        for priority in ready:
+            self._current[priority] += self.weights[priority]
+            total += self.weights[priority]
+        chosen = max(ready, key=lambda priority: self._current[priority])
+        self._current[chosen] -= total
+        return chosen
+
+    def record_done(self, priority: str, run_time: float, success: bool) -> None:
+        """
+        ثبت پایان اجرای یک وظیفه
+
+        Args:
+            priority: اولویت
+            run_time: مدت اجرا (ثانیه)
+            success: موفق بودن اجرا
+        """
+        stats = self.stats.get(priority)
+        if stats is None:
+            return
+        stats['completed' if success else 'failed'] += 1
+        stats['run_total'] += run_time
+
+    def get_stats(self) -> Dict[str, Dict[str, Any]]:
+        """
+        آمار تأخیر و توان عملیاتی هر اولویت
+
+        Returns:
+            Dict[str, Dict[str, Any]]: آمار (زمان‌ها به میلی‌ثانیه، توان به وظیفه در دقیقه)
+        """
+        minutes = max(time.time() - self.started_at, 1.0) / 60
+        result = {}
+        for priority, stats in self.stats.items():
+            dispatched = stats['dispatched']
+            finished = stats['completed'] + stats['failed']
+            result[priority] = {
+                'buffered': len(self._buffers[priority]),
+                'dispatched': dispatched,
+                'aged': stats['aged'],
+                'completed': stats['completed'],
+                'failed': stats['failed'],
+                'wait_avg_ms': stats['wait_total'] / dispatched * 1000 if dispatched else 0.0,
+                'wait_max_ms': stats['wait_max'] * 1000,
+                'run_avg_ms': stats['run_total'] / finished * 1000 if finished else 0.0,
+                'throughput_per_min': finished / minutes,
+            }
+        return result
@@ -0,0 +1,296 @@
+"""
+بافر نوشتن با تأخیر (write-behind) برای درج‌های پرتکرار
+
+درج‌هایی مثل تاریخچه‌ی پیام، لاگ فعالیت و رویدادهای امنیتی در مسیر پردازش هر پیام
+انجام می‌شوند و نیازی به نتیجه‌ی فوری ندارند. این بافر ردیف‌ها را به تفکیک جدول جمع
+می‌کند و با رسیدن به اندازه‌ی دسته یا گذشت زمان مشخص، با یک insert_many (INSERT
+چند ردیفی) می‌نویسد. تعداد ردیف‌های در انتظار محدود است و در خاموش شدن برنامه تمام
+بافرها با close_write_buffers تخلیه می‌شوند.
+"""
+import asyncio
+import logging
+import os
+import weakref
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional, Set, Tuple
+
+from core.metrics import get_metrics
+
+logger = logging.getLogger(__name__)
+
+# تعداد دفعات تلاش برای نوشتن یک دسته پیش از کنار گذاشتن آن
+MAX_RETRIES = 3
+
+# بافرهای زنده برای تخلیه در خاموش شدن و جمع آمار
+_buffers: "weakref.WeakSet[WriteBehindBuffer]" = weakref.WeakSet()
+
+
+class WriteBehindBuffer:
+    """
+    بافر درج دسته‌ای ردیف‌ها
+    """
+
+    def __init__(self, database: Any, batch_size: Optional[int] = None,
+                 flush_interval: Optional[float] = None, max_pending: Optional[int] = None,
+                 name: str = ""):
+        """
+        مقداردهی اولیه
+
+        Args:
+            database: شیء DatabaseInterface با متد insert_many
+            batch_size: حداکثر ردیف‌های هر دسته و آستانه‌ی نوشتن فوری (صفر برای نوشتن مستقیم)
+            flush_interval: حداکثر تأخیر نوشتن ردیف‌ها (ثانیه)
+            max_pending: حداکثر ردیف‌های در انتظار در حافظه
+            name: نام بافر برای لاگ (معمولاً نام پلاگین)
+        """
+        self.database = database
+        self.name = name
+        self.batch_size = int(os.getenv("WRITE_BUFFER_BATCH_SIZE", "100")) if batch_size is None else batch_size
+        self.flush_interval = float(os.getenv("WRITE_BUFFER_FLUSH_INTERVAL", "1.0")) \
+            if flush_interval is None else flush_interval
+        self.max_pending = int(os.getenv("WRITE_BUFFER_MAX_PENDING", "10000")) if max_pending is None else max_pending
+
+        self._pending: Dict[str, Deque[Dict[str, Any]]] = {}
+        self._size = 0
+        self._failures: Dict[str, int] = {}
+        self._lock = asyncio.Lock()
+        self._timer: Optional[asyncio.Task] = None
+        self._tasks: Set[asyncio.Task] = set()
+        self._closed = False
+        self.stats = {
+            'buffered': 0,
+            'flushed': 0,
+            'batches': 0,
+            'failed_batches': 0,
+            'dropped': 0,
+        }
+
+        _buffers.add(self)
+        get_metrics().register_collector('write_buffer', _gauges)
+
+    def __len__(self) -> int:
+        return self._size
+
+    @property
+    def enabled(self) -> bool:
+        """آیا ردیف‌ها بافر می‌شوند"""
+        return self.batch_size > 0 and not self._closed
+
+    async def add(self, table: str, row: Dict[str, Any]) -> bool:
+        """
+        افزودن یک ردیف برای درج
+
+        Args:
+            table: نام جدول
+            row: داده‌های ردیف
+
+        Returns:
+            bool: True در صورت بافر شدن یا درج موفق (در حالت نوشتن مستقیم)
+        """
+        if not self.enabled:
+            return bool(await self.database.insert(table, row))
+
+        if self._size >= self.max_pending:
+            # فشار معکوس: ابتدا تلاش برای نوشتن، سپس حذف قدیمی‌ترین ردیف
+            await self.flush()
+            if self._size >= self.max_pending:
+                self._drop_oldest()
+
+        queue = self._pending.setdefault(table, deque())
+        queue.append(dict(row))
+        self._size += 1
+        self.stats['buffered'] += 1
+
+        if len(queue) >= self.batch_size:
+            self._spawn(self.flush(table))
+        if self._timer is None or self._timer.done():
+            self._timer = asyncio.get_running_loop().create_task(self._run_timer())
+        return True
+
+    async def flush(self, table: Optional[str] = None) -> int:
+        """
+        نوشتن ردیف‌های در انتظار
+
+        Args:
+            table: فقط همین جدول (پیش‌فرض تمام جداول)
+
+        Returns:
+            int: تعداد ردیف‌های نوشته شده
+        """
+        async with self._lock:
+            written = 0
+            for name in [table] if table else list(self._pending):
+                written += await self._flush_table(name)
+            return written
+
+    async def close(self) -> int:
+        """
+        توقف زمان‌بندی و نوشتن تمام ردیف‌ها؛ درج‌های بعدی مستقیم انجام می‌شوند
+
+        Returns:
+            int: تعداد ردیف‌های نوشته شده
+        """
+        self._closed = True
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        if self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+        return await self.flush()
+
+    async def _flush_table(self, table: str) -> int:
+        """
+        نوشتن ردیف‌های یک جدول در دسته‌های batch_size تایی
+
+        Args:
+            table: نام جدول
+
+        Returns:
+            int: تعداد ردیف‌های نوشته شده
+        """
+        queue = self._pending.get(table)
+        written = 0
+        while queue:
+            batch = [queue.popleft() for _ in range(min(len(queue), self.batch_size or len(queue)))]
+            self._size -= len(batch)
+
+            # هر مجموعه ستون با یک درخواست اتمی نوشته می‌شود تا نتیجه‌ی ناقص پیش نیاید
+            # و فقط ردیف‌های نوشته نشده دوباره تلاش شوند
+            groups: Dict[Tuple[str, ...], List[Dict[str, Any]]] = {}
+            for row in batch:
+                groups.setdefault(tuple(row), []).append(row)
+
+            failed: List[Dict[str, Any]] = []
+            for group in groups.values():
+                try:
+                    count = await self.database.insert_many(table, group)
+                except Exception as e:
+                    logger.error(f"خطا در نوشتن دسته‌ای {table}: {str(e)}")
+                    count = 0
+
+                if count == len(group):
+                    written += len(group)
+                    self.stats['flushed'] += len(group)
+                    self.stats['batches'] += 1
+                    continue
+                if count:
+                    # درج ناقص (مثلاً درج تک‌تک پیش‌فرض DatabaseInterface)؛ count ردیف اول نوشته
+                    # شده‌اند و فقط بقیه‌ی گروه دوباره تلاش می‌شود
+                    written += count
+                    self.stats['flushed'] += count
+                    logger.warning(f"فقط {count} از {len(group)} ردیف {table} نوشته شد؛ بقیه دوباره تلاش می‌شوند")
+                failed.extend(group[count:])
+
+            if not failed:
+                self._failures.pop(table, None)
+                continue
+
+            self.stats['failed_batches'] += 1
+            failures = self._failures.get(table, 0) + 1
+            if failures >= MAX_RETRIES:
+                self._failures.pop(table, None)
+                self.stats['dropped'] += len(failed)
+                logger.error(f"{len(failed)} ردیف {table} پس از {failures} تلاش ناموفق کنار گذاشته شد")
+            else:
+                # بازگرداندن ردیف‌های نوشته نشده به ابتدای صف برای تلاش بعدی
+                self._failures[table] = failures
+                queue.extendleft(reversed(failed))
+                self._size += len(failed)
+            break
+
+        if queue is not None and not queue:
+            self._pending.pop(table, None)
+        return written
+
+    def _drop_oldest(self) -> None:
+        """
+        حذف قدیمی‌ترین ردیف بزرگ‌ترین صف در صورت پر بودن بافر
+        """
+        queue = max(self._pending.values(), key=len, default=None)
+        if not queue:
+            return
+        queue.popleft()
+        self._size -= 1
+        if self.stats['dropped'] == 0:
+            logger.warning(f"بافر نوشتن {self.name} پر است ({self.max_pending} ردیف)؛ قدیمی‌ترین ردیف‌ها حذف می‌شوند")
+        self.stats['dropped'] += 1
+
+    async def _run_timer(self) -> None:
+        """
+        نوشتن دوره‌ای تا زمانی که ردیفی در انتظار است
+        """
+        while self._size:
+            await asyncio.sleep(self.flush_interval)
+            try:
+                await self.flush()
+            except Exception as e:
+                logger.error(f"خطا در نوشتن دوره‌ای بافر {self.name}: {str(e)}")
+
+    def _spawn(self, coro: Any) -> None:
+        """
+        اجرای نوشتن در پس‌زمینه بدون معطل کردن فراخواننده
+
+        Args:
+            coro: coroutine نوشتن
+        """
+        task = asyncio.get_running_loop().create_task(coro)
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        دریافت آمار بافر
+
+        Returns:
+            Dict[str, Any]: آمار
+        """
+        return {
+            'pending': self._size,
+            'tables': {table: len(queue) for table, queue in self._pending.items()},
+            **self.stats,
+        }
+
+
+def _gauges() -> Dict[str, int]:
+    """
+    مجموع آمار تمام بافرها برای /metrics
+
+    Returns:
+        Dict[str, int]: ردیف‌های در انتظار و شمارنده‌ها
+    """
+    totals = {'buffers': 0, 'pending': 0}
+    for buffer in list(_buffers):
+        totals['buffers'] += 1
+        totals['pending'] += len(buffer)
+        for key, value in buffer.stats.items():
+            totals[key] = totals.get(key, 0) + value
+    return totals
+
+
+async def flush_write_buffers() -> int:
+    """
+    نوشتن ردیف‌های در انتظار تمام بافرها
+
+    Returns:
+        int: تعداد ردیف‌های نوشته شده
+    """
+    written = 0
+    for buffer in list(_buffers):
+        written += await buffer.flush()
+    return written
+
+
+async def close_write_buffers() -> int:
+    """
+    بستن و تخلیه‌ی تمام بافرها (در خاموش شدن برنامه)
+
+    Returns:
+        int: تعداد ردیف‌های نوشته شده
+    """
+    written = 0
+    for buffer in list(_buffers):
+        try:
+            written += await buffer.close()
+        except Exception as e:
+            logger.error(f"خطا در تخلیه‌ی بافر نوشتن {buffer.name}: {str(e)}")
+    return written
@@ -0,0 +1,50 @@
+-- Migration: 04_search_indexes
+-- Description: ایندکس‌های trigram برای جستجوی کاربران و پلاگین‌ها
+-- Version: 1.0
+-- ایجاد شده در: 2026-10-17
+
+-- جستجوی API با ILIKE '%...%' روی نام کاربری، ایمیل، نام و توضیحات پلاگین بدون ایندکس
+-- به اسکن کامل جدول نیاز دارد. ایندکس GIN با gin_trgm_ops همان ILIKE را پوشش می‌دهد و
+-- similarity() برای رتبه‌بندی نتایج از همان افزونه استفاده می‌کند. تحلیلگر زبانی
+-- (tsvector) برای متن فارسی ریشه‌یابی ندارد، پس trigram برای هر دو زبان انتخاب شده است.
+-- NOTICE: CREATE INDEX CONCURRENTLY داخل اجرای چند دستوری migration مجاز نیست
+
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+
+-- ستون‌های جستجو در طرح جداول API و سلف بات یکسان نیستند؛ فقط ستون‌های موجود ایندکس می‌شوند
+DO $$
+DECLARE
+    target RECORD;
+    analyzed_table TEXT;
+BEGIN
+    FOR target IN
+        SELECT * FROM (VALUES
+            ('users', 'username', 'idx_users_username_trgm'),
+            ('users', 'email', 'idx_users_email_trgm'),
+            ('plugins', 'name', 'idx_plugins_name_trgm'),
+            ('plugins', 'display_name', 'idx_plugins_display_name_trgm'),
+            ('plugins', 'description', 'idx_plugins_description_trgm')
+        ) AS t (table_name, column_name, index_name)
+    LOOP
+        IF EXISTS (
+            SELECT 1 FROM information_schema.columns
+            WHERE table_schema = current_schema()
+              AND table_name = target.table_name
+              AND column_name = target.column_name
+        ) THEN
+            EXECUTE format(
+                'CREATE INDEX IF NOT EXISTS %I ON %I USING GIN (%I gin_trgm_ops)',
+                target.index_name, target.table_name, target.column_name
+            );
+        END IF;
+    END LOOP;
+
+    -- به‌روزرسانی آمار برای برآورد تعداد ردیف‌ها و انتخاب ایندکس توسط planner (فقط جداول موجود)
+    FOREACH analyzed_table IN ARRAY ARRAY['users', 'plugins']
+    LOOP
+        IF to_regclass(quote_ident(analyzed_table)) IS NOT NULL THEN
+            EXECUTE format('ANALYZE %I', analyzed_table);
+        END IF;
+    END LOOP;
+END $$;
+
@@ -2,10 +2,8 @@
 """
 فایل اصلی برای راه‌اندازی سلف بات تلگرام
 """
-import os
 import sys
 import signal
-import logging
 import asyncio
 from pathlib import Path
 
@@ -13,7 +11,7 @@ from pathlib import Path
 sys.path.insert(0, str(Path(__file__).parent.absolute()))
 
 # وارد کردن ماژول‌های پروژه
-from core.logger import get_logger
+from core.logger import get_logger, setup_logging, shutdown_logging
 from core.config import Config
 from core.database import Database
 from core.redis_manager import initialize_redis
@@ -23,9 +21,13 @@ from core.license_manager import LicenseManager
 from core.plugin_marketplace import PluginMarketplace
 from core.client import TelegramClient
 from core.plugin_manager import PluginManager
+from core.write_buffer import close_write_buffers
 from core.event_handler import EventHandler
+from core.metrics import get_metrics
+from core.multi_account import MultiAccountRuntime
 
-# تنظیم لاگر
+# تنظیم لاگر (یک پیکربندی مرکزی با نوشتن غیرهمزمان از طریق صف)
+setup_logging()
 logger = get_logger("main")
 
 
@@ -65,6 +67,7 @@ async def initialize_selfbot():
     
     # ایجاد نمونه DatabaseCache
     db_cache = DatabaseCache(db, redis)
+    await db_cache.start()
     logger.info("مدیریت کش دیتابیس راه‌اندازی شد")
     
     # ایجاد CryptoManager
@@ -81,41 +84,49 @@ async def initialize_selfbot():
     await plugin_marketplace.initialize()
     logger.info("بازارچه پلاگین راه‌اندازی شد")
     
-    # ایجاد کلاینت تلگرام
+    # بررسی اطلاعات API تلگرام (برای تمام حساب‌ها مشترک است)
     try:
         api_id = int(config.get("TELEGRAM_API_ID", "0"))
-        api_hash = config.get("TELEGRAM_API_HASH", "")
-        
-        if api_id == 0 or not api_hash:
-            logger.error("TELEGRAM_API_ID و TELEGRAM_API_HASH در فایل .env تنظیم نشده‌اند")
-            logger.info("برای دریافت API ID و API Hash، به سایت my.telegram.org مراجعه کنید")
-            return None
-            
-        phone = config.get("TELEGRAM_PHONE", "")
-        session_name = config.get("TELEGRAM_SESSION_NAME", "selfbot_session")
-        
-        client = TelegramClient(
-            api_id=api_id,
-            api_hash=api_hash,
-            phone=phone,
-            session_name=session_name
-        )
-        logger.info("کلاینت تلگرام ایجاد شد")
-    except Exception as e:
-        logger.error(f"خطا در ایجاد کلاینت تلگرام: {str(e)}")
+    except ValueError:
+        api_id = 0
+    api_hash = config.get("TELEGRAM_API_HASH", "")
+    if api_id == 0 or not api_hash:
+        logger.error("TELEGRAM_API_ID و TELEGRAM_API_HASH در فایل .env تنظیم نشده‌اند")
+        logger.info("برای دریافت API ID و API Hash، به سایت my.telegram.org مراجعه کنید")
         return None
-    
-    # ایجاد مدیریت پلاگین
-    plugin_manager = PluginManager(client, db_cache)
-    await plugin_manager.initialize()
-    logger.info("مدیریت پلاگین راه‌اندازی شد")
-    
-    # ایجاد مدیریت رویدادها
-    event_handler = EventHandler(client, plugin_manager)
-    logger.info("مدیریت رویدادها راه‌اندازی شد")
-    
-    # مقداردهی event_handler در client
-    client.set_event_handler(event_handler)
+
+    # مدیریت رویدادها و پلاگین‌ها بین تمام حساب‌ها مشترک است
+    event_handler = EventHandler()
+    plugin_manager = PluginManager()
+    logger.info("مدیریت رویدادها و پلاگین‌ها راه‌اندازی شد")
+
+    # اجرای چند حسابی: حساب‌ها پلاگین‌ها و اتصال‌های دیتابیس و Redis را به اشتراک می‌گذارند
+    accounts = None
+    client = None
+    if config.get("TELEGRAM_ACCOUNTS", ""):
+        # کلاینت هر حساب پس از اتصال در MultiAccountRuntime به event_handler افزوده می‌شود
+        accounts = MultiAccountRuntime()
+        accounts.load_accounts(config.get("TELEGRAM_ACCOUNTS"))
+        logger.info(f"{len(accounts.sessions)} حساب برای اجرای چند حسابی تعریف شد")
+    else:
+        # ایجاد کلاینت تلگرام
+        try:
+            phone = config.get("TELEGRAM_PHONE", "")
+            session_name = config.get("TELEGRAM_SESSION_NAME", "selfbot_session")
+
+            client = TelegramClient(
+                api_id=api_id,
+                api_hash=api_hash,
+                phone=phone,
+                session_name=session_name
+            )
+            logger.info("کلاینت تلگرام ایجاد شد")
+        except Exception as e:
+            logger.error(f"خطا در ایجاد کلاینت تلگرام: {str(e)}")
+            return None
+
+        # مقداردهی کلاینت در event_handler
+        event_handler.set_client(client)
     
     # ایجاد آبجکت برای بازگرداندن
     selfbot = {
@@ -127,6 +138,7 @@ async def initialize_selfbot():
         "license_manager": license_manager,
         "plugin_marketplace": plugin_marketplace,
         "client": client,
+        "accounts": accounts,
         "plugin_manager": plugin_manager,
         "event_handler": event_handler
     }
@@ -154,13 +166,20 @@ async def run_selfbot():
     
     # لاگین به تلگرام
     client = selfbot["client"]
+    accounts = selfbot["accounts"]
     try:
         logger.info("در حال اتصال به تلگرام...")
-        await client.connect()
-        
-        if not await client.is_logged_in():
-            logger.info("نیاز به احراز هویت تلگرام...")
-            await client.start()
+        if accounts:
+            # اتصال پلکانی حساب‌ها روی همین حلقه‌ی رویداد
+            if not await accounts.start():
+                logger.error("هیچ حسابی متصل نشد")
+                return
+        else:
+            await client.connect()
+
+            if not await client.is_logged_in():
+                logger.info("نیاز به احراز هویت تلگرام...")
+                await client.start()
         
         logger.info("اتصال به تلگرام با موفقیت انجام شد")
         
@@ -171,6 +190,9 @@ async def run_selfbot():
         
         # اجرای وظایف پس‌زمینه
         tasks = []
+
+        # ذخیره‌ی دوره‌ای آمار هندلرها در Redis برای مسیر /metrics سرور API
+        tasks.append(asyncio.create_task(get_metrics().run_exporter(selfbot["redis"])))
         
         # نگه داشتن برنامه در حال اجرا
         logger.info("سلف بات با موفقیت راه‌اندازی شد و در حال اجراست")
@@ -193,12 +215,27 @@ async def shutdown_selfbot(selfbot):
     """
     logger.info("در حال خاموش کردن سلف بات...")
     
+    # پردازش رویدادهای باقی‌مانده در صف
+    try:
+        await selfbot["event_handler"].shutdown()
+    except:
+        pass
+    
     # قطع اتصال کلاینت تلگرام
     try:
-        await selfbot["client"].disconnect()
+        if selfbot["accounts"]:
+            await selfbot["accounts"].stop()
+        else:
+            await selfbot["client"].disconnect()
     except:
         pass
     
+    # نوشتن ردیف‌های باقی‌مانده در بافرهای نوشتن پلاگین‌ها
+    try:
+        await close_write_buffers()
+    except Exception as e:
+        logger.error(f"خطا در تخلیه‌ی بافرهای نوشتن: {str(e)}")
+
     # قطع اتصال دیتابیس
     try:
         await selfbot["db"].disconnect()
@@ -212,6 +249,7 @@ async def shutdown_selfbot(selfbot):
         pass
     
     logger.info("سلف بات با موفقیت خاموش شد")
+    shutdown_logging()
 
 
 if __name__ == "__main__":
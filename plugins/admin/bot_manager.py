@@ -10,8 +10,8 @@ import json
 from pyrogram.types import Message
 
 from plugins.base_plugin import BasePlugin
-from core.event_handler import EventType
 from core.client import TelegramClient
+from core.metrics import HandlerKind, get_metrics
 
 logger = logging.getLogger(__name__)
 
@@ -68,12 +68,7 @@ class BotManagerPlugin(BasePlugin):
             self.register_command('restart', self.cmd_restart, 'راه‌اندازی مجدد سلف بات', '.restart')
             self.register_command('status', self.cmd_status, 'نمایش وضعیت سلف بات', '.status')
             self.register_command('plugins', self.cmd_plugins, 'مدیریت پلاگین‌ها', '.plugins [list|enable|disable] [نام_پلاگین]')
-
-            # ثبت هندلرهای رویداد
-            self.register_event_handler(EventType.MESSAGE, self.on_help_command, {'text': ['.help', '/help', '!help']})
-            self.register_event_handler(EventType.MESSAGE, self.on_restart_command, {'text': ['.restart', '/restart', '!restart']})
-            self.register_event_handler(EventType.MESSAGE, self.on_status_command, {'text': ['.status', '/status', '!status']})
-            self.register_event_handler(EventType.MESSAGE, self.on_plugins_command, {'text_startswith': ['.plugins', '/plugins', '!plugins']})
+            self.register_command('perf', self.cmd_perf, 'نمایش آمار کارایی هندلرها', '.perf [تعداد|middleware|reset]')
 
             # ثبت آمار پلاگین در دیتابیس
             plugin_data = {
@@ -348,42 +343,51 @@ class BotManagerPlugin(BasePlugin):
             logger.error(f"خطا در اجرای دستور plugins: {str(e)}")
             await message.reply_text(self._("command_error", default="خطا در اجرای دستور."))
 
-    async def on_help_command(self, client: TelegramClient, message: Message) -> None:
+    async def cmd_perf(self, client: TelegramClient, message: Message) -> None:
         """
-        هندلر دستور راهنما
+        دستور نمایش آمار کارایی هندلرها و میان‌افزارها
 
         Args:
             client: کلاینت تلگرام
             message: پیام دریافتی
         """
-        await self.cmd_help(client, message)
+        if not await self.is_admin(message.from_user.id):
+            await message.reply_text(self._("not_admin", default="شما دسترسی لازم برای این دستور را ندارید."))
+            return
 
-    async def on_restart_command(self, client: TelegramClient, message: Message) -> None:
-        """
-        هندلر دستور راه‌اندازی مجدد
+        try:
+            args = message.text.split()[1:]
+            metrics = get_metrics()
 
-        Args:
-            client: کلاینت تلگرام
-            message: پیام دریافتی
-        """
-        await self.cmd_restart(client, message)
+            if args and args[0].lower() == "reset":
+                metrics.reset()
+                await message.reply_text(self._("perf_reset", default="آمار کارایی صفر شد."))
+                return
 
-    async def on_status_command(self, client: TelegramClient, message: Message) -> None:
-        """
-        هندلر دستور وضعیت
+            kind = HandlerKind.MIDDLEWARE if args and args[0].lower() == "middleware" else None
+            limit = int(args[0]) if args and args[0].isdigit() else 10
 
-        Args:
-            client: کلاینت تلگرام
-            message: پیام دریافتی
-        """
-        await self.cmd_status(client, message)
+            rows = [m for m in metrics.top(limit * 2, kind) if kind or m.kind != HandlerKind.MIDDLEWARE][:limit]
+            if not rows:
+                await message.reply_text(self._("perf_empty", default="هنوز آماری ثبت نشده است."))
+                return
 
-    async def on_plugins_command(self, client: TelegramClient, message: Message) -> None:
-        """
-        هندلر دستور مدیریت پلاگین‌ها
+            elapsed = int(time.time() - metrics.started_at)
+            perf_text = f"⏱ **آمار کارایی** (در {elapsed} ثانیه‌ی اخیر)\n\n"
+            for m in rows:
+                avg_ms = m.total_time / m.calls * 1000
+                p95_ms = m.quantile(0.95) * 1000
+                perf_text += (f"• `{m.plugin}.{m.handler}`: {m.calls} فراخوانی، {m.errors} خطا، "
+                              f"میانگین {avg_ms:.1f}ms، p95 ≤ {p95_ms:.0f}ms، مجموع {m.total_time:.2f}s\n")
 
-        Args:
-            client: کلاینت تلگرام
-            message: پیام دریافتی
-        """
-        await self.cmd_plugins(client, message)
+            executor_stats = self.event_handler.get_executor_stats()
+            if executor_stats:
+                perf_text += (f"\n📥 صف رویدادها: {executor_stats['queue_depth']}/{executor_stats['max_queue_size']}، "
+                              f"تأخیر قدیمی‌ترین: {executor_stats['oldest_lag'] * 1000:.0f}ms، "
+                              f"حذف شده: {executor_stats['dropped_oldest'] + executor_stats['dropped_newest']}\n")
+
+            await message.reply_text(perf_text)
+
+        except Exception as e:
+            logger.error(f"خطا در اجرای دستور perf: {str(e)}")
+            await message.reply_text(self._("command_error", default="خطا در اجرای دستور."))
@@ -97,11 +97,6 @@ class UserManagerPlugin(BasePlugin):
             self.register_command('users', self.cmd_list_users, 'مشاهده لیست کاربران', '.users [admin|trusted|blocked]')
 
             # ثبت هندلرهای رویداد
-            self.register_event_handler(EventType.MESSAGE, self.on_add_user_command, {'text_startswith': ['.adduser', '/adduser', '!adduser']})
-            self.register_event_handler(EventType.MESSAGE, self.on_del_user_command, {'text_startswith': ['.deluser', '/deluser', '!deluser']})
-            self.register_event_handler(EventType.MESSAGE, self.on_block_user_command, {'text_startswith': ['.block', '/block', '!block']})
-            self.register_event_handler(EventType.MESSAGE, self.on_unblock_user_command, {'text_startswith': ['.unblock', '/unblock', '!unblock']})
-            self.register_event_handler(EventType.MESSAGE, self.on_list_users_command, {'text_startswith': ['.users', '/users', '!users']})
             self.register_event_handler(EventType.MESSAGE, self.on_private_message, {'is_private': True})
 
             # ثبت آمار پلاگین در دیتابیس
@@ -16,7 +16,6 @@ from pyrogram import filters
 from pyrogram.types import Message
 
 from plugins.base_plugin import BasePlugin
-from core.event_handler import EventType
 from core.client import TelegramClient
 from core.crypto import encrypt_data, decrypt_data
 
@@ -139,11 +138,6 @@ class ImageGenerator(BasePlugin):
             self.register_command('img_set', self.cmd_image_settings, 'تنظیم پارامترهای تولید تصویر', '.img_set [پارامتر] [مقدار]')
             self.register_command('img_key', self.cmd_set_api_key, 'تنظیم کلید API تولید تصویر', '.img_key [openai|stability] [کلید]')
 
-            # ثبت هندلرهای رویداد
-            self.register_event_handler(EventType.MESSAGE, self.on_img_command, {'text_startswith': ['.img ', '/img ', '!img ']})
-            self.register_event_handler(EventType.MESSAGE, self.on_img_settings_command, {'text_startswith': ['.img_set ', '/img_set ', '!img_set ']})
-            self.register_event_handler(EventType.MESSAGE, self.on_img_key_command, {'text_startswith': ['.img_key ', '/img_key ', '!img_key ']})
-
             # ثبت آمار پلاگین در دیتابیس
             plugin_data = {
                 'name': self.name,
@@ -524,33 +518,3 @@ class ImageGenerator(BasePlugin):
         except Exception as e:
             logger.error(f"خطا در اجرای دستور img_key: {str(e)}")
             await message.reply_text(self._("command_error", default="خطا در اجرای دستور."))
-
-    async def on_img_command(self, client: TelegramClient, message: Message) -> None:
-        """
-        هندلر دستور تولید تصویر
-
-        Args:
-            client: کلاینت تلگرام
-            message: پیام دریافتی
-        """
-        await self.cmd_generate_image(client, message)
-
-    async def on_img_settings_command(self, client: TelegramClient, message: Message) -> None:
-        """
-        هندلر دستور تنظیم پارامترهای تولید تصویر
-
-        Args:
-            client: کلاینت تلگرام
-            message: پیام دریافتی
-        """
-        await self.cmd_image_settings(client, message)
-
-    async def on_img_key_command(self, client: TelegramClient, message: Message) -> None:
-        """
-        هندلر دستور تنظیم کلید API
-
-        Args:
-            client: کلاینت تلگرام
-            message: پیام دریافتی
-        """
-        await self.cmd_set_api_key(client, message)
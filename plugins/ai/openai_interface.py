@@ -14,7 +14,6 @@ from pyrogram import filters
 from pyrogram.types import Message
 
 from plugins.base_plugin import BasePlugin
-from core.event_handler import EventType
 from core.client import TelegramClient
 from core.crypto import encrypt_data, decrypt_data
 
@@ -126,12 +125,6 @@ class OpenAIInterface(BasePlugin):
             self.register_command('ai_set', self.cmd_ai_settings, 'تنظیم پارامترهای هوش مصنوعی', '.ai_set [پارامتر] [مقدار]')
             self.register_command('ai_key', self.cmd_ai_set_key, 'تنظیم کلید API', '.ai_key [کلید]')
 
-            # ثبت هندلرهای رویداد
-            self.register_event_handler(EventType.MESSAGE, self.on_ai_command, {'text_startswith': ['.ai ', '/ai ', '!ai ']})
-            self.register_event_handler(EventType.MESSAGE, self.on_ai_models_command, {'text': ['.ai_models', '/ai_models', '!ai_models']})
-            self.register_event_handler(EventType.MESSAGE, self.on_ai_settings_command, {'text_startswith': ['.ai_set ', '/ai_set ', '!ai_set ']})
-            self.register_event_handler(EventType.MESSAGE, self.on_ai_key_command, {'text_startswith': ['.ai_key ', '/ai_key ', '!ai_key ']})
-
             # ثبت آمار پلاگین در دیتابیس
             plugin_data = {
                 'name': self.name,
@@ -437,43 +430,3 @@ class OpenAIInterface(BasePlugin):
         except Exception as e:
             logger.error(f"خطا در اجرای دستور ai_key: {str(e)}")
             await message.reply_text(self._("command_error", default="خطا در اجرای دستور."))
-
-    async def on_ai_command(self, client: TelegramClient, message: Message) -> None:
-        """
-        هندلر دستور درخواست تکمیل از هوش مصنوعی
-
-        Args:
-            client: کلاینت تلگرام
-            message: پیام دریافتی
-        """
-        await self.cmd_ai_complete(client, message)
-
-    async def on_ai_models_command(self, client: TelegramClient, message: Message) -> None:
-        """
-        هندلر دستور مشاهده مدل‌های موجود
-
-        Args:
-            client: کلاینت تلگرام
-            message: پیام دریافتی
-        """
-        await self.cmd_ai_models(client, message)
-
-    async def on_ai_settings_command(self, client: TelegramClient, message: Message) -> None:
-        """
-        هندلر دستور تنظیم پارامترهای هوش مصنوعی
-
-        Args:
-            client: کلاینت تلگرام
-            message: پیام دریافتی
-        """
-        await self.cmd_ai_settings(client, message)
-
-    async def on_ai_key_command(self, client: TelegramClient, message: Message) -> None:
-        """
-        هندلر دستور تنظیم کلید API
-
-        Args:
-            client: کلاینت تلگرام
-            message: پیام دریافتی
-        """
-        await self.cmd_ai_set_key(client, message)
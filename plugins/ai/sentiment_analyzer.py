@@ -133,17 +133,10 @@ class SentimentAnalyzer(BasePlugin):
             self.register_command('sentiment_chat', self.cmd_sentiment_chat, 'فعال/غیرفعال کردن تحلیل خودکار چت',
                                 '.sentiment_chat [on|off] [chat_id]')
 
-            # ثبت هندلرهای رویداد
-            self.register_event_handler(EventType.MESSAGE, self.on_sentiment_command,
-                                     {'text_startswith': ['.sentiment ', '/sentiment ', '!sentiment ']})
-            self.register_event_handler(EventType.MESSAGE, self.on_sentiment_settings_command,
-                                     {'text_startswith': ['.sentiment_set ', '/sentiment_set ', '!sentiment_set ']})
-            self.register_event_handler(EventType.MESSAGE, self.on_sentiment_chat_command,
-                                     {'text_startswith': ['.sentiment_chat ', '/sentiment_chat ', '!sentiment_chat ']})
-
             # اگر تحلیل خودکار چت فعال باشد، هندلر مربوطه را ثبت می‌کنیم
             if self.chat_analysis_enabled:
-                self.register_event_handler(EventType.MESSAGE, self.on_chat_message, {})
+                self.register_event_handler(EventType.MESSAGE, self.on_chat_message,
+                                         self.chat_scoped_filters(self.target_chats))
 
             # ثبت آمار پلاگین در دیتابیس
             plugin_data = {
@@ -307,13 +300,12 @@ class SentimentAnalyzer(BasePlugin):
             client (TelegramClient): کلاینت تلگرام
             message (Message): پیام درخواست
         """
-        # جدا کردن متن از دستور
-        if len(message.text.split(" ", 1)) < 2:
+        # متن پس از دستور (توکن دستور یک بار در پاکت رویداد جدا شده است)
+        text = self.envelope(message).command_args
+        if not text:
             await message.reply_text("لطفاً متنی برای تحلیل وارد کنید. مثال: `.sentiment متن مورد نظر`")
             return
 
-        text = message.text.split(" ", 1)[1]
-
         # ارسال پیام در حال تحلیل
         processing_msg = await message.reply_text("در حال تحلیل احساسات متن...")
 
@@ -369,8 +361,8 @@ class SentimentAnalyzer(BasePlugin):
             message (Message): پیام درخواست
         """
         # بررسی تعداد پارامترها
-        parts = message.text.split(" ", 2)
-        if len(parts) < 3:
+        args = self.envelope(message).command_args.split(None, 1)
+        if len(args) < 2:
             await message.reply_text(
                 "لطفاً پارامتر و مقدار را وارد کنید.\n"
                 "پارامترهای موجود: provider, lang\n"
@@ -378,8 +370,8 @@ class SentimentAnalyzer(BasePlugin):
             )
             return
 
-        param = parts[1].lower()
-        value = parts[2]
+        param = args[0].lower()
+        value = args[1]
 
         if param == "provider":
             if value.lower() not in ["openai", "huggingface"]:
@@ -425,8 +417,8 @@ class SentimentAnalyzer(BasePlugin):
             message (Message): پیام درخواست
         """
         # بررسی تعداد پارامترها
-        parts = message.text.split(" ", 2)
-        if len(parts) < 2:
+        args = self.envelope(message).command_args.split()
+        if not args:
             await message.reply_text(
                 "لطفاً وضعیت را وارد کنید (on یا off).\n"
                 "مثال برای فعال کردن در چت فعلی: `.sentiment_chat on`\n"
@@ -434,16 +426,16 @@ class SentimentAnalyzer(BasePlugin):
             )
             return
 
-        state = parts[1].lower()
+        state = args[0].lower()
         if state not in ["on", "off"]:
             await message.reply_text("وضعیت باید یکی از موارد زیر باشد: on, off")
             return
 
         # تعیین چت هدف
         target_chat_id = None
-        if len(parts) >= 3:
+        if len(args) >= 2:
             try:
-                target_chat_id = int(parts[2])
+                target_chat_id = int(args[1])
             except ValueError:
                 await message.reply_text("شناسه چت باید یک عدد صحیح باشد")
                 return
@@ -464,7 +456,11 @@ class SentimentAnalyzer(BasePlugin):
                     ('sentiment_chat_analysis',)
                 )
                 # ثبت هندلر رویداد
-                self.register_event_handler(EventType.MESSAGE, self.on_chat_message, {})
+                self.register_event_handler(EventType.MESSAGE, self.on_chat_message,
+                                         self.chat_scoped_filters(self.target_chats))
+            else:
+                self.update_event_handler_filters(EventType.MESSAGE, self.on_chat_message,
+                                                  self.chat_scoped_filters(self.target_chats))
 
             await self.update(
                 'settings',
@@ -495,39 +491,12 @@ class SentimentAnalyzer(BasePlugin):
                 )
                 # حذف هندلر رویداد
                 self.unregister_event_handler(EventType.MESSAGE, self.on_chat_message)
+            elif self.chat_analysis_enabled:
+                self.update_event_handler_filters(EventType.MESSAGE, self.on_chat_message,
+                                                  self.chat_scoped_filters(self.target_chats))
 
             await message.reply_text(f"✅ تحلیل خودکار احساسات برای چت {target_chat_id} غیرفعال شد.")
 
-    async def on_sentiment_command(self, client: TelegramClient, message: Message) -> None:
-        """
-        هندلر دستور تحلیل احساسات
-
-        Args:
-            client (TelegramClient): کلاینت تلگرام
-            message (Message): پیام دریافتی
-        """
-        await self.cmd_analyze_sentiment(client, message)
-
-    async def on_sentiment_settings_command(self, client: TelegramClient, message: Message) -> None:
-        """
-        هندلر دستور تنظیم پارامترهای تحلیل احساسات
-
-        Args:
-            client (TelegramClient): کلاینت تلگرام
-            message (Message): پیام دریافتی
-        """
-        await self.cmd_sentiment_settings(client, message)
-
-    async def on_sentiment_chat_command(self, client: TelegramClient, message: Message) -> None:
-        """
-        هندلر دستور فعال/غیرفعال کردن تحلیل خودکار چت
-
-        Args:
-            client (TelegramClient): کلاینت تلگرام
-            message (Message): پیام دریافتی
-        """
-        await self.cmd_sentiment_chat(client, message)
-
     async def on_chat_message(self, client: TelegramClient, message: Message) -> None:
         """
         هندلر پیام‌های چت برای تحلیل خودکار احساسات
@@ -554,7 +523,7 @@ class SentimentAnalyzer(BasePlugin):
 
             # ثبت در دیتابیس
             if "error" not in result:
-                await self.insert(
+                await self.buffer_insert(
                     'activity_logs',
                     {
                         'user_id': message.from_user.id if message.from_user else 0,
@@ -12,7 +12,6 @@ from typing import Optional
 from pyrogram.types import Message
 
 from plugins.base_plugin import BasePlugin
-from core.event_handler import EventType
 from core.client import TelegramClient
 
 # وابستگی‌های خارجی
@@ -101,11 +100,6 @@ class VoiceProcessor(BasePlugin):
             self.register_command('stt', self.cmd_speech_to_text, 'تبدیل صوت به متن (در پاسخ به پیام صوتی)', '.stt')
             self.register_command('vp_lang', self.cmd_set_language, 'تنظیم زبان پیش‌فرض برای TTS', '.vp_lang [کد زبان]')
 
-            # ثبت هندلرهای رویداد
-            self.register_event_handler(EventType.MESSAGE, self.on_tts_command, {'text_startswith': ['.tts', '/tts', '!tts']})
-            self.register_event_handler(EventType.MESSAGE, self.on_stt_command, {'text_startswith': ['.stt', '/stt', '!stt']})
-            self.register_event_handler(EventType.MESSAGE, self.on_set_language_command, {'text_startswith': ['.vp_lang', '/vp_lang', '!vp_lang']})
-
             # ثبت آمار پلاگین در دیتابیس
             plugin_data = {
                 'name': self.name,
@@ -413,21 +407,3 @@ class VoiceProcessor(BasePlugin):
             await message.reply_text("خطا در اجرای دستور. لطفاً بعداً دوباره تلاش کنید.")
 
     # هندلرهای رویداد
-
-    async def on_tts_command(self, client: TelegramClient, message: Message) -> None:
-        """
-        هندلر دستور تبدیل متن به صوت
-        """
-        await self.cmd_text_to_speech(client, message)
-
-    async def on_stt_command(self, client: TelegramClient, message: Message) -> None:
-        """
-        هندلر دستور تبدیل صوت به متن
-        """
-        await self.cmd_speech_to_text(client, message)
-
-    async def on_set_language_command(self, client: TelegramClient, message: Message) -> None:
-        """
-        هندلر دستور تنظیم زبان
-        """
-        await self.cmd_set_language(client, message)
@@ -124,10 +124,6 @@ class ActivityTracker(BasePlugin):
             # ثبت هندلرهای رویداد
             self.register_event_handler(EventType.MESSAGE, self.on_message_activity, {})
             self.register_event_handler(EventType.EDITED_MESSAGE, self.on_edited_message_activity, {})
-            self.register_event_handler(EventType.MESSAGE, self.on_stats_command, {'text_startswith': ['.stats', '/stats', '!stats']})
-            self.register_event_handler(EventType.MESSAGE, self.on_track_command, {'text_startswith': ['.track', '/track', '!track']})
-            self.register_event_handler(EventType.MESSAGE, self.on_chart_command, {'text_startswith': ['.chart', '/chart', '!chart']})
-            self.register_event_handler(EventType.MESSAGE, self.on_export_command, {'text_startswith': ['.export', '/export', '!export']})
 
             # زمان‌بندی بررسی و ذخیره آمار روزانه
             self.schedule(self.check_daily_reset, interval=3600, name="check_daily_reset") \
@@ -278,10 +274,9 @@ class ActivityTracker(BasePlugin):
 
         try:
             # بررسی ارسالی یا دریافتی
-            is_outgoing = message.outgoing
-            has_media = bool(message.media) or bool(message.photo) \
-                or bool(message.document) or bool(message.video) or bool(message.animation) \
-                or bool(message.voice) or bool(message.audio) \
+            envelope = self.envelope(message)
+            is_outgoing = envelope.is_outgoing
+            has_media = envelope.has_media
 
             # به روزرسانی آمار روزانه
             hour = datetime.now().hour
@@ -297,7 +292,7 @@ class ActivityTracker(BasePlugin):
                     self.daily_stats["media_received"] += 1
 
             # به روزرسانی آمار چت
-            chat_id = str(message.chat.id)
+            chat_id = str(envelope.chat_id)
             if chat_id not in self.chat_activities:
                 self.chat_activities[chat_id] = {
                     "title": message.chat.title if hasattr(message.chat, "title") \
@@ -555,30 +550,6 @@ class ActivityTracker(BasePlugin):
             logger.error(f"خطا در استخراج داده‌ها: {str(e)}")
             await message.reply(f"❌ **خطا در استخراج داده‌ها:** {str(e)}")
 
-    async def on_stats_command(self, client: TelegramClient, message: Message) -> None:
-        """
-        هندلر دستور stats
-        """
-        await self.cmd_show_stats(client, message)
-
-    async def on_track_command(self, client: TelegramClient, message: Message) -> None:
-        """
-        هندلر دستور track
-        """
-        await self.cmd_toggle_tracking(client, message)
-
-    async def on_chart_command(self, client: TelegramClient, message: Message) -> None:
-        """
-        هندلر دستور chart
-        """
-        await self.cmd_generate_chart(client, message)
-
-    async def on_export_command(self, client: TelegramClient, message: Message) -> None:
-        """
-        هندلر دستور export
-        """
-        await self.cmd_export_data(client, message)
-
     async def generate_hourly_chart(self, chart_path: str) -> bool:
         """
         تولید نمودار ساعتی فعالیت‌ها
@@ -118,9 +118,6 @@ class CommunicationAnalyzer(BasePlugin):
 
             # ثبت هندلرهای رویداد
             self.register_event_handler(EventType.MESSAGE, self.on_message, {})
-            self.register_event_handler(EventType.MESSAGE, self.on_contacts_command, {'text_startswith': ['.contacts', '/contacts', '!contacts']})
-            self.register_event_handler(EventType.MESSAGE, self.on_keywords_command, {'text_startswith': ['.keywords', '/keywords', '!keywords']})
-            self.register_event_handler(EventType.MESSAGE, self.on_analyzer_command, {'text_startswith': ['.analyzer', '/analyzer', '!analyzer']})
 
             # زمان‌بندی ذخیره اطلاعات
             self.schedule(self.save_analytics_data, interval=1800, name="save_analytics_data") \
@@ -393,21 +390,3 @@ class CommunicationAnalyzer(BasePlugin):
         except Exception as e:
             logger.error(f"خطا در تغییر وضعیت تحلیل‌گر: {str(e)}")
             await message.reply(f"❌ **خطا در تغییر وضعیت تحلیل‌گر:** {str(e)}")
-
-    async def on_contacts_command(self, client: TelegramClient, message: Message) -> None:
-        """
-        هندلر دستور contacts
-        """
-        await self.cmd_analyze_contacts(client, message)
-
-    async def on_keywords_command(self, client: TelegramClient, message: Message) -> None:
-        """
-        هندلر دستور keywords
-        """
-        await self.cmd_analyze_keywords(client, message)
-
-    async def on_analyzer_command(self, client: TelegramClient, message: Message) -> None:
-        """
-        هندلر دستور analyzer
-        """
-        await self.cmd_toggle_analyzer(client, message)
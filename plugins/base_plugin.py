@@ -1,39 +1,72 @@
 """
 کلاس پایه برای پلاگین‌ها
 """
-import asyncio
+import functools
 import inspect
 import logging
 import os
-from typing import Any, Callable, Dict, List, Optional, Set, Tuple, Union
+from typing import Any, Callable, Dict, List, Optional, Tuple
 from abc import ABC, abstractmethod
-import json
 import yaml
 
-from core.client import TelegramClient
+from core.database.base import DatabaseInterface
+from core.database.postgres import AsyncPGDatabase
 from core.database.sql import PostgreSQLDatabase
 from core.database.redis import RedisManager
-from core.event_handler import EventHandler, EventType
+from core.account_context import AccountStateStore, account_key
+from core.command_dispatcher import CommandDispatcher
+from core.event_envelope import EventEnvelope, get_envelope
+from core.event_handler import DispatchMode, EventHandler, EventType
+from core.metrics import HandlerKind, get_metrics
 from core.scheduler import Scheduler
+from core.write_buffer import WriteBehindBuffer
 from core.localization import Localization, _
 
-# تنظیم سیستم لاگینگ
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.FileHandler("data/logs/plugins.log"),
-        logging.StreamHandler()
-    ]
-)
 logger = logging.getLogger(__name__)
 
 
+def create_plugin_database(backend: Optional[str] = None) -> DatabaseInterface:
+    """
+    ساخت دیتابیس پلاگین‌ها بر اساس PLUGIN_DB_BACKEND
+
+    Args:
+        backend: supabase (پیش‌فرض) یا asyncpg برای SQL پارامتری روی استخر اتصال مشترک
+
+    Returns:
+        DatabaseInterface: شیء دیتابیس
+    """
+    backend = (backend or os.getenv("PLUGIN_DB_BACKEND", "supabase")).strip().lower()
+    if backend == "asyncpg":
+        return AsyncPGDatabase()
+    if backend != "supabase":
+        logger.warning(f"PLUGIN_DB_BACKEND نامعتبر: {backend}، از supabase استفاده می‌شود")
+    return PostgreSQLDatabase()
+
+
 class BasePlugin(ABC):
     """
     کلاس پایه برای تمام پلاگین‌ها
     """
 
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        # آزادسازی دستورات و هندلرهای ثبت شده پس از cleanup هر پلاگین، حتی اگر
+        # پیاده‌سازی آن super().cleanup() را فراخوانی نکند
+        cleanup = cls.__dict__.get('cleanup')
+        if cleanup is None or getattr(cleanup, '__isabstractmethod__', False) or \
+                getattr(cleanup, '_releases_registrations', False):
+            return
+
+        @functools.wraps(cleanup)
+        async def wrapper(self, *args, **kwargs):
+            try:
+                return await cleanup(self, *args, **kwargs)
+            finally:
+                self.release_registrations()
+
+        wrapper._releases_registrations = True
+        cls.cleanup = wrapper
+
     def __init__(self):
         """
         مقداردهی اولیه
@@ -45,13 +78,17 @@ class BasePlugin(ABC):
         self.category = "general"
         self.commands = []
         self.event_handler = EventHandler()
-        self.db = PostgreSQLDatabase()
+        self.command_dispatcher = CommandDispatcher()
+        self.db = create_plugin_database()
         self.redis = RedisManager()
         self.scheduler = Scheduler()
         self.localization = Localization()
         self.config = {}
         self.is_enabled = True
         self._registered_handlers = {}
+        # وضعیت جداگانه‌ی هر حساب در اجرای چند حسابی
+        self.account_states = AccountStateStore()
+        self._write_buffer: Optional[WriteBehindBuffer] = None
 
     def set_metadata(self, name: str, version: str, description: str, author: str, category: str):
         """
@@ -144,30 +181,69 @@ class BasePlugin(ABC):
             bool: وضعیت پاکسازی
         """
 
-    def register_command(self, name: str, handler: Callable, description: str = "", usage: str = "") \
-        \ \
-        \ \
-        : \
+    def release_registrations(self) -> None:
+        """
+        حذف تمام دستورات و هندلرهای رویداد این پلاگین از پخش‌کننده‌های مشترک
+
+        پس از cleanup هر پلاگین خودکار اجرا می‌شود تا پلاگین غیرفعال یا تخلیه شده به
+        دستورات و رویدادها پاسخ ندهد.
         """
-        ثبت یک دستور
+        self.command_dispatcher.unregister_plugin(self.name)
+        self.commands = []
+        for info in list(self._registered_handlers.values()):
+            self.event_handler.remove_handler(info['event_type'], info['handler'])
+        self._registered_handlers = {}
+
+    def register_command(self, name: str, handler: Callable, description: str = "", usage: str = "",
+                         aliases: Optional[List[str]] = None, prefixes: Optional[List[str]] = None) -> bool:
+        """
+        ثبت یک دستور در پخش‌کننده‌ی مرکزی دستورات
+
+        هندلر دستور فقط برای پیام‌هایی اجرا می‌شود که توکن اول آن‌ها نام یا یکی از نام‌های
+        مستعار دستور باشد؛ نیازی به ثبت هندلر پیام جداگانه برای دستور نیست.
 
         Args:
             name: نام دستور
             handler: تابع اجرا کننده دستور
             description: توضیحات دستور
             usage: نحوه استفاده از دستور
+            aliases: نام‌های مستعار دستور
+            prefixes: پیشوندهای مجاز (پیش‌فرض تمام پیشوندهای دستور)
+
+        Returns:
+            bool: وضعیت ثبت
         """
+        if inspect.iscoroutinefunction(handler):
+            handler = get_metrics().instrument(handler, self.name, name, HandlerKind.COMMAND)
+
+        if not self.command_dispatcher.register(name, handler, self.name, aliases, prefixes, description, usage):
+            return False
+        self.command_dispatcher.attach(self.event_handler)
+
         self.commands.append({
             'name': name,
             'handler': handler,
             'description': description,
-            'usage': usage
+            'usage': usage,
+            'aliases': list(aliases or [])
         })
+        return True
+
+    def unregister_command(self, name: str) -> bool:
+        """
+        حذف یک دستور
+
+        Args:
+            name: نام دستور
+
+        Returns:
+            bool: وضعیت حذف
+        """
+        self.commands = [command for command in self.commands if command['name'] != name]
+        return self.command_dispatcher.unregister(name)
 
-    def register_event_handler(self, event_type: str, handler: Callable, filters: Optional[Dict[str, Any]] = None) \
-        \ \
-        \ \
-        : \
+    def register_event_handler(self, event_type: str, handler: Callable, filters: Optional[Dict[str, Any]] = None,
+                               order: int = 0, coalesce: bool = True):
         """
         ثبت هندلر رویداد
 
@@ -175,57 +251,163 @@ class BasePlugin(ABC):
             event_type: نوع رویداد
             handler: تابع اجرا کننده
             filters: فیلترها
+            order: ترتیب اجرا در حالت مسیریاب (مقدار کمتر زودتر اجرا می‌شود)
+            coalesce: دریافت ویرایش‌های ادغام شده (False برای دریافت تمام ویرایش‌ها)
         """
         handler_id = f"{self.name}_{event_type}_{len(self._registered_handlers)}"
-        self.event_handler.register_handler(event_type, handler, filters)
+        router_id = self.event_handler.register_handler(event_type, handler, filters, order, coalesce)
         self._registered_handlers[handler_id] = {
             'event_type': event_type,
             'handler': handler,
-            'filters': filters
+            'filters': filters,
+            'order': order,
+            'coalesce': coalesce,
+            'router_id': router_id
         }
 
-    def on_message(self, filters: Optional[Dict[str, Any]] = None):
+    def unregister_event_handler(self, event_type: str, handler: Callable) -> bool:
+        """
+        حذف هندلر رویداد
+
+        Args:
+            event_type: نوع رویداد
+            handler: تابع اجرا کننده
+
+        Returns:
+            bool: وضعیت حذف
+        """
+        removed = self.event_handler.remove_handler(event_type, handler)
+        for handler_id, info in list(self._registered_handlers.items()):
+            if info['event_type'] == event_type and info['handler'] == handler:
+                del self._registered_handlers[handler_id]
+        return removed
+
+    def update_event_handler_filters(self, event_type: str, handler: Callable,
+                                     filters: Optional[Dict[str, Any]]) -> bool:
+        """
+        بروزرسانی فیلترهای یک هندلر ثبت شده (فقط در حالت مسیریاب)
+
+        Args:
+            event_type: نوع رویداد
+            handler: تابع اجرا کننده
+            filters: فیلترهای جدید
+
+        Returns:
+            bool: وضعیت بروزرسانی
+        """
+        for info in self._registered_handlers.values():
+            if info['event_type'] == event_type and info['handler'] == handler:
+                info['filters'] = filters
+        return self.event_handler.update_handler_filters(event_type, handler, filters)
+
+    def chat_scoped_filters(self, chat_ids: List[int], **filters) -> Dict[str, Any]:
+        """
+        ساخت فیلتر محدود به چت‌های مشخص
+
+        در حالت مسیریاب هندلر در سطل چت‌های داده شده نمایه می‌شود و برای پیام‌های سایر
+        چت‌ها اجرا نمی‌شود. در حالت per_handler فیلتر ثبت شده در کلاینت قابل بروزرسانی نیست،
+        پس بررسی چت به عهده‌ی خود هندلر می‌ماند.
+
+        Args:
+            chat_ids: شناسه‌های چت
+            **filters: سایر فیلترها
+
+        Returns:
+            Dict[str, Any]: فیلترها
+        """
+        if self.event_handler.dispatch_mode == DispatchMode.ROUTER:
+            filters['chat_id'] = list(chat_ids)
+        return filters
+
+    def account_state(self, account_id: Optional[str] = None) -> Dict[str, Any]:
+        """
+        دریافت فضای وضعیت یک حساب
+
+        نمونه‌ی پلاگین بین تمام حساب‌های یک پردازه مشترک است؛ وضعیتی که به حساب وابسته است
+        (تنظیمات، شمارنده‌ها، کش‌ها) باید در این دیکشنری نگهداری شود.
+
+        Args:
+            account_id: شناسه حساب (پیش‌فرض حساب بروزرسانی در حال پردازش)
+
+        Returns:
+            Dict[str, Any]: وضعیت حساب
+        """
+        return self.account_states.get(account_id)
+
+    def account_key(self, key: str, account_id: Optional[str] = None) -> str:
+        """
+        ساخت کلید Redis یا کش مختص حساب
+
+        Args:
+            key: کلید
+            account_id: شناسه حساب (پیش‌فرض حساب بروزرسانی در حال پردازش)
+
+        Returns:
+            str: کلید با پیشوند پلاگین و حساب
+        """
+        return account_key(f"{self.name}:{key}", account_id)
+
+    @staticmethod
+    def envelope(message: Any) -> EventEnvelope:
+        """
+        دریافت پاکت رویداد پیام (فرستنده، چت، جهت، متن کوچک‌شده، نوع رسانه و توکن دستور)
+
+        پاکت یک بار برای هر بروزرسانی ساخته می‌شود و بین میان‌افزارها و هندلرها مشترک است.
+
+        Args:
+            message: پیام یا رویداد دریافتی
+
+        Returns:
+            EventEnvelope: پاکت رویداد
+        """
+        return get_envelope(message)
+
+    def on_message(self, filters: Optional[Dict[str, Any]] = None, order: int = 0):
         """
         دکوراتور برای ثبت هندلر پیام
 
         Args:
             filters: فیلترها
+            order: ترتیب اجرا در حالت مسیریاب
 
         Returns:
             Callable: دکوراتور
         """
         def decorator(func):
-            self.register_event_handler(EventType.MESSAGE, func, filters)
+            self.register_event_handler(EventType.MESSAGE, func, filters, order)
             return func
         return decorator
 
-    def on_edited_message(self, filters: Optional[Dict[str, Any]] = None):
+    def on_edited_message(self, filters: Optional[Dict[str, Any]] = None, order: int = 0, coalesce: bool = True):
         """
         دکوراتور برای ثبت هندلر پیام ویرایش شده
 
         Args:
             filters: فیلترها
+            order: ترتیب اجرا در حالت مسیریاب
+            coalesce: دریافت ویرایش‌های ادغام شده (False برای دریافت تمام ویرایش‌ها)
 
         Returns:
             Callable: دکوراتور
         """
         def decorator(func):
-            self.register_event_handler(EventType.EDITED_MESSAGE, func, filters)
+            self.register_event_handler(EventType.EDITED_MESSAGE, func, filters, order, coalesce)
             return func
         return decorator
 
-    def on_callback_query(self, filters: Optional[Dict[str, Any]] = None):
+    def on_callback_query(self, filters: Optional[Dict[str, Any]] = None, order: int = 0):
         """
         دکوراتور برای ثبت هندلر callback query
 
         Args:
             filters: فیلترها
+            order: ترتیب اجرا در حالت مسیریاب
 
         Returns:
             Callable: دکوراتور
         """
         def decorator(func):
-            self.register_event_handler(EventType.CALLBACK_QUERY, func, filters)
+            self.register_event_handler(EventType.CALLBACK_QUERY, func, filters, order)
             return func
         return decorator
 
@@ -312,8 +494,8 @@ class BasePlugin(ABC):
         await self.get_db_connection()
         return await self.db.execute(query, values)
 
-    async def fetch_one(self, query: str, values: Optional[Tuple[Any, ...]] = None) \
-        -> Optional[Dict[str, Any]]: \
+    async def fetch_one(self, query: str,
+                        values: Optional[Tuple[Any, ...]] = None) -> Optional[Dict[str, Any]]:
         """
         دریافت یک رکورد از دیتابیس
 
@@ -327,8 +509,7 @@ class BasePlugin(ABC):
         await self.get_db_connection()
         return await self.db.fetch_one(query, values)
 
-    async def fetch_all(self, query: str, values: Optional[Tuple[Any, ...]] = None) \
-        -> List[Dict[str, Any]]: \
+    async def fetch_all(self, query: str, values: Optional[Tuple[Any, ...]] = None) -> List[Dict[str, Any]]:
         """
         دریافت تمام رکوردهای مطابق با کوئری
 
@@ -356,10 +537,37 @@ class BasePlugin(ABC):
         await self.get_db_connection()
         return await self.db.insert(table, data)
 
-    async def update(self, table: str, data: Dict[str, Any], condition: str, values: Tuple[Any, ...]) \
-        \ \
-        \ \
-        -> int: \
+    @property
+    def write_buffer(self) -> WriteBehindBuffer:
+        """
+        بافر درج دسته‌ای پلاگین (در اولین استفاده ساخته می‌شود)
+
+        Returns:
+            WriteBehindBuffer: بافر نوشتن
+        """
+        if self._write_buffer is None:
+            self._write_buffer = WriteBehindBuffer(self.db, name=self.name)
+        return self._write_buffer
+
+    async def buffer_insert(self, table: str, data: Dict[str, Any]) -> bool:
+        """
+        افزودن رکورد با تأخیر و به صورت دسته‌ای
+
+        برای درج‌های پرتکرار در مسیر پردازش پیام (تاریخچه، لاگ‌ها و رویدادها) که به
+        رکورد درج شده نیازی ندارند. رکورد حداکثر پس از WRITE_BUFFER_FLUSH_INTERVAL ثانیه
+        یا با پر شدن دسته نوشته می‌شود.
+
+        Args:
+            table: نام جدول
+            data: داده‌های رکورد جدید
+
+        Returns:
+            bool: وضعیت پذیرش رکورد
+        """
+        await self.get_db_connection()
+        return await self.write_buffer.add(table, data)
+
+    async def update(self, table: str, data: Dict[str, Any], condition: str, values: Tuple[Any, ...]) -> int:
         """
         بروزرسانی یک یا چند رکورد
 
@@ -390,8 +598,7 @@ class BasePlugin(ABC):
         await self.get_db_connection()
         return await self.db.delete(table, condition, values)
 
-    def _(self, key: str, lang: Optional[str] = None, default: Optional[str] = None, **kwargs) \
-        -> str: \
+    def _(self, key: str, lang: Optional[str] = None, default: Optional[str] = None, **kwargs) -> str:
         """
         ترجمه متن
 
@@ -102,14 +102,8 @@ class AccountProtectionPlugin(BasePlugin):
 
             # ثبت هندلرهای رویداد
             self.register_event_handler(EventType.NEW_LOGIN, self.on_new_login, {})
-            self.register_event_handler(EventType.MESSAGE, self.on_message, {})
-            self.register_event_handler(EventType.MESSAGE, self.on_protect_command, {'text_startswith': ['.protect', '/protect', '!protect']})
-            self.register_event_handler(EventType.MESSAGE, self.on_unprotect_command, {'text_startswith': ['.unprotect', '/unprotect', '!unprotect']})
-            self.register_event_handler(EventType.MESSAGE, self.on_privacy_command, {'text_startswith': ['.privacy', '/privacy', '!privacy']})
-            self.register_event_handler(EventType.MESSAGE, self.on_offline_command, {'text_startswith': ['.offline', '/offline', '!offline']})
-            self.register_event_handler(EventType.MESSAGE, self.on_online_command, {'text_startswith': ['.online', '/online', '!online']})
-            self.register_event_handler(EventType.MESSAGE, self.on_lock_command, {'text_startswith': ['.lock', '/lock', '!lock']})
-            self.register_event_handler(EventType.MESSAGE, self.on_unlock_command, {'text_startswith': ['.unlock', '/unlock', '!unlock']})
+            self.register_event_handler(EventType.MESSAGE, self.on_outgoing_message, {'outgoing': True})
+            self.register_event_handler(EventType.MESSAGE, self.on_message, self.chat_scoped_filters(self.protected_dialogs))
 
             # زمان‌بندی بررسی دوره‌ای
             self.schedule(self.check_security, interval=3600, name="security_check")  # هر ساعت
@@ -366,6 +360,8 @@ class AccountProtectionPlugin(BasePlugin):
 
             # افزودن چت به لیست محافظت شده
             self.protected_dialogs.append(chat_id)
+            self.update_event_handler_filters(EventType.MESSAGE, self.on_message,
+                                              self.chat_scoped_filters(self.protected_dialogs))
 
             # ذخیره در دیتابیس
             await self.db.execute(
@@ -439,6 +435,8 @@ class AccountProtectionPlugin(BasePlugin):
 
             # حذف چت از لیست محافظت شده
             self.protected_dialogs.remove(chat_id)
+            self.update_event_handler_filters(EventType.MESSAGE, self.on_message,
+                                              self.chat_scoped_filters(self.protected_dialogs))
 
             # ذخیره در دیتابیس
             await self.db.execute(
@@ -473,6 +471,16 @@ class AccountProtectionPlugin(BasePlugin):
             logger.error(f"خطا در اجرای دستور unprotect: {str(e)}")
             await message.reply_text(self._("command_error", default="خطا در اجرای دستور."))
 
+    async def on_outgoing_message(self, client: TelegramClient, message: Message) -> None:
+        """
+        هندلر پیام‌های ارسالی برای بروزرسانی زمان آنلاین
+
+        Args:
+            client: کلاینت تلگرام
+            message: پیام دریافتی
+        """
+        self.last_online = time.time()
+
     async def on_message(self, client: TelegramClient, message: Message) -> None:
         """
         هندلر پیام‌ها برای محافظت از چت
@@ -481,17 +489,13 @@ class AccountProtectionPlugin(BasePlugin):
             client: کلاینت تلگرام
             message: پیام دریافتی
         """
-        # بروزرسانی زمان آنلاین
-        if message.outgoing:
-            self.last_online = time.time()
-
         # اگر چت در لیست محافظت شده است
         if message.chat and message.chat.id in self.protected_dialogs:
             # ذخیره تاریخچه پیام
             if message.text or message.caption:
                 content = message.text or message.caption
                 try:
-                    await self.insert('message_history', {
+                    await self.buffer_insert('message_history', {
                         'message_id': message.id,
                         'user_id': message.from_user.id if message.from_user else None,
                         'chat_id': message.chat.id,
@@ -501,23 +505,3 @@ class AccountProtectionPlugin(BasePlugin):
                     })
                 except Exception as e:
                     logger.error(f"خطا در ذخیره تاریخچه پیام: {str(e)}")
-
-    async def on_protect_command(self, client: TelegramClient, message: Message) -> None:
-        """
-        هندلر دستور محافظت از چت
-
-        Args:
-            client: کلاینت تلگرام
-            message: پیام دریافتی
-        """
-        await self.cmd_protect_chat(client, message)
-
-    async def on_unprotect_command(self, client: TelegramClient, message: Message) -> None:
-        """
-        هندلر دستور حذف محافظت از چت
-
-        Args:
-            client: کلاینت تلگرام
-            message: پیام دریافتی
-        """
-        await self.cmd_unprotect_chat(client, message)
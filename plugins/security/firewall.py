@@ -138,14 +138,6 @@ class FirewallPlugin(BasePlugin):
 
             # ثبت هندلرهای رویداد
             self.register_event_handler(EventType.MESSAGE, self.on_message, {})
-            self.register_event_handler(EventType.MESSAGE, self.on_block_command, {'text_startswith': ['.fw_block', '/fw_block', '!fw_block']})
-            self.register_event_handler(EventType.MESSAGE, self.on_unblock_command, {'text_startswith': ['.fw_unblock', '/fw_unblock', '!fw_unblock']})
-            self.register_event_handler(EventType.MESSAGE, self.on_blocklist_command, {'text_startswith': ['.fw_blocklist', '/fw_blocklist', '!fw_blocklist']})
-            self.register_event_handler(EventType.MESSAGE, self.on_keyword_command, {'text_startswith': ['.fw_keyword', '/fw_keyword', '!fw_keyword']})
-            self.register_event_handler(EventType.MESSAGE, self.on_whitelist_command, {'text_startswith': ['.fw_whitelist', '/fw_whitelist', '!fw_whitelist']})
-            self.register_event_handler(EventType.MESSAGE, self.on_spam_command, {'text_startswith': ['.fw_spam', '/fw_spam', '!fw_spam']})
-            self.register_event_handler(EventType.MESSAGE, self.on_status_command, {'text_startswith': ['.fw_status', '/fw_status', '!fw_status']})
-            self.register_event_handler(EventType.MESSAGE, self.on_notify_command, {'text_startswith': ['.fw_notify', '/fw_notify', '!fw_notify']})
 
             # زمان‌بندی پاکسازی منظم داده‌های موقت
             self.schedule(self.cleanup_temporary_data, interval=300, name="firewall_cleanup") \
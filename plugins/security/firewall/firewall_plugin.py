@@ -90,14 +90,6 @@ class FirewallPlugin(BasePlugin):
 
             # ثبت هندلرهای رویداد
             self.register_event_handler(EventType.MESSAGE, self.on_message, {})
-            self.register_event_handler(EventType.MESSAGE, self.on_block_command, {'text_startswith': ['.fw_block', '/fw_block', '!fw_block']})
-            self.register_event_handler(EventType.MESSAGE, self.on_unblock_command, {'text_startswith': ['.fw_unblock', '/fw_unblock', '!fw_unblock']})
-            self.register_event_handler(EventType.MESSAGE, self.on_blocklist_command, {'text_startswith': ['.fw_blocklist', '/fw_blocklist', '!fw_blocklist']})
-            self.register_event_handler(EventType.MESSAGE, self.on_keyword_command, {'text_startswith': ['.fw_keyword', '/fw_keyword', '!fw_keyword']})
-            self.register_event_handler(EventType.MESSAGE, self.on_whitelist_command, {'text_startswith': ['.fw_whitelist', '/fw_whitelist', '!fw_whitelist']})
-            self.register_event_handler(EventType.MESSAGE, self.on_spam_command, {'text_startswith': ['.fw_spam', '/fw_spam', '!fw_spam']})
-            self.register_event_handler(EventType.MESSAGE, self.on_status_command, {'text_startswith': ['.fw_status', '/fw_status', '!fw_status']})
-            self.register_event_handler(EventType.MESSAGE, self.on_notify_command, {'text_startswith': ['.fw_notify', '/fw_notify', '!fw_notify']})
 
             # زمان‌بندی پاکسازی منظم داده‌های موقت
             self.schedule(self.spam_controller.cleanup_temporary_data, interval=300, name="firewall_cleanup")
@@ -330,7 +322,7 @@ class FirewallPlugin(BasePlugin):
                 )
             else:
                 # ثبت مستقیم در دیتابیس اگر پلاگین در دسترس نیست
-                await self.insert('security_events', {
+                await self.buffer_insert('security_events', {
                     'event_type': f"firewall_{event_type}",
                     'details': json.dumps(details),
                     'is_resolved': False,
@@ -347,7 +339,7 @@ class FirewallPlugin(BasePlugin):
         دستور مسدود کردن کاربر
         """
         try:
-            args = message.text.split()[1:]
+            args = self.envelope(message).command_args.split()
 
             if not args:
                 await message.reply_text("لطفاً شناسه کاربر مورد نظر را وارد کنید. مثال: `.fw_block 123456789`")
@@ -7,6 +7,8 @@ import logging
 from typing import Dict, List, Any
 from pyrogram.types import Message
 
+from core.account_context import AccountStateStore
+
 logger = logging.getLogger(__name__)
 
 
@@ -21,10 +23,16 @@ class SpamController:
         """
         self.spam_threshold = 5  # آستانه تشخیص اسپم
         self.spam_window = 60  # پنجره زمانی (ثانیه) برای بررسی اسپم
-        self.user_message_count = {}  # تعداد پیام کاربران در پنجره زمانی
+        # زمان پیام‌های کاربران در پنجره زمانی، جدا برای هر حساب در اجرای چند حسابی
+        self.account_states = AccountStateStore()
         self.last_cleanup_time = time.time()
         self.auto_delete_spam = True  # حذف خودکار پیام‌های اسپم
 
+    @property
+    def user_message_count(self) -> Dict[int, List[float]]:
+        """زمان پیام‌های کاربران در پنجره زمانی برای حساب بروزرسانی در حال پردازش"""
+        return self.account_states.get().setdefault('user_message_count', {})
+
     async def initialize(self, db):
         """
         راه‌اندازی کنترل‌کننده
@@ -126,19 +134,23 @@ class SpamController:
             current_time = time.time()
             self.last_cleanup_time = current_time
 
-            # پاکسازی تعداد پیام کاربران
-            for user_id in list(self.user_message_count.keys()):
-                # حذف پیام‌های قدیمی‌تر از پنجره زمانی
-                self.user_message_count[user_id] = [
-                    t for t in self.user_message_count[user_id]
-                    if current_time - t <= self.spam_window
-                ]
+            # پاکسازی تعداد پیام کاربران تمام حساب‌ها
+            users = 0
+            for account_id in self.account_states.accounts():
+                user_message_count = self.account_states.get(account_id).get('user_message_count', {})
+                for user_id in list(user_message_count.keys()):
+                    # حذف پیام‌های قدیمی‌تر از پنجره زمانی
+                    user_message_count[user_id] = [
+                        t for t in user_message_count[user_id]
+                        if current_time - t <= self.spam_window
+                    ]
 
-                # حذف کاربرانی که پیامی ندارند
-                if not self.user_message_count[user_id]:
-                    del self.user_message_count[user_id]
+                    # حذف کاربرانی که پیامی ندارند
+                    if not user_message_count[user_id]:
+                        del user_message_count[user_id]
+                users += len(user_message_count)
 
-            logger.debug(f"پاکسازی داده‌های موقت اسپم انجام شد، {len(self.user_message_count)} کاربر در حافظه")
+            logger.debug(f"پاکسازی داده‌های موقت اسپم انجام شد، {users} کاربر در حافظه")
 
         except Exception as e:
             logger.error(f"خطا در پاکسازی داده‌های موقت اسپم: {str(e)}")
@@ -158,10 +170,7 @@ class SpamController:
 
         return len(self.user_message_count[user_id])
 
-    async def update_spam_settings(self, threshold: int = None, window: int = None, auto_delete: bool = None, db = None) \
-        \ \
-        \ \
-        -> bool: \
+    async def update_spam_settings(self, threshold: int = None, window: int = None, auto_delete: bool = None, db = None) -> bool:
         """
         بروزرسانی تنظیمات اسپم
 
@@ -237,7 +237,7 @@
                 )
             else:
                 # ثبت مستقیم در دیتابیس اگر پلاگین در دسترس نیست
-                await self.insert('security_events', {
+                await self.buffer_insert('security_events', {
                     'event_type': f"firewall_{event_type}",
                     'details': json.dumps(details),
                     'is_resolved': False,
@@ -13,7 +13,6 @@ from pyrogram import filters
 from pyrogram.types import Message
 
 from plugins.base_plugin import BasePlugin
-from core.event_handler import EventType
 from core.client import TelegramClient
 
 logger = logging.getLogger(__name__)
@@ -71,11 +70,6 @@ class SecurityEventsPlugin(BasePlugin):
             self.register_command('clear_events', self.cmd_clear_events, 'پاکسازی رویدادهای امنیتی', '.clear_events')
             self.register_command('notify', self.cmd_toggle_notifications, 'فعال/غیرفعال‌سازی نوتیفیکیشن‌ها', '.notify [on|off]')
 
-            # ثبت هندلرهای رویداد
-            self.register_event_handler(EventType.MESSAGE, self.on_list_events_command, {'text_startswith': ['.events', '/events', '!events']})
-            self.register_event_handler(EventType.MESSAGE, self.on_clear_events_command, {'text_startswith': ['.clear_events', '/clear_events', '!clear_events']})
-            self.register_event_handler(EventType.MESSAGE, self.on_toggle_notifications_command, {'text_startswith': ['.notify', '/notify', '!notify']})
-
             # زمان‌بندی بررسی دوره‌ای
             self.schedule(self.clean_old_events, interval=86400, name="clean_old_events") \
                 # هر 24 ساعت \
@@ -153,13 +147,20 @@ class SecurityEventsPlugin(BasePlugin):
             details: جزئیات رویداد
         """
         try:
-            # ثبت در دیتابیس
-            event = await self.insert('security_events', {
+            row = {
                 'event_type': event_type,
                 'details': json.dumps(details),
                 'is_resolved': False,
                 'created_at': 'NOW()'
-            })
+            }
+
+            # بدون نوتیفیکیشن به شناسه‌ی رویداد نیازی نیست و درج دسته‌ای انجام می‌شود
+            if not self.admin_notifications:
+                await self.buffer_insert('security_events', row)
+                return
+
+            # ثبت در دیتابیس
+            event = await self.insert('security_events', row)
 
             if event:
                 self.security_events.append(event)
@@ -263,7 +264,7 @@ class SecurityEventsPlugin(BasePlugin):
 
             for event in events:
                 event_time = event['created_at'].strftime('%Y-%m-%d %H:%M:%S') \
-                    if hasattr(event['created_at'], 'strftime') else str(event['created_at']) \
+                    if hasattr(event['created_at'], 'strftime') else str(event['created_at'])
                 status = "✅" if event['is_resolved'] else "⏳"
 
                 response += f"**{event['id']}**: {status} **{event['event_type']}** - {event_time}\n"
@@ -337,34 +338,3 @@ class SecurityEventsPlugin(BasePlugin):
         except Exception as e:
             logger.error(f"خطا در اجرای دستور notify: {str(e)}")
             await message.reply_text(self._("command_error", default="خطا در اجرای دستور."))
-
-    async def on_list_events_command(self, client: TelegramClient, message: Message) -> None:
-        """
-        هندلر دستور مشاهده رویدادهای امنیتی
-
-        Args:
-            client: کلاینت تلگرام
-            message: پیام دریافتی
-        """
-        await self.cmd_list_events(client, message)
-
-    async def on_clear_events_command(self, client: TelegramClient, message: Message) -> None:
-        """
-        هندلر دستور پاکسازی رویدادهای امنیتی
-
-        Args:
-            client: کلاینت تلگرام
-            message: پیام دریافتی
-        """
-        await self.cmd_clear_events(client, message)
-
-    async def on_toggle_notifications_command(self, client: TelegramClient, message: Message) \
-        -> None: \
-        """
-        هندلر دستور فعال/غیرفعال‌سازی نوتیفیکیشن‌ها
-
-        Args:
-            client: کلاینت تلگرام
-            message: پیام دریافتی
-        """
-        await self.cmd_toggle_notifications(client, message)
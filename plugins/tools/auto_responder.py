@@ -86,10 +86,6 @@ class AutoResponderPlugin(BasePlugin):
             self.register_command('ar_toggle', self.cmd_toggle_auto_response, 'فعال/غیرفعال‌سازی پاسخ خودکار', '.ar_toggle')
 
             # ثبت هندلرهای رویداد
-            self.register_event_handler(EventType.MESSAGE, self.on_add_response_command, {'text_startswith': ['.ar_add', '/ar_add', '!ar_add']})
-            self.register_event_handler(EventType.MESSAGE, self.on_del_response_command, {'text_startswith': ['.ar_del', '/ar_del', '!ar_del']})
-            self.register_event_handler(EventType.MESSAGE, self.on_list_responses_command, {'text_startswith': ['.ar_list', '/ar_list', '!ar_list']})
-            self.register_event_handler(EventType.MESSAGE, self.on_toggle_auto_response_command, {'text_startswith': ['.ar_toggle', '/ar_toggle', '!ar_toggle']})
             self.register_event_handler(EventType.MESSAGE, self.on_message, {'is_private': True})
             self.register_event_handler(EventType.MESSAGE, self.on_message, {'is_group': True})
 
@@ -333,10 +329,11 @@ class AutoResponderPlugin(BasePlugin):
             message: پیام دریافتی
         """
         # اگر سیستم غیرفعال است یا پیام از خودمان است، نادیده بگیر
-        if not self.enabled or message.outgoing:
+        if not self.enabled:
             return
 
-        if not message.text:
+        envelope = self.envelope(message)
+        if envelope.is_outgoing or not message.text:
             return
 
         # بررسی همه پاسخ‌های خودکار
@@ -348,11 +345,11 @@ class AutoResponderPlugin(BasePlugin):
 
             # بررسی تطابق با پترن
             if response['trigger_type'] == 'text':
-                if response['trigger_value'].lower() in message.text.lower():
+                if response['trigger_value'].lower() in envelope.text_lower:
                     matched = True
             elif response['trigger_type'] == 'regex':
                 try:
-                    if re.search(response['trigger_value'], message.text, re.IGNORECASE):
+                    if re.search(response['trigger_value'], envelope.text, re.IGNORECASE):
                         matched = True
                 except re.error:
                     logger.error(f"خطا در الگوی regex: {response['trigger_value']}")
@@ -370,44 +367,3 @@ class AutoResponderPlugin(BasePlugin):
 
                 except Exception as e:
                     logger.error(f"خطا در ارسال پاسخ خودکار: {str(e)}")
-
-    async def on_add_response_command(self, client: TelegramClient, message: Message) -> None:
-        """
-        هندلر دستور افزودن پاسخ خودکار
-
-        Args:
-            client: کلاینت تلگرام
-            message: پیام دریافتی
-        """
-        await self.cmd_add_response(client, message)
-
-    async def on_del_response_command(self, client: TelegramClient, message: Message) -> None:
-        """
-        هندلر دستور حذف پاسخ خودکار
-
-        Args:
-            client: کلاینت تلگرام
-            message: پیام دریافتی
-        """
-        await self.cmd_del_response(client, message)
-
-    async def on_list_responses_command(self, client: TelegramClient, message: Message) -> None:
-        """
-        هندلر دستور مشاهده لیست پاسخ‌های خودکار
-
-        Args:
-            client: کلاینت تلگرام
-            message: پیام دریافتی
-        """
-        await self.cmd_list_responses(client, message)
-
-    async def on_toggle_auto_response_command(self, client: TelegramClient, message: Message) \
-        -> None: \
-        """
-        هندلر دستور فعال/غیرفعال‌سازی پاسخ خودکار
-
-        Args:
-            client: کلاینت تلگرام
-            message: پیام دریافتی
-        """
-        await self.cmd_toggle_auto_response(client, message)
@@ -0,0 +1,3 @@
+"""
+اسکریپت‌های سنجش کارایی
+"""
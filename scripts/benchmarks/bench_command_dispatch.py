@@ -0,0 +1,146 @@
+#!/usr/bin/env python
+"""
+سنجش هزینه‌ی یافتن هندلر دستور برای هر پیام
+
+سه حالت مقایسه می‌شوند:
+    catch_all: هر دستور یک هندلر پیام بدون فیلتر دارد که متن را تقسیم و نام دستور را بررسی می‌کند
+               (رفتار حالت per_handler در Pyrogram که فیلتر text_startswith را نادیده می‌گیرد)
+    prefix: هر دستور یک هندلر با فیلتر text_startswith در مسیریاب دارد
+    dispatcher: یک هندلر مشترک که توکن اول را در جدول دستورات جستجو می‌کند
+
+استفاده:
+    python scripts/benchmarks/bench_command_dispatch.py --commands 5 25 75 --updates 20000 --command-ratio 0.1
+"""
+
+import argparse
+import asyncio
+import logging
+import random
+import sys
+import time
+from pathlib import Path
+from types import SimpleNamespace
+
+# اضافه کردن مسیر پروژه به مسیر جستجوی پایتون
+PROJECT_ROOT = Path(__file__).parent.parent.parent.absolute()
+sys.path.insert(0, str(PROJECT_ROOT))
+
+from core.command_dispatcher import CommandDispatcher
+from core.event_envelope import COMMAND_PREFIXES
+from core.event_router import EventRouter
+
+EVENT_TYPE = "message"
+
+
+def _make_updates(count: int, commands: int, command_ratio: float) -> list:
+    """ساخت پیام‌های ساختگی با نسبت مشخصی از دستورات"""
+    rng = random.Random(42)
+    updates = []
+    for index in range(count):
+        if rng.random() < command_ratio:
+            text = f".cmd{rng.randrange(commands)} arg1 arg2"
+        else:
+            text = f"hello world {index}"
+        updates.append(SimpleNamespace(
+            id=index,
+            text=text,
+            from_user=SimpleNamespace(id=1000 + index % 50),
+            chat=SimpleNamespace(id=-100 - index % 20, type="group"),
+            outgoing=False,
+        ))
+    return updates
+
+
+def _make_command_handler():
+    async def handler(client, message):
+        # پردازش آرگومان‌ها مانند هندلرهای دستور پلاگین‌ها
+        return message.text.split(" ")[1:]
+    return handler
+
+
+def _make_catch_all_handler(name: str):
+    command_handler = _make_command_handler()
+
+    async def handler(client, message):
+        text = message.text
+        if not text:
+            return None
+        parts = text.split(" ")
+        if parts[0][:1] not in COMMAND_PREFIXES or parts[0][1:] != name:
+            return None
+        return await command_handler(client, message)
+    return handler
+
+
+async def _run(router: EventRouter, updates: list) -> float:
+    start = time.perf_counter()
+    for update in updates:
+        await router.dispatch(None, update, EVENT_TYPE, (), (None, update))
+    return (time.perf_counter() - start) / len(updates) * 1e6
+
+
+async def bench_catch_all(commands: int, updates: list) -> float:
+    """
+    هندلرهای بدون فیلتر که هر پیام را تقسیم می‌کنند
+
+    Returns:
+        float: میانگین زمان هر پیام (میکروثانیه)
+    """
+    router = EventRouter()
+    for index in range(commands):
+        router.add_handler(EVENT_TYPE, _make_catch_all_handler(f"cmd{index}"))
+    return await _run(router, updates)
+
+
+async def bench_prefix(commands: int, updates: list) -> float:
+    """
+    یک هندلر با فیلتر پیشوند برای هر دستور
+
+    Returns:
+        float: میانگین زمان هر پیام (میکروثانیه)
+    """
+    router = EventRouter()
+    for index in range(commands):
+        prefixes = [f"{prefix}cmd{index}" for prefix in COMMAND_PREFIXES]
+        router.add_handler(EVENT_TYPE, _make_command_handler(), {'text_startswith': prefixes})
+    return await _run(router, updates)
+
+
+async def bench_dispatcher(commands: int, updates: list) -> float:
+    """
+    پخش‌کننده‌ی مرکزی دستورات
+
+    Returns:
+        float: میانگین زمان هر پیام (میکروثانیه)
+    """
+    dispatcher = CommandDispatcher()
+    dispatcher.initialize()
+    for index in range(commands):
+        dispatcher.register(f"cmd{index}", _make_command_handler(), "bench")
+
+    router = EventRouter()
+    router.add_handler(EVENT_TYPE, dispatcher.dispatch, {'text_startswith': list(COMMAND_PREFIXES)})
+    return await _run(router, updates)
+
+
+async def main(command_counts: list, update_count: int, command_ratio: float) -> None:
+    logging.disable(logging.CRITICAL)
+
+    print(f"{'commands':>8} {'catch_all (us)':>15} {'prefix (us)':>12} {'dispatcher (us)':>16} {'speedup':>8}")
+    for commands in command_counts:
+        # برای هر حالت پیام‌های جدید ساخته می‌شوند تا پاکت رویداد از اجرای قبلی استفاده نشود
+        catch_all = await bench_catch_all(commands, _make_updates(update_count, commands, command_ratio))
+        prefix = await bench_prefix(commands, _make_updates(update_count, commands, command_ratio))
+        dispatched = await bench_dispatcher(commands, _make_updates(update_count, commands, command_ratio))
+        print(f"{commands:>8} {catch_all:>15.2f} {prefix:>12.2f} {dispatched:>16.2f} "
+              f"{min(catch_all, prefix) / dispatched:>7.2f}x")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="سنجش هزینه‌ی پخش دستورات")
+    parser.add_argument("--commands", type=int, nargs="+", default=[5, 25, 75])
+    parser.add_argument("--updates", type=int, default=20000)
+    parser.add_argument("--command-ratio", type=float, default=0.1)
+    args = parser.parse_args()
+
+    asyncio.run(main(args.commands, args.updates, args.command_ratio))
@@ -0,0 +1,107 @@
+#!/usr/bin/env python
+"""
+سنجش هزینه‌ی پردازش هر بروزرسانی در حالت‌های per_handler و router
+
+استفاده:
+    python scripts/benchmarks/bench_event_dispatch.py --plugins 1 5 10 25 --updates 20000
+"""
+
+import argparse
+import asyncio
+import logging
+import sys
+import time
+from pathlib import Path
+from types import SimpleNamespace
+
+# اضافه کردن مسیر پروژه به مسیر جستجوی پایتون
+PROJECT_ROOT = Path(__file__).parent.parent.parent.absolute()
+sys.path.insert(0, str(PROJECT_ROOT))
+
+from core.event_handler import EventHandler, EventType, LoggingMiddleware, Middleware
+from core.event_router import EventRouter
+
+
+class _SenderCheckMiddleware(Middleware):
+    """میان‌افزار نمونه با هزینه‌ای مشابه بررسی فرستنده در میان‌افزارهای واقعی"""
+
+    async def before_event(self, client, event, event_type):
+        sender_id = self.envelope(event, event_type).sender_id
+        return sender_id is not None and sender_id > 0
+
+
+def _make_update(index: int) -> SimpleNamespace:
+    """ساخت یک پیام ساختگی شبیه پیام Pyrogram"""
+    return SimpleNamespace(
+        id=index,
+        text=f"hello world {index}",
+        from_user=SimpleNamespace(id=1000 + index % 50),
+        chat=SimpleNamespace(id=-100 - index % 20, type="group"),
+        outgoing=False,
+    )
+
+
+async def _noop_handler(client, update):
+    return None
+
+
+async def bench_per_handler(plugins: int, updates: list, middlewares: list) -> float:
+    """
+    حالت فعلی: هر هندلر wrapper و زنجیره‌ی میان‌افزار مخصوص خود را دارد
+
+    Returns:
+        float: میانگین زمان هر بروزرسانی (میکروثانیه)
+    """
+    event_handler = EventHandler()
+    event_handler.middlewares = middlewares
+    wrappers = [event_handler._create_pyrogram_wrapper(_noop_handler, EventType.MESSAGE) for _ in range(plugins)]
+
+    start = time.perf_counter()
+    for update in updates:
+        for wrapper in wrappers:
+            await wrapper(None, update)
+    elapsed = time.perf_counter() - start
+
+    return elapsed / len(updates) * 1e6
+
+
+async def bench_router(plugins: int, updates: list, middlewares: list) -> float:
+    """
+    حالت مسیریاب: یک هندلر در کلاینت و یک بار اجرای زنجیره‌ی میان‌افزار
+
+    Returns:
+        float: میانگین زمان هر بروزرسانی (میکروثانیه)
+    """
+    router = EventRouter()
+    for _ in range(plugins):
+        router.add_handler(EventType.MESSAGE, _noop_handler)
+
+    start = time.perf_counter()
+    for update in updates:
+        await router.dispatch(None, update, EventType.MESSAGE, middlewares, (None, update))
+    elapsed = time.perf_counter() - start
+
+    return elapsed / len(updates) * 1e6
+
+
+async def main(plugin_counts: list, update_count: int) -> None:
+    # لاگ‌های میان‌افزار در زمان سنجش نوشته نمی‌شوند
+    logging.disable(logging.CRITICAL)
+
+    middlewares = [_SenderCheckMiddleware(), LoggingMiddleware()]
+    updates = [_make_update(i) for i in range(update_count)]
+
+    print(f"{'plugins':>8} {'per_handler (us)':>18} {'router (us)':>14} {'speedup':>8}")
+    for plugins in plugin_counts:
+        per_handler = await bench_per_handler(plugins, updates, middlewares)
+        routed = await bench_router(plugins, updates, middlewares)
+        print(f"{plugins:>8} {per_handler:>18.2f} {routed:>14.2f} {per_handler / routed:>7.2f}x")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="سنجش هزینه‌ی پخش رویداد")
+    parser.add_argument("--plugins", type=int, nargs="+", default=[1, 5, 10, 25, 50])
+    parser.add_argument("--updates", type=int, default=20000)
+    args = parser.parse_args()
+
+    asyncio.run(main(args.plugins, args.updates))
@@ -0,0 +1,104 @@
+#!/usr/bin/env python
+"""
+سنجش ذخیره، دریافت و حذف چند کلید در Redis
+
+دو حالت مقایسه می‌شوند:
+    legacy: برای هر کلید SET و EXPIRE جدا (رفتار قبلی RedisManager.set)، یک GET و یک DEL
+    batch: mset_with_ttl (pipeline از SET ... EX)، mget و delete_many (یک رفت و برگشت برای هر عملیات)
+
+به یک سرور Redis واقعی نیاز دارد؛ کلیدها با پیشوند جداگانه در دیتابیس مشخص شده ساخته و پاک می‌شوند.
+
+استفاده:
+    python scripts/benchmarks/bench_redis_batch.py --keys 100 1000 10000 --db 15
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import sys
+import time
+from pathlib import Path
+
+# اضافه کردن مسیر پروژه به مسیر جستجوی پایتون
+PROJECT_ROOT = Path(__file__).parent.parent.parent.absolute()
+sys.path.insert(0, str(PROJECT_ROOT))
+
+from core.redis_manager import RedisManager
+
+VALUE = {"id": 1, "username": "bench", "is_active": True}
+TTL = 300
+
+
+def _key(index: int) -> str:
+    return f"cache:bench:{index}"
+
+
+async def legacy_fill(redis: RedisManager, count: int) -> None:
+    payload = json.dumps(VALUE)
+    for index in range(count):
+        full_key = redis._build_key(_key(index))
+        await redis.redis.set(full_key, payload)
+        await redis.redis.expire(full_key, TTL)
+
+
+async def legacy_read(redis: RedisManager, count: int) -> list:
+    return [await redis.get(_key(index)) for index in range(count)]
+
+
+async def legacy_delete(redis: RedisManager, count: int) -> None:
+    for index in range(count):
+        await redis.delete(_key(index))
+
+
+async def batch_fill(redis: RedisManager, count: int) -> None:
+    await redis.mset_with_ttl({_key(index): VALUE for index in range(count)}, TTL)
+
+
+async def batch_read(redis: RedisManager, count: int) -> list:
+    return await redis.mget([_key(index) for index in range(count)])
+
+
+async def batch_delete(redis: RedisManager, count: int) -> None:
+    await redis.delete_many([_key(index) for index in range(count)])
+
+
+async def _timed(coro) -> float:
+    start = time.perf_counter()
+    await coro
+    return (time.perf_counter() - start) * 1000
+
+
+async def main(key_counts: list, host: str, port: int, db: int) -> None:
+    logging.disable(logging.CRITICAL)
+
+    redis = RedisManager(host=host, port=port, db=db, prefix="bench_batch:")
+    if not await redis.connect():
+        print(f"اتصال به Redis در {host}:{port} ممکن نیست")
+        return
+
+    try:
+        print(f"{'keys':>7} {'mode':>7} {'fill (ms)':>10} {'read (ms)':>10} {'delete (ms)':>12}")
+        for count in key_counts:
+            results = {}
+            for mode, fill, read, delete in (("legacy", legacy_fill, legacy_read, legacy_delete),
+                                             ("batch", batch_fill, batch_read, batch_delete)):
+                fill_ms = await _timed(fill(redis, count))
+                read_ms = await _timed(read(redis, count))
+                delete_ms = await _timed(delete(redis, count))
+                results[mode] = fill_ms + read_ms + delete_ms
+                print(f"{count:>7} {mode:>7} {fill_ms:>10.1f} {read_ms:>10.1f} {delete_ms:>12.1f}")
+            print(f"{count:>7} {'speedup':>7} {results['legacy'] / results['batch']:>9.1f}x")
+    finally:
+        await redis.disconnect()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="سنجش عملیات چند کلیدی Redis")
+    parser.add_argument("--keys", type=int, nargs="+", default=[100, 1000, 10000])
+    parser.add_argument("--host", default="localhost")
+    parser.add_argument("--port", type=int, default=6379)
+    parser.add_argument("--db", type=int, default=15)
+    args = parser.parse_args()
+
+    asyncio.run(main(args.keys, args.host, args.port, args.db))
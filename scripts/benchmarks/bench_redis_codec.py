@@ -0,0 +1,102 @@
+#!/usr/bin/env python
+"""
+سنجش هزینه‌ی سریال‌سازی نتایج fetch_all کش شده در Redis
+
+حالت legacy همان مسیر قبلی RedisManager است (json.dumps با ensure_ascii=False، سپس
+تبدیل bytes به str و json.loads). سایر حالت‌ها RedisCodec با قالب و فشرده‌سازی‌های
+نصب شده هستند. به سرور Redis نیازی ندارد؛ فقط هزینه‌ی CPU و اندازه‌ی مقدار سنجیده می‌شود.
+
+استفاده:
+    python scripts/benchmarks/bench_redis_codec.py --rows 10 100 1000 --iterations 200
+"""
+
+import argparse
+import json
+import logging
+import sys
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+# اضافه کردن مسیر پروژه به مسیر جستجوی پایتون
+PROJECT_ROOT = Path(__file__).parent.parent.parent.absolute()
+sys.path.insert(0, str(PROJECT_ROOT))
+
+from core import redis_codec
+from core.redis_codec import RedisCodec
+
+MODES = [
+    ("json", "none"),
+    ("json", "zstd"),
+    ("json", "lz4"),
+    ("msgpack", "none"),
+    ("msgpack", "zstd"),
+]
+
+
+def _make_rows(count: int) -> list:
+    """ساخت ردیف‌های شبیه نتیجه‌ی fetch_all جدول کاربران"""
+    created = datetime(2024, 1, 1)
+    return [{
+        "id": index,
+        "username": f"user_{index}",
+        "email": f"user{index}@example.com",
+        "full_name": "کاربر آزمایشی شماره " + str(index),
+        "role": "user",
+        "is_active": index % 7 != 0,
+        "created_at": (created + timedelta(minutes=index)).isoformat(),
+        "settings": {"lang": "fa", "notifications": True},
+    } for index in range(count)]
+
+
+def _measure(encode, decode, value, iterations: int) -> tuple:
+    start = time.perf_counter()
+    for _ in range(iterations):
+        raw = encode(value)
+    encode_us = (time.perf_counter() - start) / iterations * 1e6
+
+    start = time.perf_counter()
+    for _ in range(iterations):
+        decode(raw)
+    decode_us = (time.perf_counter() - start) / iterations * 1e6
+    return encode_us, decode_us, len(raw)
+
+
+def _legacy_encode(value) -> bytes:
+    # redis-py رشته را پیش از ارسال به utf-8 تبدیل می‌کند
+    return json.dumps(value, ensure_ascii=False).encode("utf-8")
+
+
+def _legacy_decode(raw: bytes):
+    return json.loads(raw.decode("utf-8"))
+
+
+def main(row_counts: list, iterations: int, threshold: int) -> None:
+    logging.disable(logging.CRITICAL)
+
+    print(f"orjson: {redis_codec.orjson is not None}, msgpack: {redis_codec.msgpack is not None}, "
+          f"zstd: {redis_codec.zstandard is not None}, lz4: {redis_codec.lz4_frame is not None}")
+    print(f"{'rows':>6} {'mode':>14} {'encode (us)':>12} {'decode (us)':>12} {'bytes':>9} {'decode speedup':>15}")
+    for count in row_counts:
+        rows = _make_rows(count)
+        _, legacy_decode_us, _ = legacy = _measure(_legacy_encode, _legacy_decode, rows, iterations)
+        print(f"{count:>6} {'legacy':>14} {legacy[0]:>12.1f} {legacy[1]:>12.1f} {legacy[2]:>9} {'1.0x':>15}")
+
+        for codec_name, compression in MODES:
+            codec = RedisCodec(codec_name, compression, threshold)
+            if (codec.codec, codec.compression) != (codec_name, compression):
+                continue
+            encode_us, decode_us, size = _measure(codec.encode, codec.decode, rows, iterations)
+            mode = f"{codec_name}+{compression}"
+            print(f"{count:>6} {mode:>14} {encode_us:>12.1f} {decode_us:>12.1f} {size:>9} "
+                  f"{legacy_decode_us / decode_us:>14.1f}x")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="سنجش سریال‌سازی مقادیر Redis")
+    parser.add_argument("--rows", type=int, nargs="+", default=[10, 100, 1000])
+    parser.add_argument("--iterations", type=int, default=200)
+    parser.add_argument("--threshold", type=int, default=4096)
+    args = parser.parse_args()
+
+    main(args.rows, args.iterations, args.threshold)
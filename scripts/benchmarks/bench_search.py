@@ -0,0 +1,144 @@
+#!/usr/bin/env python
+"""
+سنجش جستجوی کاربران پیش و پس از ایندکس‌های trigram
+
+روی یک جدول users ساختگی (پیش‌فرض یک میلیون ردیف) در schema جداگانه دو حالت مقایسه می‌شوند:
+    before: ILIKE '%...%' بدون ایندکس با COUNT(*) دقیق و مرتب‌سازی براساس id (رفتار قبلی API)
+    after: migration 04_search_indexes، ILIKE با ایندکس GIN trigram، رتبه‌بندی با similarity
+           و برآورد تعداد از EXPLAIN
+
+به یک سرور PostgreSQL واقعی با افزونه‌ی pg_trgm نیاز دارد؛ schema در پایان حذف می‌شود.
+
+استفاده:
+    python scripts/benchmarks/bench_search.py --dsn postgresql://postgres@localhost/selfbot --rows 1000000
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import statistics
+import sys
+import time
+from pathlib import Path
+
+import asyncpg
+
+# اضافه کردن مسیر پروژه به مسیر جستجوی پایتون
+PROJECT_ROOT = Path(__file__).parent.parent.parent.absolute()
+sys.path.insert(0, str(PROJECT_ROOT))
+
+from api.search import RANK_COLUMN, like_pattern, match_condition, rank_expression
+
+SCHEMA = "bench_search"
+MIGRATION = PROJECT_ROOT / "database" / "migrations" / "04_search_indexes.sql"
+COLUMNS = ("username", "email")
+TERMS = ["user12345", "ali", "mail9", "zzzz", "reza_7"]
+LIMIT = 20
+
+
+async def _seed(conn: asyncpg.Connection, rows: int) -> None:
+    await conn.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    await conn.execute(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE")
+    await conn.execute(f"CREATE SCHEMA {SCHEMA}")
+    await conn.execute(f"SET search_path TO {SCHEMA}, public")
+    await conn.execute("""
+    CREATE TABLE users (
+        id BIGSERIAL PRIMARY KEY,
+        username TEXT NOT NULL,
+        email TEXT,
+        full_name TEXT,
+        is_active BOOLEAN DEFAULT TRUE
+    )
+    """)
+    await conn.execute("""
+    INSERT INTO users (username, email, full_name)
+    SELECT (ARRAY['ali', 'reza', 'sara', 'user', 'mina'])[1 + i % 5] || '_' || i,
+           'mail' || i || '@example.com',
+           md5(i::text)
+    FROM generate_series(1, $1) AS i
+    """, rows)
+    # پلاگین‌ها برای ANALYZE داخل migration
+    await conn.execute("CREATE TABLE plugins (id BIGSERIAL PRIMARY KEY, name TEXT NOT NULL)")
+    await conn.execute("ANALYZE users")
+
+
+async def _time(conn: asyncpg.Connection, queries: list, repeat: int) -> tuple:
+    timings = []
+    for _ in range(repeat):
+        for query, params in queries:
+            start = time.perf_counter()
+            await conn.fetch(query, *params)
+            timings.append((time.perf_counter() - start) * 1000)
+    timings.sort()
+    return statistics.median(timings), timings[int(len(timings) * 0.95) - 1]
+
+
+def _before_queries() -> list:
+    queries = []
+    for term in TERMS:
+        params = (f"%{term}%",)
+        where = "WHERE (username ILIKE $1 OR email ILIKE $1)"
+        queries.append((f"SELECT COUNT(*) FROM users {where}", params))
+        queries.append((f"SELECT id, username, email FROM users {where} ORDER BY id ASC LIMIT {LIMIT + 1}", params))
+    return queries
+
+
+def _after_queries() -> list:
+    queries = []
+    for term in TERMS:
+        where = f"WHERE {match_condition(COLUMNS, 1)}"
+        count_params = (like_pattern(term),)
+        queries.append((f"EXPLAIN (FORMAT JSON) SELECT 1 FROM users {where}", count_params))
+        queries.append((f"""
+        SELECT id, username, email, {rank_expression(COLUMNS, 2)} AS {RANK_COLUMN}
+        FROM users {where}
+        ORDER BY {RANK_COLUMN} DESC, id ASC
+        LIMIT {LIMIT + 1}
+        """, count_params + (term,)))
+    return queries
+
+
+async def main(dsn: str, rows: int, repeat: int, keep: bool) -> None:
+    logging.disable(logging.CRITICAL)
+
+    conn = await asyncpg.connect(dsn)
+    try:
+        start = time.perf_counter()
+        await _seed(conn, rows)
+        print(f"seeded {rows} rows in {time.perf_counter() - start:.1f}s")
+
+        before = await _time(conn, _before_queries(), repeat)
+
+        start = time.perf_counter()
+        await conn.execute(MIGRATION.read_text(encoding="utf-8"))
+        print(f"migration 04_search_indexes in {time.perf_counter() - start:.1f}s")
+
+        after = await _time(conn, _after_queries(), repeat)
+
+        plan = await conn.fetchval(
+            f"EXPLAIN (FORMAT JSON) SELECT 1 FROM users WHERE {match_condition(COLUMNS, 1)}",
+            like_pattern(TERMS[0])
+        )
+        plan = json.loads(plan) if isinstance(plan, str) else plan
+        print(f"plan: {plan[0]['Plan']['Node Type']}")
+
+        print(f"{'mode':>8} {'p50 (ms)':>10} {'p95 (ms)':>10}")
+        print(f"{'before':>8} {before[0]:>10.2f} {before[1]:>10.2f}")
+        print(f"{'after':>8} {after[0]:>10.2f} {after[1]:>10.2f}")
+        print(f"speedup p95: {before[1] / after[1]:.1f}x")
+    finally:
+        if not keep:
+            await conn.execute(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE")
+        await conn.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="سنجش جستجوی کاربران با ایندکس trigram")
+    parser.add_argument("--dsn", default="postgresql://postgres@localhost/postgres")
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--keep", action="store_true", help="حذف نکردن schema پس از اجرا")
+    args = parser.parse_args()
+
+    asyncio.run(main(args.dsn, args.rows, args.repeat, args.keep))
@@ -0,0 +1,100 @@
+#!/usr/bin/env python
+"""
+سنجش هزینه‌ی پر کردن و نامعتبر کردن کش یک جدول در Redis
+
+دو حالت مقایسه می‌شوند:
+    legacy: برای هر کلید set، expire و hset جدا و برای نامعتبرسازی hgetall و یک delete برای هر کلید
+    script: set_tagged (یک رفت و برگشت برای هر کلید) و delete_tags (یک رفت و برگشت برای کل جدول)
+
+به یک سرور Redis واقعی نیاز دارد؛ کلیدها با پیشوند جداگانه در دیتابیس مشخص شده ساخته و پاک می‌شوند.
+
+استفاده:
+    python scripts/benchmarks/bench_tag_invalidation.py --keys 1000 10000 --db 15
+"""
+
+import argparse
+import asyncio
+import logging
+import sys
+import time
+from pathlib import Path
+
+# اضافه کردن مسیر پروژه به مسیر جستجوی پایتون
+PROJECT_ROOT = Path(__file__).parent.parent.parent.absolute()
+sys.path.insert(0, str(PROJECT_ROOT))
+
+from core.redis_manager import RedisManager
+
+TABLE_TAG = "tag:bench_users"
+VALUE = {"__dbc__": 1, "v": {"id": 1, "username": "bench", "is_active": True}, "d": 0.001, "e": 0}
+
+
+def _key(index: int) -> str:
+    return f"db:bench_users:one:{index:032x}"
+
+
+async def legacy_fill(redis: RedisManager, count: int) -> None:
+    for index in range(count):
+        await redis.set(_key(index), VALUE, 300)
+        await redis.hset(TABLE_TAG, _key(index), "1")
+
+
+async def legacy_flush(redis: RedisManager) -> None:
+    keys = await redis.hgetall(TABLE_TAG)
+    for key in keys:
+        await redis.delete(key)
+    await redis.delete(TABLE_TAG)
+
+
+async def script_fill(redis: RedisManager, count: int) -> None:
+    for index in range(count):
+        await redis.set_tagged(_key(index), VALUE, 300, TABLE_TAG)
+
+
+async def script_flush(redis: RedisManager) -> int:
+    return await redis.delete_tags(TABLE_TAG)
+
+
+async def _timed(coro) -> float:
+    start = time.perf_counter()
+    await coro
+    return (time.perf_counter() - start) * 1000
+
+
+async def main(key_counts: list, host: str, port: int, db: int) -> None:
+    logging.disable(logging.CRITICAL)
+
+    redis = RedisManager(host=host, port=port, db=db, prefix="bench_tags:")
+    if not await redis.connect():
+        print(f"اتصال به Redis در {host}:{port} ممکن نیست")
+        return
+
+    try:
+        print(f"{'keys':>7} {'legacy fill (ms)':>17} {'script fill (ms)':>17} "
+              f"{'legacy flush (ms)':>18} {'script flush (ms)':>18} {'flush speedup':>14}")
+        for count in key_counts:
+            legacy_fill_ms = await _timed(legacy_fill(redis, count))
+            legacy_flush_ms = await _timed(legacy_flush(redis))
+
+            script_fill_ms = await _timed(script_fill(redis, count))
+            start = time.perf_counter()
+            deleted = await script_flush(redis)
+            script_flush_ms = (time.perf_counter() - start) * 1000
+            if deleted != count:
+                print(f"هشدار: {deleted} کلید از {count} کلید حذف شد")
+
+            print(f"{count:>7} {legacy_fill_ms:>17.1f} {script_fill_ms:>17.1f} "
+                  f"{legacy_flush_ms:>18.1f} {script_flush_ms:>18.1f} {legacy_flush_ms / script_flush_ms:>13.1f}x")
+    finally:
+        await redis.disconnect()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="سنجش نامعتبرسازی تگ‌های کش دیتابیس")
+    parser.add_argument("--keys", type=int, nargs="+", default=[1000, 10000])
+    parser.add_argument("--host", default="localhost")
+    parser.add_argument("--port", type=int, default=6379)
+    parser.add_argument("--db", type=int, default=15)
+    args = parser.parse_args()
+
+    asyncio.run(main(args.keys, args.host, args.port, args.db))
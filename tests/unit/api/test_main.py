@@ -10,7 +10,7 @@ from unittest.mock import patch, MagicMock, AsyncMock
 from fastapi import HTTPException, status
 from fastapi.testclient import TestClient
 
-from api.main import app, create_access_token, get_current_user, oauth2_scheme
+from api.main import app, create_access_token, get_current_user, oauth2_scheme, verify_metrics_access
 
 
 @pytest.fixture
@@ -91,6 +91,37 @@ class TestAPIAuthentication:
         assert "توکن نامعتبر" in excinfo.value.detail
 
 
+class TestMetricsAccess:
+    """تست‌های مربوط به دسترسی به /metrics"""
+
+    @pytest.mark.asyncio
+    @patch("api.main.METRICS_TOKEN", "scrape-token")
+    @patch("api.main.get_current_user", new_callable=AsyncMock)
+    async def test_metrics_token_allowed(self, mock_get_current_user):
+        """تست پذیرش توکن ثابت METRICS_TOKEN بدون بررسی کاربر"""
+        assert await verify_metrics_access("scrape-token") is None
+        mock_get_current_user.assert_not_called()
+
+    @pytest.mark.asyncio
+    @patch("api.main.METRICS_TOKEN", "scrape-token")
+    @patch("api.main.get_current_user", new_callable=AsyncMock)
+    async def test_other_tokens_need_user(self, mock_get_current_user):
+        """تست بررسی توکن دسترسی کاربر برای سایر توکن‌ها"""
+        mock_get_current_user.side_effect = HTTPException(status_code=status.HTTP_401_UNAUTHORIZED)
+
+        with pytest.raises(HTTPException) as excinfo:
+            await verify_metrics_access("wrong-token")
+
+        assert excinfo.value.status_code == status.HTTP_401_UNAUTHORIZED
+        mock_get_current_user.assert_awaited_once_with("wrong-token")
+
+    def test_metrics_endpoint_requires_token(self, test_client):
+        """تست رد درخواست /metrics بدون توکن"""
+        response = test_client.get("/metrics")
+
+        assert response.status_code == 401
+
+
 class TestAPIEndpoints:
     """تست‌های مربوط به نقاط پایانی API"""
     
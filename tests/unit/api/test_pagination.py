@@ -0,0 +1,45 @@
+"""
+تست‌های واحد برای ماژول pagination
+"""
+import pytest
+from fastapi import HTTPException
+
+from api.pagination import decode_cursor, encode_cursor, keyset_condition, split_page
+
+
+class TestPagination:
+    """تست‌های صفحه‌بندی keyset"""
+
+    def test_cursor_round_trip(self):
+        """تست ساخت و خواندن cursor"""
+        cursor = encode_cursor("name", ["فایروال", 42])
+
+        assert "=" not in cursor
+        assert decode_cursor(cursor, "name", 2) == ["فایروال", 42]
+
+    @pytest.mark.parametrize("cursor", ["not-a-cursor", encode_cursor("id", [1]), encode_cursor("name", ["a"])])
+    def test_invalid_cursor(self, cursor):
+        """تست رد cursor خراب یا مربوط به مرتب‌سازی دیگر"""
+        with pytest.raises(HTTPException) as error:
+            decode_cursor(cursor, "name", 2)
+        assert error.value.status_code == 400
+
+    def test_keyset_condition(self):
+        """تست شرط ادامه از آخرین کلید"""
+        assert keyset_condition(("id",), 2) == "id > $2"
+        assert keyset_condition(("name", "id"), 3) == "(name, id) > ($3, $4)"
+
+    def test_keyset_condition_descending(self):
+        """تست شرط ادامه برای رتبه‌ی نزولی و شناسه‌ی صعودی"""
+        assert keyset_condition(("rank", "id"), 2, (True, False)) == \
+            "((rank < $2) OR (rank = $2 AND id > $3))"
+
+    def test_split_page(self):
+        """تست تشخیص صفحه‌ی بعد از ردیف اضافه"""
+        rows = [{"id": 1, "name": "a"}, {"id": 2, "name": "b"}, {"id": 3, "name": "c"}]
+
+        page, cursor = split_page(rows, 2, "name", ("name", "id"))
+        assert page == rows[:2]
+        assert decode_cursor(cursor, "name", 2) == ["b", 2]
+
+        assert split_page(rows, 3, "name", ("name", "id")) == (rows, None)
@@ -0,0 +1,24 @@
+"""
+تست‌های واحد برای ماژول search
+"""
+from api.search import like_pattern, match_condition, rank_expression
+
+
+class TestSearch:
+    """تست‌های ساخت کوئری جستجو"""
+
+    def test_like_pattern_escapes_wildcards(self):
+        """تست escape کاراکترهای ویژه‌ی LIKE در متن کاربر"""
+        assert like_pattern("ali") == "%ali%"
+        assert like_pattern("50%_off\\") == "%50\\%\\_off\\\\%"
+
+    def test_match_condition(self):
+        """تست شرط ILIKE روی چند ستون با یک پارامتر"""
+        assert match_condition(("username", "email"), 1) == "(username ILIKE $1 OR email ILIKE $1)"
+
+    def test_rank_expression(self):
+        """تست عبارت رتبه با similarity و word_similarity"""
+        assert rank_expression(("username",), 2) == "similarity(coalesce(username, ''), $2)"
+        assert rank_expression(("name",), 3, ("description",)) == (
+            "GREATEST(similarity(coalesce(name, ''), $3), word_similarity($3, coalesce(description, '')))"
+        )
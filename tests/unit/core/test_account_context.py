@@ -0,0 +1,66 @@
+"""
+تست‌های واحد برای ماژول account_context
+"""
+import asyncio
+from types import SimpleNamespace
+
+from core.account_context import AccountStateStore, account_key, get_current_account, set_current_account
+from core.event_envelope import build_envelope
+
+
+class TestAccountContext:
+    """
+    تست‌های حساب جاری و فضای وضعیت حساب‌ها
+    """
+
+    def test_account_is_task_local(self):
+        """تست جدا بودن حساب جاری در task های هم‌زمان"""
+        async def handle(account_id):
+            set_current_account(account_id)
+            await asyncio.sleep(0)
+            return get_current_account()
+
+        async def run():
+            return await asyncio.gather(handle("a"), handle("b"))
+
+        assert asyncio.run(run()) == ["a", "b"]
+        assert get_current_account() is None
+
+    def test_account_key(self):
+        """تست پیشوند کلید حساب"""
+        async def run():
+            set_current_account("+98912")
+            return account_key("stats")
+
+        assert account_key("stats") == "stats"
+        assert account_key("stats", "a") == "account:a:stats"
+        assert asyncio.run(run()) == "account:+98912:stats"
+
+    def test_state_store(self):
+        """تست فضای وضعیت جداگانه‌ی هر حساب"""
+        store = AccountStateStore()
+
+        async def run(account_id):
+            set_current_account(account_id)
+            state = store.get()
+            state['count'] = state.get('count', 0) + 1
+
+        async def main():
+            await asyncio.gather(run("a"), run("a"), run("b"))
+
+        asyncio.run(main())
+        assert store.get("a") == {'count': 2}
+        assert store.get("b") == {'count': 1}
+        assert store.drop("a")
+        assert "a" not in store.accounts()
+
+    def test_envelope_tagged_with_account(self):
+        """تست برچسب حساب در پاکت رویداد"""
+        message = SimpleNamespace(text="hi", from_user=SimpleNamespace(id=1), chat=None, chat_id=2)
+
+        async def run():
+            set_current_account("a")
+            return build_envelope(message)
+
+        assert asyncio.run(run()).account_id == "a"
+        assert build_envelope(message).account_id is None
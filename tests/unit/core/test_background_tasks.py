@@ -0,0 +1,255 @@
+"""
+تست‌های واحد برای ماژول background_tasks
+"""
+import asyncio
+import json
+
+import pytest
+from unittest.mock import AsyncMock, MagicMock
+
+from core.background_tasks import Task, TaskManager, TaskStatus
+from core.database.redis import RedisManager
+from core.task_queue import QueueEntry
+
+
+async def succeed(value):
+    """تابع وظیفه‌ی موفق"""
+    return {"value": value}
+
+
+async def fail():
+    """تابع وظیفه‌ی ناموفق"""
+    raise RuntimeError("boom")
+
+
+HOLD = {"active": 0, "peak": 0, "release": None}
+
+
+async def hold():
+    """تابع وظیفه‌ای که تا آزاد شدن HOLD["release"] اجرا می‌ماند"""
+    HOLD["active"] += 1
+    HOLD["peak"] = max(HOLD["peak"], HOLD["active"])
+    try:
+        await HOLD["release"].wait()
+    finally:
+        HOLD["active"] -= 1
+
+
+class FakeQueue:
+    """صف ساختگی که ترتیب ذخیره‌ها، افزودن‌ها و ack ها را ثبت می‌کند"""
+
+    def __init__(self):
+        self.store = {}
+        self.events = []
+        self.visibility_timeout = 30
+        self.client = MagicMock()
+        self.client.get = AsyncMock(side_effect=self.store.get)
+        self.client.set = AsyncMock(side_effect=self._set)
+
+    async def _set(self, key, value):
+        self.store[key] = value
+        if key.startswith("task:"):
+            self.events.append(("save", json.loads(value)["status"]))
+
+    async def enqueue(self, priority, task_id):
+        self.events.append(("enqueue", task_id))
+        return "2-0"
+
+    async def ack(self, entry):
+        self.events.append(("ack", entry.task_id))
+
+    async def touch(self, entry):
+        pass
+
+
+@pytest.fixture
+def manager(monkeypatch):
+    """فیکسچر برای TaskManager با صف ساختگی و بدون اتصال به Redis"""
+    def initialize(self):
+        self.redis_client = MagicMock()
+        self.redis_client.keys.return_value = []
+
+    monkeypatch.delenv("TASK_MAX_CONCURRENCY", raising=False)
+    monkeypatch.setattr(RedisManager, "_instance", None)
+    monkeypatch.setattr(RedisManager, "initialize", initialize)
+    monkeypatch.setattr(TaskManager, "_instance", None)
+    manager = TaskManager()
+    manager.queue = FakeQueue()
+    yield manager
+    manager.thread_pool.shutdown(wait=False)
+    manager.process_pool.shutdown(wait=False)
+
+
+def store_task(manager: TaskManager, **fields) -> Task:
+    """ذخیره‌ی یک وظیفه در صف ساختگی"""
+    task = Task(id=fields.pop("id", "t1"), name="test", module_path=__name__, **fields)
+    manager.queue.store[f"task:{task.id}"] = json.dumps(task.to_dict())
+    return task
+
+
+async def wait_for(condition, timeout: float = 1.0):
+    """انتظار تا برقرار شدن شرط"""
+    async def poll():
+        while not condition():
+            await asyncio.sleep(0.001)
+    await asyncio.wait_for(poll(), timeout)
+
+
+def start_scheduler(manager: TaskManager, task_ids, max_concurrency: int) -> asyncio.Task:
+    """اجرای حلقه‌ی زمان‌بند روی پیام‌های وظایف داده شده"""
+    pending = [QueueEntry("normal", f"{i}-0", task_id) for i, task_id in enumerate(task_ids, 1)]
+
+    async def next_entry():
+        if pending:
+            return pending.pop(0)
+        await asyncio.sleep(0.001)
+        return None
+
+    manager._next_entry = next_entry
+    manager.max_concurrency = max_concurrency
+    manager._slots = asyncio.Semaphore(max_concurrency)
+    manager.running = True
+    return asyncio.create_task(manager._schedule())
+
+
+async def stop_scheduler(manager: TaskManager, scheduler: asyncio.Task):
+    """توقف حلقه‌ی زمان‌بند"""
+    manager.running = False
+    scheduler.cancel()
+    await asyncio.gather(scheduler, return_exceptions=True)
+
+
+def saved_task(manager: TaskManager, task_id: str = "t1") -> Task:
+    """خواندن آخرین وضعیت ذخیره شده‌ی وظیفه"""
+    return Task.from_dict(json.loads(manager.queue.store[f"task:{task_id}"]))
+
+
+class TestTaskManager:
+    """تست‌های مربوط به کلاس TaskManager"""
+
+    @pytest.mark.asyncio
+    async def test_retry_saves_pending_before_enqueue(self, manager):
+        """تست ذخیره‌ی وضعیت PENDING پیش از افزودن مجدد به صف و ack پس از آن"""
+        task = store_task(manager, function_name="fail")
+
+        await manager._execute_task(task, QueueEntry("normal", "1-0", "t1"))
+
+        assert manager.queue.events == [
+            ("save", TaskStatus.RUNNING),
+            ("save", TaskStatus.PENDING),
+            ("enqueue", "t1"),
+            ("ack", "t1"),
+        ]
+        assert saved_task(manager).retries == 1
+
+    @pytest.mark.asyncio
+    async def test_retries_exhausted(self, manager):
+        """تست ثبت شکست بدون افزودن مجدد پس از پایان تلاش‌ها"""
+        task = store_task(manager, function_name="fail", retries=3, max_retries=3)
+
+        await manager._execute_task(task, QueueEntry("normal", "1-0", "t1"))
+
+        assert ("enqueue", "t1") not in manager.queue.events
+        assert manager.queue.events[-1] == ("ack", "t1")
+        assert saved_task(manager).status == TaskStatus.FAILED
+        assert saved_task(manager).error == "boom"
+
+    @pytest.mark.asyncio
+    async def test_dispatch_runs_pending_task(self, manager):
+        """تست اجرای وظیفه‌ی در انتظار و آزاد شدن ظرفیت با پایان آن"""
+        store_task(manager, function_name="succeed", args=[7])
+        manager._slots = asyncio.Semaphore(1)
+        await manager._slots.acquire()
+
+        assert await manager._dispatch(QueueEntry("normal", "1-0", "t1")) is True
+        await asyncio.gather(*manager._running_tasks)
+        await asyncio.sleep(0)
+
+        assert saved_task(manager).status == TaskStatus.COMPLETED
+        assert json.loads(manager.queue.store["task_result:t1"]) == {"value": 7}
+        assert manager.queue.events[-1] == ("ack", "t1")
+        assert not manager._slots.locked()
+        assert not manager._running_tasks
+
+    @pytest.mark.asyncio
+    async def test_dispatch_skips_finished_task(self, manager):
+        """تست ack پیام وظیفه‌ی لغو شده یا ناموجود بدون اجرا"""
+        store_task(manager, function_name="succeed", status=TaskStatus.CANCELED)
+
+        assert await manager._dispatch(QueueEntry("normal", "1-0", "t1")) is False
+        assert await manager._dispatch(QueueEntry("normal", "2-0", "missing")) is False
+        assert manager.queue.events == [("ack", "t1"), ("ack", "missing")]
+
+    @pytest.mark.asyncio
+    async def test_dispatch_reclaimed_running_task(self, manager):
+        """تست شمارش تلاش برای پیام واگذار شده‌ی کارگر از کار افتاده"""
+        store_task(manager, function_name="succeed", args=[1], status=TaskStatus.RUNNING)
+        store_task(manager, id="t2", function_name="succeed", status=TaskStatus.RUNNING,
+                   retries=3, max_retries=3)
+        manager._slots = asyncio.Semaphore(2)
+
+        assert await manager._dispatch(QueueEntry("normal", "1-0", "t1", reclaimed=True)) is True
+        await asyncio.gather(*manager._running_tasks)
+        assert saved_task(manager).retries == 1
+        assert saved_task(manager).status == TaskStatus.COMPLETED
+
+        assert await manager._dispatch(QueueEntry("normal", "2-0", "t2", reclaimed=True)) is False
+        assert saved_task(manager, "t2").status == TaskStatus.FAILED
+        assert manager.queue.events[-1] == ("ack", "t2")
+
+    @pytest.mark.asyncio
+    async def test_schedule_respects_max_concurrency(self, manager):
+        """تست اجرای هم‌زمان حداکثر max_concurrency وظیفه از N وظیفه‌ی در صف"""
+        HOLD.update(active=0, peak=0, release=asyncio.Event())
+        task_ids = [f"t{i}" for i in range(6)]
+        for task_id in task_ids:
+            store_task(manager, id=task_id, function_name="hold")
+
+        scheduler = start_scheduler(manager, task_ids, max_concurrency=2)
+        try:
+            await wait_for(lambda: HOLD["active"] == 2)
+            await asyncio.sleep(0.02)
+            assert HOLD["active"] == 2
+            assert len(manager._running_tasks) == 2
+
+            HOLD["release"].set()
+            await wait_for(lambda: all(saved_task(manager, task_id).status == TaskStatus.COMPLETED
+                                       for task_id in task_ids))
+        finally:
+            await stop_scheduler(manager, scheduler)
+
+        assert HOLD["peak"] == 2
+
+    @pytest.mark.asyncio
+    async def test_slot_released_on_failure(self, manager):
+        """تست آزاد شدن ظرفیت پس از شکست وظیفه"""
+        store_task(manager, id="t1", function_name="fail", max_retries=0)
+        store_task(manager, id="t2", function_name="succeed", args=[2])
+
+        scheduler = start_scheduler(manager, ["t1", "t2"], max_concurrency=1)
+        try:
+            await wait_for(lambda: saved_task(manager, "t2").status == TaskStatus.COMPLETED)
+        finally:
+            await stop_scheduler(manager, scheduler)
+
+        assert saved_task(manager, "t1").status == TaskStatus.FAILED
+
+    @pytest.mark.asyncio
+    async def test_slot_released_on_cancel(self, manager):
+        """تست آزاد شدن ظرفیت پس از لغو وظیفه‌ی در حال اجرا"""
+        HOLD.update(active=0, peak=0, release=asyncio.Event())
+        store_task(manager, id="t1", function_name="hold")
+        store_task(manager, id="t2", function_name="succeed", args=[2])
+
+        scheduler = start_scheduler(manager, ["t1", "t2"], max_concurrency=1)
+        try:
+            await wait_for(lambda: HOLD["active"] == 1)
+            assert saved_task(manager, "t2").status == TaskStatus.PENDING
+
+            for running in list(manager._running_tasks):
+                running.cancel()
+            await wait_for(lambda: saved_task(manager, "t2").status == TaskStatus.COMPLETED)
+        finally:
+            await stop_scheduler(manager, scheduler)
+
+        assert HOLD["active"] == 0
@@ -0,0 +1,93 @@
+"""
+تست‌های واحد برای ماژول command_dispatcher
+"""
+import asyncio
+from types import SimpleNamespace
+from unittest.mock import AsyncMock
+
+import pytest
+
+from core.command_dispatcher import CommandDispatcher
+
+
+def make_message(text):
+    """ساخت پیام نمونه مشابه پیام Pyrogram"""
+    return SimpleNamespace(
+        text=text,
+        from_user=SimpleNamespace(id=1),
+        chat=SimpleNamespace(id=-100, type=SimpleNamespace(value="group")),
+        outgoing=True
+    )
+
+
+@pytest.fixture
+def dispatcher():
+    """پخش‌کننده‌ی خالی برای هر تست"""
+    instance = CommandDispatcher()
+    instance.initialize()
+    return instance
+
+
+class TestCommandDispatcher:
+    """
+    تست‌های پخش‌کننده‌ی دستورات
+    """
+
+    def test_dispatch_by_first_token(self, dispatcher):
+        """تست اجرای هندلر دستور بر اساس توکن اول"""
+        block = AsyncMock(return_value="block")
+        blocklist = AsyncMock(return_value="blocklist")
+        dispatcher.register("fw_block", block, "firewall")
+        dispatcher.register("fw_blocklist", blocklist, "firewall")
+
+        message = make_message("/fw_blocklist")
+        result = asyncio.run(dispatcher.dispatch(None, message))
+
+        # برخلاف فیلتر text_startswith، دستور fw_block برای fw_blocklist اجرا نمی‌شود
+        assert result == "blocklist"
+        blocklist.assert_awaited_once_with(None, message)
+        block.assert_not_awaited()
+
+    def test_non_command_skips_handlers(self, dispatcher):
+        """تست عبور پیام‌های غیر دستوری بدون اجرای هندلرها"""
+        handler = AsyncMock()
+        dispatcher.register("help", handler, "bot_manager")
+
+        assert asyncio.run(dispatcher.dispatch(None, make_message("help me"))) is None
+        assert asyncio.run(dispatcher.dispatch(None, make_message(".unknown"))) is None
+        handler.assert_not_awaited()
+        assert dispatcher.stats['unknown'] == 1
+
+    def test_aliases_and_prefixes(self, dispatcher):
+        """تست نام‌های مستعار و محدودیت پیشوند"""
+        handler = AsyncMock(return_value=True)
+        dispatcher.register("sentiment", handler, "sentiment", aliases=["sa"], prefixes=["."])
+
+        assert asyncio.run(dispatcher.dispatch(None, make_message(".SA hello"))) is True
+        assert asyncio.run(dispatcher.dispatch(None, make_message("/sentiment hello"))) is None
+        assert dispatcher.get("sa").name == "sentiment"
+
+    def test_conflict_between_plugins(self, dispatcher):
+        """تست رد دستور تکراری از پلاگین دیگر"""
+        assert dispatcher.register("status", AsyncMock(), "bot_manager")
+        assert not dispatcher.register("status", AsyncMock(), "firewall")
+        assert not dispatcher.register("fw_status", AsyncMock(), "firewall", aliases=["status"])
+        assert dispatcher.get("status").plugin == "bot_manager"
+        assert dispatcher.get("fw_status") is None
+
+    def test_unregister_plugin(self, dispatcher):
+        """تست حذف دستورات و نام‌های مستعار یک پلاگین"""
+        dispatcher.register("ai", AsyncMock(), "openai", aliases=["gpt"])
+        dispatcher.register("help", AsyncMock(), "bot_manager")
+
+        assert dispatcher.unregister_plugin("openai") == 1
+        assert dispatcher.get("gpt") is None
+        assert dispatcher.get("help") is not None
+        assert dispatcher.get_stats()['commands'] == 1
+
+    def test_handler_error(self, dispatcher):
+        """تست ثبت خطای هندلر بدون توقف پردازش"""
+        dispatcher.register("boom", AsyncMock(side_effect=ValueError("x")), "test")
+
+        assert asyncio.run(dispatcher.dispatch(None, make_message(".boom"))) is None
+        assert dispatcher.stats['failed'] == 1
@@ -0,0 +1,137 @@
+"""
+تست‌های واحد برای ماژول database
+"""
+import asyncio
+import logging
+
+import pytest
+from unittest.mock import AsyncMock, MagicMock, patch
+
+from core.database import Database
+
+
+class FakePool:
+    """استخر اتصال ساختگی با یک اتصال"""
+
+    def __init__(self):
+        self.conn = MagicMock()
+        self.conn.execute = AsyncMock(return_value="UPDATE 1")
+        self.conn.fetch = AsyncMock(return_value=[{"id": 1}])
+        self.conn.fetchrow = AsyncMock(return_value={"id": 1})
+        self.acquire = AsyncMock(return_value=self.conn)
+        self.release = AsyncMock()
+
+    def get_size(self):
+        return 2
+
+    def get_idle_size(self):
+        return 1
+
+
+@pytest.fixture
+def database(monkeypatch):
+    """فیکسچر برای ایجاد نمونه‌ی تازه‌ی Database"""
+    for key in ("DB_POOL_MIN_SIZE", "DB_POOL_MAX_SIZE", "DB_POOL_ACQUIRE_TIMEOUT",
+                "DB_POOL_MAX_INACTIVE_LIFETIME", "DB_STATEMENT_CACHE_SIZE", "DB_SLOW_QUERY_MS"):
+        monkeypatch.delenv(key, raising=False)
+    monkeypatch.setattr(Database, "_instance", None)
+    monkeypatch.setattr(Database, "_pool", None)
+    return Database
+
+
+def connected(db: Database) -> FakePool:
+    """اتصال نمونه به استخر ساختگی"""
+    pool = FakePool()
+    db._pool = pool
+    db._connected = True
+    return pool
+
+
+class TestDatabase:
+    """تست‌های مربوط به کلاس Database"""
+
+    @pytest.mark.asyncio
+    async def test_pool_settings_from_config(self, database, monkeypatch):
+        """تست خواندن تنظیمات استخر از Config"""
+        monkeypatch.setenv("DB_POOL_MAX_SIZE", "20")
+        monkeypatch.setenv("DB_POOL_ACQUIRE_TIMEOUT", "2.5")
+        monkeypatch.setenv("DB_STATEMENT_CACHE_SIZE", "0")
+        monkeypatch.setenv("DB_SLOW_QUERY_MS", "abc")
+        db = database(host="localhost", port="5432", user="postgres", database="selfbot")
+
+        with patch("core.database.pool.asyncpg.create_pool", AsyncMock(return_value=FakePool())) as create_pool:
+            assert await db.connect() is True
+
+        assert db.acquire_timeout == 2.5
+        assert db.slow_query_ms == 500.0
+        create_pool.assert_awaited_once()
+        kwargs = create_pool.call_args.kwargs
+        assert kwargs["max_size"] == 20
+        assert kwargs["statement_cache_size"] == 0
+        assert kwargs["max_inactive_connection_lifetime"] == 300.0
+        assert kwargs["port"] == 5432
+
+    @pytest.mark.asyncio
+    async def test_query_stats_and_slow_log(self, database, caplog):
+        """تست ثبت زمان انتظار، آزاد شدن اتصال و لاگ کوئری کند"""
+        db = database("postgresql://localhost/selfbot")
+        pool = connected(db)
+        db.slow_query_ms = 1e-9
+
+        with caplog.at_level(logging.WARNING, logger="core.database"):
+            assert await db.fetchrow("SELECT *\n  FROM users WHERE id = $1", 1) == {"id": 1}
+
+        pool.acquire.assert_awaited_once_with(timeout=db.acquire_timeout)
+        pool.release.assert_awaited_once_with(pool.conn)
+        assert "SELECT * FROM users WHERE id = $1" in caplog.text
+        stats = db.get_stats()
+        assert stats["queries"] == 1
+        assert stats["slow_queries"] == 1
+        assert stats["acquires"] == 1
+        assert stats["in_use"] == 0
+
+    @pytest.mark.asyncio
+    async def test_acquire_timeout(self, database):
+        """تست خطای پر بودن استخر"""
+        db = database("postgresql://localhost/selfbot")
+        pool = connected(db)
+        pool.acquire.side_effect = asyncio.TimeoutError()
+
+        assert await db.execute("SELECT 1") is None
+        assert db.stats["acquire_timeouts"] == 1
+        assert db.stats["errors"] == 1
+        assert db.get_stats()["waiting"] == 0
+
+    @pytest.mark.asyncio
+    async def test_unit_of_work_pins_connection(self, database):
+        """تست اجرای چند دستور روی یک اتصال"""
+        db = database("postgresql://localhost/selfbot")
+        pool = connected(db)
+
+        async with db.unit_of_work() as conn:
+            await conn.execute("UPDATE users SET is_active = false")
+            await conn.execute("DELETE FROM sessions")
+            assert db.get_stats()["in_use"] == 1
+
+        assert conn is pool.conn
+        pool.conn.transaction.assert_called_once()
+        pool.acquire.assert_awaited_once()
+        pool.release.assert_awaited_once_with(pool.conn)
+
+    @pytest.mark.asyncio
+    async def test_transaction(self, database):
+        """تست اجرای کوئری‌ها در یک تراکنش و بازگشت False در صورت خطا"""
+        db = database("postgresql://localhost/selfbot")
+        pool = connected(db)
+        queries = [
+            ("INSERT INTO users (username) VALUES ($1)", ("ali",)),
+            ("UPDATE stats SET users = users + 1", None),
+        ]
+
+        assert await db.transaction(queries) is True
+        pool.conn.execute.assert_any_await("INSERT INTO users (username) VALUES ($1)", "ali")
+        pool.conn.execute.assert_any_await("UPDATE stats SET users = users + 1")
+
+        pool.conn.execute.side_effect = RuntimeError("constraint")
+        assert await db.transaction(queries) is False
+        assert db.get_stats()["in_use"] == 0
@@ -1,11 +1,14 @@
 """
 تست‌های واحد برای ماژول database_cache
 """
+import asyncio
+import time
+
 import pytest
 import json
-from unittest.mock import AsyncMock, MagicMock, patch
+from unittest.mock import AsyncMock, MagicMock, create_autospec, patch
 
-from core.database_cache import DatabaseCache
+from core.database_cache import DatabaseCache, row_key
 from core.database import Database
 from core.redis_manager import RedisManager
 
@@ -13,9 +16,9 @@ from core.redis_manager import RedisManager
 @pytest.fixture
 def mock_database():
     """فیکسچر برای شبیه‌سازی دیتابیس"""
-    db = MagicMock(spec=Database)
-    db.query = AsyncMock()
-    db.execute = AsyncMock()
+    db = create_autospec(Database, instance=True)
+    db.fetchrow.return_value = None
+    db.fetch.return_value = []
     return db
 
 
@@ -28,6 +31,8 @@ def mock_redis():
     redis.delete = AsyncMock()
     redis.hset = AsyncMock()
     redis.hgetall = AsyncMock(return_value={})
+    redis.set_tagged = AsyncMock(return_value=True)
+    redis.delete_tags = AsyncMock(return_value=0)
     redis.exists = AsyncMock(return_value=False)
     return redis
 
@@ -68,57 +73,53 @@ class TestDatabaseCache:
         assert tag1 != tag2
     
     @pytest.mark.asyncio
-    async def test_add_to_tag(self, database_cache, mock_redis):
-        """تست تابع _add_to_tag"""
-        # تنظیم پارامترها
-        table = "users"
-        cache_key = "db:users:select:abcdef"
-        
-        # فراخوانی متد
-        await database_cache._add_to_tag(table, cache_key)
-        
-        # بررسی اضافه شدن به نگاشت داخلی
-        tag_key = database_cache._get_tag_key(table)
-        assert tag_key in database_cache._cache_tags
-        assert cache_key in database_cache._cache_tags[tag_key]
-        
-        # بررسی فراخوانی redis
-        mock_redis.hset.assert_called_once_with(tag_key, cache_key, "1")
-    
+    async def test_store_with_tag(self, database_cache, mock_redis):
+        """تست ذخیره و ثبت کلید در تگ جدول با یک فراخوانی"""
+        cache_key = "db:users:one:abcdef"
+
+        tags = database_cache._entry_tags("users", None)
+        await database_cache._store(cache_key, "users", {"id": 1}, None, tags, 0)
+
+        # ذخیره و ثبت تگ‌ها در یک رفت و برگشت و بدون نگاشت داخلی
+        mock_redis.set_tagged.assert_called_once()
+        key, value, ttl, *tag_keys = mock_redis.set_tagged.call_args[0]
+        assert key == cache_key
+        assert value["v"] == {"id": 1}
+        assert ttl == 300
+        assert tag_keys == ["tag:users", "tag:users:agg"]
+        mock_redis.set.assert_not_called()
+        mock_redis.hset.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_store_skipped_after_invalidation(self, database_cache, mock_redis, mock_database):
+        """تست ذخیره نشدن نتیجه‌ی کوئری هم‌زمان با نوشتن در Redis و L1"""
+        async def racing_fetch(query, params):
+            await database_cache.invalidate_cache(["users"])
+            return {"id": 1, "username": "old"}
+
+        mock_database.fetchrow.side_effect = racing_fetch
+
+        result = await database_cache.fetch_one("users", "SELECT * FROM users WHERE id = $1", (1,))
+
+        assert result == {"id": 1, "username": "old"}
+        mock_redis.set_tagged.assert_not_called()
+        assert len(database_cache.local) == 0
+        assert database_cache.stats['stale_skips'] == 1
+
     @pytest.mark.asyncio
     async def test_invalidate_tag(self, database_cache, mock_redis):
         """تست تابع _invalidate_tag"""
-        # تنظیم داده‌های نگاشت داخلی
         table = "users"
-        tag_key = database_cache._get_tag_key(table)
-        cache_key1 = "db:users:select:abcdef"
-        cache_key2 = "db:users:count:123456"
-        
-        database_cache._cache_tags[tag_key] = {cache_key1, cache_key2}
-        
-        # تنظیم مقدار برگشتی از redis
-        mock_redis.hgetall.return_value = {
-            cache_key1: "1",
-            cache_key2: "1",
-            "db:users:select:xyz": "1"
-        }
-        
-        # فراخوانی متد
+        database_cache.local.set("db:users:one:abcdef", {"id": 1}, tag=database_cache._get_tag_key(table))
+
         await database_cache._invalidate_tag(table)
-        
-        # بررسی حذف تگ از نگاشت داخلی
-        assert tag_key not in database_cache._cache_tags
-        
-        # بررسی فراخوانی‌های redis
-        mock_redis.hgetall.assert_called_once_with(tag_key)
-        
-        # بررسی حذف کلیدها
-        assert mock_redis.delete.call_count == 4  # 3 کلید + 1 تگ
-        mock_redis.delete.assert_any_call(tag_key)
-        mock_redis.delete.assert_any_call(cache_key1)
-        mock_redis.delete.assert_any_call(cache_key2)
-        mock_redis.delete.assert_any_call("db:users:select:xyz")
-    
+
+        # حذف تمام کلیدهای جدول با یک فراخوانی
+        mock_redis.delete_tags.assert_called_once_with(database_cache._get_tag_key(table))
+        mock_redis.hgetall.assert_not_called()
+        mock_redis.delete.assert_not_called()
+        assert len(database_cache.local) == 0
+
     @pytest.mark.asyncio
     async def test_fetch_one_cache_hit(self, database_cache, mock_redis):
         """تست تابع fetch_one با کش موجود"""
@@ -130,7 +131,7 @@ class TestDatabaseCache:
         
         # تنظیم مقدار برگشتی از redis
         mock_redis.exists.return_value = True
-        mock_redis.get.return_value = json.dumps(expected_data)
+        mock_redis.get.return_value = {"__dbc__": 1, "v": expected_data, "d": 0.001, "e": time.time() + 300}
         
         # فراخوانی متد
         result = await database_cache.fetch_one(table, query, params)
@@ -139,7 +140,7 @@ class TestDatabaseCache:
         assert result == expected_data
         
         # تایید عدم فراخوانی دیتابیس
-        database_cache.db.query.assert_not_called()
+        database_cache.db.fetchrow.assert_not_called()
     
     @pytest.mark.asyncio
     async def test_fetch_one_cache_miss(self, database_cache, mock_redis, mock_database):
@@ -152,7 +153,7 @@ class TestDatabaseCache:
         
         # تنظیم مقدار برگشتی از redis و دیتابیس
         mock_redis.exists.return_value = False
-        mock_database.query.return_value = [expected_data]
+        mock_database.fetchrow.return_value = expected_data
         
         # فراخوانی متد
         result = await database_cache.fetch_one(table, query, params)
@@ -161,10 +162,10 @@ class TestDatabaseCache:
         assert result == expected_data
         
         # تایید فراخوانی دیتابیس
-        mock_database.query.assert_called_once_with(query, params)
+        mock_database.fetchrow.assert_called_once_with(query, *params)
         
         # تایید ذخیره در کش
-        mock_redis.set.assert_called_once()
+        mock_redis.set_tagged.assert_called_once()
     
     @pytest.mark.asyncio
     async def test_fetch_all_cache_hit(self, database_cache, mock_redis):
@@ -180,7 +181,7 @@ class TestDatabaseCache:
         
         # تنظیم مقدار برگشتی از redis
         mock_redis.exists.return_value = True
-        mock_redis.get.return_value = json.dumps(expected_data)
+        mock_redis.get.return_value = {"__dbc__": 1, "v": expected_data, "d": 0.001, "e": time.time() + 300}
         
         # فراخوانی متد
         result = await database_cache.fetch_all(table, query, params)
@@ -189,7 +190,7 @@ class TestDatabaseCache:
         assert result == expected_data
         
         # تایید عدم فراخوانی دیتابیس
-        database_cache.db.query.assert_not_called()
+        database_cache.db.fetch.assert_not_called()
     
     @pytest.mark.asyncio
     async def test_fetch_all_cache_miss(self, database_cache, mock_redis, mock_database):
@@ -205,7 +206,7 @@ class TestDatabaseCache:
         
         # تنظیم مقدار برگشتی از redis و دیتابیس
         mock_redis.exists.return_value = False
-        mock_database.query.return_value = expected_data
+        mock_database.fetch.return_value = expected_data
         
         # فراخوانی متد
         result = await database_cache.fetch_all(table, query, params)
@@ -214,10 +215,10 @@ class TestDatabaseCache:
         assert result == expected_data
         
         # تایید فراخوانی دیتابیس
-        mock_database.query.assert_called_once_with(query, params)
+        mock_database.fetch.assert_called_once_with(query, *params)
         
         # تایید ذخیره در کش
-        mock_redis.set.assert_called_once()
+        mock_redis.set_tagged.assert_called_once()
     
     @pytest.mark.asyncio
     async def test_count_cache_hit(self, database_cache, mock_redis):
@@ -230,7 +231,7 @@ class TestDatabaseCache:
         
         # تنظیم مقدار برگشتی از redis
         mock_redis.exists.return_value = True
-        mock_redis.get.return_value = json.dumps(expected_count)
+        mock_redis.get.return_value = {"__dbc__": 1, "v": expected_count, "d": 0.001, "e": time.time() + 300}
         
         # فراخوانی متد
         result = await database_cache.count(table, query, params)
@@ -239,7 +240,7 @@ class TestDatabaseCache:
         assert result == expected_count
         
         # تایید عدم فراخوانی دیتابیس
-        database_cache.db.query.assert_not_called()
+        database_cache.db.fetchrow.assert_not_called()
     
     @pytest.mark.asyncio
     async def test_count_cache_miss(self, database_cache, mock_redis, mock_database):
@@ -252,7 +253,7 @@ class TestDatabaseCache:
         
         # تنظیم مقدار برگشتی از redis و دیتابیس
         mock_redis.exists.return_value = False
-        mock_database.query.return_value = [{"count": expected_count}]
+        mock_database.fetchrow.return_value = {"count": expected_count}
         
         # فراخوانی متد
         result = await database_cache.count(table, query, params)
@@ -261,10 +262,10 @@ class TestDatabaseCache:
         assert result == expected_count
         
         # تایید فراخوانی دیتابیس
-        mock_database.query.assert_called_once_with(query, params)
+        mock_database.fetchrow.assert_called_once_with(query, *params)
         
         # تایید ذخیره در کش
-        mock_redis.set.assert_called_once()
+        mock_redis.set_tagged.assert_called_once()
     
     @pytest.mark.asyncio
     async def test_execute(self, database_cache, mock_database):
@@ -279,7 +280,7 @@ class TestDatabaseCache:
             await database_cache.execute(tables, query, params)
             
             # بررسی فراخوانی دیتابیس
-            mock_database.execute.assert_called_once_with(query, params)
+            mock_database.execute.assert_called_once_with(query, *params)
             
             # بررسی نامعتبرسازی کش برای هر جدول
             assert mock_invalidate.call_count == 2
@@ -328,3 +329,223 @@ class TestDatabaseCache:
             assert mock_invalidate.call_count == 2
             mock_invalidate.assert_any_call("users")
             mock_invalidate.assert_any_call("user_settings")
+
+    @pytest.mark.asyncio
+    async def test_fetch_one_local_hit(self, database_cache, mock_redis, mock_database):
+        """تست پاسخ از کش L1 بدون رفت و برگشت به Redis"""
+        query = "SELECT * FROM users WHERE id = %s"
+        mock_database.fetchrow.return_value = {"id": 1, "username": "test_user"}
+
+        first = await database_cache.fetch_one("users", query, (1,))
+        first["username"] = "changed"
+        second = await database_cache.fetch_one("users", query, (1,))
+
+        # تغییر نتیجه توسط فراخواننده مقدار کش را تغییر نمی‌دهد
+        assert second == {"id": 1, "username": "test_user"}
+        mock_database.fetchrow.assert_called_once()
+        mock_redis.get.assert_called_once()
+        assert database_cache.stats['l1_hits'] == 1
+        assert database_cache.stats['l2_misses'] == 1
+
+    @pytest.mark.asyncio
+    async def test_remote_invalidation(self, database_cache, mock_database):
+        """تست پاک شدن L1 با پیام نامعتبرسازی پردازه‌ی دیگر"""
+        mock_database.fetchrow.return_value = {"id": 1}
+        await database_cache.fetch_one("users", "SELECT * FROM users WHERE id = %s", (1,))
+        assert len(database_cache.local) == 1
+
+        # پیام خود این نمونه نادیده گرفته می‌شود
+        await database_cache._on_invalidation("db_cache:invalidate",
+                                              {"origin": database_cache.instance_id, "tables": ["users"]})
+        assert len(database_cache.local) == 1
+
+        await database_cache._on_invalidation("db_cache:invalidate", {"origin": "api", "tables": ["users"]})
+        assert len(database_cache.local) == 0
+        assert database_cache.stats['invalidations_received'] == 1
+
+    @pytest.mark.asyncio
+    async def test_concurrent_misses_single_query(self, database_cache, mock_database):
+        """تست اجرای یک کوئری برای درخواست‌های هم‌زمان یک کلید"""
+        async def slow_fetch(query, params):
+            await asyncio.sleep(0.01)
+            return {"id": 1}
+
+        mock_database.fetchrow.side_effect = slow_fetch
+        database_cache.local.max_size = 0
+
+        results = await asyncio.gather(*(
+            database_cache.fetch_one("users", "SELECT * FROM users WHERE id = %s", (1,)) for _ in range(20)
+        ))
+
+        assert all(result == {"id": 1} for result in results)
+        mock_database.fetchrow.assert_called_once()
+        assert database_cache.stats['coalesced'] == 19
+
+    @pytest.mark.asyncio
+    async def test_leader_cancellation_does_not_cancel_waiters(self, database_cache, mock_database):
+        """تست ادامه‌ی بارگذاری برای منتظرها پس از لغو درخواست اول"""
+        release = asyncio.Event()
+
+        async def slow_fetch(query, params):
+            await release.wait()
+            return {"id": 1}
+
+        mock_database.fetchrow.side_effect = slow_fetch
+        database_cache.local.max_size = 0
+        query = "SELECT * FROM users WHERE id = %s"
+
+        leader = asyncio.create_task(database_cache.fetch_one("users", query, (1,)))
+        await asyncio.sleep(0)
+        waiter = asyncio.create_task(database_cache.fetch_one("users", query, (1,)))
+        await asyncio.sleep(0)
+
+        leader.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await leader
+        release.set()
+
+        assert await waiter == {"id": 1}
+        mock_database.fetchrow.assert_called_once()
+        assert not database_cache._inflight
+
+    @pytest.mark.asyncio
+    async def test_early_refresh(self, database_cache, mock_redis, mock_database):
+        """تست تازه‌سازی پس‌زمینه‌ی کلید نزدیک به انقضا"""
+        mock_redis.get.return_value = {"__dbc__": 1, "v": {"id": 1}, "d": 10.0, "e": time.time() + 0.001}
+        mock_database.fetchrow.return_value = {"id": 2}
+
+        # مقدار فعلی برگردانده و تازه‌سازی در پس‌زمینه انجام می‌شود
+        result = await database_cache.fetch_one("users", "SELECT * FROM users WHERE id = %s", (1,))
+        assert result == {"id": 1}
+        assert database_cache.stats['early_refreshes'] == 1
+
+        await asyncio.gather(*database_cache._refresh_tasks)
+        mock_database.fetchrow.assert_called_once()
+        stored = mock_redis.set_tagged.call_args[0][1]
+        assert stored["v"] == {"id": 2}
+
+    @pytest.mark.asyncio
+    async def test_row_level_invalidation(self, database_cache, mock_redis, mock_database):
+        """تست حذف فقط ردیف تغییر یافته و کوئری‌های تجمیعی جدول"""
+        mock_database.fetchrow.side_effect = lambda query, *args: {"id": args[0]}
+        mock_database.fetch.return_value = [{"id": 1}, {"id": 2}]
+        query = "SELECT * FROM users WHERE id = $1"
+
+        await database_cache.fetch_one("users", query, (1,), depends_on=[row_key("users", id=1)])
+        await database_cache.fetch_one("users", query, (2,), depends_on=[row_key("users", id=2)])
+        await database_cache.fetch_all("users", "SELECT * FROM users")
+        assert len(database_cache.local) == 3
+
+        with patch.object(database_cache, '_invalidate_tag', AsyncMock()) as mock_invalidate:
+            await database_cache.execute(["users"], "UPDATE users SET last_login = NOW() WHERE id = $1", (1,),
+                                         keys=[row_key("users", id=1)])
+            mock_invalidate.assert_not_called()
+
+        # ردیف 2 در کش باقی می‌ماند
+        mock_redis.delete_tags.assert_called_once_with("tag:users:agg", "tag:dep:users:id=1")
+        assert len(database_cache.local) == 1
+        assert await database_cache.fetch_one("users", query, (2,), depends_on=[row_key("users", id=2)]) == {"id": 2}
+        assert mock_database.fetchrow.call_count == 2
+
+    @pytest.mark.asyncio
+    async def test_table_flush_removes_row_entries(self, database_cache, mock_redis, mock_database):
+        """تست حذف ورودی‌های وابسته به ردیف با نامعتبرسازی کل جدول"""
+        mock_database.fetchrow.return_value = {"id": 1}
+        await database_cache.fetch_one("users", "SELECT * FROM users WHERE id = $1", (1,),
+                                       depends_on=[row_key("users", id=1)])
+
+        await database_cache.invalidate_cache(["users"])
+
+        mock_redis.delete_tags.assert_called_once_with("tag:users")
+        assert len(database_cache.local) == 0
+
+    def test_row_key(self):
+        """تست ساخت کلید وابستگی ردیف"""
+        assert row_key("users", id=42) == "users:id=42"
+        assert row_key("settings", user_id=1, key="theme") == "settings:key=theme,user_id=1"
+
+    @pytest.mark.asyncio
+    async def test_estimate_count(self, database_cache, mock_redis, mock_database):
+        """تست تعداد تقریبی از برآورد planner و نامعتبر نشدن آن با نوشتن"""
+        plan = json.dumps([{"Plan": {"Node Type": "Seq Scan", "Plan Rows": 250000}}])
+        mock_database.fetchrow.return_value = {"QUERY PLAN": plan}
+
+        assert await database_cache.estimate_count("users", "SELECT 1 FROM users") == (250000, False)
+        mock_database.fetchrow.assert_called_once_with("EXPLAIN (FORMAT JSON) SELECT 1 FROM users")
+
+        await database_cache.execute(["users"], "UPDATE users SET is_active = false WHERE id = $1", (1,),
+                                     keys=[row_key("users", id=1)])
+        assert await database_cache.estimate_count("users", "SELECT 1 FROM users") == (250000, False)
+        assert mock_database.fetchrow.call_count == 1
+
+    @pytest.mark.asyncio
+    async def test_estimate_count_small_table_is_exact(self, database_cache, mock_database):
+        """تست شمارش دقیق وقتی برآورد کمتر از آستانه است"""
+        plan = [{"Plan": {"Plan Rows": 12}}]
+        mock_database.fetchrow.side_effect = [{"QUERY PLAN": plan}, {"count": 9}]
+
+        total = await database_cache.estimate_count("plugins", "SELECT 1 FROM plugins WHERE type = $1", ("ai",))
+
+        assert total == (9, True)
+        mock_database.fetchrow.assert_called_with(
+            "SELECT COUNT(*) FROM (SELECT 1 FROM plugins WHERE type = $1) AS counted", "ai"
+        )
+
+    @pytest.mark.asyncio
+    async def test_fill_lock_released_with_token(self, database_cache, mock_redis, mock_database):
+        """تست آزاد کردن قفل پر کردن کش با توکن گرفته شده"""
+        database_cache.fill_lock = True
+        mock_redis.acquire_lock = AsyncMock(return_value="token-1")
+        mock_redis.release_lock = AsyncMock(return_value=True)
+        mock_database.fetchrow.return_value = {"id": 1}
+
+        assert await database_cache.fetch_one("users", "SELECT * FROM users WHERE id = $1", (1,)) == {"id": 1}
+
+        lock_name = mock_redis.acquire_lock.call_args.args[0]
+        mock_redis.release_lock.assert_awaited_once_with(lock_name, "token-1")
+
+
+@pytest.fixture
+def pooled_database(monkeypatch):
+    """فیکسچر برای نمونه‌ی واقعی Database که فقط استخر asyncpg آن ساختگی است"""
+    monkeypatch.setattr(Database, "_instance", None)
+    monkeypatch.setattr(Database, "_pool", None)
+    db = Database(host="localhost", port="5432", user="postgres", database="selfbot")
+    conn = MagicMock()
+    conn.execute = AsyncMock(return_value="UPDATE 1")
+    conn.fetch = AsyncMock(return_value=[{"id": 1}, {"id": 2}])
+    conn.fetchrow = AsyncMock(return_value={"id": 1})
+    db._pool = MagicMock()
+    db._pool.acquire = AsyncMock(return_value=conn)
+    db._pool.release = AsyncMock()
+    db._connected = True
+    return db, conn
+
+
+class TestDatabaseCacheWithDatabase:
+    """تست‌های DatabaseCache روی کلاس واقعی Database"""
+
+    @pytest.mark.asyncio
+    async def test_reads_bind_params_on_connection(self, pooled_database, mock_redis):
+        """تست ارسال پارامترها به صورت جدا به اتصال در خواندن‌ها"""
+        db, conn = pooled_database
+        cache = DatabaseCache(db, mock_redis, default_ttl=300, local_ttl=0)
+
+        assert await cache.fetch_one("users", "SELECT * FROM users WHERE id = $1 AND role = $2",
+                                     (1, "admin")) == {"id": 1}
+        conn.fetchrow.assert_awaited_once_with("SELECT * FROM users WHERE id = $1 AND role = $2", 1, "admin")
+
+        assert await cache.fetch_all("users", "SELECT * FROM users") == [{"id": 1}, {"id": 2}]
+        conn.fetch.assert_awaited_once_with("SELECT * FROM users")
+
+    @pytest.mark.asyncio
+    async def test_execute_binds_params_on_connection(self, pooled_database, mock_redis):
+        """تست ارسال پارامترها به صورت جدا به اتصال در نوشتن"""
+        db, conn = pooled_database
+        cache = DatabaseCache(db, mock_redis, default_ttl=300)
+
+        await cache.execute(["users"], "UPDATE users SET role = $1 WHERE id = $2", ("admin", 1),
+                            keys=[row_key("users", id=1)])
+
+        conn.execute.assert_awaited_once_with("UPDATE users SET role = $1 WHERE id = $2", "admin", 1)
+        db._pool.release.assert_awaited_once_with(conn)
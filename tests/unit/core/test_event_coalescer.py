@@ -0,0 +1,62 @@
+"""
+تست‌های واحد برای ماژول event_coalescer
+"""
+import asyncio
+import pytest
+from types import SimpleNamespace
+from unittest.mock import AsyncMock
+
+from core.event_coalescer import EditCoalescer, edit_key
+
+
+def make_edit(message_id=1, chat_id=-100, text="v1"):
+    """ساخت پیام ویرایش شده‌ی ساختگی"""
+    return SimpleNamespace(id=message_id, chat=SimpleNamespace(id=chat_id), text=text)
+
+
+class TestEditCoalescer:
+    """تست‌های مربوط به کلاس EditCoalescer"""
+
+    @pytest.mark.asyncio
+    async def test_latest_edit_dispatched_once(self):
+        """تست ارسال فقط آخرین ویرایش درون پنجره"""
+        coalescer = EditCoalescer(window=0.02)
+        callback = AsyncMock()
+        wrapped = coalescer.wrap(callback)
+
+        for index in range(10):
+            await wrapped(None, make_edit(text=f"v{index}"))
+        await wrapped(None, make_edit(message_id=2, text="other"))
+
+        callback.assert_not_called()
+        await asyncio.sleep(0.05)
+
+        assert callback.await_count == 2
+        texts = sorted(call.args[1].text for call in callback.await_args_list)
+        assert texts == ["other", "v9"]
+        assert coalescer.get_stats()['coalesced'] == 9
+
+    @pytest.mark.asyncio
+    async def test_flush_all(self):
+        """تست ارسال فوری ویرایش‌های در انتظار هنگام خاموش شدن"""
+        coalescer = EditCoalescer(window=10)
+        callback = AsyncMock()
+
+        coalescer.submit(("a", 1), callback, "latest")
+        await coalescer.flush_all()
+
+        callback.assert_awaited_once_with("latest")
+        assert coalescer.pending == 0
+
+    @pytest.mark.asyncio
+    async def test_without_key_runs_immediately(self):
+        """تست اجرای فوری رویداد بدون شناسه پیام"""
+        coalescer = EditCoalescer(window=10)
+        callback = AsyncMock(return_value="done")
+
+        assert await coalescer.wrap(callback)(SimpleNamespace(text="x")) == "done"
+
+    def test_edit_key(self):
+        """تست ساخت کلید برای Pyrogram و Telethon"""
+        assert edit_key(make_edit(5, -1)) == (-1, 5)
+        assert edit_key(SimpleNamespace(id=5, chat=None, chat_id=-2)) == (-2, 5)
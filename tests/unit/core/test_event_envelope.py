@@ -0,0 +1,112 @@
+"""
+تست‌های واحد برای ماژول event_envelope
+"""
+import asyncio
+from enum import Enum
+from types import SimpleNamespace
+
+import pytest
+
+from core.event_envelope import (
+    ChatTypeMask, DirectionMask, EventEnvelope, build_envelope, get_envelope, set_current_envelope
+)
+
+
+class MessageMediaType(Enum):
+    """نمونه‌ی نوع رسانه‌ی Pyrogram"""
+    PHOTO = "photo"
+
+
+class MessageMediaDocument:
+    """نمونه‌ی رسانه‌ی Telethon"""
+
+
+def make_message(text="hello", user_id=1, chat_id=-100, chat_type="group", outgoing=False, media=None):
+    """ساخت پیام نمونه مشابه پیام Pyrogram"""
+    return SimpleNamespace(
+        text=text,
+        from_user=SimpleNamespace(id=user_id),
+        chat=SimpleNamespace(id=chat_id, type=SimpleNamespace(value=chat_type)),
+        outgoing=outgoing,
+        media=media
+    )
+
+
+class TestEventEnvelope:
+    """
+    تست‌های پاکت رویداد
+    """
+
+    def test_slots(self):
+        """تست عدم وجود دیکشنری ویژگی‌ها"""
+        envelope = build_envelope(make_message())
+        assert not hasattr(envelope, '__dict__')
+        with pytest.raises(AttributeError):
+            envelope.extra = 1
+
+    def test_pyrogram_message(self):
+        """تست استخراج مقادیر از پیام Pyrogram"""
+        envelope = build_envelope(make_message("Hello World", user_id=5, chat_id=-7, outgoing=True,
+                                               media=MessageMediaType.PHOTO), "message")
+
+        assert envelope.event_type == "message"
+        assert envelope.sender_id == 5
+        assert envelope.chat_id == -7
+        assert envelope.chat_type == ChatTypeMask.GROUP
+        assert envelope.direction == DirectionMask.OUTGOING
+        assert envelope.is_outgoing
+        assert envelope.text_lower == "hello world"
+        assert envelope.media_kind == "photo"
+        assert envelope.command is None
+
+    def test_telethon_event(self):
+        """تست استخراج مقادیر از رویداد Telethon"""
+        event = SimpleNamespace(sender_id=3, chat_id=9, is_private=True, out=False,
+                                raw_text="hi", media=MessageMediaDocument())
+        envelope = build_envelope(event)
+
+        assert envelope.sender_id == 3
+        assert envelope.chat_id == 9
+        assert envelope.chat_type == ChatTypeMask.PRIVATE
+        assert envelope.direction == DirectionMask.INCOMING
+        assert envelope.media_kind == "document"
+        assert envelope.has_media
+
+    @pytest.mark.parametrize("text, command, prefix, args", [
+        (".Help me please", "help", ".", "me please"),
+        ("/start@my_bot", "start", "/", ""),
+        ("!ping", "ping", "!", ""),
+        ("hello .help", None, None, ""),
+        (".", None, None, ""),
+    ])
+    def test_command_token(self, text, command, prefix, args):
+        """تست استخراج توکن دستور"""
+        envelope = build_envelope(make_message(text))
+        assert envelope.command == command
+        assert envelope.command_prefix == prefix
+        assert envelope.command_args == args
+
+    def test_get_envelope_reuses_instance(self):
+        """تست ساخته شدن یک پاکت برای هر بروزرسانی"""
+        async def run():
+            message = make_message()
+            first = get_envelope(message, "message")
+            second = get_envelope(message)
+            other = get_envelope(make_message())
+            return message, first, second, other
+
+        message, first, second, other = asyncio.run(run())
+        assert first is second
+        assert first.update is message
+        assert other is not first
+
+    def test_set_current_envelope(self):
+        """تست انتقال پاکت به task دیگر"""
+        message = make_message()
+        envelope = EventEnvelope(message, "message", 1, 2, 0, DirectionMask.INCOMING, "x")
+
+        async def worker():
+            set_current_envelope(envelope)
+            return get_envelope(message)
+
+        assert asyncio.run(worker()) is envelope
@@ -0,0 +1,127 @@
+"""
+تست‌های واحد برای ماژول event_executor
+"""
+import asyncio
+import pytest
+
+from core.event_executor import EventExecutor, OverflowPolicy
+
+
+class TestEventExecutor:
+    """تست‌های مربوط به کلاس EventExecutor"""
+
+    @pytest.mark.asyncio
+    async def test_per_chat_order(self):
+        """تست حفظ ترتیب رویدادهای هر چت"""
+        executor = EventExecutor(workers=4)
+        seen = {1: [], 2: []}
+
+        async def job(chat_id, index):
+            # تأخیر معکوس برای اطمینان از عدم وابستگی ترتیب به زمان اجرا
+            await asyncio.sleep(0.001 * (5 - index))
+            seen[chat_id].append(index)
+
+        for index in range(5):
+            await executor.submit(1, job, 1, index)
+            await executor.submit(2, job, 2, index)
+
+        await executor.stop()
+
+        assert seen == {1: [0, 1, 2, 3, 4], 2: [0, 1, 2, 3, 4]}
+        assert executor.stats['processed'] == 10
+
+    @pytest.mark.asyncio
+    async def test_chats_run_in_parallel(self):
+        """تست اجرای موازی چت‌های مختلف"""
+        executor = EventExecutor(workers=2)
+        release = asyncio.Event()
+        started = []
+
+        async def slow(chat_id):
+            started.append(chat_id)
+            await release.wait()
+
+        await executor.submit(1, slow, 1)
+        await executor.submit(2, slow, 2)
+        await asyncio.sleep(0.01)
+
+        assert sorted(started) == [1, 2]
+        release.set()
+        await executor.stop()
+
+    @pytest.mark.asyncio
+    async def test_drop_newest(self):
+        """تست رد رویداد جدید هنگام پر بودن صف"""
+        executor = EventExecutor(workers=1, max_queue_size=2, overflow_policy=OverflowPolicy.DROP_NEWEST)
+        release = asyncio.Event()
+        done = []
+
+        async def job(index):
+            await release.wait()
+            done.append(index)
+
+        await executor.submit(1, job, 0)
+        await asyncio.sleep(0)  # شروع اجرای کار اول
+        assert await executor.submit(1, job, 1)
+        assert await executor.submit(1, job, 2)
+        assert not await executor.submit(1, job, 3)
+
+        stats = executor.get_stats()
+        assert stats['queue_depth'] == 2
+        assert stats['dropped_newest'] == 1
+
+        release.set()
+        await executor.stop()
+        assert done == [0, 1, 2]
+
+    @pytest.mark.asyncio
+    async def test_drop_oldest(self):
+        """تست حذف قدیمی‌ترین رویداد پرترافیک‌ترین چت"""
+        executor = EventExecutor(workers=1, max_queue_size=3, overflow_policy=OverflowPolicy.DROP_OLDEST)
+        release = asyncio.Event()
+        done = []
+
+        async def job(index):
+            await release.wait()
+            done.append(index)
+
+        await executor.submit(0, job, 'running')
+        await asyncio.sleep(0)
+        await executor.submit(1, job, 'a1')
+        await executor.submit(1, job, 'a2')
+        await executor.submit(2, job, 'b1')
+        await executor.submit(2, job, 'b2')
+
+        assert executor.stats['dropped_oldest'] == 1
+        release.set()
+        await executor.stop()
+        assert 'a1' not in done
+        assert done.index('b1') < done.index('b2')
+
+    @pytest.mark.asyncio
+    async def test_block_policy(self):
+        """تست انتظار ارسال‌کننده تا آزاد شدن ظرفیت صف"""
+        executor = EventExecutor(workers=1, max_queue_size=1, overflow_policy=OverflowPolicy.BLOCK)
+        release = asyncio.Event()
+
+        async def job():
+            await release.wait()
+
+        await executor.submit(1, job)
+        await asyncio.sleep(0)
+        await executor.submit(1, job)
+
+        blocked = asyncio.create_task(executor.submit(1, job))
+        await asyncio.sleep(0.01)
+        assert not blocked.done()
+        assert executor.stats['blocked'] == 1
+
+        release.set()
+        assert await asyncio.wait_for(blocked, 1)
+        await executor.stop()
+        assert executor.stats['processed'] == 3
+
+    def test_invalid_policy(self):
+        """تست سیاست نامعتبر"""
+        with pytest.raises(ValueError):
+            EventExecutor(overflow_policy="unknown")
@@ -0,0 +1,144 @@
+"""
+تست‌های واحد برای ماژول event_handler
+"""
+from types import SimpleNamespace
+
+import pytest
+from unittest.mock import MagicMock
+
+from core.client import ClientType
+from core.event_handler import DispatchMode, EventHandler, EventType, Middleware
+
+
+def make_client(client_type=ClientType.PYROGRAM):
+    """ساخت کلاینت ساختگی با کلاینت Pyrogram/Telethon داخلی ساختگی"""
+    client = MagicMock()
+    client.client_type = client_type
+    client.client.add_handler = MagicMock(side_effect=lambda handler, group=0: (handler, group))
+    return client
+
+
+def make_message(message_id=1, chat_id=-100, text="hello"):
+    """ساخت پیام نمونه مشابه پیام Pyrogram"""
+    return SimpleNamespace(
+        id=message_id,
+        text=text,
+        from_user=SimpleNamespace(id=1),
+        chat=SimpleNamespace(id=chat_id, type=SimpleNamespace(value="group")),
+        outgoing=False,
+        media=None
+    )
+
+
+@pytest.fixture
+def event_handler(monkeypatch):
+    """فیکسچر برای ایجاد نمونه‌ی تازه‌ی EventHandler در حالت per_handler"""
+    for key in ("EVENT_DISPATCH_MODE", "EVENT_WORKERS", "EVENT_EDIT_COALESCE_WINDOW"):
+        monkeypatch.delenv(key, raising=False)
+    monkeypatch.setattr(EventHandler, "_instance", None)
+    return EventHandler()
+
+
+class CountingMiddleware(Middleware):
+    """میان‌افزار شمارنده‌ی رویدادهای عبوری"""
+
+    def __init__(self):
+        self.before = []
+        self.after = 0
+
+    async def before_event(self, client, event, event_type):
+        self.before.append(event.text)
+        return True
+
+    async def after_event(self, client, event, event_type, result):
+        self.after += 1
+        return result
+
+
+def client_handlers(client):
+    """هندلرهای Pyrogram ثبت شده در کلاینت داخلی"""
+    return [call.args[0] for call in client.client.add_handler.call_args_list]
+
+
+class TestEventHandler:
+    """تست‌های مربوط به کلاس EventHandler"""
+
+    def test_remove_handler_detaches_from_client(self, event_handler):
+        """تست حذف هندلر از کلاینت در حالت per_handler"""
+        async def first(client, message):
+            return None
+
+        async def second(client, message):
+            return None
+
+        client = make_client()
+        event_handler.set_client(client)
+        event_handler.register_handler(EventType.MESSAGE, first)
+        event_handler.register_handler(EventType.MESSAGE, second)
+        registered_first, registered_second = client_handlers(client)
+
+        assert event_handler.remove_handler(EventType.MESSAGE, first) is True
+
+        client.client.remove_handler.assert_called_once_with(registered_first, 0)
+        assert [a['handle'] for a in event_handler._attached[None]] == [(registered_second, 0)]
+
+        # حذف دوباره چیزی را از کلاینت حذف نمی‌کند
+        assert event_handler.remove_handler(EventType.MESSAGE, first) is False
+        assert client.client.remove_handler.call_count == 1
+
+    def test_remove_handler_detaches_telethon(self, event_handler):
+        """تست حذف هندلر Telethon با همان callback و event builder"""
+        async def handler(event):
+            return None
+
+        client = make_client(ClientType.TELETHON)
+        event_handler.set_client(client)
+        event_handler.register_handler(EventType.EDITED_MESSAGE, handler)
+        callback, builder = client.client.add_event_handler.call_args.args
+
+        event_handler.remove_handler(EventType.EDITED_MESSAGE, handler)
+
+        client.client.remove_event_handler.assert_called_once_with(callback, builder)
+
+    def test_remove_handler_keeps_router_dispatcher(self, event_handler):
+        """تست باقی ماندن هندلر واحد مسیریاب در کلاینت پس از حذف یک هندلر"""
+        async def handler(client, message):
+            return None
+
+        client = make_client()
+        event_handler.set_dispatch_mode(DispatchMode.ROUTER)
+        event_handler.set_client(client)
+        event_handler.register_handler(EventType.MESSAGE, handler)
+
+        assert event_handler.remove_handler(EventType.MESSAGE, handler) is True
+
+        assert client.client.add_handler.call_count == 1
+        client.client.remove_handler.assert_not_called()
+
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize("mode", [DispatchMode.PER_HANDLER, DispatchMode.ROUTER])
+    async def test_coalesced_edits_run_middlewares_per_edit(self, event_handler, mode):
+        """تست اجرای میان‌افزارها برای هر ویرایش و هندلر فقط برای آخرین ویرایش در هر دو حالت"""
+        seen = []
+
+        async def handler(client, message):
+            seen.append(message.text)
+
+        middleware = CountingMiddleware()
+        event_handler.set_dispatch_mode(mode)
+        event_handler.configure_edit_coalescing(60)
+        event_handler.register_middleware(middleware)
+        client = make_client()
+        event_handler.set_client(client)
+        event_handler.register_handler(EventType.EDITED_MESSAGE, handler)
+        callback = client_handlers(client)[0].callback
+
+        for text in ("a", "b", "c"):
+            await callback(client.client, make_message(text=text))
+        assert seen == []
+
+        await event_handler.coalescer.flush_all()
+
+        assert middleware.before == ["a", "b", "c"]
+        assert middleware.after == 3
+        assert seen == ["c"]
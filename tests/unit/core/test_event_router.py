@@ -0,0 +1,248 @@
+"""
+تست‌های واحد برای ماژول event_router
+"""
+import pytest
+from types import SimpleNamespace
+from unittest.mock import AsyncMock
+
+from core.event_envelope import get_envelope
+from core.event_router import EventRouter, StopPropagation, match_filters
+
+
+def make_message(text="hello", user_id=1, chat_id=-100, chat_type="group", outgoing=False):
+    """ساخت پیام ساختگی"""
+    return SimpleNamespace(
+        text=text,
+        from_user=SimpleNamespace(id=user_id),
+        chat=SimpleNamespace(id=chat_id, type=chat_type),
+        outgoing=outgoing
+    )
+
+
+class RejectMiddleware:
+    """میان‌افزار رد کننده‌ی تمام رویدادها"""
+
+    async def before_event(self, client, event, event_type):
+        return False
+
+    async def after_event(self, client, event, event_type, result):
+        return result
+
+
+@pytest.fixture
+def router():
+    """فیکسچر برای ایجاد نمونه EventRouter"""
+    return EventRouter()
+
+
+class TestEventRouter:
+    """تست‌های مربوط به کلاس EventRouter"""
+
+    def test_handlers_sorted_by_order(self, router):
+        """تست مرتب‌سازی هندلرها براساس ترتیب اعلام شده"""
+        async def first(client, update):
+            return None
+
+        async def second(client, update):
+            return None
+
+        router.add_handler("message", second, order=10)
+        router.add_handler("message", first, order=-5)
+
+        handlers = [entry.handler for entry in router.get_handlers("message")]
+        assert handlers == [first, second]
+
+    def test_remove_handler(self, router):
+        """تست حذف هندلر از جدول"""
+        async def handler(client, update):
+            return None
+
+        handler_id = router.add_handler("message", handler)
+
+        assert router.find_handler_ids("message", handler) == [handler_id]
+        assert router.remove_handler(handler_id) is True
+        assert router.get_handlers("message") == []
+        assert router.remove_handler(handler_id) is False
+
+    @pytest.mark.asyncio
+    async def test_middlewares_run_once_per_update(self, router):
+        """تست اجرای یک‌باره‌ی میان‌افزارها برای چند هندلر"""
+        middleware = SimpleNamespace(
+            before_event=AsyncMock(return_value=True),
+            after_event=AsyncMock(side_effect=lambda c, e, t, result: result)
+        )
+        handlers = [AsyncMock(return_value=i) for i in range(3)]
+        for handler in handlers:
+            router.add_handler("message", handler)
+
+        message = make_message()
+        results = await router.dispatch(None, message, "message", [middleware], (None, message))
+
+        assert results == [0, 1, 2]
+        middleware.before_event.assert_called_once()
+        middleware.after_event.assert_called_once()
+        for handler in handlers:
+            handler.assert_called_once_with(None, message)
+
+    @pytest.mark.asyncio
+    async def test_stop_propagation(self, router):
+        """تست توقف پخش رویداد توسط هندلر"""
+        async def stopper(client, update):
+            raise StopPropagation()
+
+        late_handler = AsyncMock()
+        router.add_handler("message", stopper, order=0)
+        router.add_handler("message", late_handler, order=1)
+
+        message = make_message()
+        await router.dispatch(None, message, "message", [], (None, message))
+
+        late_handler.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_rejected_by_middleware(self, router):
+        """تست رد رویداد توسط میان‌افزار"""
+        handler = AsyncMock()
+        router.add_handler("message", handler)
+
+        message = make_message()
+        result = await router.dispatch(None, message, "message", [RejectMiddleware()], (None, message))
+
+        assert result is None
+        handler.assert_not_called()
+
+
+    @pytest.mark.asyncio
+    async def test_dispatch_by_coalesce(self, router):
+        """تست جدا کردن هندلرهای با و بدون ادغام ویرایش"""
+        coalesced = AsyncMock()
+        every_edit = AsyncMock()
+        router.add_handler("edited_message", coalesced)
+        router.add_handler("edited_message", every_edit, coalesce=False)
+
+        message = make_message()
+        await router.dispatch(None, message, "edited_message", [], (None, message), coalesce=False)
+
+        every_edit.assert_called_once()
+        coalesced.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_dispatch_defers_coalesced_handlers(self, router):
+        """تست اجرای یک‌باره‌ی میان‌افزارها و سپردن هندلرهای ادغامی"""
+        coalesced = AsyncMock()
+        every_edit = AsyncMock(return_value="now")
+        router.add_handler("edited_message", coalesced, order=1)
+        router.add_handler("edited_message", every_edit, order=2, coalesce=False)
+        middleware = SimpleNamespace(
+            before_event=AsyncMock(return_value=True),
+            after_event=AsyncMock(side_effect=lambda client, event, event_type, result: result)
+        )
+        defer = AsyncMock()
+
+        message = make_message()
+        results = await router.dispatch(None, message, "edited_message", [middleware], (None, message),
+                                        defer=defer)
+
+        assert results == ["now"]
+        middleware.before_event.assert_called_once()
+        middleware.after_event.assert_called_once()
+        coalesced.assert_not_called()
+        entries, *args = defer.call_args[0]
+        assert [entry.handler for entry in entries] == [coalesced]
+        assert args == [None, message]
+
+        await router.run_handlers(entries, tuple(args))
+        coalesced.assert_called_once_with(None, message)
+
+    @pytest.mark.asyncio
+    async def test_stop_propagation_skips_later_deferred(self, router):
+        """تست متوقف شدن هندلرهای ادغامی بعد از هندلر فوری با StopPropagation"""
+        async def stop(*args):
+            raise StopPropagation()
+
+        early = AsyncMock()
+        late = AsyncMock()
+        router.add_handler("edited_message", early, order=0)
+        router.add_handler("edited_message", stop, order=1, coalesce=False)
+        router.add_handler("edited_message", late, order=2)
+        defer = AsyncMock()
+
+        message = make_message()
+        await router.dispatch(None, message, "edited_message", [], (None, message), defer=defer)
+
+        entries = defer.call_args[0][0]
+        assert [entry.handler for entry in entries] == [early]
+
+
+class TestMatchFilters:
+    """تست‌های مربوط به تابع match_filters"""
+
+    def test_text_filters(self):
+        """تست فیلترهای متنی"""
+        message = make_message(text=".help")
+
+        assert match_filters(message, {'text': ['.help', '/help']})
+        assert not match_filters(message, {'text': ['.status']})
+        assert match_filters(message, {'text_startswith': ['.he']})
+        assert match_filters(message, {'text': r'^\.h'})
+
+    def test_chat_and_direction_filters(self):
+        """تست فیلترهای چت و جهت پیام"""
+        message = make_message(user_id=5, chat_id=-42, chat_type="private", outgoing=True)
+
+        assert match_filters(message, {'chat_id': -42, 'user_id': [5, 6]})
+        assert not match_filters(message, {'chat_id': -1})
+        assert match_filters(message, {'outgoing': True, 'is_private': True})
+        assert not match_filters(message, {'incoming': True})
+        assert not match_filters(message, {'chat_type': 'group'})
+
+
+class TestFilterIndex:
+    """تست‌های مربوط به نمایه‌ی فیلترها"""
+
+    def test_chat_scoped_candidates(self, router):
+        """تست انتخاب هندلرها فقط از سطل چت مربوطه"""
+        async def scoped(client, update):
+            return None
+
+        async def global_handler(client, update):
+            return None
+
+        router.add_handler("message", scoped, {'chat_id': [-42]}, order=-1)
+        router.add_handler("message", global_handler)
+
+        matched = [entry.handler for entry in router.match("message", make_message(chat_id=-42))]
+        assert matched == [scoped, global_handler]
+
+        matched = [entry.handler for entry in router.match("message", make_message(chat_id=-7))]
+        assert matched == [global_handler]
+
+        index = router._indexes["message"]
+        assert index.candidates(get_envelope(make_message(chat_id=-7))) == router.get_handlers("message")[1:]
+
+    def test_update_filters_reindexes(self, router):
+        """تست جابجایی هندلر بین سطل‌ها پس از تغییر فیلتر"""
+        async def handler(client, update):
+            return None
+
+        handler_id = router.add_handler("message", handler, {'chat_id': [-1]})
+
+        assert router.update_filters(handler_id, {'chat_id': [-2, -3]}) is True
+        assert router.match("message", make_message(chat_id=-1)) == []
+        assert len(router.match("message", make_message(chat_id=-3))) == 1
+        assert -1 not in router._indexes["message"].by_chat
+
+        router.update_filters(handler_id, {})
+        assert len(router.match("message", make_message(chat_id=-1))) == 1
+        assert router.update_filters("missing", {}) is False
+
+    def test_chat_type_and_direction_masks(self, router):
+        """تست فیلترهای نوع چت و جهت با ماسک بیتی"""
+        async def handler(client, update):
+            return None
+
+        router.add_handler("message", handler, {'chat_type': 'group', 'incoming': True})
+
+        assert router.match("message", make_message(chat_type="supergroup"))
+        assert not router.match("message", make_message(chat_type="private"))
+        assert not router.match("message", make_message(outgoing=True))
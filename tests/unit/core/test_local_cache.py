@@ -0,0 +1,83 @@
+"""
+تست‌های واحد برای ماژول local_cache
+"""
+from unittest.mock import patch
+
+from core.local_cache import MISSING, LocalCache
+
+
+class TestLocalCache:
+    """
+    تست‌های کش LRU درون پردازه‌ای
+    """
+
+    def test_get_set(self):
+        """تست ذخیره و خواندن مقدار و شمارنده‌ها"""
+        cache = LocalCache(max_size=10)
+        cache.set("a", {"id": 1})
+        cache.set("none", None)
+
+        assert cache.get("a") == {"id": 1}
+        assert cache.get("none") is None
+        assert cache.get("b") is MISSING
+        assert cache.stats['hits'] == 2
+        assert cache.stats['misses'] == 1
+
+    def test_lru_eviction(self):
+        """تست حذف کم‌استفاده‌ترین کلید پس از پر شدن"""
+        cache = LocalCache(max_size=2)
+        cache.set("a", 1, tag="users")
+        cache.set("b", 2)
+        cache.get("a")
+        cache.set("c", 3)
+
+        assert cache.get("b") is MISSING
+        assert cache.get("a") == 1
+        assert cache.get("c") == 3
+        assert cache.stats['evicted'] == 1
+
+    def test_ttl_expiry(self):
+        """تست انقضای مقدار پس از TTL"""
+        cache = LocalCache(max_size=10, default_ttl=5)
+        with patch("core.local_cache.time.monotonic", return_value=100.0):
+            cache.set("a", 1)
+            cache.set("b", 2, ttl=0)
+        with patch("core.local_cache.time.monotonic", return_value=104.0):
+            assert cache.get("a") == 1
+        with patch("core.local_cache.time.monotonic", return_value=106.0):
+            assert cache.get("a") is MISSING
+
+        assert cache.get("b") is MISSING
+        assert len(cache) == 0
+
+    def test_invalidate_tag(self):
+        """تست حذف تمام کلیدهای یک جدول"""
+        cache = LocalCache(max_size=10)
+        cache.set("db:users:one:1", 1, tag="users")
+        cache.set("db:users:all:2", 2, tag="users")
+        cache.set("db:plugins:one:3", 3, tag="plugins")
+
+        assert cache.invalidate_tag("users") == 2
+        assert cache.get("db:users:one:1") is MISSING
+        assert cache.get("db:plugins:one:3") == 3
+        assert cache.invalidate_tag("users") == 0
+
+    def test_multiple_tags(self):
+        """تست حذف کلید با هر یک از تگ‌هایش و پاک شدن آن از تگ‌های دیگر"""
+        cache = LocalCache(max_size=10)
+        cache.set("row", 1, tag=("tag:users", "tag:dep:users:id=1"))
+        cache.set("list", 2, tag=("tag:users", "tag:users:agg"))
+
+        assert cache.invalidate_tag("tag:dep:users:id=1") == 1
+        assert cache.get("row") is MISSING
+        assert cache.get("list") == 2
+        assert cache.invalidate_tag("tag:users") == 1
+        assert cache.get_stats()['tags'] == 0
+
+    def test_disabled(self):
+        """تست غیرفعال بودن کش با اندازه صفر"""
+        cache = LocalCache(max_size=0)
+        cache.set("a", 1)
+
+        assert cache.get("a") is MISSING
+        assert len(cache) == 0
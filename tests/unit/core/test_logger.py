@@ -0,0 +1,58 @@
+"""
+تست‌های واحد برای ماژول logger
+"""
+import json
+import logging
+
+from core import logger as logger_module
+from core.logger import JSONFormatter, parse_sample_rates, setup_logging, shutdown_logging
+
+
+class TestJSONFormatter:
+    """تست‌های مربوط به کلاس JSONFormatter"""
+
+    def test_structured_fields(self):
+        """تست افزودن فیلدهای ساختاریافته به خروجی"""
+        record = logging.LogRecord("core.event_handler", logging.INFO, __file__, 1, "رویداد", None, None)
+        record.chat_id = -100
+        record.user_id = 5
+        record.latency_ms = 1.5
+
+        data = json.loads(JSONFormatter().format(record))
+
+        assert data['message'] == "رویداد"
+        assert data['chat_id'] == -100
+        assert data['user_id'] == 5
+        assert data['latency_ms'] == 1.5
+        assert 'plugin' not in data
+
+
+class TestSetupLogging:
+    """تست‌های مربوط به پیکربندی مرکزی لاگ"""
+
+    def test_queue_logging_writes_file(self, tmp_path):
+        """تست نوشتن لاگ‌ها در فایل از طریق صف"""
+        root = logging.getLogger()
+        previous_handlers, previous_level = list(root.handlers), root.level
+        try:
+            setup_logging(log_dir=str(tmp_path), log_file="test.log", json_format=True, console_output=False)
+            assert logger_module._listener is not None
+
+            logging.getLogger("tests.logger").info("ثبت", extra={'chat_id': 1})
+            shutdown_logging()
+
+            lines = (tmp_path / "test.log").read_text(encoding='utf-8').splitlines()
+            assert json.loads(lines[-1])['chat_id'] == 1
+            assert logger_module._listener is None
+        finally:
+            shutdown_logging()
+            root.handlers = previous_handlers
+            root.setLevel(previous_level)
+
+    def test_parse_sample_rates(self):
+        """تست تبدیل رشته‌ی نرخ نمونه‌برداری"""
+        assert parse_sample_rates("message=0.1, edited_message=2,bad=x,raw") == {
+            'message': 0.1,
+            'edited_message': 1.0,
+        }
+        assert parse_sample_rates(None) == {}
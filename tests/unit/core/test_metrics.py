@@ -0,0 +1,115 @@
+"""
+تست‌های واحد برای ماژول metrics
+"""
+import os
+import socket
+
+import pytest
+from unittest.mock import AsyncMock, MagicMock
+
+from core.metrics import HandlerKind, HandlerMetrics, MetricsRegistry, handler_labels, render_prometheus
+
+
+@pytest.fixture
+def registry():
+    """فیکسچر برای ایجاد مخزن آمار خالی"""
+    registry = MetricsRegistry()
+    registry.initialize()
+    return registry
+
+
+class DummyPlugin:
+    """پلاگین ساختگی"""
+    name = "Dummy"
+
+    async def on_message(self, client, message):
+        return "ok"
+
+    async def failing(self, client, message):
+        raise RuntimeError("boom")
+
+
+class TestHandlerMetrics:
+    """تست‌های مربوط به کلاس HandlerMetrics"""
+
+    def test_histogram_and_quantile(self):
+        """تست ثبت در سطل‌های هیستوگرام و تخمین چندک"""
+        metrics = HandlerMetrics("p", "h", HandlerKind.HANDLER)
+        for _ in range(95):
+            metrics.observe(0.002)
+        for _ in range(5):
+            metrics.observe(0.3, error=True)
+
+        assert metrics.calls == 100
+        assert metrics.errors == 5
+        assert metrics.quantile(0.5) == 0.0025
+        assert metrics.quantile(0.99) == 0.5
+
+
+class TestMetricsRegistry:
+    """تست‌های مربوط به کلاس MetricsRegistry"""
+
+    def test_handler_labels(self):
+        """تست استخراج نام پلاگین از متد"""
+        assert handler_labels(DummyPlugin().on_message) == ("Dummy", "on_message")
+
+    @pytest.mark.asyncio
+    async def test_instrument(self, registry):
+        """تست اندازه‌گیری فراخوانی‌ها و خطاها"""
+        plugin = DummyPlugin()
+        ok = registry.instrument(plugin.on_message)
+        failing = registry.instrument(plugin.failing)
+
+        assert await ok(None, None) == "ok"
+        with pytest.raises(RuntimeError):
+            await failing(None, None)
+
+        assert registry.get("Dummy", "on_message", HandlerKind.COMMAND).calls == 1
+        assert registry.get("Dummy", "failing", HandlerKind.COMMAND).errors == 1
+        assert registry.plugin_totals()["Dummy"]["calls"] == 2
+
+    def test_render_prometheus(self, registry):
+        """تست خروجی متنی Prometheus"""
+        registry.for_handler(DummyPlugin().on_message).observe(0.004)
+        registry.register_collector("event_executor", lambda: {'queue_depth': 3, 'running': True})
+
+        text = render_prometheus({"bot": registry.snapshot()})
+
+        labels = 'instance="bot",plugin="Dummy",handler="on_message",kind="handler"'
+        assert f'selfbot_handler_calls_total{{{labels}}} 1' in text
+        assert f'selfbot_handler_latency_seconds_bucket{{{labels},le="0.005"}} 1' in text
+        assert f'selfbot_handler_latency_seconds_bucket{{{labels},le="0.0025"}} 0' in text
+        assert 'selfbot_event_executor_queue_depth{instance="bot"} 3' in text
+        assert 'selfbot_event_executor_running' not in text
+
+    def test_for_middleware_cached_per_instance(self, registry):
+        """تست استفاده‌ی دوباره از آمار هر مرحله‌ی میان‌افزار"""
+        class DummyMiddleware:
+            pass
+
+        middleware = DummyMiddleware()
+        before = registry.for_middleware(middleware, "before_event")
+
+        assert registry.for_middleware(middleware, "before_event") is before
+        assert registry.for_middleware(middleware, "after_event") is not before
+        assert registry.for_middleware(DummyMiddleware(), "before_event") is before
+        assert (before.plugin, before.handler, before.kind) == (
+            "middleware", "DummyMiddleware.before_event", HandlerKind.MIDDLEWARE
+        )
+
+    @pytest.mark.asyncio
+    async def test_default_instance(self, registry, monkeypatch):
+        """تست نام پیش‌فرض پردازه از METRICS_INSTANCE یا hostname:pid"""
+        redis = MagicMock()
+        redis.hset = AsyncMock(return_value=True)
+
+        monkeypatch.delenv("METRICS_INSTANCE", raising=False)
+        await registry.export_to_redis(redis)
+        assert redis.hset.call_args.args[1] == f"{socket.gethostname()}:{os.getpid()}"
+
+        monkeypatch.setenv("METRICS_INSTANCE", "worker-1")
+        await registry.export_to_redis(redis)
+        assert redis.hset.call_args.args[1] == "worker-1"
+
+        registry.for_handler(DummyPlugin().on_message).observe(0.004)
+        assert 'instance="worker-1"' in registry.render_prometheus()
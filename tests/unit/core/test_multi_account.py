@@ -0,0 +1,159 @@
+"""
+تست‌های واحد برای ماژول multi_account
+"""
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+from unittest.mock import AsyncMock, MagicMock
+
+from core import multi_account
+from core.account_context import get_current_account
+from core.client import ClientType
+from core.event_handler import EventHandler, EventType
+from core.multi_account import AccountStatus, MultiAccountRuntime, parse_accounts
+
+
+def make_client(client_type=ClientType.PYROGRAM, connected=True):
+    """ساخت کلاینت ساختگی با کلاینت Pyrogram/Telethon داخلی ساختگی"""
+    client = MagicMock()
+    client.client_type = client_type
+    client.connect = AsyncMock(return_value=connected)
+    client.disconnect = AsyncMock(return_value=True)
+    client.client.add_handler = MagicMock(side_effect=lambda handler, group=0: (handler, group))
+    return client
+
+
+def make_message(user_id=1, chat_id=-100):
+    """ساخت پیام نمونه مشابه پیام Pyrogram"""
+    return SimpleNamespace(
+        text="hello",
+        from_user=SimpleNamespace(id=user_id),
+        chat=SimpleNamespace(id=chat_id, type=SimpleNamespace(value="group")),
+        outgoing=False,
+        media=None
+    )
+
+
+@pytest.fixture
+def client_factory(monkeypatch):
+    """فیکسچر برای جایگزینی TelegramClientManager با کارخانه‌ی کلاینت ساختگی"""
+    factory = MagicMock()
+    factory.create_client = MagicMock(side_effect=lambda phone, client_type, *args: make_client(client_type))
+    monkeypatch.setattr(multi_account, "TelegramClientManager", MagicMock(return_value=factory))
+    return factory
+
+
+@pytest.fixture
+def runtime(monkeypatch, client_factory):
+    """فیکسچر برای ایجاد نمونه‌ی تازه‌ی MultiAccountRuntime و EventHandler"""
+    for key in ("EVENT_DISPATCH_MODE", "EVENT_WORKERS", "EVENT_EDIT_COALESCE_WINDOW"):
+        monkeypatch.delenv(key, raising=False)
+    monkeypatch.setenv("ACCOUNT_CONNECT_INTERVAL", "0")
+    monkeypatch.setenv("ACCOUNT_CONNECT_RETRIES", "0")
+    monkeypatch.setattr(EventHandler, "_instance", None)
+    monkeypatch.setattr(MultiAccountRuntime, "_instance", None)
+    return MultiAccountRuntime()
+
+
+def client_handlers(client):
+    """هندلرهای Pyrogram ثبت شده در کلاینت داخلی"""
+    return [call.args[0] for call in client.client.add_handler.call_args_list]
+
+
+class TestMultiAccountRuntime:
+    """تست‌های مربوط به کلاس MultiAccountRuntime"""
+
+    def test_parse_accounts(self):
+        """تست خواندن لیست حساب‌ها و نوع کلاینت پیش‌فرض"""
+        assert parse_accounts(" +1, +2:telethon ,,") == [
+            {'phone_number': '+1', 'client_type': ClientType.PYROGRAM},
+            {'phone_number': '+2', 'client_type': ClientType.TELETHON},
+        ]
+        assert parse_accounts(None) == []
+
+    def test_load_accounts_uses_client_factory(self, runtime, client_factory):
+        """تست ساخت یک کلاینت برای هر حساب از کارخانه"""
+        assert runtime.load_accounts("+1,+2:telethon,+1") == 2
+
+        assert client_factory.create_client.call_count == 2
+        assert runtime.sessions["+2"].client.client_type == ClientType.TELETHON
+        assert runtime.sessions["+1"].status == AccountStatus.PENDING
+
+    @pytest.mark.asyncio
+    async def test_start_attaches_handlers_per_account(self, runtime):
+        """تست ثبت هندلرهای مشترک در کلاینت هر حساب و برچسب حساب بروزرسانی‌ها"""
+        seen = []
+
+        async def handler(client, message):
+            seen.append(get_current_account())
+
+        runtime.event_handler.register_handler(EventType.MESSAGE, handler)
+        runtime.load_accounts("+1,+2")
+
+        assert await runtime.start() == 2
+        first, second = runtime.get_client("+1"), runtime.get_client("+2")
+        assert set(runtime.event_handler.clients) == {"+1", "+2"}
+
+        # هندلرهای ثبت شده پس از اتصال نیز به تمام حساب‌ها اضافه می‌شوند
+        runtime.event_handler.register_handler(EventType.EDITED_MESSAGE, handler)
+        assert len(client_handlers(first)) == len(client_handlers(second)) == 2
+
+        await client_handlers(second)[0].callback(second.client, make_message())
+        await client_handlers(first)[0].callback(first.client, make_message())
+        assert seen == ["+2", "+1"]
+
+    @pytest.mark.asyncio
+    async def test_failed_account_does_not_block_others(self, runtime, client_factory):
+        """تست ادامه‌ی اتصال سایر حساب‌ها با شکست یک حساب"""
+        client_factory.create_client.side_effect = [make_client(connected=False), make_client()]
+        runtime.load_accounts("+1,+2")
+
+        assert await runtime.start() == 1
+        assert runtime.sessions["+1"].status == AccountStatus.FAILED
+        assert runtime.sessions["+1"].error == "connect failed"
+        assert "+1" not in runtime.event_handler.clients
+
+    @pytest.mark.asyncio
+    async def test_stop_account_detaches_handlers(self, runtime):
+        """تست حذف هندلرها از کلاینت حساب و قطع اتصال آن"""
+        async def handler(client, message):
+            return None
+
+        runtime.load_accounts("+1,+2")
+        await runtime.start()
+        runtime.event_handler.register_handler(EventType.MESSAGE, handler)
+        client = runtime.get_client("+1")
+
+        assert await runtime.stop_account("+1") is True
+
+        registered = client_handlers(client)[0]
+        client.client.remove_handler.assert_called_once_with(registered, 0)
+        client.disconnect.assert_awaited_once()
+        assert runtime.sessions["+1"].status == AccountStatus.STOPPED
+        assert set(runtime.event_handler.clients) == {"+2"}
+        runtime.get_client("+2").client.remove_handler.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_telethon_account_detaches_event_handlers(self, runtime):
+        """تست حذف هندلرهای Telethon با همان callback و event builder"""
+        async def handler(event):
+            return None
+
+        runtime.load_accounts("+1:telethon")
+        await runtime.start()
+        runtime.event_handler.register_handler(EventType.MESSAGE, handler)
+        client = runtime.get_client("+1")
+
+        await runtime.stop_account("+1")
+
+        callback, builder = client.client.add_event_handler.call_args.args
+        client.client.remove_event_handler.assert_called_once_with(callback, builder)
+
+    def test_gauges(self, runtime):
+        """تست شمارش حساب‌ها به تفکیک وضعیت"""
+        runtime.load_accounts("+1,+2")
+        runtime.sessions["+2"].status = AccountStatus.CONNECTED
+
+        assert runtime._gauges() == {'total': 2, AccountStatus.PENDING: 1, AccountStatus.CONNECTED: 1}
+        assert runtime.get_stats()['connected'] == 1
@@ -0,0 +1,70 @@
+"""
+تست‌های واحد برای ماژول query_fingerprint
+"""
+import os
+import subprocess
+import sys
+from datetime import datetime
+from decimal import Decimal
+
+from core.query_fingerprint import encode_params, explain_fingerprint, normalize_query, query_fingerprint
+
+
+class TestQueryFingerprint:
+    """
+    تست‌های اثر انگشت کوئری
+    """
+
+    def test_normalize_whitespace_and_case(self):
+        """تست یکسان شدن کوئری‌ها با فاصله و حروف متفاوت"""
+        first = "SELECT *  FROM users\n  WHERE id = %s;"
+        second = "select * from USERS where ID = %s"
+
+        assert normalize_query(first) == normalize_query(second) == "select * from users where id = %s"
+        assert normalize_query("INSERT INTO t ( a , b ) VALUES ( %s , %s )") == "insert into t (a,b) values (%s,%s)"
+
+    def test_string_literals_preserved(self):
+        """تست حفظ حروف و فاصله‌های داخل رشته‌ها"""
+        query = "SELECT * FROM users WHERE name = 'Ali  Reza' AND \"Role\" = 'x'"
+
+        assert normalize_query(query) == "select * from users where name = 'Ali  Reza' and \"Role\" = 'x'"
+        assert query_fingerprint(query) != query_fingerprint(query.replace("Ali", "ali"))
+
+    def test_quoted_identifiers_preserved(self):
+        """تست حفظ حروف شناسه‌های داخل کوتیشن که در PostgreSQL حساس به حروف‌اند"""
+        assert normalize_query('SELECT "UserId" FROM "Users"') == 'select "UserId" from "Users"'
+        assert query_fingerprint('SELECT "UserId" FROM t') != query_fingerprint('SELECT "userid" FROM t')
+
+    def test_typed_params(self):
+        """تست تفاوت اثر انگشت پارامترهای هم‌مقدار با نوع متفاوت"""
+        query = "SELECT * FROM users WHERE id = %s"
+        fingerprints = {query_fingerprint(query, (value,)) for value in (1, "1", True, 1.0, Decimal("1"), None)}
+
+        assert len(fingerprints) == 6
+        assert encode_params(("a,b",)) != encode_params(("a", "b"))
+        assert encode_params({'b': 2, 'a': 1}) == encode_params({'a': 1, 'b': 2})
+        assert encode_params((datetime(2025, 5, 13, 10, 0),)) == "l1[t2025-05-13T10:00:00;]"
+
+    def test_stable_across_processes(self):
+        """تست یکسان بودن اثر انگشت در پردازه‌ی دیگر با hash seed متفاوت"""
+        query = "SELECT * FROM plugins WHERE name = %s AND is_enabled = %s"
+        params = ("firewall", True)
+        code = (
+            "from core.query_fingerprint import query_fingerprint;"
+            f"print(query_fingerprint({query!r}, {params!r}))"
+        )
+        env = dict(os.environ, PYTHONHASHSEED="12345")
+        root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+        output = subprocess.run([sys.executable, "-c", code], cwd=root, env=env,
+                                capture_output=True, text=True, check=True).stdout.strip()
+
+        assert output == query_fingerprint(query, params)
+
+    def test_explain(self):
+        """تست اجزای اثر انگشت برای اشکال‌زدایی"""
+        details = explain_fingerprint("SELECT  1", (5,))
+
+        assert details['query'] == "select 1"
+        assert details['params'] == "l1[i5;]"
+        assert details['fingerprint'] == query_fingerprint("select 1", [5])
+        assert len(details['fingerprint']) == 32
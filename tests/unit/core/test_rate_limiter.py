@@ -0,0 +1,87 @@
+"""
+تست‌های واحد برای ماژول rate_limiter
+"""
+import pytest
+from unittest.mock import AsyncMock, MagicMock
+
+from core.rate_limiter import GCRALimiter, RateLimitKey, RedisGCRALimiter, build_rate_limit_key
+
+
+class TestGCRALimiter:
+    """تست‌های مربوط به کلاس GCRALimiter"""
+
+    def test_burst_then_steady_rate(self):
+        """تست مجاز بودن انفجار اولیه و سپس نرخ ثابت"""
+        limiter = GCRALimiter(rate=5, period=5)
+
+        assert all(limiter.allow("u1", now=0.0) for _ in range(5))
+        assert not limiter.allow("u1", now=0.0)
+        assert limiter.retry_after("u1", now=0.0) == pytest.approx(1.0)
+
+        assert limiter.allow("u1", now=1.0)
+        assert not limiter.allow("u1", now=1.0)
+
+    def test_keys_are_independent(self):
+        """تست مستقل بودن کلیدها"""
+        limiter = GCRALimiter(rate=1, period=10)
+
+        assert limiter.allow("u1", now=0.0)
+        assert not limiter.allow("u1", now=0.0)
+        assert limiter.allow("u2", now=0.0)
+
+    def test_idle_keys_are_evicted(self):
+        """تست حذف کلیدهای بیکار"""
+        limiter = GCRALimiter(rate=1, period=1)
+
+        for user_id in range(100):
+            limiter.allow(user_id, now=0.0)
+        assert len(limiter) == 100
+
+        limiter.allow("late", now=5.0)
+        assert len(limiter) == 1
+
+    def test_max_keys(self):
+        """تست محدود بودن تعداد کلیدها"""
+        limiter = GCRALimiter(rate=1, period=60, max_keys=10)
+
+        for user_id in range(50):
+            limiter.allow(user_id, now=0.0)
+
+        assert len(limiter) == 10
+
+    def test_build_key(self):
+        """تست ساخت کلید محدودیت"""
+        assert build_rate_limit_key(RateLimitKey.USER, 5, -1) == "u5"
+        assert build_rate_limit_key(RateLimitKey.CHAT, 5, -1) == "c-1"
+        assert build_rate_limit_key(RateLimitKey.USER_CHAT, 5, -1) == "u5:c-1"
+        assert build_rate_limit_key(RateLimitKey.USER_CHAT, None, -1) is None
+
+
+class TestRedisGCRALimiter:
+    """تست‌های مربوط به کلاس RedisGCRALimiter"""
+
+    @pytest.mark.asyncio
+    async def test_uses_script(self):
+        """تست اجرای اسکریپت اتمیک با کلید پیشونددار"""
+        script = AsyncMock(return_value=0)
+        redis_manager = MagicMock()
+        redis_manager.redis.register_script.return_value = script
+        redis_manager._build_key.side_effect = lambda key: f"selfbot:{key}"
+
+        limiter = RedisGCRALimiter(redis_manager, rate=2, period=1)
+
+        assert await limiter.allow("u1") is False
+        script.assert_awaited_once_with(keys=["selfbot:ratelimit:u1"], args=[500000, 500000])
+
+    @pytest.mark.asyncio
+    async def test_falls_back_on_error(self):
+        """تست استفاده از محدودکننده‌ی محلی در صورت خطای Redis"""
+        redis_manager = MagicMock()
+        redis_manager.redis.register_script.return_value = AsyncMock(side_effect=ConnectionError())
+        redis_manager._build_key.side_effect = lambda key: key
+
+        limiter = RedisGCRALimiter(redis_manager, rate=1, period=60)
+
+        assert await limiter.allow("u1") is True
+        assert await limiter.allow("u1") is False
+
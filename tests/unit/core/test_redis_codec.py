@@ -0,0 +1,83 @@
+"""
+تست‌های واحد برای ماژول redis_codec
+"""
+import json
+import zlib
+from datetime import datetime
+from types import SimpleNamespace
+
+import pytest
+
+from core import redis_codec
+from core.redis_codec import MAGIC, RedisCodec
+
+
+@pytest.fixture
+def fake_zstd(monkeypatch):
+    """فیکسچر برای جایگزینی zstandard با zlib در تست"""
+    module = SimpleNamespace(
+        ZstdCompressor=lambda level=3: SimpleNamespace(compress=zlib.compress),
+        ZstdDecompressor=lambda: SimpleNamespace(decompress=lambda data: zlib.decompress(bytes(data))),
+    )
+    monkeypatch.setattr(redis_codec, "zstandard", module)
+    return module
+
+
+class TestRedisCodec:
+    """تست‌های سریال‌ساز مقادیر Redis"""
+
+    def test_json_round_trip_without_header(self):
+        """تست json بدون سرآیند و هم‌قالب مقادیر قدیمی"""
+        codec = RedisCodec("json", "none")
+        value = {"name": "فایروال", "rows": [1, 2], "created_at": datetime(2024, 1, 2, 3, 4, 5)}
+
+        raw = codec.encode(value)
+        assert not raw.startswith(MAGIC)
+        assert json.loads(raw) == {"name": "فایروال", "rows": [1, 2], "created_at": "2024-01-02T03:04:05"}
+        assert codec.decode(raw)["name"] == "فایروال"
+
+    def test_reads_legacy_values(self):
+        """تست خواندن مقادیر ذخیره شده با json.dumps قبلی از bytes و str"""
+        codec = RedisCodec("json", "none")
+        legacy = json.dumps({"id": 1, "title": "سلام"}, ensure_ascii=False)
+
+        assert codec.decode(legacy.encode("utf-8")) == {"id": 1, "title": "سلام"}
+        assert codec.decode(legacy) == {"id": 1, "title": "سلام"}
+
+    def test_compression_above_threshold(self, fake_zstd):
+        """تست فشرده‌سازی فقط برای مقادیر بزرگ‌تر از آستانه"""
+        codec = RedisCodec("json", "zstd", threshold=100)
+        rows = [{"id": index, "username": f"user{index}"} for index in range(50)]
+
+        small = codec.encode({"id": 1})
+        large = codec.encode(rows)
+
+        assert not small.startswith(MAGIC)
+        assert large.startswith(MAGIC + b"jz")
+        assert codec.decode(large) == rows
+        # مقادیر فشرده با تنظیمات دیگر هم خوانده می‌شوند
+        assert RedisCodec("json", "none").decode(large) == rows
+
+    def test_unavailable_library_falls_back(self, monkeypatch):
+        """تست استفاده از json بدون فشرده‌سازی در صورت نصب نبودن کتابخانه"""
+        monkeypatch.setattr(redis_codec, "msgpack", None)
+        monkeypatch.setattr(redis_codec, "lz4_frame", None)
+
+        codec = RedisCodec("msgpack", "lz4")
+        assert (codec.codec, codec.compression) == ("json", "none")
+
+        with pytest.raises(ValueError):
+            codec.decode(MAGIC + b"m-" + b"\x81\xa1a\x01")
+        with pytest.raises(ValueError):
+            codec.decode(MAGIC + b"x-{}")
+
+    def test_msgpack_lz4(self):
+        """تست msgpack و lz4 (در صورت نصب بودن)"""
+        pytest.importorskip("msgpack")
+        pytest.importorskip("lz4.frame")
+        codec = RedisCodec("msgpack", "lz4", threshold=0)
+        value = {"id": 1, "tags": ["a", "b"], 2: "int key"}
+
+        raw = codec.encode(value)
+        assert raw[:4] in (MAGIC + b"ml", MAGIC + b"m-")
+        assert codec.decode(raw) == value
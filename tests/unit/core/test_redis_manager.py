@@ -1,12 +1,14 @@
 """
 تست‌های واحد برای ماژول redis_manager.py
 """
+import asyncio
 import json
 import pytest
 from unittest.mock import AsyncMock, patch, MagicMock
 from datetime import datetime, timedelta
 
-from core.redis_manager import RedisManager, initialize_redis
+from core import redis_manager as redis_manager_module
+from core.redis_manager import RELEASE_LOCK_SCRIPT, RedisManager, initialize_redis
 
 
 class TestRedisManager:
@@ -225,3 +227,246 @@ class TestRedisManager:
         
         assert isinstance(manager, RedisManager)
         assert manager.prefix == 'custom:'
+
+
+class TestRedisManagerBatch:
+    """تست‌های عملیات چند کلیدی و pipeline"""
+
+    @pytest.fixture
+    def client(self):
+        """فیکسچر برای شبیه‌سازی کلاینت redis.asyncio و pipeline آن"""
+        client = MagicMock()
+        client.set = AsyncMock(return_value=True)
+        client.expire = AsyncMock(return_value=True)
+        client.mget = AsyncMock(return_value=[b'{"id": 1}', None, b'plain'])
+        client.mset = AsyncMock(return_value=True)
+        client.unlink = AsyncMock(return_value=2)
+
+        pipe = MagicMock()
+        pipe.execute = AsyncMock(return_value=[True, b'{"a": 1}', 3])
+        context = MagicMock()
+        context.__aenter__ = AsyncMock(return_value=pipe)
+        context.__aexit__ = AsyncMock(return_value=False)
+        client.pipeline = MagicMock(return_value=context)
+        client.raw_pipe = pipe
+        return client
+
+    @pytest.fixture
+    def manager(self, client):
+        """فیکسچر برای نمونه‌ی متصل RedisManager"""
+        RedisManager._instance = None
+        manager = RedisManager(prefix='test:')
+        manager.redis = client
+        yield manager
+        RedisManager._instance = None
+
+    @pytest.mark.asyncio
+    async def test_set_with_expire_is_single_command(self, manager, client):
+        """تست ذخیره با زمان انقضا در یک دستور SET ... EX"""
+        assert await manager.set('key', {'a': 1}, 60) is True
+
+        client.set.assert_awaited_once_with('test:key', manager.codec.encode({'a': 1}), ex=60)
+        client.expire.assert_not_awaited()
+
+    @pytest.mark.asyncio
+    async def test_mget(self, manager, client):
+        """تست دریافت چند مقدار با پیشوند و مقدار پیش‌فرض"""
+        assert await manager.mget(['a', 'b', 'c'], default=0) == [{'id': 1}, 0, 'plain']
+        client.mget.assert_awaited_once_with(['test:a', 'test:b', 'test:c'])
+
+    @pytest.mark.asyncio
+    async def test_mset_with_ttl(self, manager, client):
+        """تست ذخیره چند مقدار در یک pipeline و MSET بدون انقضا"""
+        assert await manager.mset_with_ttl({'a': 1, 'b': [2]}, 30) is True
+        client.pipeline.assert_called_once_with(transaction=False)
+        client.raw_pipe.set.assert_any_call('test:a', 1, ex=30)
+        client.raw_pipe.set.assert_any_call('test:b', manager.codec.encode([2]), ex=30)
+        client.raw_pipe.execute.assert_awaited_once()
+
+        assert await manager.mset_with_ttl({'a': 1}) is True
+        client.mset.assert_awaited_once_with({'test:a': 1})
+
+    @pytest.mark.asyncio
+    async def test_delete_many(self, manager, client):
+        """تست حذف چند کلید با یک UNLINK"""
+        assert await manager.delete_many(['a', 'b']) == 2
+        assert await manager.delete_many([]) == 0
+        client.unlink.assert_awaited_once_with('test:a', 'test:b')
+
+    @pytest.mark.asyncio
+    async def test_pipeline(self, manager, client):
+        """تست اجرای دستورات صف شده و تبدیل نتیجه‌ی get"""
+        async with manager.pipeline() as pipe:
+            pipe.set('a', 1, 60).get('b').incr('counter', 2)
+            assert len(pipe) == 3
+
+        assert pipe.results == [True, {'a': 1}, 3]
+        client.raw_pipe.incrby.assert_called_once_with('test:counter', 2)
+        client.raw_pipe.execute.assert_awaited_once()
+
+    @pytest.mark.asyncio
+    async def test_pipeline_requires_connection(self, manager):
+        """تست خطای اتصال در pipeline بدون اتصال"""
+        manager.redis = None
+        with pytest.raises(ConnectionError):
+            async with manager.pipeline():
+                pass
+
+    @pytest.mark.asyncio
+    async def test_lock_released_only_by_owner(self, manager, client):
+        """تست آزاد شدن قفل فقط با توکن گرفته شده"""
+        store = {}
+
+        async def set_nx(key, value, nx=False, ex=None):
+            if nx and key in store:
+                return None
+            store[key] = value
+            return True
+
+        async def release(keys, args):
+            if store.get(keys[0]) != args[0]:
+                return 0
+            del store[keys[0]]
+            return 1
+
+        client.set = AsyncMock(side_effect=set_nx)
+        client.register_script = MagicMock(return_value=AsyncMock(side_effect=release))
+
+        token = await manager.acquire_lock('job', timeout=1, expire=5)
+        assert token and store == {'test:lock:job': token}
+        assert await manager.acquire_lock('job', timeout=0.05) is None
+
+        # قفل منقضی شده و توسط پردازه‌ی دیگری گرفته شده است
+        store['test:lock:job'] = 'other-owner'
+        assert await manager.release_lock('job', token) is False
+        assert store == {'test:lock:job': 'other-owner'}
+
+        store['test:lock:job'] = token
+        assert await manager.release_lock('job', token) is True
+        assert store == {}
+        client.register_script.assert_called_once_with(RELEASE_LOCK_SCRIPT)
+
+
+class FakePubSub:
+    """PubSub ساختگی با صف پیام برای listen"""
+
+    def __init__(self, *messages):
+        self.queue = asyncio.Queue()
+        for message in messages:
+            self.queue.put_nowait(message)
+        self.channels = {}
+        self.patterns = {}
+
+    async def subscribe(self, *channels):
+        self.channels.update(dict.fromkeys(channels))
+
+    async def psubscribe(self, *patterns):
+        self.patterns.update(dict.fromkeys(patterns))
+
+    async def unsubscribe(self, *channels):
+        for channel in channels or list(self.channels):
+            self.channels.pop(channel, None)
+
+    async def punsubscribe(self, *patterns):
+        for pattern in patterns or list(self.patterns):
+            self.patterns.pop(pattern, None)
+
+    async def aclose(self):
+        pass
+
+    async def listen(self):
+        while self.channels or self.patterns:
+            message = await self.queue.get()
+            if isinstance(message, Exception):
+                raise message
+            yield message
+
+
+def _message(channel, data, pattern=None):
+    if pattern:
+        return {'type': 'pmessage', 'pattern': pattern.encode(), 'channel': channel.encode(), 'data': data}
+    return {'type': 'message', 'pattern': None, 'channel': channel.encode(), 'data': data}
+
+
+class TestRedisManagerPubSub:
+    """تست‌های دریافت پیام‌های اشتراکی"""
+
+    @pytest.fixture
+    def manager(self):
+        """فیکسچر برای نمونه‌ی متصل RedisManager با PubSub ساختگی"""
+        RedisManager._instance = None
+        manager = RedisManager(prefix='test:', max_concurrent_handlers=2)
+        manager.redis = MagicMock()
+        manager.redis.close = AsyncMock()
+        manager._pubsub = FakePubSub()
+        yield manager
+        RedisManager._instance = None
+
+    @pytest.mark.asyncio
+    async def test_channel_and_pattern_delivery(self, manager):
+        """تست تحویل پیام کانال و الگو و ثبت آمار"""
+        received = []
+
+        async def handler(channel, data):
+            received.append((channel, data))
+
+        assert await manager.subscribe('cache', handler) is True
+        assert await manager.psubscribe('events:*', handler) is True
+        manager._pubsub.queue.put_nowait({'type': 'subscribe', 'channel': b'test:cache', 'data': 1})
+        manager._pubsub.queue.put_nowait(_message('test:cache', b'{"tables": ["users"]}'))
+        manager._pubsub.queue.put_nowait(_message('test:events:join', b'plain', pattern='test:events:*'))
+        await asyncio.sleep(0.01)
+
+        assert received == [('test:cache', {'tables': ['users']}), ('test:events:join', 'plain')]
+        stats = manager.get_pubsub_stats()
+        assert stats['subscriptions']['test:cache']['delivered'] == 1
+        assert stats['subscriptions']['test:events:*']['delivered'] == 1
+        await manager.disconnect()
+
+    @pytest.mark.asyncio
+    async def test_handler_concurrency_limit(self, manager):
+        """تست محدود ماندن handler های هم‌زمان و توقف دریافت تا آزاد شدن ظرفیت"""
+        release = asyncio.Event()
+        running = []
+
+        async def handler(channel, data):
+            running.append(data)
+            await release.wait()
+
+        await manager.subscribe('jobs', handler)
+        for index in range(5):
+            manager._pubsub.queue.put_nowait(_message('test:jobs', str(index).encode()))
+        await asyncio.sleep(0.01)
+
+        assert len(manager._handler_tasks) == 2
+        assert manager._pubsub.queue.qsize() == 2
+
+        release.set()
+        await asyncio.sleep(0.01)
+        assert len(running) == 5
+        assert manager.get_pubsub_stats()['subscriptions']['test:jobs']['delivered'] == 5
+        await manager.disconnect()
+
+    @pytest.mark.asyncio
+    async def test_resubscribe_after_connection_error(self, manager, monkeypatch):
+        """تست ساخت PubSub جدید و اشتراک دوباره پس از قطع اتصال"""
+        monkeypatch.setattr(redis_manager_module, 'PUBSUB_RECONNECT_DELAY', 0.001)
+        received = []
+
+        async def handler(channel, data):
+            received.append(data)
+
+        replacement = FakePubSub(_message('test:cache', b'after'))
+        manager.redis.pubsub = MagicMock(return_value=replacement)
+
+        await manager.subscribe('cache', handler)
+        await manager.psubscribe('events:*', handler)
+        manager._pubsub.queue.put_nowait(ConnectionError('connection lost'))
+        await asyncio.sleep(0.05)
+
+        assert manager._pubsub is replacement
+        assert list(replacement.channels) == ['test:cache']
+        assert list(replacement.patterns) == ['test:events:*']
+        assert received == ['after']
+        assert manager.get_pubsub_stats()['resubscribes'] == 1
+        await manager.disconnect()
@@ -0,0 +1,174 @@
+"""
+تست‌های واحد برای ماژول task_queue
+"""
+import pytest
+from unittest.mock import AsyncMock, MagicMock
+from redis.exceptions import ResponseError
+
+from core.task_queue import PriorityScheduler, QueueEntry, StreamTaskQueue, parse_priority_weights
+
+
+@pytest.fixture
+def client():
+    """فیکسچر برای شبیه‌سازی کلاینت redis.asyncio"""
+    client = MagicMock()
+    client.xgroup_create = AsyncMock(side_effect=[True, ResponseError("BUSYGROUP Consumer Group name already exists")])
+    client.xadd = AsyncMock(return_value=b"1-0")
+    client.xreadgroup = AsyncMock(return_value=[
+        [b"task_stream:high", [(b"1-0", {b"task_id": b"a"}), (b"2-0", {b"task_id": b"b"})]],
+    ])
+    client.xautoclaim = AsyncMock(return_value=[b"0-0", [(b"3-0", {b"task_id": b"c"}), (b"4-0", None)], []])
+    client.xack = AsyncMock(return_value=1)
+    client.xclaim = AsyncMock(return_value=[b"1-0"])
+
+    pipe = MagicMock()
+    pipe.execute = AsyncMock(return_value=[1, 1])
+    context = MagicMock()
+    context.__aenter__ = AsyncMock(return_value=pipe)
+    context.__aexit__ = AsyncMock(return_value=False)
+    client.pipeline = MagicMock(return_value=context)
+    client.raw_pipe = pipe
+    return client
+
+
+@pytest.fixture
+def queue(client):
+    """فیکسچر برای صف متصل"""
+    queue = StreamTaskQueue(consumer="host:1", visibility_timeout=30, block_ms=2000)
+    queue.client = client
+    return queue
+
+
+class TestStreamTaskQueue:
+    """تست‌های صف وظایف Redis Streams"""
+
+    @pytest.mark.asyncio
+    async def test_ensure_groups_ignores_existing(self, queue, client):
+        """تست ساخت consumer group و نادیده گرفتن گروه موجود"""
+        await queue.ensure_groups(["high", "low"])
+        await queue.ensure_groups(["high"])
+
+        assert client.xgroup_create.await_count == 2
+        client.xgroup_create.assert_any_await("task_stream:high", "workers", id="0", mkstream=True)
+
+    @pytest.mark.asyncio
+    async def test_read_blocks_in_group(self, queue, client):
+        """تست XREADGROUP مسدودکننده و تبدیل پیام‌ها"""
+        client.xgroup_create = AsyncMock(return_value=True)
+
+        entries = await queue.read(["high", "normal"])
+
+        client.xreadgroup.assert_awaited_once_with(
+            "workers", "host:1", {"task_stream:high": ">", "task_stream:normal": ">"}, count=1, block=2000
+        )
+        assert entries == [QueueEntry("high", "1-0", "a"), QueueEntry("high", "2-0", "b")]
+
+    @pytest.mark.asyncio
+    async def test_claim_stuck(self, queue, client):
+        """تست واگذاری پیام‌های بی‌پاسخ و ack پیام‌های حذف شده"""
+        client.xgroup_create = AsyncMock(return_value=True)
+
+        entries = await queue.claim_stuck("normal")
+
+        client.xautoclaim.assert_awaited_once_with(
+            "task_stream:normal", "workers", "host:1", 30000, start_id="0-0", count=10
+        )
+        assert entries == [QueueEntry("normal", "3-0", "c", reclaimed=True)]
+        client.xack.assert_awaited_once_with("task_stream:normal", "workers", b"4-0")
+
+    @pytest.mark.asyncio
+    async def test_ack_and_touch(self, queue, client):
+        """تست ack و حذف پیام و تمدید زمان بیکاری"""
+        entry = QueueEntry("low", "5-0", "d")
+
+        await queue.touch(entry)
+        await queue.ack(entry)
+
+        client.xclaim.assert_awaited_once_with("task_stream:low", "workers", "host:1", 0, ["5-0"], justid=True)
+        client.raw_pipe.xack.assert_called_once_with("task_stream:low", "workers", "5-0")
+        client.raw_pipe.xdel.assert_called_once_with("task_stream:low", "5-0")
+        assert queue.get_stats()["acked"] == 1
+
+    @pytest.mark.asyncio
+    async def test_drain_legacy_list(self, queue, client):
+        """تست انتقال دسته‌ای وظایف صف list قدیمی به stream"""
+        client.eval = AsyncMock(side_effect=[2, 1])
+
+        moved = await queue.drain_list("task_queue:high", "high", batch=2)
+
+        assert moved == 3
+        assert client.eval.await_count == 2
+        script, numkeys, *args = client.eval.await_args[0]
+        assert "RPOP" in script and "XADD" in script
+        assert (numkeys, args) == (2, ["task_queue:high", "task_stream:high", 2])
+        assert queue.get_stats()["enqueued"] == 3
+
+
+def _entry(priority: str, enqueued_at: float, task_id: str = "t") -> QueueEntry:
+    return QueueEntry(priority, f"{int(enqueued_at * 1000)}-0", task_id)
+
+
+class TestPriorityScheduler:
+    """تست‌های انتخاب پیام بین اولویت‌ها"""
+
+    def _fill(self, scheduler, now, count=60):
+        for index in range(count):
+            for priority in ("high", "normal", "low"):
+                scheduler.add(_entry(priority, now, f"{priority}{index}"))
+
+    def test_parse_priority_weights(self):
+        """تست خواندن وزن‌ها و نادیده گرفتن موارد نامعتبر"""
+        assert parse_priority_weights("high:6, normal:3,low:x,bad:0,") == {"high": 6, "normal": 3}
+        assert parse_priority_weights(None) == {}
+
+    def test_strict_picks_highest(self):
+        """تست انتخاب همیشه بالاترین اولویت در حالت strict"""
+        scheduler = PriorityScheduler(["high", "normal", "low"], policy="strict", aging=0)
+        scheduler.add(_entry("low", 100))
+        scheduler.add(_entry("normal", 100))
+        scheduler.add(_entry("high", 100))
+
+        assert [scheduler.next(now=101).priority for _ in range(3)] == ["high", "normal", "low"]
+        assert scheduler.next(now=101) is None
+
+    def test_weighted_share(self):
+        """تست سهم هر اولویت به نسبت وزن و پخش شدن انتخاب‌ها"""
+        scheduler = PriorityScheduler(["high", "normal", "low"], policy="weighted",
+                                      weights={"high": 6, "normal": 3, "low": 1}, aging=0)
+        self._fill(scheduler, 100)
+
+        picks = [scheduler.next(now=101).priority for _ in range(20)]
+
+        assert (picks.count("high"), picks.count("normal"), picks.count("low")) == (12, 6, 2)
+        assert "low" in picks[:10]
+
+    def test_aging_prevents_starvation(self):
+        """تست انتخاب پیام قدیمی اولویت پایین پس از گذشتن زمان aging"""
+        scheduler = PriorityScheduler(["high", "normal", "low"], policy="strict", aging=30)
+        scheduler.add(_entry("low", 100, "old"))
+        scheduler.add(_entry("high", 125, "new"))
+
+        assert scheduler.next(now=129).task_id == "new"
+        scheduler.add(_entry("high", 129, "newer"))
+        assert scheduler.next(now=131).task_id == "old"
+
+        stats = scheduler.get_stats()
+        assert stats["low"]["aged"] == 1
+        assert stats["low"]["wait_max_ms"] == pytest.approx(31000)
+
+    def test_stats(self):
+        """تست آمار تأخیر، مدت اجرا و نتیجه‌ی هر اولویت"""
+        scheduler = PriorityScheduler(["high", "low"], policy="strict", aging=0)
+        scheduler.add(_entry("high", 100))
+        scheduler.add(_entry("high", 102))
+        scheduler.next(now=103)
+        scheduler.next(now=103)
+        scheduler.record_done("high", 0.5, True)
+        scheduler.record_done("high", 1.5, False)
+
+        stats = scheduler.get_stats()["high"]
+        assert stats["dispatched"] == 2
+        assert (stats["completed"], stats["failed"]) == (1, 1)
+        assert stats["wait_avg_ms"] == pytest.approx(2000)
+        assert stats["run_avg_ms"] == pytest.approx(1000)
+        assert stats["buffered"] == 0
@@ -0,0 +1,112 @@
+"""
+تست‌های واحد برای ماژول write_buffer
+"""
+import asyncio
+
+import pytest
+from unittest.mock import AsyncMock, MagicMock
+
+from core.write_buffer import MAX_RETRIES, WriteBehindBuffer, close_write_buffers
+
+
+@pytest.fixture
+def database():
+    """فیکسچر برای شبیه‌سازی دیتابیس با درج دسته‌ای"""
+    database = MagicMock()
+    database.insert = AsyncMock(return_value={"id": 1})
+    database.insert_many = AsyncMock(side_effect=lambda table, rows: len(rows))
+    return database
+
+
+class TestWriteBehindBuffer:
+    """تست‌های بافر نوشتن با تأخیر"""
+
+    @pytest.mark.asyncio
+    async def test_flush_on_batch_size(self, database):
+        """تست نوشتن دسته با رسیدن به اندازه‌ی دسته"""
+        buffer = WriteBehindBuffer(database, batch_size=3, flush_interval=60, max_pending=100)
+        for index in range(3):
+            await buffer.add("message_history", {"message_id": index})
+        await asyncio.sleep(0)
+
+        database.insert_many.assert_awaited_once_with(
+            "message_history", [{"message_id": 0}, {"message_id": 1}, {"message_id": 2}]
+        )
+        database.insert.assert_not_awaited()
+        assert len(buffer) == 0
+        await buffer.close()
+
+    @pytest.mark.asyncio
+    async def test_flush_on_interval(self, database):
+        """تست نوشتن ردیف‌ها پس از گذشت زمان"""
+        buffer = WriteBehindBuffer(database, batch_size=100, flush_interval=0.01, max_pending=100)
+        await buffer.add("activity_logs", {"chat_id": 1})
+        await buffer.add("security_events", {"event_type": "spam"})
+        await asyncio.sleep(0.05)
+
+        assert database.insert_many.await_count == 2
+        assert buffer.get_stats()["flushed"] == 2
+        await buffer.close()
+
+    @pytest.mark.asyncio
+    async def test_retry_then_drop(self, database):
+        """تست بازگرداندن دسته‌ی ناموفق و کنار گذاشتن آن پس از چند تلاش"""
+        database.insert_many = AsyncMock(return_value=0)
+        buffer = WriteBehindBuffer(database, batch_size=10, flush_interval=60, max_pending=100)
+        await buffer.add("activity_logs", {"chat_id": 1})
+
+        for _ in range(MAX_RETRIES - 1):
+            assert await buffer.flush() == 0
+            assert len(buffer) == 1
+        await buffer.flush()
+
+        assert len(buffer) == 0
+        assert buffer.stats["dropped"] == 1
+        assert buffer.stats["failed_batches"] == MAX_RETRIES
+        await buffer.close()
+
+    @pytest.mark.asyncio
+    async def test_partial_write_retries_unwritten_rows(self, database):
+        """تست تلاش مجدد فقط برای ردیف‌های نوشته نشده‌ی گروه ستونی ناقص"""
+        database.insert_many = AsyncMock(side_effect=lambda table, rows: len(rows) if "chat_id" in rows[0] else 1)
+        buffer = WriteBehindBuffer(database, batch_size=10, flush_interval=60, max_pending=100)
+        await buffer.add("activity_logs", {"chat_id": 1})
+        await buffer.add("activity_logs", {"user_id": 1})
+        await buffer.add("activity_logs", {"user_id": 2})
+        await buffer.add("activity_logs", {"user_id": 3})
+
+        assert await buffer.flush() == 2
+        assert database.insert_many.await_count == 2
+        assert buffer.get_stats()["tables"] == {"activity_logs": 2}
+        assert buffer.stats["flushed"] == 2
+        assert buffer.stats["failed_batches"] == 1
+
+        database.insert_many = AsyncMock(side_effect=lambda table, rows: len(rows))
+        assert await buffer.flush() == 2
+        database.insert_many.assert_awaited_once_with("activity_logs", [{"user_id": 2}, {"user_id": 3}])
+        await buffer.close()
+
+    @pytest.mark.asyncio
+    async def test_memory_cap(self, database):
+        """تست محدود ماندن ردیف‌های در انتظار وقتی دیتابیس در دسترس نیست"""
+        database.insert_many = AsyncMock(side_effect=ConnectionError("down"))
+        buffer = WriteBehindBuffer(database, batch_size=100, flush_interval=60, max_pending=5)
+        for index in range(20):
+            await buffer.add("message_history", {"message_id": index})
+
+        assert len(buffer) <= 5
+        assert buffer.stats["dropped"] >= 15
+        await buffer.close()
+
+    @pytest.mark.asyncio
+    async def test_close_flushes_and_writes_through(self, database):
+        """تست تخلیه در خاموش شدن و درج مستقیم پس از آن"""
+        buffer = WriteBehindBuffer(database, batch_size=100, flush_interval=60, max_pending=100)
+        await buffer.add("message_history", {"message_id": 1})
+        await buffer.add("message_history", {"message_id": 2})
+
+        assert await close_write_buffers() >= 2
+        database.insert_many.assert_awaited_once()
+
+        assert await buffer.add("message_history", {"message_id": 3}) is True
+        database.insert.assert_awaited_once_with("message_history", {"message_id": 3})
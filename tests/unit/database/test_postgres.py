@@ -0,0 +1,99 @@
+"""
+تست‌های واحد برای ماژول database/postgres.py
+"""
+import pytest
+from unittest.mock import AsyncMock, MagicMock
+
+from core.database.postgres import AsyncPGDatabase, affected_rows, quote_identifier
+
+
+class TestAsyncPGDatabase:
+    """تست‌های مربوط به کلاس AsyncPGDatabase"""
+
+    @pytest.fixture
+    def database(self):
+        """فیکسچر برای شبیه‌سازی Database مشترک"""
+        database = MagicMock()
+        database.connect = AsyncMock(return_value=True)
+        database.execute = AsyncMock(return_value="UPDATE 2")
+        database.fetch = AsyncMock(return_value=[{"id": 1}])
+        database.fetchrow = AsyncMock(return_value={"id": 1})
+        return database
+
+    @pytest.fixture
+    def pg_db(self, database):
+        """فیکسچر برای ایجاد نمونه AsyncPGDatabase"""
+        return AsyncPGDatabase(database)
+
+    def test_helpers(self):
+        """تست نقل‌قول نام‌ها و تعداد رکوردهای تحت تاثیر"""
+        assert quote_identifier("users") == '"users"'
+        assert quote_identifier("public.users") == '"public"."users"'
+        with pytest.raises(ValueError):
+            quote_identifier("users; DROP TABLE users")
+
+        assert affected_rows("INSERT 0 3") == 3
+        assert affected_rows("DELETE 0") == 0
+        assert affected_rows(None) == 0
+
+    @pytest.mark.asyncio
+    async def test_fetch_passes_parameters(self, pg_db, database):
+        """تست ارسال پارامترها به asyncpg بدون تجزیه‌ی کوئری"""
+        query = "SELECT * FROM settings WHERE key = $1"
+
+        assert await pg_db.fetch_one(query, ("api_key",)) == {"id": 1}
+        assert await pg_db.fetch_all(query, ("api_key",)) == [{"id": 1}]
+        database.fetchrow.assert_awaited_once_with(query, "api_key")
+        database.fetch.assert_awaited_once_with(query, "api_key")
+
+    @pytest.mark.asyncio
+    async def test_insert(self, pg_db, database):
+        """تست ساخت INSERT پارامتری"""
+        await pg_db.insert("plugins", {"name": "firewall", "is_enabled": True})
+
+        database.fetchrow.assert_awaited_once_with(
+            'INSERT INTO "plugins" ("name", "is_enabled") VALUES ($1, $2) RETURNING *',
+            "firewall", True
+        )
+
+    @pytest.mark.asyncio
+    async def test_update_numbers_after_condition(self, pg_db, database):
+        """تست شماره‌گذاری مقادیر جدید پس از پارامترهای شرط"""
+        count = await pg_db.update("plugins", {"config": "{}", "version": "2"}, "name = $1", ("firewall",))
+
+        assert count == 2
+        database.execute.assert_awaited_once_with(
+            'UPDATE "plugins" SET "config" = $2, "version" = $3 WHERE name = $1',
+            "firewall", "{}", "2"
+        )
+
+    @pytest.mark.asyncio
+    async def test_invalid_table(self, pg_db, database):
+        """تست رد نام جدول نامعتبر بدون اجرای کوئری"""
+        assert await pg_db.delete("plugins where 1=1 --", "id = $1", (1,)) == 0
+        assert await pg_db.insert("bad name", {"a": 1}) is None
+        database.execute.assert_not_awaited()
+        database.fetchrow.assert_not_awaited()
+
+    @pytest.mark.asyncio
+    async def test_insert_many(self, pg_db, database):
+        """تست درج چند ردیفی با گروه‌بندی ستون‌ها در یک تراکنش"""
+        conn = MagicMock()
+        conn.execute = AsyncMock(side_effect=["INSERT 0 2", "INSERT 0 1"])
+        unit_of_work = MagicMock()
+        unit_of_work.__aenter__ = AsyncMock(return_value=conn)
+        unit_of_work.__aexit__ = AsyncMock(return_value=False)
+        database.unit_of_work = MagicMock(return_value=unit_of_work)
+
+        count = await pg_db.insert_many("activity_logs", [
+            {"chat_id": 1, "activity_type": "a"},
+            {"chat_id": 2, "activity_type": "b"},
+            {"chat_id": 3},
+        ])
+
+        assert count == 3
+        conn.execute.assert_any_await(
+            'INSERT INTO "activity_logs" ("chat_id", "activity_type") VALUES ($1, $2), ($3, $4)',
+            1, "a", 2, "b"
+        )
+        conn.execute.assert_any_await('INSERT INTO "activity_logs" ("chat_id") VALUES ($1)', 3)